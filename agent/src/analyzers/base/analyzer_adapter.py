@@ -9,7 +9,8 @@ from typing import Dict, Any, Optional, List
 from abc import ABC, abstractmethod
 import logging
 
-from .state import GraphState, AnalysisResult, TaskType
+from ...core.workflow.state import GraphState, AnalysisResult, TaskType
+from ...core.workflow.deadline import NodeCancelled, check_cancelled
 from ..speech.speech_analyzer import SpeechAnalyzer
 from ..visual.visual_analyzer import VisualAnalyzer
 from ..content.content_analyzer import ContentAnalyzer
@@ -124,6 +125,9 @@ class SpeechAnalyzerAdapter(AnalyzerAdapter):
                 logger.warning("未提供音频文件路径或数据")
                 features = {}
             
+            # 特征提取耗时较长，任务已超时或请求截止时间已过时不再继续分析
+            check_cancelled()
+            
             # 进行分析
             analysis_params = task_data.get("params", {})
             result = analyzer.analyze(features, analysis_params)
@@ -144,6 +148,8 @@ class SpeechAnalyzerAdapter(AnalyzerAdapter):
                 details
             )
             
+        except NodeCancelled:
+            raise
         except Exception as e:
             logger.error(f"语音分析失败: {e}")
             return self._create_analysis_result(
@@ -241,6 +247,9 @@ class VisualAnalyzerAdapter(AnalyzerAdapter):
                 logger.warning("未提供视频文件路径或帧数据")
                 features = {}
             
+            # 特征提取耗时较长，任务已超时或请求截止时间已过时不再继续分析
+            check_cancelled()
+            
             # 进行分析
             analysis_params = task_data.get("params", {})
             result = analyzer.analyze(features, analysis_params)
@@ -252,7 +261,7 @@ class VisualAnalyzerAdapter(AnalyzerAdapter):
                 "expression": result.get("expression", 5.0),
                 "posture": result.get("posture", 5.0),
                 "engagement": result.get("engagement", 5.0),
-                "features": features
+                "features": analyzer.features_to_dict(features)
             }
             
             return self._create_analysis_result(
@@ -261,6 +270,8 @@ class VisualAnalyzerAdapter(AnalyzerAdapter):
                 details
             )
             
+        except NodeCancelled:
+            raise
         except Exception as e:
             logger.error(f"视觉分析失败: {e}")
             return self._create_analysis_result(
@@ -311,6 +322,9 @@ class ContentAnalyzerAdapter(AnalyzerAdapter):
             # 提取特征
             features = analyzer.extract_features(text)
             
+            # 特征提取耗时较长，任务已超时或请求截止时间已过时不再继续分析
+            check_cancelled()
+            
             # 进行分析
             analysis_params = task_data.get("params", {})
             result = analyzer.analyze(features, analysis_params)
@@ -330,6 +344,8 @@ class ContentAnalyzerAdapter(AnalyzerAdapter):
                 details
             )
             
+        except NodeCancelled:
+            raise
         except Exception as e:
             logger.error(f"内容分析失败: {e}")
             return self._create_analysis_result(
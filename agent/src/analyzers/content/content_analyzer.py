@@ -5,16 +5,22 @@
 分析面试回答内容，使用大语言模型进行多维度评分和分析
 """
 
+import asyncio
 import logging
 import json
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Awaitable, Callable, Dict, Any, Optional, List, Tuple
 
 from ...core.system.config import AgentConfig
 from ...services.content_filter_service import ContentFilterService
 from ...services.openai_service import OpenAIService
+from ...services.llm_router import build_llm_router
+from ...services.prompt_budget import PromptBudget, compress_transcript, estimate_tokens, extract_keywords
 
 logger = logging.getLogger(__name__)
 
+# 批量评分时为每个回答预留的响应token数
+BATCH_RESPONSE_TOKENS_PER_ANSWER = 700
+
 class ContentAnalyzer:
     """内容分析器"""
     
@@ -27,15 +33,25 @@ class ContentAnalyzer:
         logger.info("开始初始化内容分析器...")
         self.config = config or AgentConfig()
         self.openai_service = OpenAIService(config)
+        # 内容评分优先使用OpenAI兼容接口，配置了星火时可容错和对冲
+        self.llm_router = build_llm_router(self.config, preferred="openai",
+                                           resolve_openai=lambda: self.openai_service)
+        # 长回答压缩到提示词预算以内，LLM延迟不随回答长度增长
+        self.prompt_budget = PromptBudget(self.config)
         self.use_llm = self.config.get("content_analyzer", "use_llm", True)
+        # 批量评分：一个提示词包含多个问答，减少整场面试的LLM调用次数
+        self.batch_size = max(1, int(self.config.get("content", "batch_size", 6)))
+        self.batch_answer_tokens = int(self.config.get("content", "batch_answer_tokens", 600))
         logger.info("内容分析器初始化完成，LLM评分模式: %s", str(self.use_llm))
     
-    async def analyze_with_llm(self, transcript: str, job_position: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def analyze_with_llm(self, transcript: str, job_position: Optional[Dict[str, Any]] = None,
+                               on_token: Optional[Callable[[str], Awaitable[None]]] = None) -> Dict[str, Any]:
         """使用LLM分析内容
         
         Args:
             transcript: 文本内容
             job_position: 职位信息
+            on_token: 可选的异步回调，提供时以流式方式调用LLM，每收到一个文本片段就回调一次
             
         Returns:
             Dict[str, Any]: 分析结果
@@ -57,11 +73,14 @@ class ContentAnalyzer:
             ]
             
             logger.info("正在调用LLM服务进行内容分析...")
-            response = await self.openai_service.chat_completion(
-                messages=messages,
-                temperature=0.3,  # 低温度以获得更稳定的评分
-                max_tokens=2000
-            )
+            if on_token is not None:
+                response = await self._stream_llm(messages, on_token)
+            else:
+                response = await self.llm_router.chat(
+                    messages,
+                    temperature=0.3,  # 低温度以获得更稳定的评分
+                    max_tokens=2000
+                )
             
             # 解析结果
             if response.get("status") == "success":
@@ -82,30 +101,171 @@ class ContentAnalyzer:
             logger.warning("发生异常，正在回退到基于规则的评分方法")
             return self._fallback_analysis(transcript, job_position)
     
-    def _build_analysis_prompt(self, transcript: str, job_position: Optional[Dict[str, Any]] = None) -> str:
-        """构建分析提示词
+    async def _stream_llm(self, messages: List[Dict[str, str]],
+                          on_token: Callable[[str], Awaitable[None]]) -> Dict[str, Any]:
+        """流式调用LLM，边接收边回调，结束后返回与chat_completion相同格式的结果
         
         Args:
-            transcript: 文本内容
+            messages: 对话消息
+            on_token: 文本片段回调
+            
+        Returns:
+            Dict[str, Any]: 完整响应
+        """
+        pieces = []
+        async for piece in self.llm_router.stream(messages, temperature=0.3, max_tokens=2000):
+            pieces.append(piece)
+            await on_token(piece)
+        return {"status": "success", "content": "".join(pieces), "role": "assistant"}
+    
+    async def analyze_batch(self, qa_pairs: List[Dict[str, Any]],
+                            job_position: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """批量分析一场面试的多个回答
+        
+        多个问答打包进同一个结构化提示词（受 content_batch 预算和 batch_size 限制），
+        各批次并发调用LLM；批次调用失败或某个回答的结果无法解析时，对这些回答逐个调用
+        analyze_with_llm
+        
+        Args:
+            qa_pairs: 问答列表，每项包含 question 和 answer
             job_position: 职位信息
             
         Returns:
-            str: 构建好的提示词
+            List[Dict[str, Any]]: 与qa_pairs顺序一致的分析结果，格式同analyze_with_llm
         """
-        logger.debug("开始构建分析提示词")
+        if not qa_pairs:
+            return []
+        if not self.use_llm:
+            return [self._fallback_analysis(pair.get("answer") or "", job_position) for pair in qa_pairs]
+        
+        batches = self._pack_batches(qa_pairs, job_position)
+        logger.info("批量内容评分：%d 个回答打包为 %d 个批次", len(qa_pairs), len(batches))
+        batch_results = await asyncio.gather(*(self._score_batch(batch, job_position) for batch in batches))
+        
+        results: List[Optional[Dict[str, Any]]] = [None] * len(qa_pairs)
+        for batch, parsed in zip(batches, batch_results):
+            for position, index in enumerate(batch["indices"]):
+                results[index] = parsed.get(position + 1)
+        
+        missing = [index for index, result in enumerate(results) if result is None]
+        if missing:
+            logger.warning("批量评分有 %d 个回答未得到有效结果，逐个重新评分", len(missing))
+            retried = await asyncio.gather(*(
+                self.analyze_with_llm(qa_pairs[index].get("answer") or "", job_position) for index in missing
+            ))
+            for index, result in zip(missing, retried):
+                results[index] = result
+        return results
+    
+    def _pack_batches(self, qa_pairs: List[Dict[str, Any]],
+                      job_position: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+        """把问答按token预算和批次大小依次装入批次
+        
+        Args:
+            qa_pairs: 问答列表
+            job_position: 职位信息
+            
+        Returns:
+            List[Dict[str, Any]]: 批次列表，每项包含 indices（问答下标）、prompt 和 original_tokens
+        """
+        position_name, requirements_text, keywords = self._position_context(job_position)
+        budget = self.prompt_budget.budget_for("content_batch")
+        overhead = estimate_tokens(self._render_batch_prompt([], position_name, requirements_text))
+        
+        batches, indices, items, used, original = [], [], [], overhead, overhead
+        
+        def flush():
+            prompt = self._render_batch_prompt(items, position_name, requirements_text)
+            self.prompt_budget.metrics.record("content_batch", original, estimate_tokens(prompt), budget)
+            batches.append({"indices": list(indices), "prompt": prompt})
+        
+        for index, pair in enumerate(qa_pairs):
+            question = str(pair.get("question") or "")
+            answer = str(pair.get("answer") or "")
+            compressed = compress_transcript(answer, self.batch_answer_tokens, keywords,
+                                             self.prompt_budget.settings["max_sentence_chars"])
+            item = self._render_batch_item(len(items) + 1, question, compressed)
+            cost = estimate_tokens(item)
+            if items and (len(items) >= self.batch_size or used + cost > budget):
+                flush()
+                indices, items, used, original = [], [], overhead, overhead
+                item = self._render_batch_item(1, question, compressed)
+            indices.append(index)
+            items.append(item)
+            used += cost
+            original += estimate_tokens(self._render_batch_item(len(items), question, answer))
+        flush()
+        return batches
+    
+    async def _score_batch(self, batch: Dict[str, Any],
+                           job_position: Optional[Dict[str, Any]] = None) -> Dict[int, Dict[str, Any]]:
+        """调用LLM为一个批次评分
+        
+        Args:
+            batch: _pack_batches生成的批次
+            job_position: 职位信息
+            
+        Returns:
+            Dict[int, Dict[str, Any]]: 批次内序号（从1开始）到分析结果的映射，失败时为空
+        """
+        messages = [
+            {"role": "system", "content": "你是一位专业的面试评估专家，负责对面试回答进行分析和评分。"},
+            {"role": "user", "content": batch["prompt"]}
+        ]
+        try:
+            response = await self.llm_router.chat(
+                messages,
+                temperature=0.3,
+                max_tokens=min(4096, BATCH_RESPONSE_TOKENS_PER_ANSWER * len(batch["indices"]))
+            )
+        except Exception as e:
+            logger.exception("批量评分调用LLM失败: %s", e)
+            return {}
+        if response.get("status") != "success":
+            logger.error("批量评分调用LLM失败: %s", response.get("error", "未知错误"))
+            return {}
+        return self._parse_batch_response(response.get("content", ""), len(batch["indices"]))
+    
+    def _position_context(self, job_position: Optional[Dict[str, Any]] = None) -> Tuple[str, str, List[str]]:
+        """提取职位名称、要求文本和压缩关键词"""
         position_name = "未知职位"
         position_requirements = []
-        
         if job_position:
             position_name = job_position.get("title", "未知职位")
             position_requirements = job_position.get("requirements", [])
-            logger.debug("使用职位信息：职位=%s, 要求数量=%d", position_name, len(position_requirements))
-        else:
-            logger.debug("未提供职位信息，使用默认值")
-        
         requirements_text = ', '.join(position_requirements) if position_requirements else '未提供具体要求'
+        keywords = extract_keywords([
+            position_name, position_requirements, (job_position or {}).get("skills", [])
+        ])
+        return position_name, requirements_text, keywords
+    
+    def _build_analysis_prompt(self, transcript: str, job_position: Optional[Dict[str, Any]] = None) -> str:
+        """构建分析提示词
         
-        prompt = f"""
+        Args:
+            transcript: 文本内容
+            job_position: 职位信息
+            
+        Returns:
+            str: 构建好的提示词
+        """
+        logger.debug("开始构建分析提示词")
+        position_name, requirements_text, keywords = self._position_context(job_position)
+        logger.debug("使用职位信息：职位=%s", position_name)
+        
+        prompt = self.prompt_budget.fit(
+            "content",
+            lambda text: self._render_analysis_prompt(text, position_name, requirements_text),
+            transcript,
+            keywords
+        )
+        
+        logger.debug("提示词构建完成，长度为 %d 字符", len(prompt))
+        return prompt
+    
+    def _render_analysis_prompt(self, transcript: str, position_name: str, requirements_text: str) -> str:
+        """渲染分析提示词模板"""
+        return f"""
         请对以下面试回答进行专业、全面的分析和评分。应聘者正在应聘 {position_name} 职位。
 
         ## 面试回答内容:
@@ -160,9 +320,59 @@ class ContentAnalyzer:
 
         请确保JSON格式正确，overall_score为所有维度的加权平均分(权重自行判断)。
         """
-        
-        logger.debug("提示词构建完成，长度为 %d 字符", len(prompt))
-        return prompt
+    
+    def _render_batch_item(self, number: int, question: str, answer: str) -> str:
+        """渲染批量评分提示词中的一个问答"""
+        return f"""
+        ### 问答 {number}
+        问题: {question or '未提供'}
+        回答: {answer or '（未作答）'}
+        """
+    
+    def _render_batch_prompt(self, items: List[str], position_name: str, requirements_text: str) -> str:
+        """渲染批量评分提示词模板"""
+        answers = "".join(items)
+        return f"""
+        请对同一位应聘者的以下 {len(items)} 个面试回答分别进行专业分析和评分。应聘者正在应聘 {position_name} 职位。
+
+        ## 职位要求:
+        {requirements_text}
+
+        ## 面试问答:
+        {answers}
+
+        ## 每个回答按以下九个维度评分(每个维度0-100分):
+        专业技能相关性、问题理解、回答完整度、结构逻辑、表达流畅度、深度与细节、实践经验、创新思维、文化匹配度，
+        并各列出2-3点主要优势和改进建议。各回答独立评分，不要相互比较。
+
+        ## 请以JSON格式返回，results中每个问答一项，index为问答编号:
+        {{
+            "results": [
+                {{
+                    "index": 1,
+                    "scores": {{
+                        "professional_relevance": 85,
+                        "question_understanding": 90,
+                        "completeness": 75,
+                        "structure_logic": 80,
+                        "fluency": 85,
+                        "depth_detail": 70,
+                        "practical_experience": 75,
+                        "innovative_thinking": 65,
+                        "cultural_fit": 80,
+                        "overall_score": 78
+                    }},
+                    "analysis": {{
+                        "strengths": ["优势1", "优势2"],
+                        "suggestions": ["建议1", "建议2"]
+                    }},
+                    "summary": "一句话总结评价"
+                }}
+            ]
+        }}
+
+        请确保JSON格式正确，results包含全部 {len(items)} 个问答。
+        """
     
     def _parse_llm_response(self, response_text: str) -> Dict[str, Any]:
         """解析LLM响应
@@ -187,33 +397,7 @@ class ContentAnalyzer:
                 logger.debug("成功提取JSON字符串，长度: %d", len(json_str))
                 result = json.loads(json_str)
                 
-                # 确保result包含必要的字段
-                if not isinstance(result, dict):
-                    logger.error("解析失败：返回结果不是有效的JSON对象")
-                    raise ValueError("返回结果不是有效的JSON对象")
-                
-                # 检查scores字段
-                if "scores" not in result or not isinstance(result["scores"], dict):
-                    logger.error("解析失败：返回结果中缺少scores字段或格式不正确")
-                    raise ValueError("返回结果中缺少scores字段或格式不正确")
-                
-                # 检查analysis字段
-                if "analysis" not in result or not isinstance(result["analysis"], dict):
-                    logger.error("解析失败：返回结果中缺少analysis字段或格式不正确")
-                    raise ValueError("返回结果中缺少analysis字段或格式不正确")
-                
-                # 确保overall_score存在
-                if "overall_score" not in result["scores"]:
-                    logger.warning("返回结果中缺少overall_score字段，将自动计算")
-                    # 如果没有overall_score，计算平均分
-                    scores = result["scores"]
-                    score_values = [v for k, v in scores.items() if k != "overall_score" and isinstance(v, (int, float))]
-                    if score_values:
-                        result["scores"]["overall_score"] = round(sum(score_values) / len(score_values))
-                        logger.info("自动计算的overall_score值为: %d", result["scores"]["overall_score"])
-                    else:
-                        result["scores"]["overall_score"] = 0
-                        logger.warning("无法自动计算overall_score，设置为默认值0")
+                self._validate_llm_result(result)
                 
                 logger.info("LLM响应解析成功，得分: %s, 优势数量: %d, 改进建议数量: %d", 
                            result["scores"].get("overall_score"),
@@ -249,12 +433,108 @@ class ContentAnalyzer:
                 "error": str(e)
             }
     
-    async def analyze_async(self, transcript: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    def _parse_batch_response(self, response_text: str, count: int) -> Dict[int, Dict[str, Any]]:
+        """解析批量评分响应
+        
+        按index把结果对应到问答；缺少index但结果数与问答数一致时按顺序对应。
+        格式不正确的单项会被丢弃，由调用方逐个重新评分
+        
+        Args:
+            response_text: LLM返回的文本
+            count: 批次内的问答数
+            
+        Returns:
+            Dict[int, Dict[str, Any]]: 问答序号（从1开始）到分析结果的映射
+        """
+        text = response_text.strip()
+        items = None
+        for start_char, end_char in (("{", "}"), ("[", "]")):
+            json_start = text.find(start_char)
+            json_end = text.rfind(end_char) + 1
+            if json_start < 0 or json_end <= json_start:
+                continue
+            try:
+                data = json.loads(text[json_start:json_end])
+            except ValueError:
+                continue
+            items = data.get("results") if isinstance(data, dict) else data
+            if isinstance(items, list):
+                break
+            items = None
+        if items is None:
+            logger.error("无法从批量评分响应中提取results列表")
+            return {}
+        
+        by_order = len(items) == count
+        parsed = {}
+        for position, item in enumerate(items):
+            if not isinstance(item, dict):
+                continue
+            number = item.get("index")
+            if isinstance(number, str) and number.strip().isdigit():
+                number = int(number)
+            if not isinstance(number, int) or isinstance(number, bool):
+                if not by_order:
+                    continue
+                number = position + 1
+            if not 1 <= number <= count or number in parsed:
+                continue
+            try:
+                result = self._validate_llm_result({k: v for k, v in item.items() if k != "index"})
+            except ValueError:
+                continue
+            parsed[number] = result
+        logger.info("批量评分响应解析完成，有效结果 %d/%d", len(parsed), count)
+        return parsed
+    
+    def _validate_llm_result(self, result: Any) -> Dict[str, Any]:
+        """校验单个回答的评分结果，缺少overall_score时按各维度平均分补全
+        
+        Args:
+            result: 从LLM响应中解析出的对象
+            
+        Returns:
+            Dict[str, Any]: 校验后的结果
+            
+        Raises:
+            ValueError: 结果格式不正确
+        """
+        if not isinstance(result, dict):
+            logger.error("解析失败：返回结果不是有效的JSON对象")
+            raise ValueError("返回结果不是有效的JSON对象")
+        
+        # 检查scores字段
+        if "scores" not in result or not isinstance(result["scores"], dict):
+            logger.error("解析失败：返回结果中缺少scores字段或格式不正确")
+            raise ValueError("返回结果中缺少scores字段或格式不正确")
+        
+        # 检查analysis字段
+        if "analysis" not in result or not isinstance(result["analysis"], dict):
+            logger.error("解析失败：返回结果中缺少analysis字段或格式不正确")
+            raise ValueError("返回结果中缺少analysis字段或格式不正确")
+        
+        # 确保overall_score存在
+        if "overall_score" not in result["scores"]:
+            logger.warning("返回结果中缺少overall_score字段，将自动计算")
+            # 如果没有overall_score，计算平均分
+            scores = result["scores"]
+            score_values = [v for k, v in scores.items() if k != "overall_score" and isinstance(v, (int, float))]
+            if score_values:
+                result["scores"]["overall_score"] = round(sum(score_values) / len(score_values))
+                logger.info("自动计算的overall_score值为: %d", result["scores"]["overall_score"])
+            else:
+                result["scores"]["overall_score"] = 0
+                logger.warning("无法自动计算overall_score，设置为默认值0")
+        return result
+    
+    async def analyze_async(self, transcript: str, params: Optional[Dict[str, Any]] = None,
+                            on_token: Optional[Callable[[str], Awaitable[None]]] = None) -> Dict[str, Any]:
         """异步分析内容
         
         Args:
             transcript: 文本内容
             params: 分析参数，如职位信息等
+            on_token: 可选的LLM文本片段回调，用于向客户端流式推送评估过程
             
         Returns:
             Dict[str, Any]: 分析结果
@@ -281,7 +561,7 @@ class ContentAnalyzer:
             if self.use_llm:
                 logger.info("使用LLM进行内容评分分析...")
                 try:
-                    result = await self.analyze_with_llm(filtered_text, job_position)
+                    result = await self.analyze_with_llm(filtered_text, job_position, on_token=on_token)
                     
                     # 如果LLM评分成功，返回结果
                     if "scores" in result and "analysis" in result:
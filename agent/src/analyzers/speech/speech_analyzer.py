@@ -7,19 +7,25 @@
 
 import logging
 import json
-from typing import Dict, Any, Optional, List
+from typing import Awaitable, Callable, Dict, Any, Optional, List
 import numpy as np
 import asyncio
 from concurrent.futures import ThreadPoolExecutor
 
 from ...core.system.config import AgentConfig
+from ...core.system.resource_registry import ResourceRegistry, get_resource_registry, config_fingerprint
 from ...services.content_filter_service import ContentFilterService
 from ...services.xunfei_service import XunFeiService
 from ...services.async_xunfei_service import AsyncXunFeiService
+from ...services.llm_router import build_llm_router
+from ...services.prompt_budget import PromptBudget, format_feature
 from .audio_feature_extractor import AudioFeatureExtractor
 
 logger = logging.getLogger(__name__)
 
+# 进程内共享的线程池资源名
+THREAD_POOL_RESOURCE = "speech.thread_pool"
+
 class SpeechAnalyzer:
     """语音分析器"""
     
@@ -45,40 +51,102 @@ class SpeechAnalyzer:
             logger.info("已检测到星火大模型配置，将使用星火Lite版本进行语音分析")
             self.use_xunfei_llm = True
         
-        # 初始化讯飞服务
+        # 初始化讯飞服务（客户端从进程级资源注册表获取，多个分析器实例共享）
         self.xunfei_service = None
         self.async_xunfei_service = None
+        self._registry = get_resource_registry()
+        self._acquired_resources = []
+        services_fingerprint = config_fingerprint(self.config.get_section("services"))
         
         if self.use_xunfei:
             try:
                 logger.info("正在初始化讯飞服务...")
                 # 同步服务仅用于非异步方法
-                from agent.src.services.xunfei_service import XunFeiService
-                self.xunfei_service = XunFeiService(self.config)
+                self.xunfei_service = self._acquire_resource(
+                    ("speech.xunfei_service", XunFeiService, services_fingerprint),
+                    lambda: XunFeiService(self.config)
+                )
                 logger.info("讯飞服务初始化成功")
-                
-                # 初始化异步讯飞服务（用于异步方法）
-                if self.use_xunfei_llm:
-                    logger.info("正在初始化讯飞异步服务...")
-                    from agent.src.services.async_xunfei_service import AsyncXunFeiService
-                    self.async_xunfei_service = AsyncXunFeiService(self.config)
-                    logger.info("讯飞异步服务初始化成功")
             except Exception as e:
                 logger.error(f"初始化讯飞服务失败: {e}", exc_info=True)
                 self.use_xunfei = False
                 self.use_xunfei_llm = False
                 self.xunfei_service = None
+        
+        # 初始化异步讯飞服务（用于异步方法）
+        if self.use_xunfei and self.use_xunfei_llm:
+            try:
+                logger.info("正在初始化讯飞异步服务...")
+                self.async_xunfei_service = self._acquire_resource(
+                    ("speech.async_xunfei_service", AsyncXunFeiService, services_fingerprint),
+                    lambda: AsyncXunFeiService(self.config)
+                )
+                logger.info("讯飞异步服务初始化成功")
+            except Exception as e:
+                logger.error(f"初始化讯飞异步服务失败: {e}", exc_info=True)
+                self.use_xunfei_llm = False
                 self.async_xunfei_service = None
         
+        # 语音评分优先使用星火，配置了OpenAI兼容接口时可容错和对冲
+        self.llm_router = build_llm_router(
+            self.config, preferred="xunfei",
+            resolve_xunfei=(lambda: self.async_xunfei_service) if self.async_xunfei_service is not None else None
+        )
+        # 长转写文本压缩到提示词预算以内，避免超出星火Lite的上下文
+        self.prompt_budget = PromptBudget(self.config)
+        
         # 初始化基本特征提取器
-        from .audio_feature_extractor import AudioFeatureExtractor
         self.feature_extractor = AudioFeatureExtractor()
         
-        # 创建线程池用于并行处理
-        self.thread_pool = ThreadPoolExecutor(max_workers=5)
+        # 并行处理用的线程池（进程内共享）
+        self.thread_pool = self._acquire_resource(
+            THREAD_POOL_RESOURCE,
+            lambda: ThreadPoolExecutor(max_workers=5, thread_name_prefix="speech-analyzer"),
+            closer=lambda pool: pool.shutdown(wait=False)
+        )
         
         logger.info("语音分析器初始化完成")
     
+    def _acquire_resource(self, name, factory, closer=None):
+        """从资源注册表获取共享资源，并记录以便close()时释放"""
+        resource = self._registry.acquire(name, factory, closer)
+        self._acquired_resources.append(name)
+        return resource
+    
+    def close(self):
+        """释放本实例持有的共享资源引用"""
+        for name in self._acquired_resources:
+            self._registry.release(name)
+        self._acquired_resources = []
+    
+    @staticmethod
+    def register_shared_resources(registry: ResourceRegistry, config: Optional[AgentConfig] = None):
+        """注册语音分析器的可预热共享资源
+        
+        Args:
+            registry: 资源注册表
+            config: 配置对象
+        """
+        config = config or AgentConfig()
+        services_fingerprint = config_fingerprint(config.get_section("services"))
+        registry.register(
+            THREAD_POOL_RESOURCE,
+            lambda: ThreadPoolExecutor(max_workers=5, thread_name_prefix="speech-analyzer"),
+            closer=lambda pool: pool.shutdown(wait=False),
+            warm_up=True
+        )
+        if config.get("speech", "use_xunfei", True):
+            registry.register(
+                ("speech.xunfei_service", XunFeiService, services_fingerprint),
+                lambda: XunFeiService(config),
+                warm_up=True
+            )
+            registry.register(
+                ("speech.async_xunfei_service", AsyncXunFeiService, services_fingerprint),
+                lambda: AsyncXunFeiService(config),
+                warm_up=True
+            )
+    
     def _extract_xunfei_features(self, audio_bytes: bytes) -> Dict[str, Any]:
         """提取讯飞API特征
         
@@ -615,13 +683,15 @@ class SpeechAnalyzer:
             logger.error(f"异步提取语音特征失败: {e}", exc_info=True)
             return {}
     
-    async def analyze_with_llm(self, audio_file: str, transcript: str = None, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def analyze_with_llm(self, audio_file: str, transcript: str = None, params: Optional[Dict[str, Any]] = None,
+                               on_token: Optional[Callable[[str], Awaitable[None]]] = None) -> Dict[str, Any]:
         """使用大语言模型进行语音分析（异步）
         
         Args:
             audio_file: 音频文件路径
             transcript: 预先转录的文本（可选）
             params: 分析参数 (可选)
+            on_token: 可选的异步回调，提供时流式调用星火大模型，每收到一个回答片段就回调一次
             
         Returns:
             Dict[str, Any]: 分析结果
@@ -649,7 +719,10 @@ class SpeechAnalyzer:
             prompt = self._build_speech_analysis_prompt(transcript, features)
             messages = [{"role": "user", "content": prompt}]
             
-            response = await self.async_xunfei_service.chat_spark(messages)
+            if on_token is not None:
+                response = await self._stream_spark(messages, on_token)
+            else:
+                response = await self.llm_router.chat(messages, temperature=0.5, max_tokens=2048)
             
             if response and response.get("status") == "success":
                 logger.info("星火大模型分析成功")
@@ -662,6 +735,24 @@ class SpeechAnalyzer:
             logger.error(f"使用LLM进行语音分析时出错: {e}", exc_info=True)
             return await self._fallback_analysis_async(audio_file)
     
+    async def _stream_spark(self, messages: List[Dict[str, str]],
+                            on_token: Callable[[str], Awaitable[None]]) -> Dict[str, Any]:
+        """流式调用大模型（优先星火），边接收边回调，结束后返回与chat_spark相同格式的结果
+        
+        Args:
+            messages: 对话消息
+            on_token: 回答片段回调
+            
+        Returns:
+            Dict[str, Any]: 完整响应
+        """
+        pieces = []
+        token_usage = {}
+        async for piece in self.llm_router.stream(messages, temperature=0.5, max_tokens=2048, usage=token_usage):
+            pieces.append(piece)
+            await on_token(piece)
+        return {"status": "success", "content": "".join(pieces), "token_usage": token_usage}
+    
     def _build_speech_analysis_prompt(self, transcript: str, features: Dict[str, Any]) -> str:
         """为语音分析构建提示词
         
@@ -672,27 +763,28 @@ class SpeechAnalyzer:
         Returns:
             str: 构建好的提示词
         """
-        # 提取关键特征用于提示词
-        speech_rate = features.get("speech_rate", "未知")
-        pitch_mean = features.get("pitch_mean", "未知")
-        energy_mean = features.get("energy_mean", "未知")
+        # 提取关键特征用于提示词（数值保留两位小数，序列只保留统计量）
+        speech_rate = format_feature(features.get("speech_rate"))
+        pitch_mean = format_feature(features.get("pitch_mean"))
+        energy_mean = format_feature(features.get("energy_mean"))
         
         # 讯飞评测结果
         xunfei_assessment = features.get("xunfei_assessment", {})
-        clarity = xunfei_assessment.get("clarity", "未知")
-        fluency = xunfei_assessment.get("fluency", "未知")
-        integrity = xunfei_assessment.get("integrity", "未知")
-        speed = xunfei_assessment.get("speed", "未知")
+        clarity = format_feature(xunfei_assessment.get("clarity"))
+        fluency = format_feature(xunfei_assessment.get("fluency"))
+        integrity = format_feature(xunfei_assessment.get("integrity"))
+        speed = format_feature(xunfei_assessment.get("speed"))
         
         # 情感分析结果
         xunfei_emotion = features.get("xunfei_emotion", {})
-        emotion = xunfei_emotion.get("emotion", "未知")
+        emotion = format_feature(xunfei_emotion.get("emotion"))
         
-        prompt = f"""
+        def render(text: str) -> str:
+            return f"""
         请作为专业的面试语音分析专家，对以下面试语音进行全面分析。
         
         ## 语音转写文本
-        {transcript}
+        {text}
         
         ## 语音特征数据
         - 语速: {speech_rate} 字/秒
@@ -741,6 +833,7 @@ class SpeechAnalyzer:
         请确保JSON格式正确，overall_score为所有维度的加权平均分。
         """
         
+        prompt = self.prompt_budget.fit("speech", render, transcript)
         logger.debug(f"构建的提示词: {prompt}")
         return prompt
     
@@ -978,7 +1071,8 @@ class SpeechAnalyzer:
         features = self.extract_features(audio_file)
         return self.analyze(features)
 
-    async def analyze_async(self, audio_file: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    async def analyze_async(self, audio_file: str, params: Optional[Dict[str, Any]] = None,
+                            on_token: Optional[Callable[[str], Awaitable[None]]] = None) -> Dict[str, Any]:
         """异步分析音频文件
         
         使用LLM或基于规则的方法进行分析
@@ -986,6 +1080,7 @@ class SpeechAnalyzer:
         Args:
             audio_file: 音频文件路径
             params: 分析参数
+            on_token: 可选的LLM回答片段回调，用于向客户端流式推送评估过程
             
         Returns:
             Dict[str, Any]: 分析结果
@@ -996,7 +1091,7 @@ class SpeechAnalyzer:
             # 如果启用了讯飞星火大模型，使用LLM分析
             if self.use_xunfei_llm and self.async_xunfei_service:
                 logger.info("使用讯飞星火大模型进行分析...")
-                result = await self.analyze_with_llm(audio_file)
+                result = await self.analyze_with_llm(audio_file, on_token=on_token)
                 
                 # 如果LLM分析成功，转换为兼容旧版API的格式
                 if "scores" in result and "analysis" in result:
@@ -0,0 +1,469 @@
+# agent/analyzers/visual/frame_inference_service.py
+
+from typing import Dict, Any, Optional, List, Tuple, Callable
+import os
+import cv2
+import numpy as np
+import time
+import threading
+import logging
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
+from queue import Queue, Empty
+
+from ...core.system.config import AgentConfig
+from ...core.system.resource_registry import get_resource_registry
+
+logger = logging.getLogger(__name__)
+
+# 人脸框格式: (x, y, w, h)
+FaceBox = Tuple[int, int, int, int]
+
+# 进程内共享的Haar人脸检测器资源名
+FACE_DETECTOR_RESOURCE = "visual.face_detector.haarcascade"
+
+
+def create_haar_face_detector() -> cv2.CascadeClassifier:
+    """创建OpenCV内置的Haar级联人脸检测器"""
+    model_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
+    return cv2.CascadeClassifier(model_path)
+
+
+def _detect_haar(detector: cv2.CascadeClassifier, frame: np.ndarray) -> List[FaceBox]:
+    """使用Haar级联分类器检测单帧"""
+    gray = frame if frame.ndim == 2 else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    faces = detector.detectMultiScale(
+        gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30)
+    )
+    return [tuple(int(v) for v in face) for face in faces]
+
+
+def detect_faces(frame: np.ndarray) -> List[FaceBox]:
+    """使用进程内共享的Haar检测器检测单帧人脸
+
+    可作为进程后端的任务：检测器在工作进程预热时加载一次，之后的调用直接复用。
+
+    Args:
+        frame: BGR或灰度图像
+
+    Returns:
+        List[FaceBox]: 人脸框列表
+    """
+    registry = get_resource_registry()
+    detector = registry.acquire(FACE_DETECTOR_RESOURCE, create_haar_face_detector)
+    try:
+        return _detect_haar(detector, frame)
+    finally:
+        registry.release(FACE_DETECTOR_RESOURCE)
+
+
+@dataclass
+class FrameInferenceRequest:
+    """单帧推理请求"""
+    session_id: str
+    frame: np.ndarray
+    future: Future = field(default_factory=Future)
+    submitted_at: float = field(default_factory=time.time)
+
+
+class BatchedFrameInferenceService:
+    """批量帧推理服务
+
+    汇集多个面试会话提交的视频帧，在一个很短的时间窗口内组成微批次，
+    统一执行人脸检测后再把结果按请求路由回各个会话。
+
+    支持两种检测后端:
+    - haarcascade: OpenCV级联分类器只能逐帧检测，合批没有收益，各会话的帧直接分发到
+      小型线程池并行检测，共享同一个分类器
+    - dnn: 基于cv2.dnn的SSD人脸检测模型，整批帧通过blobFromImages一次前向推理
+
+    Args:
+        config: 配置对象，如果为None则创建默认配置
+        detector: 自定义批量检测函数，输入帧列表，返回每帧的人脸框列表（主要用于测试）
+    """
+
+    def __init__(self, config: Optional[AgentConfig] = None,
+                 detector: Optional[Callable[[List[np.ndarray]], List[List[FaceBox]]]] = None):
+        """初始化批量帧推理服务
+
+        Args:
+            config: 配置对象
+            detector: 自定义批量检测函数
+        """
+        self.config = config or AgentConfig()
+
+        # 批处理参数
+        self.max_batch_size = self.config.get("visual", "inference_max_batch_size", 16)
+        self.batch_window = self.config.get("visual", "inference_batch_window", 0.01)  # 聚批等待窗口（秒）
+        self.face_detection_model = self.config.get("visual", "face_detection_model", "haarcascade")
+        self.haar_workers = self.config.get("visual", "inference_haar_workers", 4)
+
+        # DNN人脸检测模型配置（Caffe格式的res10 SSD模型）
+        self.dnn_model_path = self.config.get("visual", "dnn_model_path", "")
+        self.dnn_config_path = self.config.get("visual", "dnn_config_path", "")
+        self.dnn_input_size = tuple(self.config.get("visual", "dnn_input_size", (300, 300)))
+        self.dnn_confidence_threshold = self.config.get("visual", "dnn_confidence_threshold", 0.5)
+
+        self._custom_detector = detector
+        self._face_detector = None
+        self._dnn_net = None
+
+        # 请求队列与工作线程（批量后端），Haar后端使用线程池
+        self._queue: "Queue[FrameInferenceRequest]" = Queue()
+        self._worker = None
+        self._haar_pool: Optional[ThreadPoolExecutor] = None
+        self._running = False
+        self._lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+
+        # 统计信息
+        self._stats = {
+            "total_frames": 0,
+            "total_batches": 0,
+            "max_batch_size": 0,
+            "total_inference_time": 0.0,
+            "failed_batches": 0
+        }
+
+        logger.info(f"初始化批量帧推理服务: backend={self.face_detection_model}, "
+                    f"max_batch_size={self.max_batch_size}, batch_window={self.batch_window}")
+
+    def start(self):
+        """启动推理工作线程"""
+        with self._lock:
+            if self._running:
+                return
+
+            self._load_detector()
+            self._running = True
+            if self._backend_name() == "haarcascade":
+                self._haar_pool = ThreadPoolExecutor(
+                    max_workers=max(1, self.haar_workers),
+                    thread_name_prefix="FrameInferenceHaar"
+                )
+            else:
+                self._worker = threading.Thread(
+                    target=self._worker_loop,
+                    name="FrameInferenceWorker",
+                    daemon=True
+                )
+                self._worker.start()
+
+        logger.info("批量帧推理服务已启动")
+
+    def stop(self, timeout: float = 5.0):
+        """停止推理工作线程
+
+        未处理的请求会以异常结束，避免调用方无限等待
+
+        Args:
+            timeout: 等待工作线程退出的超时时间（秒）
+        """
+        with self._lock:
+            if not self._running:
+                return
+            self._running = False
+
+        if self._worker is not None:
+            self._worker.join(timeout=timeout)
+            self._worker = None
+
+        # 已提交到线程池的帧检测完成后再关闭
+        if self._haar_pool is not None:
+            self._haar_pool.shutdown(wait=True)
+            self._haar_pool = None
+
+        # 清理残留请求
+        while True:
+            try:
+                request = self._queue.get_nowait()
+            except Empty:
+                break
+            if not request.future.done():
+                request.future.set_exception(RuntimeError("批量帧推理服务已停止"))
+
+        # 归还启动时从资源注册表取得的检测器引用
+        if self._face_detector is not None:
+            get_resource_registry().release(FACE_DETECTOR_RESOURCE)
+            self._face_detector = None
+
+        logger.info("批量帧推理服务已停止")
+
+    @property
+    def is_running(self) -> bool:
+        """服务是否在运行"""
+        return self._running
+
+    def submit(self, session_id: str, frame: np.ndarray) -> Future:
+        """提交一帧进行推理
+
+        Args:
+            session_id: 会话ID
+            frame: BGR或灰度图像帧
+
+        Returns:
+            Future: 完成后结果为该帧的人脸框列表
+        """
+        if not self._running:
+            self.start()
+
+        pool = self._haar_pool
+        if pool is not None:
+            try:
+                return pool.submit(self._detect_one_haar, frame)
+            except RuntimeError:
+                # 线程池已随服务停止关闭
+                future = Future()
+                future.set_exception(RuntimeError("批量帧推理服务已停止"))
+                return future
+
+        request = FrameInferenceRequest(session_id=session_id, frame=frame)
+        self._queue.put(request)
+        return request.future
+
+    def detect(self, session_id: str, frame: np.ndarray, timeout: Optional[float] = None) -> List[FaceBox]:
+        """同步检测一帧中的人脸（阻塞直到所在批次完成）
+
+        Args:
+            session_id: 会话ID
+            frame: 图像帧
+            timeout: 等待超时时间（秒）
+
+        Returns:
+            List[FaceBox]: 人脸框列表
+        """
+        return self.submit(session_id, frame).result(timeout=timeout)
+
+    async def detect_async(self, session_id: str, frame: np.ndarray) -> List[FaceBox]:
+        """异步检测一帧中的人脸
+
+        Args:
+            session_id: 会话ID
+            frame: 图像帧
+
+        Returns:
+            List[FaceBox]: 人脸框列表
+        """
+        return await asyncio.wrap_future(self.submit(session_id, frame))
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        with self._stats_lock:
+            stats = self._stats.copy()
+        if stats["total_batches"] > 0:
+            stats["avg_batch_size"] = stats["total_frames"] / stats["total_batches"]
+            stats["avg_inference_time"] = stats["total_inference_time"] / stats["total_batches"]
+        else:
+            stats["avg_batch_size"] = 0.0
+            stats["avg_inference_time"] = 0.0
+        stats["queue_size"] = self._queue.qsize()
+        stats["backend"] = self._backend_name()
+        return stats
+
+    def _backend_name(self) -> str:
+        """当前使用的检测后端名称"""
+        if self._custom_detector is not None:
+            return "custom"
+        if self._dnn_net is not None:
+            return "dnn"
+        return "haarcascade"
+
+    def _load_detector(self):
+        """加载检测模型"""
+        if self._custom_detector is not None:
+            return
+
+        if self.face_detection_model == "dnn":
+            if self.dnn_model_path and self.dnn_config_path and \
+                    os.path.exists(self.dnn_model_path) and os.path.exists(self.dnn_config_path):
+                try:
+                    self._dnn_net = cv2.dnn.readNetFromCaffe(self.dnn_config_path, self.dnn_model_path)
+                    logger.info(f"成功加载DNN人脸检测模型: {self.dnn_model_path}")
+                    return
+                except Exception as e:
+                    logger.error(f"加载DNN人脸检测模型失败: {e}", exc_info=True)
+            else:
+                logger.warning("DNN人脸检测模型文件未配置或不存在，回退到Haar级联检测器")
+
+        if self._face_detector is None:
+            # 与VisualAnalyzer共享进程内的Haar检测器
+            self._face_detector = get_resource_registry().acquire(
+                FACE_DETECTOR_RESOURCE, create_haar_face_detector
+            )
+            logger.info("成功加载Haar级联人脸检测器")
+
+    def _collect_batch(self) -> List[FrameInferenceRequest]:
+        """从队列中收集一个微批次
+
+        阻塞等待第一帧，之后在batch_window时间窗口内尽量凑满max_batch_size
+
+        Returns:
+            List[FrameInferenceRequest]: 请求批次，服务停止时可能为空
+        """
+        try:
+            first = self._queue.get(timeout=0.1)
+        except Empty:
+            return []
+
+        batch = [first]
+        deadline = time.time() + self.batch_window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._queue.get(timeout=remaining))
+            except Empty:
+                break
+
+        # 时间窗口结束后，把已经排队的请求也一并带走（不再等待）
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(self._queue.get_nowait())
+            except Empty:
+                break
+
+        return batch
+
+    def _worker_loop(self):
+        """工作线程循环"""
+        while self._running:
+            batch = self._collect_batch()
+            if not batch:
+                continue
+
+            start_time = time.time()
+            try:
+                results = self._detect_batch([request.frame for request in batch])
+            except Exception as e:
+                logger.error(f"批量人脸检测失败: {e}", exc_info=True)
+                with self._stats_lock:
+                    self._stats["failed_batches"] += 1
+                for request in batch:
+                    if not request.future.done():
+                        request.future.set_exception(e)
+                continue
+
+            self._record_batch(len(batch), time.time() - start_time)
+
+            # 结果路由回各个会话
+            for request, faces in zip(batch, results):
+                if not request.future.done():
+                    request.future.set_result(faces)
+
+            # 检测器返回的结果少于请求数时，没有结果的请求以异常结束，避免调用方一直等待
+            if len(results) < len(batch):
+                logger.error(f"检测结果数量({len(results)})少于批次大小({len(batch)})")
+                for request in batch[len(results):]:
+                    if not request.future.done():
+                        request.future.set_exception(RuntimeError("检测器未返回该帧的结果"))
+
+    def _record_batch(self, size: int, inference_time: float):
+        """记录一次检测的统计信息
+
+        Args:
+            size: 检测的帧数
+            inference_time: 检测耗时（秒）
+        """
+        with self._stats_lock:
+            self._stats["total_frames"] += size
+            self._stats["total_batches"] += 1
+            self._stats["max_batch_size"] = max(self._stats["max_batch_size"], size)
+            self._stats["total_inference_time"] += inference_time
+
+    def _detect_one_haar(self, frame: np.ndarray) -> List[FaceBox]:
+        """在线程池中使用Haar级联分类器检测单帧
+
+        Args:
+            frame: 图像帧
+
+        Returns:
+            List[FaceBox]: 人脸框列表
+        """
+        start_time = time.time()
+        try:
+            faces = _detect_haar(self._face_detector, frame)
+        except Exception:
+            with self._stats_lock:
+                self._stats["failed_batches"] += 1
+            raise
+        self._record_batch(1, time.time() - start_time)
+        return faces
+
+    def _detect_batch(self, frames: List[np.ndarray]) -> List[List[FaceBox]]:
+        """对一批帧执行人脸检测
+
+        Args:
+            frames: 图像帧列表
+
+        Returns:
+            List[List[FaceBox]]: 每帧对应的人脸框列表
+        """
+        if self._custom_detector is not None:
+            return self._custom_detector(frames)
+
+        return self._detect_batch_dnn(frames)
+
+    def _detect_batch_dnn(self, frames: List[np.ndarray]) -> List[List[FaceBox]]:
+        """使用DNN模型对一批帧做一次前向推理
+
+        SSD检测输出形状为(1, 1, N, 7)，每行为
+        [batch_id, class_id, confidence, x1, y1, x2, y2]，坐标为相对值
+        """
+        images = [cv2.cvtColor(frame, cv2.COLOR_GRAY2BGR) if frame.ndim == 2 else frame for frame in frames]
+        blob = cv2.dnn.blobFromImages(
+            images, 1.0, self.dnn_input_size, (104.0, 177.0, 123.0), swapRB=False, crop=False
+        )
+        self._dnn_net.setInput(blob)
+        detections = self._dnn_net.forward()
+
+        results: List[List[FaceBox]] = [[] for _ in frames]
+        for detection in detections.reshape(-1, 7):
+            batch_id = int(detection[0])
+            confidence = float(detection[2])
+            if batch_id < 0 or batch_id >= len(frames) or confidence < self.dnn_confidence_threshold:
+                continue
+
+            height, width = images[batch_id].shape[:2]
+            x1 = int(max(0.0, detection[3]) * width)
+            y1 = int(max(0.0, detection[4]) * height)
+            x2 = int(min(1.0, detection[5]) * width)
+            y2 = int(min(1.0, detection[6]) * height)
+            if x2 > x1 and y2 > y1:
+                results[batch_id].append((x1, y1, x2 - x1, y2 - y1))
+
+        return results
+
+
+# 进程内共享的推理服务实例
+_shared_service: Optional[BatchedFrameInferenceService] = None
+_shared_service_lock = threading.Lock()
+
+
+def get_frame_inference_service(config: Optional[AgentConfig] = None) -> BatchedFrameInferenceService:
+    """获取进程内共享的批量帧推理服务
+
+    首次调用时根据配置创建并启动服务，后续调用返回同一实例
+
+    Args:
+        config: 配置对象，仅在首次创建时生效
+
+    Returns:
+        BatchedFrameInferenceService: 共享的推理服务
+    """
+    global _shared_service
+    with _shared_service_lock:
+        if _shared_service is None:
+            _shared_service = BatchedFrameInferenceService(config)
+            _shared_service.start()
+        return _shared_service
+
+
+def shutdown_frame_inference_service():
+    """停止并释放共享的批量帧推理服务"""
+    global _shared_service
+    with _shared_service_lock:
+        if _shared_service is not None:
+            _shared_service.stop()
+            _shared_service = None
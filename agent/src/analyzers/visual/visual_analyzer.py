@@ -13,12 +13,47 @@ import asyncio
 
 from ..base.analyzer import Analyzer
 from ...core.system.config import AgentConfig
+from ...core.system.resource_registry import ResourceRegistry, get_resource_registry
 from ...utils.utils import normalize_score, weighted_average
 from ...services.content_filter_service import ContentFilterService
 from ...services.async_xunfei_service import AsyncXunFeiService
+from ...services.llm_router import build_llm_router
+from ...services.prompt_budget import PromptBudget
+from .frame_inference_service import get_frame_inference_service, FACE_DETECTOR_RESOURCE, create_haar_face_detector
+from .visual_features import VisualFeatureColumns
 
 logger = logging.getLogger(__name__)
 
+
+class FrameStreamState:
+    """单路视频流的实时分析状态
+    
+    帧缓冲区、分析历史、趋势缓冲区和分析节流时间都属于某一路视频流，
+    多个会话共用一个分析器时各自持有一份，互不干扰。
+    """
+    
+    def __init__(self, buffer_size: int = 30, history_size: int = 50):
+        """初始化视频流状态
+        
+        Args:
+            buffer_size: 帧缓冲区大小
+            history_size: 分析历史记录数量
+        """
+        self.frame_buffer = deque(maxlen=buffer_size)  # 视频帧缓冲区
+        self.analysis_history = deque(maxlen=history_size)  # 分析历史记录
+        # 趋势指标环形缓冲区，列依次为眼神接触、表情、姿态、注意力评分
+        self.trend_values = np.zeros((history_size, 4), dtype=np.float32)
+        self.trend_count = 0
+        self.last_analysis_time = 0
+    
+    def clear(self):
+        """清空流式数据"""
+        self.frame_buffer.clear()
+        self.analysis_history.clear()
+        self.trend_count = 0
+        self.last_analysis_time = 0
+
+
 class VisualAnalyzer(Analyzer):
     """视觉分析器
     
@@ -43,13 +78,16 @@ class VisualAnalyzer(Analyzer):
         # 初始化人脸检测器（延迟加载）
         self._face_detector = None
         
-        # 流式处理相关属性
-        self.frame_buffer = deque(maxlen=30)  # 视频帧缓冲区
-        self.analysis_history = deque(maxlen=50)  # 分析历史记录
-        self.last_analysis_time = 0
+        # 流式处理相关属性，未指定视频流状态时使用分析器自身的默认状态
+        self.stream_state = FrameStreamState()
+        self.frame_buffer = self.stream_state.frame_buffer
+        self.analysis_history = self.stream_state.analysis_history
         self.analysis_interval = 0.5  # 分析间隔（秒）
         self.face_tracking = {}  # 人脸跟踪信息
         
+        # 多会话批量推理（实时帧交给进程内共享的推理服务聚批检测）
+        self.use_batched_inference = self.get_config("batched_inference", False)
+        
         # 讯飞LLM相关配置
         self.use_xunfei_llm = self.config.get("visual", "use_xunfei_llm", True)
         self.async_xunfei_service = None
@@ -65,27 +103,49 @@ class VisualAnalyzer(Analyzer):
                 self.use_xunfei_llm = False
                 self.async_xunfei_service = None
         
+        # 视觉评分优先使用星火，配置了OpenAI兼容接口时可容错和对冲
+        self.llm_router = build_llm_router(
+            self.config, preferred="xunfei",
+            resolve_xunfei=(lambda: self.async_xunfei_service) if self.async_xunfei_service is not None else None
+        )
+        self.prompt_budget = PromptBudget(self.config)
+        
         logger.info("视觉分析器初始化完成")
     
     def _load_face_detector(self):
-        """加载人脸检测器"""
+        """加载人脸检测器
+        
+        检测器从进程级资源注册表获取，同一进程内的所有分析器实例共享一份模型
+        """
         logger.info("开始加载人脸检测器...")
         try:
-            if self.face_detection_model == "haarcascade":
-                # 使用OpenCV内置的Haar级联分类器
-                model_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-                self._face_detector = cv2.CascadeClassifier(model_path)
-                logger.info("成功加载Haar级联人脸检测器")
-            else:
-                # 默认使用Haar级联分类器
-                model_path = cv2.data.haarcascades + 'haarcascade_frontalface_default.xml'
-                self._face_detector = cv2.CascadeClassifier(model_path)
+            if self.face_detection_model != "haarcascade":
                 logger.info("使用默认Haar级联人脸检测器")
+            self._face_detector = get_resource_registry().acquire(
+                FACE_DETECTOR_RESOURCE, create_haar_face_detector
+            )
+            logger.info("成功加载Haar级联人脸检测器")
         
         except Exception as e:
             logger.error(f"加载人脸检测器失败: {e}", exc_info=True)
             self._face_detector = None
     
+    def close(self):
+        """释放共享的人脸检测器引用"""
+        if self._face_detector is not None:
+            get_resource_registry().release(FACE_DETECTOR_RESOURCE)
+            self._face_detector = None
+    
+    @staticmethod
+    def register_shared_resources(registry: ResourceRegistry, config: Optional[AgentConfig] = None):
+        """注册视觉分析器的可预热共享资源
+        
+        Args:
+            registry: 资源注册表
+            config: 配置对象
+        """
+        registry.register(FACE_DETECTOR_RESOURCE, create_haar_face_detector, warm_up=True)
+    
     def extract_features(self, file_path: str) -> Dict[str, Any]:
         """提取视觉特征
         
@@ -113,19 +173,17 @@ class VisualAnalyzer(Analyzer):
             duration = frame_count / fps if fps > 0 else 0
             
             # 计算采样间隔
-            sample_interval = int(fps / self.frame_sample_rate) if fps > 0 else 1
+            sample_interval = max(1, int(fps / self.frame_sample_rate)) if fps > 0 else 1
             
-            # 初始化特征
+            # 初始化特征（逐帧特征以列式存储）
+            frames = VisualFeatureColumns(capacity=frame_count // sample_interval + 1)
             features = {
                 "video_info": {
                     "fps": fps,
                     "frame_count": frame_count,
                     "duration": duration
                 },
-                "face_detections": [],
-                "eye_contacts": [],
-                "expressions": [],
-                "postures": []
+                "frames": frames
             }
             
             # 加载人脸检测器（如果尚未加载）
@@ -145,31 +203,15 @@ class VisualAnalyzer(Analyzer):
                     frame_features = self._extract_frame_features(frame, frame_idx / fps)
                     
                     # 更新特征
-                    if "face_detected" in frame_features and frame_features["face_detected"]:
-                        features["face_detections"].append({
-                            "time": frame_idx / fps,
-                            "bbox": frame_features["face_bbox"]
-                        })
-                    
-                    if "eye_contact" in frame_features:
-                        features["eye_contacts"].append({
-                            "time": frame_idx / fps,
-                            "score": frame_features["eye_contact"]
-                        })
-                    
-                    if "expression" in frame_features:
-                        features["expressions"].append({
-                            "time": frame_idx / fps,
-                            "type": frame_features["expression"],
-                            "score": frame_features["expression_score"]
-                        })
-                    
-                    if "posture" in frame_features:
-                        features["postures"].append({
-                            "time": frame_idx / fps,
-                            "type": frame_features["posture"],
-                            "score": frame_features["posture_score"]
-                        })
+                    frames.append(
+                        frame_idx / fps,
+                        face_bbox=frame_features.get("face_bbox") if frame_features.get("face_detected") else None,
+                        eye_contact=frame_features.get("eye_contact"),
+                        expression=frame_features.get("expression"),
+                        expression_score=frame_features.get("expression_score"),
+                        posture=frame_features.get("posture"),
+                        posture_score=frame_features.get("posture_score")
+                    )
                 
                 frame_idx += 1
             
@@ -189,10 +231,7 @@ class VisualAnalyzer(Analyzer):
                     "frame_count": 0,
                     "duration": 0
                 },
-                "face_detections": [],
-                "eye_contacts": [],
-                "expressions": [],
-                "postures": [],
+                "frames": VisualFeatureColumns(capacity=1),
                 "stats": {}
             }
     
@@ -320,48 +359,54 @@ class VisualAnalyzer(Analyzer):
             Dict[str, Any]: 统计特征
         """
         stats = {}
+        frames = self._get_frame_columns(features)
         
         # 计算人脸检测率
-        face_detection_count = len(features["face_detections"])
+        face_detection_count = int(np.count_nonzero(frames.face_detected))
         total_samples = max(1, int(features["video_info"]["duration"] * self.frame_sample_rate))
         stats["face_detection_rate"] = face_detection_count / total_samples if total_samples > 0 else 0
         
-        # 计算平均眼神接触评分
-        eye_contact_scores = [item["score"] for item in features["eye_contacts"]]
-        stats["avg_eye_contact"] = np.mean(eye_contact_scores) if eye_contact_scores else 5.0
+        # 计算平均眼神接触评分（NaN表示该帧缺失）
+        stats["avg_eye_contact"] = self._nanmean(frames.eye_contact_scores, 5.0)
         
-        # 计算表情统计
-        expression_types = [item["type"] for item in features["expressions"]]
-        expression_scores = [item["score"] for item in features["expressions"]]
-        
-        # 表情类型分布
-        expression_counts = {}
-        for exp_type in expression_types:
-            if exp_type in expression_counts:
-                expression_counts[exp_type] += 1
-            else:
-                expression_counts[exp_type] = 1
+        # 表情类型分布与平均评分
+        stats["expression_distribution"] = frames.expression_distribution()
+        stats["avg_expression_score"] = self._nanmean(frames.expression_scores, 5.0)
         
-        stats["expression_distribution"] = expression_counts
-        stats["avg_expression_score"] = np.mean(expression_scores) if expression_scores else 5.0
-        
-        # 计算姿态统计
-        posture_types = [item["type"] for item in features["postures"]]
-        posture_scores = [item["score"] for item in features["postures"]]
-        
-        # 姿态类型分布
-        posture_counts = {}
-        for pos_type in posture_types:
-            if pos_type in posture_counts:
-                posture_counts[pos_type] += 1
-            else:
-                posture_counts[pos_type] = 1
-        
-        stats["posture_distribution"] = posture_counts
-        stats["avg_posture_score"] = np.mean(posture_scores) if posture_scores else 5.0
+        # 姿态类型分布与平均评分
+        stats["posture_distribution"] = frames.posture_distribution()
+        stats["avg_posture_score"] = self._nanmean(frames.posture_scores, 5.0)
         
         return stats
     
+    @staticmethod
+    def _get_frame_columns(features: Dict[str, Any]) -> VisualFeatureColumns:
+        """获取列式逐帧特征，兼容旧的字典列表格式"""
+        frames = features.get("frames")
+        if isinstance(frames, VisualFeatureColumns):
+            return frames
+        return VisualFeatureColumns.from_records(features)
+    
+    @staticmethod
+    def _nanmean(values: np.ndarray, default: float) -> float:
+        """忽略缺失值求均值，全部缺失时返回默认值"""
+        valid = values[~np.isnan(values)]
+        return float(valid.mean()) if len(valid) > 0 else default
+    
+    def features_to_dict(self, features: Dict[str, Any]) -> Dict[str, Any]:
+        """将特征转换为可序列化的字典（API边界使用）
+        
+        Args:
+            features: extract_features返回的特征
+            
+        Returns:
+            Dict[str, Any]: 逐帧特征展开为字典列表后的特征
+        """
+        result = {key: value for key, value in features.items() if key != "frames"}
+        if "frames" in features:
+            result.update(self._get_frame_columns(features).to_records())
+        return result
+    
     def analyze(self, features: Dict[str, Any], params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
         """分析视觉特征
         
@@ -440,11 +485,14 @@ class VisualAnalyzer(Analyzer):
             "overall_score": overall_score
         }
     
-    def extract_frame_features(self, frame_data: bytes) -> Dict[str, Any]:
+    def extract_frame_features(self, frame_data: bytes, session_id: Optional[str] = None,
+                               stream: Optional[FrameStreamState] = None) -> Dict[str, Any]:
         """提取视频帧特征
         
         Args:
             frame_data: 视频帧数据
+            session_id: 会话ID，启用批量推理时用于路由检测结果
+            stream: 视频流状态，为None时使用分析器的默认状态
             
         Returns:
             Dict[str, Any]: 提取的特征
@@ -457,16 +505,18 @@ class VisualAnalyzer(Analyzer):
             if frame is None:
                 return {}
             
+            stream = stream or self.stream_state
+            
             # 将帧添加到缓冲区
-            self.frame_buffer.append({
+            stream.frame_buffer.append({
                 "frame": frame,
                 "timestamp": time.time()
             })
             
             # 提取帧特征
-            features = self._extract_single_frame_features(frame)
+            features = self._extract_single_frame_features(frame, session_id)
             features["timestamp"] = time.time()
-            features["buffer_size"] = len(self.frame_buffer)
+            features["buffer_size"] = len(stream.frame_buffer)
             
             return features
             
@@ -474,19 +524,21 @@ class VisualAnalyzer(Analyzer):
             print(f"提取视频帧特征失败: {e}")
             return {}
     
-    def analyze_frame(self, features: Dict[str, Any]) -> Dict[str, Any]:
+    def analyze_frame(self, features: Dict[str, Any], stream: Optional[FrameStreamState] = None) -> Dict[str, Any]:
         """分析视频帧
         
         Args:
             features: 视频帧特征
+            stream: 视频流状态，为None时使用分析器的默认状态
             
         Returns:
             Dict[str, Any]: 实时分析结果
         """
+        stream = stream or self.stream_state
         current_time = time.time()
         
         # 检查是否需要进行分析（控制分析频率）
-        if current_time - self.last_analysis_time < self.analysis_interval:
+        if current_time - stream.last_analysis_time < self.analysis_interval:
             return {}
         
         try:
@@ -500,11 +552,12 @@ class VisualAnalyzer(Analyzer):
             }
             
             # 添加到历史记录
-            self.analysis_history.append(result)
-            self.last_analysis_time = current_time
+            stream.analysis_history.append(result)
+            self._record_trend_values(result, stream)
+            stream.last_analysis_time = current_time
             
             # 计算趋势
-            result["trends"] = self._calculate_visual_trends()
+            result["trends"] = self._calculate_visual_trends(stream)
             
             return result
             
@@ -512,11 +565,12 @@ class VisualAnalyzer(Analyzer):
             print(f"视频帧分析失败: {e}")
             return {}
     
-    def _extract_single_frame_features(self, frame: np.ndarray) -> Dict[str, Any]:
+    def _extract_single_frame_features(self, frame: np.ndarray, session_id: Optional[str] = None) -> Dict[str, Any]:
         """提取单帧特征
         
         Args:
             frame: 视频帧
+            session_id: 会话ID
             
         Returns:
             Dict[str, Any]: 帧特征
@@ -524,21 +578,27 @@ class VisualAnalyzer(Analyzer):
         features = {}
         
         try:
-            # 加载人脸检测器（如果尚未加载）
-            if self._face_detector is None:
-                self._load_face_detector()
-            
             # 转换为灰度图
             gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
             
             # 人脸检测
-            if self._face_detector is not None:
-                faces = self._face_detector.detectMultiScale(
-                    gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30)
-                )
-                features["faces"] = faces.tolist() if len(faces) > 0 else []
+            if self.use_batched_inference:
+                # 交给共享推理服务，与其他会话的帧组成微批次一起检测
+                service = get_frame_inference_service(self.config)
+                faces = service.detect(session_id or str(id(self)), gray)
+                features["faces"] = [list(face) for face in faces]
             else:
-                features["faces"] = []
+                # 加载人脸检测器（如果尚未加载）
+                if self._face_detector is None:
+                    self._load_face_detector()
+                
+                if self._face_detector is not None:
+                    faces = self._face_detector.detectMultiScale(
+                        gray, scaleFactor=1.1, minNeighbors=5, minSize=(30, 30)
+                    )
+                    features["faces"] = faces.tolist() if len(faces) > 0 else []
+                else:
+                    features["faces"] = []
             
             # 图像质量特征
             features["brightness"] = np.mean(gray)
@@ -712,70 +772,53 @@ class VisualAnalyzer(Analyzer):
             print(f"分析帧注意力失败: {e}")
             return 5.0
     
-    def _calculate_visual_trends(self) -> Dict[str, str]:
+    def _calculate_visual_trends(self, stream: Optional[FrameStreamState] = None) -> Dict[str, str]:
         """计算视觉分析趋势
         
+        Args:
+            stream: 视频流状态，为None时使用分析器的默认状态
+            
         Returns:
             Dict[str, str]: 趋势信息
         """
-        if len(self.analysis_history) < 3:
+        stream = stream or self.stream_state
+        if stream.trend_count < 3:
             return {}
         
         try:
-            # 获取最近的分析结果
-            recent = list(self.analysis_history)[-3:]
-            
-            trends = {}
-            
-            # 计算眼神接触趋势
-            eye_contact_values = [r.get("eye_contact", 5.0) for r in recent]
-            trends["eye_contact"] = self._get_trend_direction(eye_contact_values)
+            # 取环形缓冲区中最近3次分析的指标，按列一次性计算变化量
+            capacity = len(stream.trend_values)
+            last = (stream.trend_count - 1) % capacity
+            first = (stream.trend_count - 3) % capacity
+            diffs = stream.trend_values[last] - stream.trend_values[first]
             
-            # 计算表情趋势
-            expression_scores = [r.get("facial_expression", {}).get("score", 5.0) for r in recent]
-            trends["expression"] = self._get_trend_direction(expression_scores)
-            
-            # 计算姿态趋势
-            posture_scores = [r.get("posture", {}).get("score", 5.0) for r in recent]
-            trends["posture"] = self._get_trend_direction(posture_scores)
-            
-            # 计算注意力趋势
-            attention_values = [r.get("attention", 5.0) for r in recent]
-            trends["attention"] = self._get_trend_direction(attention_values)
-            
-            return trends
+            directions = np.where(diffs > 0.5, "上升", np.where(diffs < -0.5, "下降", "稳定"))
+            return dict(zip(("eye_contact", "expression", "posture", "attention"), directions.tolist()))
             
         except Exception as e:
             print(f"计算视觉趋势失败: {e}")
             return {}
     
-    def _get_trend_direction(self, values: List[float]) -> str:
-        """获取趋势方向
+    def _record_trend_values(self, result: Dict[str, Any], stream: Optional[FrameStreamState] = None):
+        """把一次实时分析的评分写入趋势缓冲区
         
         Args:
-            values: 数值列表
-            
-        Returns:
-            str: 趋势方向
+            result: 实时分析结果
+            stream: 视频流状态，为None时使用分析器的默认状态
         """
-        if len(values) < 2:
-            return "稳定"
-        
-        # 计算变化
-        diff = values[-1] - values[0]
-        
-        if diff > 0.5:
-            return "上升"
-        elif diff < -0.5:
-            return "下降"
-        else:
-            return "稳定"
+        stream = stream or self.stream_state
+        row = stream.trend_count % len(stream.trend_values)
+        stream.trend_values[row] = (
+            result.get("eye_contact", 5.0),
+            result.get("facial_expression", {}).get("score", 5.0),
+            result.get("posture", {}).get("score", 5.0),
+            result.get("attention", 5.0)
+        )
+        stream.trend_count += 1
     
     def clear_stream_data(self):
         """清空流式数据"""
-        self.frame_buffer.clear()
-        self.analysis_history.clear()
-        self.last_analysis_time = 0
+        self.stream_state.clear()
         self.face_tracking.clear()
 
     async def analyze(self, video_file: str, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
@@ -793,7 +836,7 @@ class VisualAnalyzer(Analyzer):
             # 提取特征
             logger.debug("开始提取视频特征...")
             features = await self.extract_features(video_file)
-            logger.debug(f"视频特征提取完成: {json.dumps(features, ensure_ascii=False)[:200]}...")
+            logger.debug(f"视频特征提取完成: 采样帧数={len(features.get('frames', []))}, 统计={features.get('stats', {})}")
             
             # 如果启用了讯飞星火大模型且服务可用，使用LLM进行分析
             if self.use_xunfei_llm and self.async_xunfei_service:
@@ -884,9 +927,9 @@ class VisualAnalyzer(Analyzer):
             ]
             
             logger.info("调用讯飞星火大模型...")
-            # 调用星火大模型
-            response = await self.async_xunfei_service.chat_spark(
-                messages=messages,
+            # 调用星火大模型（过慢或失败时由路由器切换到其他提供方）
+            response = await self.llm_router.chat(
+                messages,
                 temperature=0.3,  # 低温度以获得更稳定的评分
                 max_tokens=2048
             )
@@ -967,6 +1010,8 @@ class VisualAnalyzer(Analyzer):
         请确保JSON格式正确，overall_score为所有维度的加权平均分。
         """
         
+        # 视觉提示词只包含统计量，长度固定，只记录大小
+        self.prompt_budget.record("visual", prompt)
         logger.debug(f"构建的提示词: {prompt}")
         return prompt
     
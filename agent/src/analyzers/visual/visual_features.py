@@ -0,0 +1,246 @@
+# agent/analyzers/visual/visual_features.py
+
+from typing import Dict, Any, Optional, List, Tuple
+import numpy as np
+
+
+class VisualFeatureColumns:
+    """列式存储的逐帧视觉特征
+
+    每个采样帧占一行，各特征分别保存在NumPy数组中：
+    - timestamps: 采样时间戳（秒）
+    - face_detected: 是否检测到人脸
+    - face_bboxes: N×4人脸框 (x, y, w, h)，未检测到人脸的行为0
+    - eye_contact_scores: 眼神接触评分，缺失值为NaN
+    - expression_codes / posture_codes: 类别编码，缺失值为-1，对应标签见 *_labels
+    - expression_scores / posture_scores: 评分，缺失值为NaN
+
+    数组按容量倍增的方式扩展，避免为每一帧创建小字典。
+    只有在API边界处才通过 to_records() 转换为字典列表。
+    """
+
+    def __init__(self, capacity: int = 256):
+        """初始化列式特征存储
+
+        Args:
+            capacity: 初始容量（行数），通常为预计采样帧数
+        """
+        capacity = max(1, int(capacity))
+        self._size = 0
+        self._timestamps = np.zeros(capacity, dtype=np.float64)
+        self._face_detected = np.zeros(capacity, dtype=bool)
+        self._face_bboxes = np.zeros((capacity, 4), dtype=np.int32)
+        self._eye_contact_scores = np.full(capacity, np.nan, dtype=np.float32)
+        self._expression_codes = np.full(capacity, -1, dtype=np.int16)
+        self._expression_scores = np.full(capacity, np.nan, dtype=np.float32)
+        self._posture_codes = np.full(capacity, -1, dtype=np.int16)
+        self._posture_scores = np.full(capacity, np.nan, dtype=np.float32)
+
+        # 类别标签表（编码 -> 标签）
+        self.expression_labels: List[str] = []
+        self.posture_labels: List[str] = []
+        self._expression_index: Dict[str, int] = {}
+        self._posture_index: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def capacity(self) -> int:
+        """当前已分配的行数"""
+        return len(self._timestamps)
+
+    @property
+    def nbytes(self) -> int:
+        """列数组占用的内存（字节）"""
+        return sum(column.nbytes for column in self._columns())
+
+    def _columns(self) -> Tuple[np.ndarray, ...]:
+        return (
+            self._timestamps, self._face_detected, self._face_bboxes,
+            self._eye_contact_scores, self._expression_codes, self._expression_scores,
+            self._posture_codes, self._posture_scores
+        )
+
+    def _grow(self):
+        """容量倍增"""
+        new_capacity = self.capacity * 2
+
+        def extend(column: np.ndarray, fill) -> np.ndarray:
+            extended = np.full((new_capacity,) + column.shape[1:], fill, dtype=column.dtype)
+            extended[:len(column)] = column
+            return extended
+
+        self._timestamps = extend(self._timestamps, 0)
+        self._face_detected = extend(self._face_detected, False)
+        self._face_bboxes = extend(self._face_bboxes, 0)
+        self._eye_contact_scores = extend(self._eye_contact_scores, np.nan)
+        self._expression_codes = extend(self._expression_codes, -1)
+        self._expression_scores = extend(self._expression_scores, np.nan)
+        self._posture_codes = extend(self._posture_codes, -1)
+        self._posture_scores = extend(self._posture_scores, np.nan)
+
+    @staticmethod
+    def _encode(label: str, labels: List[str], index: Dict[str, int]) -> int:
+        """获取类别标签的编码，新标签追加到标签表"""
+        code = index.get(label)
+        if code is None:
+            code = len(labels)
+            labels.append(label)
+            index[label] = code
+        return code
+
+    def append(self, timestamp: float,
+               face_bbox: Optional[Tuple[int, int, int, int]] = None,
+               eye_contact: Optional[float] = None,
+               expression: Optional[str] = None,
+               expression_score: Optional[float] = None,
+               posture: Optional[str] = None,
+               posture_score: Optional[float] = None):
+        """追加一个采样帧的特征
+
+        Args:
+            timestamp: 时间戳（秒）
+            face_bbox: 人脸框，None表示未检测到人脸
+            eye_contact: 眼神接触评分
+            expression: 表情类型
+            expression_score: 表情评分
+            posture: 姿态类型
+            posture_score: 姿态评分
+        """
+        if self._size >= self.capacity:
+            self._grow()
+
+        row = self._size
+        self._timestamps[row] = timestamp
+
+        if face_bbox is not None:
+            self._face_detected[row] = True
+            self._face_bboxes[row] = face_bbox
+
+        if eye_contact is not None:
+            self._eye_contact_scores[row] = eye_contact
+
+        if expression is not None:
+            self._expression_codes[row] = self._encode(expression, self.expression_labels, self._expression_index)
+            self._expression_scores[row] = expression_score
+
+        if posture is not None:
+            self._posture_codes[row] = self._encode(posture, self.posture_labels, self._posture_index)
+            self._posture_scores[row] = posture_score
+
+        self._size += 1
+
+    # 只读视图（截断到已用行数）
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._timestamps[:self._size]
+
+    @property
+    def face_detected(self) -> np.ndarray:
+        return self._face_detected[:self._size]
+
+    @property
+    def face_bboxes(self) -> np.ndarray:
+        return self._face_bboxes[:self._size]
+
+    @property
+    def eye_contact_scores(self) -> np.ndarray:
+        return self._eye_contact_scores[:self._size]
+
+    @property
+    def expression_codes(self) -> np.ndarray:
+        return self._expression_codes[:self._size]
+
+    @property
+    def expression_scores(self) -> np.ndarray:
+        return self._expression_scores[:self._size]
+
+    @property
+    def posture_codes(self) -> np.ndarray:
+        return self._posture_codes[:self._size]
+
+    @property
+    def posture_scores(self) -> np.ndarray:
+        return self._posture_scores[:self._size]
+
+    @staticmethod
+    def _distribution(codes: np.ndarray, labels: List[str]) -> Dict[str, int]:
+        """统计类别分布"""
+        valid = codes[codes >= 0]
+        if len(valid) == 0:
+            return {}
+        counts = np.bincount(valid, minlength=len(labels))
+        return {labels[code]: int(count) for code, count in enumerate(counts) if count > 0}
+
+    def expression_distribution(self) -> Dict[str, int]:
+        """表情类型分布"""
+        return self._distribution(self.expression_codes, self.expression_labels)
+
+    def posture_distribution(self) -> Dict[str, int]:
+        """姿态类型分布"""
+        return self._distribution(self.posture_codes, self.posture_labels)
+
+    def to_records(self) -> Dict[str, List[Dict[str, Any]]]:
+        """转换为逐帧字典列表（仅在API边界使用）
+
+        Returns:
+            Dict[str, List[Dict[str, Any]]]: 包含face_detections、eye_contacts、expressions、postures
+        """
+        timestamps = self.timestamps.tolist()
+
+        face_rows = np.flatnonzero(self.face_detected)
+        bboxes = self.face_bboxes[face_rows].tolist()
+        face_detections = [
+            {"time": timestamps[row], "bbox": tuple(bbox)}
+            for row, bbox in zip(face_rows.tolist(), bboxes)
+        ]
+
+        eye_rows = np.flatnonzero(~np.isnan(self.eye_contact_scores))
+        eye_contacts = [
+            {"time": timestamps[row], "score": float(self._eye_contact_scores[row])}
+            for row in eye_rows.tolist()
+        ]
+
+        def categorical_records(codes: np.ndarray, scores: np.ndarray, labels: List[str]) -> List[Dict[str, Any]]:
+            rows = np.flatnonzero(codes >= 0)
+            return [
+                {"time": timestamps[row], "type": labels[codes[row]], "score": float(scores[row])}
+                for row in rows.tolist()
+            ]
+
+        return {
+            "face_detections": face_detections,
+            "eye_contacts": eye_contacts,
+            "expressions": categorical_records(self.expression_codes, self.expression_scores, self.expression_labels),
+            "postures": categorical_records(self.posture_codes, self.posture_scores, self.posture_labels)
+        }
+
+    @classmethod
+    def from_records(cls, records: Dict[str, Any]) -> "VisualFeatureColumns":
+        """从逐帧字典列表构建列式存储（兼容旧格式的特征）
+
+        Args:
+            records: 包含face_detections、eye_contacts、expressions、postures的字典
+
+        Returns:
+            VisualFeatureColumns: 列式特征
+        """
+        rows: Dict[float, Dict[str, Any]] = {}
+        for item in records.get("face_detections", []):
+            rows.setdefault(item["time"], {})["face_bbox"] = tuple(item["bbox"])
+        for item in records.get("eye_contacts", []):
+            rows.setdefault(item["time"], {})["eye_contact"] = item["score"]
+        for item in records.get("expressions", []):
+            row = rows.setdefault(item["time"], {})
+            row["expression"] = item["type"]
+            row["expression_score"] = item["score"]
+        for item in records.get("postures", []):
+            row = rows.setdefault(item["time"], {})
+            row["posture"] = item["type"]
+            row["posture_score"] = item["score"]
+
+        columns = cls(capacity=len(rows))
+        for timestamp in sorted(rows):
+            columns.append(timestamp, **rows[timestamp])
+        return columns
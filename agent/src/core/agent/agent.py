@@ -6,8 +6,11 @@ import json
 import asyncio
 import time
 from datetime import datetime
+from functools import partial
 
 from ..system.config import AgentConfig
+from ..workflow.task_graph import TaskGraph
+from .realtime_sessions import RealtimeSession, RealtimeSessionRegistry
 from ...analyzers.speech.speech_analyzer import SpeechAnalyzer
 from ...analyzers.visual.visual_analyzer import VisualAnalyzer
 from ...analyzers.content.content_analyzer import ContentAnalyzer
@@ -81,16 +84,26 @@ class InterviewAgent:
         self.scenarios = {}
         self._load_default_scenarios()
         
-        # 实时分析状态
-        self.is_analyzing = False
-        self.session_start_time = None
-        self.current_session_id = None
-        self.feedback_callbacks = []
+        # 实时分析会话，每个会话独立的队列、回调和分析缓冲区
+        self.sessions = self._create_session_registry()
         
         # 初始化LangGraph智能体
         from agent.core.langgraph_agent import LangGraphAgent
         self.langgraph_agent = LangGraphAgent(user_id=user_id, session_id=session_id)
     
+    def _create_session_registry(self) -> RealtimeSessionRegistry:
+        """按配置创建实时会话注册表
+        
+        Returns:
+            RealtimeSessionRegistry: 实时会话注册表
+        """
+        return RealtimeSessionRegistry(self._process_stream_item, **self.config.get_section("realtime"))
+    
+    @property
+    def is_analyzing(self) -> bool:
+        """是否有进行中的实时分析会话"""
+        return len(self.sessions) > 0
+    
     def _load_default_scenarios(self):
         """加载默认场景"""
         # 导入并注册默认场景
@@ -210,29 +223,35 @@ class InterviewAgent:
             except Exception as e:
                 print(f"LangGraph分析异常，回退到传统方法: {str(e)}")
         
-        # 初始化结果
-        result = {
-            "speech": {},
-            "visual": {},
-            "content": {},
-            "overall": {}
-        }
-        
-        # 提取语音特征并分析
-        speech_features = self.speech_analyzer.extract_features(file_path)
-        result["speech"] = self.speech_analyzer.analyze(speech_features, scenario_params)
+        # 各模态按依赖图在线程池中执行：语音分析、视觉分析和语音转写互不依赖，
+        # 内容分析只等待转写文本，综合分析在三者完成后进行
+        def analyze_speech():
+            speech_features = self.speech_analyzer.extract_features(file_path)
+            return self.speech_analyzer.analyze(speech_features, scenario_params)
         
-        # 如果是视频，提取视觉特征并分析
-        if file_type == "video":
+        def analyze_visual():
+            # 只有视频需要视觉分析
+            if file_type != "video":
+                return {}
             visual_features = self.visual_analyzer.extract_features(file_path)
-            result["visual"] = self.visual_analyzer.analyze(visual_features, scenario_params)
+            return self.visual_analyzer.analyze(visual_features, scenario_params)
+        
+        def analyze_content(transcript):
+            return self.content_analyzer.analyze(transcript, scenario_params)
+        
+        def analyze_overall(speech, visual, content):
+            result = {"speech": speech, "visual": visual, "content": content, "overall": {}}
+            result["overall"] = self.overall_analyzer.analyze(result, scenario_params)
+            return result
         
-        # 提取文本内容并分析
-        text_content = self.speech_analyzer.speech_to_text(file_path)
-        result["content"] = self.content_analyzer.analyze(text_content, scenario_params)
+        graph = TaskGraph("interview_agent_analysis")
+        graph.add("speech", analyze_speech)
+        graph.add("visual", analyze_visual)
+        graph.add("transcript", partial(self.speech_analyzer.speech_to_text, file_path))
+        graph.add("content", analyze_content, deps=["transcript"])
+        graph.add("overall", analyze_overall, deps=["speech", "visual", "content"])
         
-        # 综合分析
-        result["overall"] = self.overall_analyzer.analyze(result, scenario_params)
+        result = graph.run_sync()["overall"]
         
         return AnalysisResult(result)
     
@@ -248,18 +267,11 @@ class InterviewAgent:
             use_langgraph: 是否使用LangGraph框架进行分析，默认为True
             
         Returns:
-            bool: 是否成功开始
+            bool: 是否成功开始，会话已存在或达到会话数上限时返回False
         """
-        if self.is_analyzing:
+        if not self.sessions.start(session_id, scenario, feedback_callback):
             return False
             
-        self.is_analyzing = True
-        self.current_session_id = session_id
-        self.session_start_time = time.time()
-        
-        if feedback_callback:
-            self.feedback_callbacks.append(feedback_callback)
-            
         # 如果使用LangGraph框架，初始化实时分析会话
         if use_langgraph:
             try:
@@ -288,7 +300,7 @@ class InterviewAgent:
         Returns:
             bool: 是否成功停止
         """
-        if self.current_session_id == session_id:
+        if session_id in self.sessions:
             # 如果使用LangGraph框架，通知停止实时分析会话
             if use_langgraph:
                 try:
@@ -304,10 +316,7 @@ class InterviewAgent:
                 except Exception as e:
                     print(f"LangGraph停止实时分析会话异常: {str(e)}")
             
-            self.is_analyzing = False
-            self.current_session_id = None
-            self.session_start_time = None
-            self.feedback_callbacks.clear()
+            self.sessions.stop(session_id)
             return True
         return False
     
@@ -315,6 +324,8 @@ class InterviewAgent:
                                   timestamp: float = None, use_langgraph: bool = True) -> Dict[str, Any]:
         """分析音频流数据
         
+        数据进入会话的输入队列，由会话注册表的工作协程处理
+        
         Args:
             session_id: 会话ID
             audio_data: 音频数据
@@ -324,85 +335,14 @@ class InterviewAgent:
         Returns:
             Dict[str, Any]: 实时分析结果
         """
-        if not self.is_analyzing or self.current_session_id != session_id:
-            return {}
-            
-        try:
-            # 提取音频特征
-            features = self.speech_analyzer.extract_stream_features(audio_data)
-            
-            # 计算会话时间
-            session_time = time.time() - self.session_start_time if self.session_start_time else 0
-            
-            # 如果使用LangGraph框架进行分析
-            if use_langgraph:
-                try:
-                    # 准备输入数据
-                    input_data = {
-                        "session_id": session_id,
-                        "audio_features": features,
-                        "timestamp": timestamp or time.time(),
-                        "session_time": session_time,
-                        "action": "analyze_audio_stream"
-                    }
-                    
-                    # 使用LangGraph智能体处理
-                    langgraph_result = self.langgraph_agent.process(input_data)
-                    
-                    # 如果LangGraph处理成功
-                    if langgraph_result and "error" not in langgraph_result:
-                        # 构建反馈结果
-                        feedback = {
-                            "session_id": self.current_session_id,
-                            "timestamp": timestamp or time.time(),
-                            "session_time": session_time,
-                            "feedback_type": "speech",
-                            "analysis": langgraph_result.get("analysis", {}),
-                            "suggestions": langgraph_result.get("suggestions", [])
-                        }
-                        
-                        # 触发回调
-                        for callback in self.feedback_callbacks:
-                            try:
-                                await callback(session_id, feedback)
-                            except Exception as e:
-                                print(f"回调函数执行失败: {e}")
-                        
-                        return langgraph_result.get("analysis", {})
-                        
-                except Exception as e:
-                    print(f"LangGraph音频流分析异常，回退到传统方法: {str(e)}")
-            
-            # 进行传统的实时语音分析
-            speech_result = self.speech_analyzer.analyze_stream(features)
-            
-            # 构建反馈结果
-            feedback = {
-                "session_id": self.current_session_id,
-                "timestamp": timestamp or time.time(),
-                "session_time": session_time,
-                "feedback_type": "speech",
-                "analysis": speech_result,
-                "suggestions": self._generate_real_time_suggestions(speech_result)
-            }
-            
-            # 触发回调
-            for callback in self.feedback_callbacks:
-                try:
-                    await callback(session_id, feedback)
-                except Exception as e:
-                    print(f"回调函数执行失败: {e}")
-            
-            return speech_result
-            
-        except Exception as e:
-            print(f"音频流分析失败: {e}")
-            return {}
+        return await self.sessions.submit(session_id, "audio", audio_data, timestamp, use_langgraph=use_langgraph)
     
     async def analyze_video_frame(self, session_id: str, frame_data: bytes, 
                                  timestamp: float = None, use_langgraph: bool = True) -> Dict[str, Any]:
         """分析视频帧数据
         
+        数据进入会话的输入队列，由会话注册表的工作协程处理
+        
         Args:
             session_id: 会话ID
             frame_data: 视频帧数据
@@ -412,26 +352,47 @@ class InterviewAgent:
         Returns:
             Dict[str, Any]: 实时分析结果
         """
-        if not self.is_analyzing or self.current_session_id != session_id:
-            return {}
+        return await self.sessions.submit(session_id, "video", frame_data, timestamp, use_langgraph=use_langgraph)
+    
+    async def _process_stream_item(self, session: RealtimeSession, kind: str, data: bytes,
+                                   timestamp: Optional[float], options: Dict[str, Any]) -> Dict[str, Any]:
+        """分析一条音频块或视频帧，并把反馈发送给该会话的回调
+        
+        Args:
+            session: 实时会话
+            kind: 数据类型，audio或video
+            data: 音频块或视频帧数据
+            timestamp: 时间戳
+            options: 分析选项
             
+        Returns:
+            Dict[str, Any]: 实时分析结果
+        """
+        is_audio = kind == "audio"
+        feedback_type = "speech" if is_audio else "visual"
+        
         try:
-            # 提取视觉特征
-            features = self.visual_analyzer.extract_frame_features(frame_data)
+            # 提取特征，分析缓冲区按会话隔离
+            if is_audio:
+                features = self.speech_analyzer.extract_stream_features(data)
+            else:
+                features = self.visual_analyzer.extract_frame_features(
+                    data, session.session_id, stream=session.visual_stream
+                )
             
             # 计算会话时间
-            session_time = time.time() - self.session_start_time if self.session_start_time else 0
+            session_time = session.session_time
             
             # 如果使用LangGraph框架进行分析
-            if use_langgraph:
+            if options.get("use_langgraph", True):
                 try:
                     # 准备输入数据
                     input_data = {
-                        "session_id": session_id,
-                        "visual_features": features,
+                        "session_id": session.session_id,
+                        "audio_features" if is_audio else "visual_features": features,
                         "timestamp": timestamp or time.time(),
                         "session_time": session_time,
-                        "action": "analyze_video_frame"
+                        "action": "analyze_audio_stream" if is_audio else "analyze_video_frame"
                     }
                     
                     # 使用LangGraph智能体处理
@@ -439,52 +400,38 @@ class InterviewAgent:
                     
                     # 如果LangGraph处理成功
                     if langgraph_result and "error" not in langgraph_result:
-                        # 构建反馈结果
-                        feedback = {
-                            "session_id": self.current_session_id,
+                        await session.emit({
+                            "session_id": session.session_id,
                             "timestamp": timestamp or time.time(),
                             "session_time": session_time,
-                            "feedback_type": "visual",
+                            "feedback_type": feedback_type,
                             "analysis": langgraph_result.get("analysis", {}),
                             "suggestions": langgraph_result.get("suggestions", [])
-                        }
-                        
-                        # 触发回调
-                        for callback in self.feedback_callbacks:
-                            try:
-                                await callback(session_id, feedback)
-                            except Exception as e:
-                                print(f"回调函数执行失败: {e}")
-                        
+                        })
                         return langgraph_result.get("analysis", {})
                         
                 except Exception as e:
-                    print(f"LangGraph视频帧分析异常，回退到传统方法: {str(e)}")
+                    print(f"LangGraph{'音频流' if is_audio else '视频帧'}分析异常，回退到传统方法: {str(e)}")
             
-            # 进行传统的实时视觉分析
-            visual_result = self.visual_analyzer.analyze_frame(features)
+            # 进行传统的实时分析
+            if is_audio:
+                result = self.speech_analyzer.analyze_stream(features)
+            else:
+                result = self.visual_analyzer.analyze_frame(features, stream=session.visual_stream)
             
-            # 构建反馈结果
-            feedback = {
-                "session_id": self.current_session_id,
+            await session.emit({
+                "session_id": session.session_id,
                 "timestamp": timestamp or time.time(),
                 "session_time": session_time,
-                "feedback_type": "visual",
-                "analysis": visual_result,
-                "suggestions": self._generate_real_time_suggestions(visual_result)
-            }
-            
-            # 触发回调
-            for callback in self.feedback_callbacks:
-                try:
-                    await callback(session_id, feedback)
-                except Exception as e:
-                    print(f"回调函数执行失败: {e}")
+                "feedback_type": feedback_type,
+                "analysis": result,
+                "suggestions": self._generate_real_time_suggestions(result)
+            })
             
-            return visual_result
+            return result
             
         except Exception as e:
-            print(f"视频帧分析失败: {e}")
+            print(f"{'音频流' if is_audio else '视频帧'}分析失败: {e}")
             return {}
     
     async def analyze_question_answer(self, session_id: str, question_id: int, answer_text: str, 
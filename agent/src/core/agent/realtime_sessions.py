@@ -0,0 +1,272 @@
+# -*- coding: utf-8 -*-
+"""
+实时面试会话注册表
+
+一个智能体实例同时服务多场实时面试，每个会话持有独立的状态：
+1. 有界输入队列：积压超过上限时丢弃最旧的数据，实时反馈只关心最新的音视频
+2. 反馈回调：反馈只发送给该会话注册的回调，不会串到其他会话
+3. 分析缓冲区：视频流状态（帧缓冲、趋势、节流时间）按会话隔离
+4. 生命周期：开始、停止，以及超过空闲时间后自动回收
+
+所有会话由同一个后台协程处理。有数据的会话进入就绪队列，工作协程轮流取出会话，
+每次最多处理 batch_size 条数据后把仍有积压的会话放回队尾，单个高频会话不会饿死其他会话。
+"""
+
+import time
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from ...analyzers.visual.visual_analyzer import FrameStreamState
+
+logger = logging.getLogger(__name__)
+
+# 处理一条流数据的协程函数：(会话, 数据类型, 数据, 时间戳, 选项) -> 分析结果
+StreamProcessor = Callable[["RealtimeSession", str, bytes, Optional[float], Dict[str, Any]],
+                           Awaitable[Dict[str, Any]]]
+StreamItem = Tuple[str, bytes, Optional[float], Dict[str, Any], asyncio.Future]
+
+
+class RealtimeSession:
+    """单个实时面试会话"""
+
+    def __init__(self, session_id: str, scenario: str, queue_size: int):
+        """初始化会话
+
+        Args:
+            session_id: 会话ID
+            scenario: 面试场景
+            queue_size: 输入队列上限
+        """
+        self.session_id = session_id
+        self.scenario = scenario
+        self.started_at = time.time()
+        self.last_active = time.monotonic()
+        self.queue_size = queue_size
+        self.queue: Deque[StreamItem] = deque()
+        self.callbacks: List[Callable] = []
+        self.visual_stream = FrameStreamState()
+        self.scheduled = False
+        self.closed = False
+        self.stats = {"received": 0, "processed": 0, "dropped": 0, "feedback": 0}
+
+    @property
+    def session_time(self) -> float:
+        """会话已进行的时间（秒）"""
+        return time.time() - self.started_at
+
+    async def emit(self, feedback: Dict[str, Any]):
+        """把反馈发送给本会话注册的回调
+
+        Args:
+            feedback: 反馈内容
+        """
+        for callback in list(self.callbacks):
+            try:
+                await callback(self.session_id, feedback)
+            except Exception as e:
+                logger.error(f"会话 {self.session_id} 的反馈回调执行失败: {e}")
+        self.stats["feedback"] += 1
+
+
+class RealtimeSessionRegistry:
+    """实时面试会话注册表，单个工作协程多路复用所有会话的流数据"""
+
+    def __init__(self, processor: StreamProcessor, max_sessions: int = 500, queue_size: int = 32,
+                 batch_size: int = 4, idle_timeout: float = 300.0,
+                 sweep_interval: float = 5.0):
+        """初始化会话注册表
+
+        Args:
+            processor: 处理单条流数据的协程函数
+            max_sessions: 同时活跃的会话数上限
+            queue_size: 每个会话的输入队列上限
+            batch_size: 工作协程每次轮到一个会话时最多处理的数据条数
+            idle_timeout: 会话空闲超过该时间（秒）后被回收
+            sweep_interval: 检查空闲会话的间隔（秒）
+        """
+        self.processor = processor
+        self.max_sessions = max_sessions
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.idle_timeout = idle_timeout
+        self.sweep_interval = sweep_interval
+        self._sessions: Dict[str, RealtimeSession] = {}
+        self._ready: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._last_sweep = time.monotonic()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def __contains__(self, session_id: str) -> bool:
+        return session_id in self._sessions
+
+    def get(self, session_id: str) -> Optional[RealtimeSession]:
+        """获取会话
+
+        Args:
+            session_id: 会话ID
+
+        Returns:
+            Optional[RealtimeSession]: 会话，不存在时返回None
+        """
+        return self._sessions.get(session_id)
+
+    def session_ids(self) -> List[str]:
+        """获取所有活跃会话的ID"""
+        return list(self._sessions)
+
+    def start(self, session_id: str, scenario: str = "technical",
+              feedback_callback: Optional[Callable] = None) -> bool:
+        """开始会话
+
+        Args:
+            session_id: 会话ID
+            scenario: 面试场景
+            feedback_callback: 反馈回调函数
+
+        Returns:
+            bool: 是否成功开始，会话已存在或达到会话数上限时返回False
+        """
+        if session_id in self._sessions:
+            return False
+        if len(self._sessions) >= self.max_sessions:
+            self.evict_idle()
+            if len(self._sessions) >= self.max_sessions:
+                logger.warning(f"实时会话数已达上限 {self.max_sessions}，拒绝会话 {session_id}")
+                return False
+
+        session = RealtimeSession(session_id, scenario, self.queue_size)
+        if feedback_callback:
+            session.callbacks.append(feedback_callback)
+        self._sessions[session_id] = session
+        logger.info(f"实时会话开始: {session_id}，当前会话数: {len(self._sessions)}")
+        return True
+
+    def stop(self, session_id: str) -> bool:
+        """停止会话，丢弃其未处理的数据
+
+        Args:
+            session_id: 会话ID
+
+        Returns:
+            bool: 会话是否存在
+        """
+        session = self._sessions.pop(session_id, None)
+        if session is None:
+            return False
+        session.closed = True
+        while session.queue:
+            future = session.queue.popleft()[-1]
+            if not future.done():
+                future.set_result({})
+        session.callbacks.clear()
+        logger.info(f"实时会话结束: {session_id}，统计: {session.stats}")
+        return True
+
+    def evict_idle(self) -> List[str]:
+        """回收空闲超时的会话
+
+        Returns:
+            List[str]: 被回收的会话ID
+        """
+        now = time.monotonic()
+        self._last_sweep = now
+        idle = [sid for sid, session in self._sessions.items()
+                if not session.queue and now - session.last_active > self.idle_timeout]
+        for session_id in idle:
+            logger.info(f"实时会话空闲超过 {self.idle_timeout}s，自动回收: {session_id}")
+            self.stop(session_id)
+        return idle
+
+    async def submit(self, session_id: str, kind: str, data: bytes,
+                     timestamp: Optional[float] = None, **options) -> Dict[str, Any]:
+        """提交一条流数据并等待其分析结果
+
+        Args:
+            session_id: 会话ID
+            kind: 数据类型，audio或video
+            data: 音频块或视频帧数据
+            timestamp: 时间戳
+            **options: 传给处理函数的选项
+
+        Returns:
+            Dict[str, Any]: 分析结果；会话不存在、数据被丢弃或会话已停止时返回空字典
+        """
+        session = self._sessions.get(session_id)
+        if session is None:
+            return {}
+        self._ensure_worker()
+
+        future = asyncio.get_running_loop().create_future()
+        session.queue.append((kind, data, timestamp, options, future))
+        session.last_active = time.monotonic()
+        session.stats["received"] += 1
+        if len(session.queue) > session.queue_size:
+            # 积压超过上限：丢弃最旧的数据
+            dropped = session.queue.popleft()[-1]
+            session.stats["dropped"] += 1
+            if not dropped.done():
+                dropped.set_result({})
+        if not session.scheduled:
+            session.scheduled = True
+            self._ready.put_nowait(session)
+        return await future
+
+    def _ensure_worker(self):
+        """在当前事件循环中启动工作协程"""
+        loop = asyncio.get_running_loop()
+        if self._worker is not None and not self._worker.done() and self._loop is loop:
+            return
+        self._loop = loop
+        self._ready = asyncio.Queue()
+        for session in self._sessions.values():
+            session.scheduled = bool(session.queue)
+            if session.scheduled:
+                self._ready.put_nowait(session)
+        self._worker = loop.create_task(self._run())
+
+    async def _run(self):
+        """工作协程：轮流处理各会话的积压数据"""
+        while True:
+            try:
+                session = await asyncio.wait_for(self._ready.get(), timeout=self.sweep_interval)
+            except asyncio.TimeoutError:
+                session = None
+            if time.monotonic() - self._last_sweep >= self.sweep_interval:
+                self.evict_idle()
+            if session is None:
+                continue
+
+            for _ in range(self.batch_size):
+                if session.closed or not session.queue:
+                    break
+                kind, data, timestamp, options, future = session.queue.popleft()
+                try:
+                    result = await self.processor(session, kind, data, timestamp, options)
+                except Exception as e:
+                    logger.error(f"会话 {session.session_id} 的{kind}数据处理失败: {e}")
+                    result = {}
+                session.stats["processed"] += 1
+                if not future.done():
+                    future.set_result(result)
+
+            if session.queue and not session.closed:
+                self._ready.put_nowait(session)
+            else:
+                session.scheduled = False
+
+    async def close(self):
+        """停止工作协程并结束所有会话"""
+        for session_id in list(self._sessions):
+            self.stop(session_id)
+        if self._worker is not None:
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+            self._worker = None
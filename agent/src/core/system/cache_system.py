@@ -321,7 +321,7 @@ class FileCache:
             default_ttl: 默认TTL（秒）
         """
         self.cache_dir = Path(cache_dir)
-        self.cache_dir.mkdir(exist_ok=True)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
         self.max_files = max_files
         self.default_ttl = default_ttl
         
@@ -40,7 +40,11 @@ class AgentConfig:
                 "expression_weight": 0.4,
                 "eye_contact_weight": 0.3,
                 "body_language_weight": 0.3,
-                "frame_sample_rate": 5  # 每秒采样帧数
+                "frame_sample_rate": 5,  # 每秒采样帧数
+                "batched_inference": False,  # 实时帧是否使用多会话批量推理
+                "inference_max_batch_size": 16,  # 批量推理的最大批次大小
+                "inference_batch_window": 0.01,  # 批量推理的聚批等待窗口（秒）
+                "inference_haar_workers": 4  # Haar后端逐帧检测的线程数
             },
             
             # 内容分析配置
@@ -48,7 +52,9 @@ class AgentConfig:
                 "model": "bert-base-chinese",
                 "relevance_weight": 0.4,
                 "structure_weight": 0.3,
-                "key_points_weight": 0.3
+                "key_points_weight": 0.3,
+                "batch_size": 6,  # 批量评分时单个提示词最多包含的问答数
+                "batch_answer_tokens": 600  # 批量评分时每个回答压缩到的token数
             },
             
             # 综合分析配置
@@ -61,6 +67,36 @@ class AgentConfig:
                 "suggestions_count": 5   # 输出的建议数量
             },
             
+            # 实时分析会话配置
+            "realtime": {
+                "max_sessions": 500,  # 同时活跃的实时会话数上限
+                "queue_size": 32,  # 每个会话的输入队列上限，积压超过时丢弃最旧的数据
+                "batch_size": 4,  # 每次轮到一个会话时最多处理的数据条数
+                "idle_timeout": 300,  # 会话空闲超过该时间（秒）后自动回收
+                "sweep_interval": 5  # 检查空闲会话的间隔（秒）
+            },
+            
+            # 工作流图配置
+            "workflow": {
+                "memoize_nodes": False,  # 是否记忆化分析器、RAG和学习路径节点的结果
+                "memo_max_entries": 256,  # 记忆化缓存的最大条目数
+                "memo_ttl": None,  # 记忆化结果有效期（秒），为None时不过期
+                # 节点版本号，节点逻辑变化时提升以让旧的记忆化结果失效
+                "node_versions": {"analyzer": "1", "rag": "1", "learning_path": "1"},
+                "request_timeout": 180,  # 单次请求的总时间预算（秒），超过后跳过剩余节点
+                # 各节点的时间预算（秒），超时的节点被取消，保留已有的部分结果继续执行
+                "node_timeouts": {
+                    "task_parser": 10,
+                    "strategy_selector": 10,
+                    "task_planner": 10,
+                    "analyzer": 90,
+                    "rag": 60,
+                    "learning_path": 90,
+                    "generator": 30,
+                    "evaluator": 30
+                }
+            },
+            
             # 外部服务配置
             "services": {
                 "xunfei": {
@@ -70,6 +106,50 @@ class AgentConfig:
                     "ise_url": "https://api.xfyun.cn/v1/service/v1/ise",
                     "iat_url": "https://api.xfyun.cn/v1/service/v1/iat",
                     "emotion_url": "https://api.xfyun.cn/v1/service/v1/emotion"
+                },
+                # 共享HTTP连接池配置
+                "http": {
+                    "limit": 100,  # 连接池总连接数
+                    "limit_per_host": 20,  # 单个主机的最大连接数
+                    "keepalive_timeout": 30,  # 空闲连接保活时间（秒）
+                    "dns_cache_ttl": 300,  # DNS缓存时间（秒）
+                    "connect_timeout": 10,  # 建立连接超时时间（秒）
+                    "request_timeout": 60  # 请求总超时时间（秒）
+                },
+                # LLM响应缓存配置
+                "llm_cache": {
+                    "enabled": True,
+                    "backend": "memory",  # memory 或 file
+                    "cache_dir": "./cache/llm",  # file后端的缓存目录
+                    "max_entries": 5000,
+                    "ttl": 7 * 24 * 3600,  # 缓存有效期（秒）
+                    "max_temperature": 0.5,  # 温度高于该值的调用需要多样性，不缓存
+                    "cost_per_1k_tokens": {}  # 各提供方每千token费用，用于统计节省的费用
+                },
+                # 多提供方LLM路由配置
+                "llm_router": {
+                    "enabled": True,
+                    "providers": ["openai", "xunfei"],  # 未配置凭据的提供方会被跳过
+                    "hedge": True,  # 首选提供方过慢时向次优提供方发出对冲请求
+                    "hedge_percentile": 95,  # 对冲等待取首选提供方的该分位延迟
+                    "hedge_min_delay": 0.2,
+                    "default_hedge_delay": 3.0,  # 延迟样本不足时的对冲等待（秒）
+                    "max_hedge_ratio": 0.2  # 对冲请求占总请求的最大比例
+                },
+                # Web搜索配置
+                "websearch": {
+                    "cache_enabled": True,
+                    "cache_ttl": 3600,  # 搜索结果缓存时间（秒）
+                    "cache_max_entries": 1000,
+                    "engine_deadline": 5.0  # 多引擎搜索等待各引擎的最长时间（秒）
+                },
+                # 提示词token预算配置
+                "prompt_budget": {
+                    "enabled": True,
+                    # 各分析器提示词的最大估算token数（星火Lite上下文约4K，需为回答留出空间）
+                    "max_prompt_tokens": {"content": 3000, "content_batch": 6000, "speech": 1800, "visual": 1800},
+                    "default_max_prompt_tokens": 2000,
+                    "min_transcript_tokens": 200  # 压缩后转写文本至少保留的token数
                 }
             },
             
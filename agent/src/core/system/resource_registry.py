@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+模型与资源注册表
+
+在进程内共享重量级资源（人脸检测模型、讯飞服务客户端、线程池等），提供：
+1. 延迟加载：首次获取时才创建
+2. 引用计数：记录每个资源的使用者数量，非常驻资源在最后一个使用者释放时关闭
+3. 预热：在工作进程启动时提前创建标记为预热的资源
+4. fork安全：Celery prefork等场景下，子进程丢弃从父进程继承的实例并重新初始化
+"""
+
+import os
+import json
+import hashlib
+import threading
+import time
+import logging
+from typing import Any, Callable, Dict, Hashable, List, Optional
+from dataclasses import dataclass, field
+
+
+@dataclass
+class ResourceSpec:
+    """资源定义"""
+    factory: Callable[[], Any]
+    closer: Optional[Callable[[Any], None]] = None
+    warm_up: bool = False
+    keep_alive: bool = True  # 引用计数归零后是否保留实例
+
+
+@dataclass
+class ResourceEntry:
+    """已创建的资源实例"""
+    value: Any
+    created_at: float = field(default_factory=time.time)
+    ref_count: int = 0
+    load_time: float = 0.0
+
+
+def config_fingerprint(section: Any) -> str:
+    """计算配置片段的指纹，用于区分不同配置创建的资源
+
+    Args:
+        section: 配置字典或其他可JSON序列化的对象
+
+    Returns:
+        str: 短指纹字符串
+    """
+    payload = json.dumps(section, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.md5(payload.encode("utf-8")).hexdigest()[:12]
+
+
+class ResourceRegistry:
+    """进程级资源注册表"""
+
+    def __init__(self):
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self._specs: Dict[Hashable, ResourceSpec] = {}
+        self._entries: Dict[Hashable, ResourceEntry] = {}
+        self._locks: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.RLock()
+        self._pid = os.getpid()
+
+        self.stats = {
+            "loads": 0,
+            "hits": 0,
+            "releases": 0,
+            "closes": 0,
+            "fork_resets": 0,
+            "total_load_time": 0.0
+        }
+
+    def register(self, name: Hashable, factory: Callable[[], Any],
+                 closer: Optional[Callable[[Any], None]] = None,
+                 warm_up: bool = False, keep_alive: bool = True):
+        """注册资源定义
+
+        Args:
+            name: 资源名称
+            factory: 创建资源的无参函数
+            closer: 关闭资源的函数
+            warm_up: 是否在warm_up()时预先创建
+            keep_alive: 引用计数归零后是否保留实例
+        """
+        with self._lock:
+            self._specs[name] = ResourceSpec(factory, closer, warm_up, keep_alive)
+
+    def is_registered(self, name: Hashable) -> bool:
+        """资源是否已注册"""
+        return name in self._specs
+
+    def acquire(self, name: Hashable, factory: Optional[Callable[[], Any]] = None,
+                closer: Optional[Callable[[Any], None]] = None) -> Any:
+        """获取资源并增加引用计数
+
+        资源尚未创建时调用其工厂函数创建；同名资源在并发获取时只会创建一次。
+        未注册的资源可以在首次获取时通过factory参数顺带注册。
+
+        Args:
+            name: 资源名称
+            factory: 资源未注册时使用的工厂函数
+            closer: 资源未注册时使用的关闭函数
+
+        Returns:
+            Any: 资源实例
+
+        Raises:
+            KeyError: 资源未注册且未提供工厂函数
+        """
+        self._check_fork()
+
+        with self._lock:
+            if name not in self._specs:
+                if factory is None:
+                    raise KeyError(f"资源未注册: {name}")
+                self._specs[name] = ResourceSpec(factory, closer)
+
+            entry = self._entries.get(name)
+            if entry is not None:
+                entry.ref_count += 1
+                self.stats["hits"] += 1
+                return entry.value
+
+            create_lock = self._locks.setdefault(name, threading.Lock())
+
+        # 在资源级锁内创建，避免加载慢的模型阻塞其他资源
+        with create_lock:
+            with self._lock:
+                entry = self._entries.get(name)
+                if entry is not None:
+                    entry.ref_count += 1
+                    self.stats["hits"] += 1
+                    return entry.value
+                spec = self._specs[name]
+
+            start_time = time.time()
+            value = spec.factory()
+            load_time = time.time() - start_time
+
+            with self._lock:
+                self._entries[name] = ResourceEntry(value=value, ref_count=1, load_time=load_time)
+                self.stats["loads"] += 1
+                self.stats["total_load_time"] += load_time
+
+        self.logger.info(f"资源已加载: {name}, 耗时 {load_time:.3f}s")
+        return value
+
+    def release(self, name: Hashable):
+        """释放一次资源引用
+
+        非常驻资源在引用计数归零时关闭并移除
+
+        Args:
+            name: 资源名称
+        """
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None:
+                return
+
+            entry.ref_count = max(0, entry.ref_count - 1)
+            self.stats["releases"] += 1
+
+            spec = self._specs.get(name)
+            if entry.ref_count > 0 or spec is None or spec.keep_alive:
+                return
+
+            del self._entries[name]
+
+        self._close(name, spec, entry.value)
+
+    def get_ref_count(self, name: Hashable) -> int:
+        """获取资源的当前引用计数"""
+        with self._lock:
+            entry = self._entries.get(name)
+            return entry.ref_count if entry else 0
+
+    def is_loaded(self, name: Hashable) -> bool:
+        """资源是否已创建"""
+        with self._lock:
+            return name in self._entries
+
+    def warm_up(self, names: Optional[List[Hashable]] = None) -> List[Hashable]:
+        """预热资源
+
+        Args:
+            names: 需要预热的资源名称，None表示所有标记为预热的资源
+
+        Returns:
+            List[Hashable]: 成功预热的资源名称
+        """
+        with self._lock:
+            if names is None:
+                names = [name for name, spec in self._specs.items() if spec.warm_up]
+
+        warmed = []
+        for name in names:
+            try:
+                self.acquire(name)
+                self.release(name)
+                warmed.append(name)
+            except Exception as e:
+                self.logger.error(f"资源预热失败: {name}, 错误: {e}")
+
+        self.logger.info(f"资源预热完成: {len(warmed)}/{len(names)}")
+        return warmed
+
+    def reset_after_fork(self):
+        """fork之后在子进程中调用，丢弃从父进程继承的实例
+
+        继承来的线程池、网络连接等在子进程中不可用，这里不调用关闭函数，
+        只清空实例和锁，下次获取时重新创建。资源定义保持不变。
+        """
+        self._lock = threading.RLock()
+        self._locks = {}
+        self._entries = {}
+        self._pid = os.getpid()
+        self.stats["fork_resets"] += 1
+
+    def _check_fork(self):
+        """检测是否处于fork出的子进程中（兜底，正常由at-fork钩子处理）"""
+        if os.getpid() != self._pid:
+            self.reset_after_fork()
+
+    def shutdown(self):
+        """关闭所有已创建的资源"""
+        with self._lock:
+            entries = self._entries
+            self._entries = {}
+
+        for name, entry in entries.items():
+            self._close(name, self._specs.get(name), entry.value)
+
+    def _close(self, name: Hashable, spec: Optional[ResourceSpec], value: Any):
+        """调用资源的关闭函数"""
+        if spec is None or spec.closer is None:
+            return
+        try:
+            spec.closer(value)
+            self.stats["closes"] += 1
+            self.logger.info(f"资源已关闭: {name}")
+        except Exception as e:
+            self.logger.error(f"关闭资源失败: {name}, 错误: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        with self._lock:
+            return {
+                **self.stats,
+                "registered": len(self._specs),
+                "loaded": len(self._entries),
+                "resources": {
+                    str(name): {
+                        "ref_count": entry.ref_count,
+                        "load_time": entry.load_time,
+                        "age": time.time() - entry.created_at
+                    }
+                    for name, entry in self._entries.items()
+                }
+            }
+
+
+# 全局资源注册表实例
+_resource_registry: Optional[ResourceRegistry] = None
+
+
+def get_resource_registry() -> ResourceRegistry:
+    """获取全局资源注册表实例"""
+    global _resource_registry
+    if _resource_registry is None:
+        _resource_registry = ResourceRegistry()
+    return _resource_registry
+
+
+def init_resource_registry() -> ResourceRegistry:
+    """初始化资源注册表（关闭已有资源）"""
+    global _resource_registry
+    if _resource_registry is not None:
+        _resource_registry.shutdown()
+    _resource_registry = ResourceRegistry()
+    return _resource_registry
+
+
+def warm_up_analyzer_resources(config=None) -> List[Hashable]:
+    """注册并预热分析器共享的模型与客户端
+
+    在Celery工作进程或Web服务启动时调用，使首个请求无需承担模型加载开销
+
+    Args:
+        config: AgentConfig配置对象
+
+    Returns:
+        List[Hashable]: 成功预热的资源名称
+    """
+    from ...analyzers.speech.speech_analyzer import SpeechAnalyzer
+    from ...analyzers.visual.visual_analyzer import VisualAnalyzer
+
+    registry = get_resource_registry()
+    SpeechAnalyzer.register_shared_resources(registry, config)
+    VisualAnalyzer.register_shared_resources(registry, config)
+    return registry.warm_up()
+
+
+def _reset_registry_in_child():
+    """fork后子进程中重置全局注册表"""
+    if _resource_registry is not None:
+        _resource_registry.reset_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_registry_in_child)
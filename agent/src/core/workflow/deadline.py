@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+工作流截止时间与协作式取消
+
+请求级截止时间保存在状态的 deadline 字段（time.time() 时间戳）中，随状态在节点间传递：
+1. 每个节点的时间预算取节点自身超时和请求剩余时间中的较小值，由 asyncio.wait_for 强制执行
+2. 节点超时后保留已写入状态的部分结果，在 metadata 中记录超时的节点，工作流继续执行后续节点
+3. 取消令牌：asyncio 只能取消协程，已提交到线程池的任务无法被中断。节点超时时取消其令牌，
+   工作线程通过 run_with_token 拿到令牌，在耗时步骤之间调用 check_cancelled() 主动退出
+"""
+
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from functools import wraps
+from typing import Any, Awaitable, Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+NodeFunc = Callable[..., Awaitable[Any]]
+
+
+class NodeCancelled(Exception):
+    """节点或任务已被取消（超时或截止时间已过）"""
+    pass
+
+
+class CancelToken:
+    """取消令牌，可跨线程检查；父令牌被取消时子令牌也视为已取消"""
+
+    def __init__(self, parent: Optional["CancelToken"] = None):
+        """初始化取消令牌
+
+        Args:
+            parent: 父令牌，如节点令牌之于其下的各个分析任务
+        """
+        self.parent = parent
+        self.reason: Optional[str] = None
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        """是否已取消"""
+        return self._event.is_set() or (self.parent is not None and self.parent.cancelled)
+
+    def cancel(self, reason: str = "已取消"):
+        """取消令牌
+
+        Args:
+            reason: 取消原因
+        """
+        if not self._event.is_set():
+            self.reason = reason
+            self._event.set()
+
+    def check(self):
+        """已取消时抛出 NodeCancelled"""
+        if self.cancelled:
+            token = self
+            while not token._event.is_set() and token.parent is not None:
+                token = token.parent
+            raise NodeCancelled(token.reason or "已取消")
+
+    def wait(self, timeout: float) -> bool:
+        """等待至多 timeout 秒，期间被取消则提前返回，可替代工作线程中的 time.sleep
+
+        Args:
+            timeout: 最长等待时间（秒）
+
+        Returns:
+            bool: 是否已取消
+        """
+        end = time.monotonic() + timeout
+        while not self.cancelled:
+            remaining = end - time.monotonic()
+            if remaining <= 0:
+                return False
+            # 只等待自身事件，每隔一小段时间检查一次父令牌
+            self._event.wait(min(remaining, 0.05))
+        return True
+
+
+_current_token: contextvars.ContextVar[Optional[CancelToken]] = contextvars.ContextVar(
+    "workflow_cancel_token", default=None
+)
+
+
+def current_cancel_token() -> Optional[CancelToken]:
+    """获取当前节点或任务的取消令牌，不在受截止时间约束的节点中时返回None"""
+    return _current_token.get()
+
+
+def check_cancelled():
+    """当前节点或任务已被取消时抛出 NodeCancelled，供分析器在耗时步骤之间调用"""
+    token = _current_token.get()
+    if token is not None:
+        token.check()
+
+
+def run_with_token(token: Optional[CancelToken], func: Callable, *args, **kwargs) -> Any:
+    """在工作线程中带着取消令牌执行函数
+
+    线程池不会继承提交方的上下文变量，通过该函数把令牌传入工作线程。
+    令牌在开始执行前已被取消时直接抛出 NodeCancelled，不再执行函数。
+
+    Args:
+        token: 取消令牌
+        func: 要执行的函数
+        *args: 位置参数
+        **kwargs: 关键字参数
+
+    Returns:
+        Any: 函数返回值
+    """
+    if token is not None:
+        token.check()
+    reset = _current_token.set(token)
+    try:
+        return func(*args, **kwargs)
+    finally:
+        _current_token.reset(reset)
+
+
+def set_deadline(state: Any, timeout: Optional[float]) -> Any:
+    """为请求设置截止时间，已有更早的截止时间时保留原值
+
+    Args:
+        state: 工作流状态（带 deadline 字段）
+        timeout: 从现在起的时间预算（秒），为None时不设置
+
+    Returns:
+        Any: 状态本身
+    """
+    if timeout is not None:
+        deadline = time.time() + timeout
+        current = getattr(state, "deadline", None)
+        state.deadline = deadline if current is None else min(current, deadline)
+    return state
+
+
+def remaining_time(state: Any) -> Optional[float]:
+    """请求剩余时间
+
+    Args:
+        state: 工作流状态
+
+    Returns:
+        Optional[float]: 剩余秒数（可能为负），没有截止时间时返回None
+    """
+    deadline = getattr(state, "deadline", None)
+    return None if deadline is None else deadline - time.time()
+
+
+def node_budget(state: Any, timeout: Optional[float] = None) -> Optional[float]:
+    """节点的时间预算：节点超时和请求剩余时间中的较小值
+
+    Args:
+        state: 工作流状态
+        timeout: 节点超时（秒），为None时不限制
+
+    Returns:
+        Optional[float]: 时间预算（秒），两者都没有时返回None
+    """
+    remaining = remaining_time(state)
+    if remaining is None:
+        return timeout
+    return remaining if timeout is None else min(timeout, remaining)
+
+
+def record_timeout(state: Any, name: str):
+    """在状态元数据中记录超时或被跳过的节点/任务，标记结果为部分结果
+
+    Args:
+        state: 工作流状态
+        name: 节点或任务名称
+    """
+    metadata = state.metadata
+    metadata.setdefault("timed_out", []).append(name)
+    metadata["partial_result"] = True
+
+
+def with_deadline(node: str, func: NodeFunc, timeout: Optional[float] = None,
+                  on_timeout: Optional[Callable[[Any], None]] = None,
+                  request_timeout: Optional[float] = None) -> NodeFunc:
+    """给节点函数加上时间预算
+
+    节点在预算内未完成时被取消（同时取消其令牌），返回已被原地更新的状态作为部分结果；
+    请求截止时间已过时不再执行节点。
+
+    Args:
+        node: 节点名称
+        func: 节点协程函数，签名为 (state, config=None) -> state
+        timeout: 节点超时（秒），为None时只受请求截止时间约束
+        on_timeout: 节点超时或被跳过后对状态的处理，如推进计划步骤以免路由器重复进入该节点
+        request_timeout: 状态还没有截止时间时，从第一个节点开始计算的请求时间预算（秒）
+
+    Returns:
+        NodeFunc: 带时间预算的节点函数
+    """
+    @wraps(func)
+    async def guarded(state, config=None):
+        if request_timeout is not None and getattr(state, "deadline", None) is None:
+            set_deadline(state, request_timeout)
+        budget = node_budget(state, timeout)
+        token = CancelToken(parent=_current_token.get())
+        if budget is not None and budget <= 0:
+            token.cancel(f"请求截止时间已过，跳过节点 {node}")
+            logger.warning(f"请求截止时间已过，跳过节点: {node}")
+            record_timeout(state, node)
+            if on_timeout:
+                on_timeout(state)
+            return state
+
+        reset = _current_token.set(token)
+        try:
+            # wait_for 为协程创建的任务会复制当前上下文，节点内可通过 current_cancel_token() 取得令牌
+            if budget is None:
+                return await func(state, config)
+            return await asyncio.wait_for(func(state, config), budget)
+        except asyncio.TimeoutError:
+            token.cancel(f"节点 {node} 超时")
+            logger.warning(f"节点 {node} 超过时间预算 {budget}s，保留部分结果继续执行")
+            record_timeout(state, node)
+            if on_timeout:
+                on_timeout(state)
+            return state
+        finally:
+            _current_token.reset(reset)
+
+    return guarded
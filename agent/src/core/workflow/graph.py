@@ -37,6 +37,8 @@ from agent.core.nodes import (
     FeedbackGenerator,
 )
 from ..system.config import AgentConfig
+from .node_memo import NodeMemoizer
+from .deadline import with_deadline
 from ...nodes.executors.rag_executor import RAGExecutor, RAGExecutorInput, RAGExecutorOutput
 from ...nodes.executors.learning_path_generator import LearningPathGenerator, LearningPathGeneratorInput, LearningPathGeneratorOutput
 
@@ -62,6 +64,7 @@ class NodeType(str, Enum):
 class WorkflowState(BaseModel):
     """工作流状态"""
     query: str = Field(default="", description="查询文本")
+    media_files: List[str] = Field(default_factory=list, description="待分析的媒体文件路径")
     task_type: str = Field(default="", description="任务类型")
     strategy: Dict[str, Any] = Field(default_factory=dict, description="策略")
     plan: List[Dict[str, Any]] = Field(default_factory=list, description="计划")
@@ -71,6 +74,7 @@ class WorkflowState(BaseModel):
     history: List[Dict[str, Any]] = Field(default_factory=list, description="历史记录")
     metadata: Dict[str, Any] = Field(default_factory=dict, description="元数据")
     error: Optional[str] = Field(default=None, description="错误信息")
+    deadline: Optional[float] = Field(default=None, description="请求截止时间（time.time()时间戳）")
 
 class WorkflowBuilder:
     """工作流构建器"""
@@ -91,6 +95,15 @@ class WorkflowBuilder:
         
         # 节点映射
         self.node_map = {}
+        
+        # 节点结果记忆化（可选）
+        workflow_config = self.config.get_section("workflow")
+        self.memoizer = None
+        if workflow_config.get("memoize_nodes", False):
+            self.memoizer = NodeMemoizer(
+                max_entries=workflow_config.get("memo_max_entries", 256),
+                ttl=workflow_config.get("memo_ttl")
+            )
     
     def build(self) -> StateGraph:
         """构建工作流图
@@ -113,41 +126,97 @@ class WorkflowBuilder:
     def _add_nodes(self):
         """添加节点"""
         # 任务解析器
-        self.graph.add_node(NodeType.TASK_PARSER, self._task_parser)
-        self.node_map[NodeType.TASK_PARSER] = self._task_parser
+        task_parser = self._wrap_node(NodeType.TASK_PARSER, self._task_parser)
+        self.graph.add_node(NodeType.TASK_PARSER, task_parser)
+        self.node_map[NodeType.TASK_PARSER] = task_parser
         
         # 策略选择器
-        self.graph.add_node(NodeType.STRATEGY_SELECTOR, self._strategy_selector)
-        self.node_map[NodeType.STRATEGY_SELECTOR] = self._strategy_selector
+        strategy_selector = self._wrap_node(NodeType.STRATEGY_SELECTOR, self._strategy_selector)
+        self.graph.add_node(NodeType.STRATEGY_SELECTOR, strategy_selector)
+        self.node_map[NodeType.STRATEGY_SELECTOR] = strategy_selector
         
         # 任务规划器
-        self.graph.add_node(NodeType.TASK_PLANNER, self._task_planner)
-        self.node_map[NodeType.TASK_PLANNER] = self._task_planner
+        task_planner = self._wrap_node(NodeType.TASK_PLANNER, self._task_planner)
+        self.graph.add_node(NodeType.TASK_PLANNER, task_planner)
+        self.node_map[NodeType.TASK_PLANNER] = task_planner
         
         # 分析器
-        self.graph.add_node(NodeType.ANALYZER, self._analyzer)
-        self.node_map[NodeType.ANALYZER] = self._analyzer
+        # 分析结果取决于媒体文件内容，同一路径重新上传的文件按内容指纹区分
+        analyzer = self._wrap_node(NodeType.ANALYZER, self._analyzer, memo_inputs=["query", "media_files"],
+                                   media_inputs=["query", "media_files"])
+        self.graph.add_node(NodeType.ANALYZER, analyzer)
+        self.node_map[NodeType.ANALYZER] = analyzer
         
         # RAG
-        self.graph.add_node(NodeType.RAG, self._rag)
-        self.node_map[NodeType.RAG] = self._rag
+        rag = self._wrap_node(NodeType.RAG, self._rag, memo_inputs=["query", "context", "plan", "current_step"])
+        self.graph.add_node(NodeType.RAG, rag)
+        self.node_map[NodeType.RAG] = rag
         
         # 学习路径生成器
-        self.graph.add_node(NodeType.LEARNING_PATH, self._learning_path)
-        self.node_map[NodeType.LEARNING_PATH] = self._learning_path
+        learning_path = self._wrap_node(
+            NodeType.LEARNING_PATH, self._learning_path,
+            memo_inputs=["query", "context.analysis", "results.rag_result", "plan", "current_step"]
+        )
+        self.graph.add_node(NodeType.LEARNING_PATH, learning_path)
+        self.node_map[NodeType.LEARNING_PATH] = learning_path
         
         # 生成器
-        self.graph.add_node(NodeType.GENERATOR, self._generator)
-        self.node_map[NodeType.GENERATOR] = self._generator
+        generator = self._wrap_node(NodeType.GENERATOR, self._generator)
+        self.graph.add_node(NodeType.GENERATOR, generator)
+        self.node_map[NodeType.GENERATOR] = generator
         
         # 评估器
-        self.graph.add_node(NodeType.EVALUATOR, self._evaluator)
-        self.node_map[NodeType.EVALUATOR] = self._evaluator
+        evaluator = self._wrap_node(NodeType.EVALUATOR, self._evaluator)
+        self.graph.add_node(NodeType.EVALUATOR, evaluator)
+        self.node_map[NodeType.EVALUATOR] = evaluator
         
-        # 路由器
+        # 路由器只做判断，不设时间预算
         self.graph.add_node(NodeType.ROUTER, self._router)
         self.node_map[NodeType.ROUTER] = self._router
     
+    def _wrap_node(self, node: NodeType, func, memo_inputs: Optional[List[str]] = None,
+                   media_inputs: Optional[List[str]] = None):
+        """给节点函数加上记忆化（可选）和时间预算
+        
+        Args:
+            node: 节点类型
+            func: 节点函数
+            memo_inputs: 节点读取的状态字段，给出时在开启记忆化后按这些字段记忆化节点结果
+            media_inputs: 值为媒体文件路径的状态字段，文件内容指纹参与记忆化的键
+            
+        Returns:
+            节点函数
+        """
+        workflow_config = self.config.get_section("workflow")
+        if memo_inputs is not None and self.memoizer is not None:
+            versions = workflow_config.get("node_versions", {})
+            func = self.memoizer.wrap(
+                node.value, func,
+                inputs=memo_inputs,
+                outputs=["results", "context", "current_step", "metadata"],
+                version=str(versions.get(node.value, "1")),
+                media=media_inputs or ()
+            )
+        
+        # 计划中的步骤超时后推进到下一步，生成器基于已有的部分结果生成回答
+        plan_nodes = (NodeType.ANALYZER, NodeType.RAG, NodeType.LEARNING_PATH,
+                      NodeType.GENERATOR, NodeType.EVALUATOR)
+        return with_deadline(
+            node.value, func,
+            timeout=workflow_config.get("node_timeouts", {}).get(node.value),
+            on_timeout=self._skip_step if node in plan_nodes else None,
+            request_timeout=workflow_config.get("request_timeout")
+        )
+    
+    @staticmethod
+    def _skip_step(state: WorkflowState):
+        """跳过当前计划步骤
+        
+        Args:
+            state: 工作流状态
+        """
+        state.current_step += 1
+    
     def _add_edges(self):
         """添加边"""
         # 设置入口节点
@@ -480,7 +549,7 @@ class WorkflowBuilder:
         
         try:
             # 执行分析
-            analysis_result = await self.analyzer_executor.execute(state.query)
+            analysis_result = await self.analyzer_executor.execute_async(state.query)
             
             # 更新状态
             if "analyzer_results" not in state.results:
@@ -0,0 +1,306 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+工作流节点结果记忆化
+
+路由器循环会重复进入分析器、RAG和学习路径节点，同一份文件在同一场景下的重复评估也会重新计算全部节点。
+记忆化层包装节点函数：
+1. 键：节点名称、节点读取的状态字段和节点版本号的稳定哈希，修改节点逻辑时提升版本号即可让旧结果失效；
+   节点读取媒体文件时，键还包含文件的大小、修改时间和内容哈希，同一路径重新上传的文件不会命中旧结果
+2. 值：节点对输出字段造成的变更（补丁），命中时把补丁应用到当前状态上，而不是整体替换状态
+3. 存储：有界的本地内存缓存（LRU），并记录命中与未命中次数
+
+节点出错（设置了error字段或抛出异常）时不缓存结果；输入字段无法稳定序列化时跳过记忆化，直接执行节点。
+"""
+
+import os
+import copy
+import json
+import enum
+import hashlib
+import logging
+import dataclasses
+from datetime import date, datetime
+from functools import wraps
+from typing import Any, Awaitable, Callable, Dict, Iterator, Optional, Sequence
+
+from ..system.cache_system import MemoryCache
+
+logger = logging.getLogger(__name__)
+
+NodeFunc = Callable[..., Awaitable[Any]]
+
+_MISSING = object()
+
+
+def _get_field(state: Any, path: str) -> Any:
+    """按点分隔的路径读取状态字段，支持对象属性和字典键"""
+    value = state
+    for name in path.split("."):
+        if isinstance(value, dict):
+            value = value.get(name, _MISSING)
+        else:
+            value = getattr(value, name, _MISSING)
+        if value is _MISSING:
+            return _MISSING
+    return value
+
+
+def _set_field(state: Any, path: str, value: Any):
+    """按点分隔的路径写入状态字段"""
+    *parents, name = path.split(".")
+    target = state
+    for parent in parents:
+        target = target[parent] if isinstance(target, dict) else getattr(target, parent)
+    if isinstance(target, dict):
+        target[name] = value
+    else:
+        setattr(target, name, value)
+
+
+def _to_jsonable(value: Any) -> Any:
+    """把状态字段转换为可稳定序列化的结构
+
+    repr() 可能包含对象地址或省略内容，既会让相同输入得到不同的键，也会让不同输入得到相同的键，
+    因此无法稳定序列化的类型直接报错，由调用方跳过记忆化。
+
+    Raises:
+        TypeError: 值的类型无法稳定序列化
+    """
+    if hasattr(value, "dict") and callable(value.dict):
+        return value.dict()
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+    if isinstance(value, enum.Enum):
+        return value.value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray)):
+        return {"__bytes__": hashlib.sha256(value).hexdigest()}
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=lambda item: json.dumps(item, sort_keys=True, default=_to_jsonable))
+    raise TypeError(f"无法稳定序列化的类型: {type(value).__name__}")
+
+
+def _iter_paths(value: Any) -> Iterator[str]:
+    """依次产出字段值中的字符串（单个路径、路径列表或以路径为值的字典）"""
+    if isinstance(value, (str, os.PathLike)):
+        yield os.fspath(value)
+    elif isinstance(value, dict):
+        for item in value.values():
+            yield from _iter_paths(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            yield from _iter_paths(item)
+
+
+def file_fingerprint(path: str, chunk_size: int = 1 << 20) -> Optional[Dict[str, Any]]:
+    """计算媒体文件的指纹：大小、修改时间和内容哈希
+
+    Args:
+        path: 文件路径
+        chunk_size: 分块读取的大小（字节）
+
+    Returns:
+        Optional[Dict[str, Any]]: 文件指纹，路径不是文件时返回None
+    """
+    try:
+        stat = os.stat(path)
+    except (OSError, ValueError):
+        return None
+    if not os.path.isfile(path):
+        return None
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "hash": digest.hexdigest()}
+
+
+def make_node_key(node: str, state: Any, fields: Sequence[str], version: str = "1",
+                  media: Sequence[str] = ()) -> str:
+    """计算节点结果的缓存键
+
+    Args:
+        node: 节点名称
+        state: 工作流状态
+        fields: 节点读取的状态字段（点分隔路径）
+        version: 节点版本号
+        media: 值为媒体文件路径的状态字段，键中包含这些文件的指纹；不是已存在文件的值只按字段值参与计算
+
+    Returns:
+        str: 缓存键
+
+    Raises:
+        TypeError: 输入字段包含无法稳定序列化的值
+    """
+    inputs = {}
+    for path in fields:
+        value = _get_field(state, path)
+        inputs[path] = None if value is _MISSING else value
+    files = {}
+    for path in media:
+        value = _get_field(state, path)
+        for file_path in ([] if value is _MISSING else _iter_paths(value)):
+            fingerprint = file_fingerprint(file_path)
+            if fingerprint is not None:
+                files[file_path] = fingerprint
+    payload = json.dumps({"node": str(node), "version": version, "inputs": inputs, "files": files},
+                         sort_keys=True, ensure_ascii=False, default=_to_jsonable)
+    return f"{node}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+def diff_value(before: Any, after: Any) -> Optional[Dict[str, Any]]:
+    """计算字段从 before 变为 after 的补丁
+
+    字典按键递归比较；列表只追加了元素时记录追加部分；整数记录增量（如步骤计数）；其余记录新值。
+
+    Args:
+        before: 节点执行前的值
+        after: 节点执行后的值
+
+    Returns:
+        Optional[Dict[str, Any]]: 补丁，没有变化时返回None
+    """
+    if before is _MISSING:
+        return {"set": copy.deepcopy(after)}
+    if isinstance(before, dict) and isinstance(after, dict):
+        changes = {}
+        for key, value in after.items():
+            patch = diff_value(before.get(key, _MISSING), value)
+            if patch is not None:
+                changes[key] = patch
+        removed = [key for key in before if key not in after]
+        if not changes and not removed:
+            return None
+        return {"dict": changes, "del": removed}
+    if before == after:
+        return None
+    if isinstance(before, list) and isinstance(after, list) and after[:len(before)] == before:
+        return {"extend": copy.deepcopy(after[len(before):])}
+    if (isinstance(before, int) and isinstance(after, int)
+            and not isinstance(before, bool) and not isinstance(after, bool)):
+        return {"add": after - before}
+    return {"set": copy.deepcopy(after)}
+
+
+def apply_patch(value: Any, patch: Dict[str, Any]) -> Any:
+    """把补丁应用到字段当前值上
+
+    Args:
+        value: 字段当前值（字典和列表会被原地修改）
+        patch: diff_value 生成的补丁
+
+    Returns:
+        Any: 应用补丁后的值
+    """
+    if "dict" in patch:
+        if not isinstance(value, dict):
+            value = {}
+        for key, sub_patch in patch["dict"].items():
+            value[key] = apply_patch(value.get(key, _MISSING), sub_patch)
+        for key in patch["del"]:
+            value.pop(key, None)
+        return value
+    if "extend" in patch and isinstance(value, list):
+        value.extend(copy.deepcopy(patch["extend"]))
+        return value
+    if "add" in patch and isinstance(value, int) and not isinstance(value, bool):
+        return value + patch["add"]
+    if "extend" in patch:
+        return copy.deepcopy(patch["extend"])
+    if "add" in patch:
+        return patch["add"]
+    return copy.deepcopy(patch["set"])
+
+
+class NodeMemoizer:
+    """工作流节点结果的记忆化缓存"""
+
+    def __init__(self, max_entries: int = 256, ttl: Optional[float] = None):
+        """初始化记忆化缓存
+
+        Args:
+            max_entries: 最多缓存的节点结果数，超过时淘汰最久未使用的结果
+            ttl: 结果有效期（秒），为None时不过期
+        """
+        self.cache = MemoryCache(max_size=max_entries, default_ttl=ttl)
+        self.node_stats: Dict[str, Dict[str, int]] = {}
+
+    @property
+    def hits(self) -> int:
+        return self.cache.stats["hits"]
+
+    @property
+    def misses(self) -> int:
+        return self.cache.stats["misses"]
+
+    def wrap(self, node: str, func: NodeFunc, inputs: Sequence[str], outputs: Sequence[str],
+             version: str = "1", media: Sequence[str] = ()) -> NodeFunc:
+        """包装节点函数
+
+        Args:
+            node: 节点名称
+            func: 节点协程函数，签名为 (state, config=None) -> state，可原地修改状态
+            inputs: 节点读取的状态字段，决定缓存键
+            outputs: 节点写入的状态字段，命中时把记录的变更应用到这些字段
+            version: 节点版本号，节点逻辑变化时提升
+            media: 值为媒体文件路径的状态字段，文件内容参与缓存键
+
+        Returns:
+            NodeFunc: 带记忆化的节点函数
+        """
+        stats = self.node_stats.setdefault(str(node), {"hits": 0, "misses": 0, "skipped": 0})
+
+        @wraps(func)
+        async def memoized(state, config=None):
+            try:
+                key = make_node_key(node, state, inputs, version, media)
+            except TypeError as e:
+                stats["skipped"] += 1
+                logger.debug(f"节点 {node} 的输入无法稳定序列化，跳过记忆化: {e}")
+                return await func(state, config)
+            patches = self.cache.get(key)
+            if patches is not None:
+                stats["hits"] += 1
+                logger.debug(f"节点 {node} 命中记忆化缓存")
+                for path, patch in patches.items():
+                    current = _get_field(state, path)
+                    _set_field(state, path, apply_patch(current, patch))
+                return state
+
+            stats["misses"] += 1
+            before = {path: copy.deepcopy(_get_field(state, path)) for path in outputs}
+            result = await func(state, config)
+            if _get_field(result, "error") not in (None, _MISSING):
+                return result
+
+            patches = {}
+            for path in outputs:
+                patch = diff_value(before[path], _get_field(result, path))
+                if patch is not None:
+                    patches[path] = patch
+            self.cache.set(key, patches)
+            return result
+
+        return memoized
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息
+
+        Returns:
+            Dict[str, Any]: 总命中/未命中次数、命中率、当前条目数和各节点的命中情况
+        """
+        stats = self.cache.get_stats()
+        return {
+            "hits": stats["hits"],
+            "misses": stats["misses"],
+            "hit_rate": stats["hit_rate"],
+            "evictions": stats["evictions"],
+            "entries": stats["current_size"],
+            "nodes": {node: dict(counts) for node, counts in self.node_stats.items()}
+        }
+
+    def clear(self):
+        """清空缓存"""
+        self.cache.clear()
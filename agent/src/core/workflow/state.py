@@ -146,6 +146,7 @@ class GraphState:
     # 工作流控制
     next_node: Optional[str] = None  # 下一个要执行的节点
     error: Optional[str] = None  # 错误信息
+    deadline: Optional[float] = None  # 请求截止时间（time.time()时间戳），为None时不限制
     
     # 元数据
     metadata: Dict[str, Any] = field(default_factory=dict)  # 元数据
@@ -0,0 +1,385 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图状态增量日志
+
+每个会话的图状态检查点由三个文件组成：
+1. base.pickle：基准快照，包含压缩时刻全部键的序列化值及其序号
+2. journal.log：追加写入的增量记录，每条只包含相对上一个检查点变化的键
+3. index.json：最新检查点的索引（序号、已提交的日志长度），原子替换写入
+
+每次检查点写入的字节数与变化量成正比，而不是与状态大小成正比。
+增量记录数达到上限或日志大小超过基准快照时压缩为新的基准快照，
+压缩前的基准快照和日志以硬链接保留在 history/ 目录下，保证压缩后仍能重放最近 keep_history 个检查点。
+恢复时读取基准快照并按序重放增量记录；末尾被截断或校验失败的记录会被丢弃。
+"""
+
+import os
+import json
+import time
+import struct
+import pickle
+import hashlib
+import logging
+import shutil
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 记录头：负载长度 + CRC32
+_HEADER = struct.Struct(">II")
+
+
+class StateJournal:
+    """单个会话的图状态增量日志"""
+
+    BASE_FILE = "base.pickle"
+    JOURNAL_FILE = "journal.log"
+    INDEX_FILE = "index.json"
+    HISTORY_DIR = "history"
+
+    def __init__(self, directory: Path, compact_every: int = 50, keep_history: int = 10):
+        """初始化增量日志
+
+        Args:
+            directory: 会话的检查点目录
+            compact_every: 增量记录数达到该值时压缩为基准快照
+            keep_history: 压缩后至少保留可重放的最近检查点数量
+        """
+        self.directory = Path(directory)
+        self.compact_every = compact_every
+        self.keep_history = keep_history
+        self.seq = 0
+        self.base_seq = 0
+        self.base_bytes = 0
+        self.journal_bytes = 0
+        self.records = 0
+        self.compactions = 0
+        self._digests: Dict[str, bytes] = {}
+        self._recovered = False
+
+    @property
+    def base_path(self) -> Path:
+        return self.directory / self.BASE_FILE
+
+    @property
+    def journal_path(self) -> Path:
+        return self.directory / self.JOURNAL_FILE
+
+    @property
+    def index_path(self) -> Path:
+        return self.directory / self.INDEX_FILE
+
+    @property
+    def history_dir(self) -> Path:
+        return self.directory / self.HISTORY_DIR
+
+    def _segment_paths(self, base_seq: int) -> Tuple[Path, Path]:
+        """历史分段的基准快照和日志路径
+
+        Args:
+            base_seq: 分段基准快照的序号
+
+        Returns:
+            Tuple[Path, Path]: (基准快照路径, 日志路径)
+        """
+        return (self.history_dir / f"base.{base_seq:010d}.pickle",
+                self.history_dir / f"journal.{base_seq:010d}.log")
+
+    def _archived_segments(self) -> List[int]:
+        """已保留的历史分段的基准序号，按时间顺序排列"""
+        if not self.history_dir.exists():
+            return []
+        return sorted(int(path.name.split(".")[1]) for path in self.history_dir.glob("base.*.pickle"))
+
+    def exists(self) -> bool:
+        """是否已有检查点"""
+        return self.index_path.exists()
+
+    def checkpoint(self, values: Dict[str, bytes], timestamp: str) -> int:
+        """写入一个检查点，只记录变化的键
+
+        Args:
+            values: 键 -> 序列化后的值
+            timestamp: 检查点时间戳
+
+        Returns:
+            int: 本次写入的字节数
+        """
+        if not self._recovered:
+            self._recover()
+
+        digests = {key: hashlib.blake2b(value, digest_size=16).digest() for key, value in values.items()}
+        changed = {key: values[key] for key, digest in digests.items() if self._digests.get(key) != digest}
+        deleted = [key for key in self._digests if key not in values]
+
+        self.seq += 1
+        self._digests = digests
+        if self.base_seq == 0 or self.records + 1 >= self.compact_every:
+            return self._compact(values, timestamp)
+
+        payload = pickle.dumps({"seq": self.seq, "ts": timestamp, "set": changed, "del": deleted},
+                               protocol=pickle.HIGHEST_PROTOCOL)
+        record = _HEADER.pack(len(payload), zlib.crc32(payload)) + payload
+        with open(self.journal_path, "ab") as f:
+            f.write(record)
+        self.journal_bytes += len(record)
+        self.records += 1
+        written = len(record) + self._write_index(timestamp)
+
+        # 日志比基准快照还大时重放代价已超过直接读取快照，提前压缩
+        if self.journal_bytes > self.base_bytes:
+            written += self._compact(values, timestamp)
+        return written
+
+    def replay(self, until: Optional[str] = None) -> Optional[Tuple[int, Dict[str, bytes]]]:
+        """重放基准快照和增量记录，得到最新（或指定时间点）的状态
+
+        Args:
+            until: 时间戳（可以只给出前缀，如到秒），只重放不晚于该时间的检查点，为None时重放到最新
+
+        Returns:
+            Optional[Tuple[int, Dict[str, bytes]]]: (序号, 键 -> 序列化后的值)，没有检查点时返回None
+        """
+        result = None
+        # 指定时间点时可能早于当前基准快照，从保留的历史分段开始重放
+        states = self._iter_states() if until is None else self._iter_states(history=True)
+        for seq, timestamp, values in states:
+            if until is None:
+                result = (seq, values)
+                continue
+            if timestamp[:len(until)] > until:
+                break
+            result = (seq, dict(values))
+        return None if result is None else (result[0], dict(result[1]))
+
+    def history(self, limit: int) -> List[Tuple[int, str, Dict[str, bytes]]]:
+        """获取最近的检查点历史，跨越压缩时从保留的历史分段重放
+
+        Args:
+            limit: 最多返回的检查点数量
+
+        Returns:
+            List[Tuple[int, str, Dict[str, bytes]]]: 按时间顺序排列的 (序号, 时间戳, 状态)
+        """
+        if limit <= 0:
+            return []
+        latest = self._read_index().get("seq", self.seq)
+        states = [(seq, timestamp, dict(values))
+                  for seq, timestamp, values in self._iter_states(history=True, since=latest - limit + 1)]
+        return states[-limit:]
+
+    def _iter_states(self, history: bool = False,
+                     since: Optional[int] = None) -> Iterator[Tuple[int, str, Dict[str, bytes]]]:
+        """依次产出各检查点的状态（产出的字典会被后续记录原地更新）
+
+        Args:
+            history: 是否先重放保留的历史分段
+            since: 只需要不早于该序号的检查点，跳过更早的历史分段
+
+        Yields:
+            Tuple[int, str, Dict[str, bytes]]: (序号, 时间戳, 状态)
+        """
+        base = self._read_base()
+        if base is None:
+            return
+        segments = []
+        if history:
+            archived = [seq for seq in self._archived_segments() if seq < base["seq"]]
+            if since is not None:
+                # 从覆盖 since 的分段开始
+                start = [seq for seq in archived if seq <= since]
+                archived = archived[archived.index(start[-1]):] if start else archived
+            segments = [(seq, *self._segment_paths(seq)) for seq in archived]
+        segments.append((base["seq"], self.base_path, self.journal_path))
+
+        for i, (_, base_path, journal_path) in enumerate(segments):
+            current = i == len(segments) - 1
+            segment_base = base if current else self._read_base(base_path)
+            if segment_base is None:
+                continue
+            # 分段中不早于下一分段基准快照的记录由下一分段提供
+            end_seq = None if current else segments[i + 1][0]
+            values = dict(segment_base["values"])
+            base_seq = segment_base["seq"]
+            yield base_seq, segment_base["ts"], values
+            limit = self._committed_bytes() if current else None
+            for record, _ in self._iter_records(limit, journal_path):
+                if record["seq"] <= base_seq:
+                    # 压缩后尚未截断的旧记录
+                    continue
+                if end_seq is not None and record["seq"] >= end_seq:
+                    break
+                values.update(record["set"])
+                for key in record["del"]:
+                    values.pop(key, None)
+                yield record["seq"], record["ts"], values
+
+    def _iter_records(self, limit: Optional[int],
+                      path: Optional[Path] = None) -> Iterator[Tuple[Dict[str, Any], int]]:
+        """读取日志中完整且校验通过的记录
+
+        Args:
+            limit: 最多读取的字节数，为None时读到文件末尾
+            path: 日志路径，默认为当前日志
+
+        Yields:
+            Tuple[Dict[str, Any], int]: (记录, 该记录结束位置)
+        """
+        path = path or self.journal_path
+        if not path.exists():
+            return
+        with open(path, "rb") as f:
+            data = f.read() if limit is None else f.read(limit)
+        offset = 0
+        while offset + _HEADER.size <= len(data):
+            length, checksum = _HEADER.unpack_from(data, offset)
+            start, end = offset + _HEADER.size, offset + _HEADER.size + length
+            payload = data[start:end]
+            if len(payload) < length or zlib.crc32(payload) != checksum:
+                logger.warning(f"检查点日志末尾记录不完整，忽略 {len(data) - offset} 字节: {path}")
+                return
+            try:
+                record = pickle.loads(payload)
+            except Exception as e:
+                logger.warning(f"检查点日志记录解析失败，停止重放: {e}")
+                return
+            offset = end
+            yield record, offset
+
+    def _read_base(self, path: Optional[Path] = None) -> Optional[Dict[str, Any]]:
+        """读取基准快照
+
+        Args:
+            path: 基准快照路径，默认为当前基准快照
+        """
+        path = path or self.base_path
+        if not path.exists():
+            return None
+        with open(path, "rb") as f:
+            return pickle.load(f)
+
+    def _read_index(self) -> Dict[str, Any]:
+        """读取索引，不存在或损坏时返回空字典"""
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _committed_bytes(self) -> Optional[int]:
+        """索引记录的已提交日志长度，超出部分是未提交的残留记录"""
+        return self._read_index().get("journal_bytes")
+
+    def _recover(self):
+        """从磁盘恢复写入位置：丢弃未提交或不完整的日志尾部"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._recovered = True
+        base = self._read_base()
+        if base is None:
+            return
+
+        values = dict(base["values"])
+        self.base_seq = self.seq = base["seq"]
+        self.base_bytes = self.base_path.stat().st_size
+        valid_bytes = 0
+        for record, end in self._iter_records(self._committed_bytes()):
+            valid_bytes = end
+            if record["seq"] <= self.base_seq:
+                continue
+            values.update(record["set"])
+            for key in record["del"]:
+                values.pop(key, None)
+            self.seq = record["seq"]
+            self.records += 1
+
+        if self.journal_path.exists() and self.journal_path.stat().st_size != valid_bytes:
+            with open(self.journal_path, "r+b") as f:
+                f.truncate(valid_bytes)
+        self.journal_bytes = valid_bytes
+        self._digests = {key: hashlib.blake2b(value, digest_size=16).digest() for key, value in values.items()}
+
+    def _compact(self, values: Dict[str, bytes], timestamp: str) -> int:
+        """把当前状态写为新的基准快照并清空日志
+
+        Args:
+            values: 键 -> 序列化后的值
+            timestamp: 检查点时间戳
+
+        Returns:
+            int: 写入的字节数
+        """
+        data = pickle.dumps({"seq": self.seq, "ts": timestamp, "values": values},
+                            protocol=pickle.HIGHEST_PROTOCOL)
+        self._archive_segment()
+        # 基准快照自带序号，先替换快照再替换为空日志，中途崩溃时序号不大于快照的旧记录会被跳过；
+        # 两者都以新文件替换，已保留的历史分段（硬链接）不受影响
+        atomic_write(self.base_path, data)
+        atomic_write(self.journal_path, b"")
+        self.base_seq = self.seq
+        self.base_bytes = len(data)
+        self.journal_bytes = 0
+        self.records = 0
+        self.compactions += 1
+        written = len(data) + self._write_index(timestamp)
+        self._prune_segments()
+        return written
+
+    def _archive_segment(self):
+        """把当前基准快照和日志保留为历史分段，压缩后仍可重放其中的检查点"""
+        if self.keep_history <= 1 or self.base_seq == 0 or not self.base_path.exists():
+            return
+        self.history_dir.mkdir(exist_ok=True)
+        for source, target in zip((self.base_path, self.journal_path), self._segment_paths(self.base_seq)):
+            if not source.exists():
+                continue
+            # 上次压缩中途崩溃可能留下同名分段
+            target.unlink(missing_ok=True)
+            try:
+                os.link(source, target)
+            except OSError:
+                shutil.copyfile(source, target)
+
+    def _prune_segments(self):
+        """删除不再需要的历史分段：较新的分段和当前分段已覆盖最近 keep_history 个检查点"""
+        archived = self._archived_segments()
+        covered = [seq for seq in archived if seq <= self.base_seq - self.keep_history + 1]
+        for seq in archived:
+            if (covered and seq < covered[-1]) or seq >= self.base_seq or self.keep_history <= 1:
+                for path in self._segment_paths(seq):
+                    path.unlink(missing_ok=True)
+
+    def _write_index(self, timestamp: str) -> int:
+        """原子更新索引
+
+        Args:
+            timestamp: 最新检查点时间戳
+
+        Returns:
+            int: 写入的字节数
+        """
+        data = json.dumps({
+            "seq": self.seq,
+            "base_seq": self.base_seq,
+            "journal_bytes": self.journal_bytes,
+            "records": self.records,
+            "timestamp": timestamp,
+            "updated_at": time.time()
+        }).encode("utf-8")
+        atomic_write(self.index_path, data)
+        return len(data)
+
+
+def atomic_write(path: Path, data: bytes):
+    """通过临时文件和重命名原子写入文件
+
+    Args:
+        path: 目标文件
+        data: 文件内容
+    """
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
@@ -10,19 +10,26 @@
 4. 状态持久化
 """
 
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable
 import json
 import time
 import asyncio
 import os
 import pickle
+import re
+import shutil
 from datetime import datetime, timedelta
-from dataclasses import dataclass, field, asdict
+from dataclasses import dataclass, field, asdict, fields, is_dataclass
 from collections import defaultdict, deque
 from pathlib import Path
+from urllib.parse import quote
 import logging
 
 from .state import GraphState, Task, AnalysisResult, TaskStatus
+from .state_journal import StateJournal, atomic_write
+
+# 图状态中列表元素的字段路径，如 task_state.tasks[3]
+_LIST_ITEM = re.compile(r"\[\d+\]$")
 
 
 @dataclass
@@ -76,15 +83,22 @@ class StateManager:
     负责管理智能体的所有状态信息，提供状态的创建、更新、查询和持久化功能
     """
     
-    def __init__(self, state_dir: str = "./state", auto_save_interval: int = 300):
+    SESSIONS_DIR = "sessions"
+    SESSION_HISTORY_FILE = "session_history.jsonl"
+    TASK_HISTORY_FILE = "task_history.jsonl"
+    
+    def __init__(self, state_dir: str = "./state", auto_save_interval: int = 300,
+                 save_debounce: float = 1.0):
         """初始化状态管理器
         
         Args:
             state_dir: 状态文件存储目录
             auto_save_interval: 自动保存间隔（秒）
+            save_debounce: 状态变更后延迟落盘的时间（秒），期间的多次变更合并为一次写入
         """
         self.state_dir = state_dir
         self.auto_save_interval = auto_save_interval
+        self.save_debounce = save_debounce
         self.logger = logging.getLogger(self.__class__.__name__)
         
         # 确保状态目录存在
@@ -100,8 +114,9 @@ class StateManager:
         self.cache_timestamps: Dict[str, float] = {}
         self.cache_ttl = 3600  # 缓存1小时
         
-        # 状态历史
-        self.graph_state_history: Dict[str, List[GraphState]] = {}
+        # 图状态增量日志，每个会话一份；历史和回滚通过重放日志得到
+        self.graph_journals: Dict[str, StateJournal] = {}
+        self.journal_compact_every = 50
         self.max_history_size = 10
         
         # 历史记录（内存中保留最近的记录）
@@ -111,6 +126,17 @@ class StateManager:
         # 状态变更监听器
         self.state_listeners = []
         
+        # 待落盘的变更：每个会话单独一个文件，只重写有变更的会话；历史记录追加写入
+        self._dirty_sessions = set()
+        self._removed_sessions = set()
+        self._global_dirty = False
+        self._pending_history: Dict[str, List[Dict[str, Any]]] = {
+            self.SESSION_HISTORY_FILE: [],
+            self.TASK_HISTORY_FILE: []
+        }
+        self._history_lines: Dict[str, int] = {}
+        self._flush_task: Optional[asyncio.Task] = None
+        
         # 性能统计
         self.performance_stats = {
             "save_count": 0,
@@ -118,7 +144,10 @@ class StateManager:
             "cache_hits": 0,
             "cache_misses": 0,
             "total_save_time": 0.0,
-            "total_load_time": 0.0
+            "total_load_time": 0.0,
+            "bytes_written": 0,
+            "flush_count": 0,
+            "files_written": 0
         }
         
         # 加载已保存的状态
@@ -137,13 +166,21 @@ class StateManager:
                     global_data = json.load(f)
                     self.global_state = GlobalState.from_dict(global_data)
             
-            # 加载活跃会话
-            sessions_file = os.path.join(self.state_dir, "active_sessions.json")
-            if os.path.exists(sessions_file):
-                with open(sessions_file, 'r', encoding='utf-8') as f:
+            # 加载活跃会话，每个会话一个文件
+            sessions_dir = Path(self.state_dir) / self.SESSIONS_DIR
+            legacy_sessions_file = os.path.join(self.state_dir, "active_sessions.json")
+            if sessions_dir.exists():
+                for session_file in sessions_dir.glob("*.json"):
+                    with open(session_file, 'r', encoding='utf-8') as f:
+                        session_state = SessionState.from_dict(json.load(f))
+                    self.sessions[session_state.session_id] = session_state
+            elif os.path.exists(legacy_sessions_file):
+                # 旧版本把所有会话保存在一个文件中，加载后在下次落盘时拆分
+                with open(legacy_sessions_file, 'r', encoding='utf-8') as f:
                     sessions_data = json.load(f)
                     for session_id, session_data in sessions_data.items():
                         self.sessions[session_id] = SessionState.from_dict(session_data)
+                self._dirty_sessions.update(self.sessions)
             
             # 加载历史记录
             self._load_history()
@@ -156,23 +193,43 @@ class StateManager:
     def _load_history(self):
         """加载历史记录"""
         try:
-            # 加载会话历史
-            session_history_file = os.path.join(self.state_dir, "session_history.json")
-            if os.path.exists(session_history_file):
-                with open(session_history_file, 'r', encoding='utf-8') as f:
-                    history_data = json.load(f)
-                    self.session_history.extend(history_data[-1000:])  # 只加载最近1000条
-            
-            # 加载任务历史
-            task_history_file = os.path.join(self.state_dir, "task_history.json")
-            if os.path.exists(task_history_file):
-                with open(task_history_file, 'r', encoding='utf-8') as f:
-                    history_data = json.load(f)
-                    self.task_history.extend(history_data[-5000:])  # 只加载最近5000条
-                    
+            self.session_history.extend(self._read_history(self.SESSION_HISTORY_FILE, "session_history.json"))
+            self.task_history.extend(self._read_history(self.TASK_HISTORY_FILE, "task_history.json"))
         except Exception as e:
             self.logger.warning(f"历史记录加载失败: {e}")
     
+    def _read_history(self, filename: str, legacy_filename: str) -> List[Dict[str, Any]]:
+        """读取历史记录文件，只保留内存队列容量内的最近记录
+        
+        Args:
+            filename: 追加写入的JSON Lines文件名
+            legacy_filename: 旧版本整体写入的JSON文件名
+            
+        Returns:
+            List[Dict[str, Any]]: 历史记录
+        """
+        path = os.path.join(self.state_dir, filename)
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                lines = f.readlines()
+            self._history_lines[filename] = len(lines)
+            entries = []
+            for line in lines:
+                try:
+                    entries.append(json.loads(line))
+                except ValueError:
+                    # 写入中断留下的不完整行
+                    continue
+            return entries
+        
+        legacy_path = os.path.join(self.state_dir, legacy_filename)
+        if os.path.exists(legacy_path):
+            with open(legacy_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            self._pending_history[filename].extend(entries)
+            return entries
+        return []
+    
     def _start_auto_save(self):
         """启动自动保存任务"""
         async def auto_save_loop():
@@ -183,7 +240,13 @@ class StateManager:
                 except Exception as e:
                     self.logger.error(f"自动保存失败: {e}")
         
-        asyncio.create_task(auto_save_loop())
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 在同步代码中创建时没有事件循环，不启动自动保存
+            self._auto_save_task = None
+            return
+        self._auto_save_task = loop.create_task(auto_save_loop())
     
     async def start_session(self, session_id: str, session_type: str, 
                            context: Optional[Dict[str, Any]] = None) -> bool:
@@ -214,6 +277,7 @@ class StateManager:
         # 更新全局状态
         self.global_state.total_sessions += 1
         self.global_state.last_update = time.time()
+        self._mark_dirty(session_id, global_state=True)
         
         # 通知监听器
         await self._notify_listeners("session_started", {
@@ -246,13 +310,16 @@ class StateManager:
         summary = self._generate_session_summary(session_state)
         
         # 移动到历史记录
-        self.session_history.append(session_state.to_dict())
+        self._append_history(self.SESSION_HISTORY_FILE, self.session_history, session_state.to_dict())
         
         # 从活跃会话中移除
         del self.sessions[session_id]
+        self._dirty_sessions.discard(session_id)
+        self._removed_sessions.add(session_id)
         
         # 更新全局状态
         self._update_global_metrics(session_state)
+        self._mark_dirty(global_state=True)
         
         # 通知监听器
         await self._notify_listeners("session_ended", {
@@ -357,6 +424,7 @@ class StateManager:
         
         session_state = self.sessions[session_id]
         session_state.context.update(context_update)
+        self._mark_dirty(session_id)
         
         # 通知监听器
         await self._notify_listeners("context_updated", {
@@ -379,11 +447,12 @@ class StateManager:
         session_state.task_history.append(task_id)
         
         # 添加到全局任务历史
-        self.task_history.append({
+        self._append_history(self.TASK_HISTORY_FILE, self.task_history, {
             "task_id": task_id,
             "session_id": session_id,
             "timestamp": time.time()
         })
+        self._mark_dirty(session_id)
     
     async def add_result_to_session(self, session_id: str, result: Dict[str, Any]):
         """向会话添加分析结果
@@ -404,6 +473,7 @@ class StateManager:
             if "processing_times" not in session_state.performance_metrics:
                 session_state.performance_metrics["processing_times"] = []
             session_state.performance_metrics["processing_times"].append(result["processing_time"])
+        self._mark_dirty(session_id)
     
     async def add_feedback_to_session(self, session_id: str, feedback: Dict[str, Any]):
         """向会话添加用户反馈
@@ -419,6 +489,7 @@ class StateManager:
         session_state = self.sessions[session_id]
         feedback["timestamp"] = time.time()
         session_state.user_feedback.append(feedback)
+        self._mark_dirty(session_id)
     
     def get_session_state(self, session_id: str) -> Optional[SessionState]:
         """获取会话状态
@@ -495,6 +566,7 @@ class StateManager:
         """
         self.global_state.strategy_weights.update(weights)
         self.global_state.last_update = time.time()
+        self._mark_dirty(global_state=True)
         
         # 通知监听器
         await self._notify_listeners("strategy_weights_updated", {
@@ -509,6 +581,7 @@ class StateManager:
         """
         self.global_state.learned_patterns.update(patterns)
         self.global_state.last_update = time.time()
+        self._mark_dirty(global_state=True)
         
         # 通知监听器
         await self._notify_listeners("patterns_updated", {
@@ -549,42 +622,142 @@ class StateManager:
                 self.logger.error(f"状态监听器执行失败: {e}")
     
     async def save_state(self):
-        """保存状态到文件"""
+        """立即把待落盘的变更保存到文件"""
+        self.flush()
+    
+    def flush(self) -> int:
+        """把待落盘的变更写入文件，关闭前调用以免丢失防抖期间的变更
+        
+        只重写有变更的会话文件和全局状态，历史记录只追加新增的条目。
+        
+        Returns:
+            int: 写入或删除的文件数
+        """
+        written = 0
+        bytes_written = 0
         try:
+            sessions_dir = Path(self.state_dir) / self.SESSIONS_DIR
+            sessions_dir.mkdir(parents=True, exist_ok=True)
+            
             # 保存全局状态
-            global_state_file = os.path.join(self.state_dir, "global_state.json")
-            with open(global_state_file, 'w', encoding='utf-8') as f:
-                json.dump(self.global_state.to_dict(), f, ensure_ascii=False, indent=2)
+            if self._global_dirty:
+                self._global_dirty = False
+                data = json.dumps(self.global_state.to_dict(), ensure_ascii=False).encode("utf-8")
+                atomic_write(Path(self.state_dir) / "global_state.json", data)
+                written += 1
+                bytes_written += len(data)
+            
+            # 保存有变更的会话，每个会话写入自己的文件
+            dirty, self._dirty_sessions = self._dirty_sessions, set()
+            for session_id in dirty:
+                session_state = self.sessions.get(session_id)
+                if session_state is None:
+                    continue
+                data = json.dumps(session_state.to_dict(), ensure_ascii=False).encode("utf-8")
+                atomic_write(self._session_file(session_id), data)
+                written += 1
+                bytes_written += len(data)
             
-            # 保存活跃会话
-            sessions_file = os.path.join(self.state_dir, "active_sessions.json")
-            sessions_data = {sid: state.to_dict() for sid, state in self.sessions.items()}
-            with open(sessions_file, 'w', encoding='utf-8') as f:
-                json.dump(sessions_data, f, ensure_ascii=False, indent=2)
+            removed, self._removed_sessions = self._removed_sessions, set()
+            for session_id in removed:
+                if session_id not in self.sessions:
+                    self._session_file(session_id).unlink(missing_ok=True)
+                    written += 1
             
-            # 保存历史记录
-            await self._save_history()
+            # 追加历史记录
+            written += self._save_history()
             
-            self.logger.debug("状态保存完成")
+            self.performance_stats["flush_count"] += 1
+            self.performance_stats["files_written"] += written
+            self.performance_stats["bytes_written"] += bytes_written
+            if written:
+                self.logger.debug(f"状态保存完成，写入 {written} 个文件")
             
         except Exception as e:
             self.logger.error(f"状态保存失败: {e}")
+        return written
     
-    async def _save_history(self):
-        """保存历史记录"""
-        try:
-            # 保存会话历史
-            session_history_file = os.path.join(self.state_dir, "session_history.json")
-            with open(session_history_file, 'w', encoding='utf-8') as f:
-                json.dump(list(self.session_history), f, ensure_ascii=False, indent=2)
+    def _save_history(self) -> int:
+        """追加新增的历史记录，文件行数超过内存队列容量两倍时按内存队列重写
+        
+        Returns:
+            int: 写入的文件数
+        """
+        written = 0
+        for filename, history in ((self.SESSION_HISTORY_FILE, self.session_history),
+                                  (self.TASK_HISTORY_FILE, self.task_history)):
+            pending = self._pending_history[filename]
+            if not pending:
+                continue
+            self._pending_history[filename] = []
+            path = Path(self.state_dir) / filename
+            try:
+                lines = self._history_lines.get(filename, 0) + len(pending)
+                if lines > 2 * history.maxlen:
+                    entries, lines = list(history), len(history)
+                    data = "".join(json.dumps(e, ensure_ascii=False) + "\n" for e in entries)
+                    atomic_write(path, data.encode("utf-8"))
+                else:
+                    with open(path, 'a', encoding='utf-8') as f:
+                        f.writelines(json.dumps(e, ensure_ascii=False) + "\n" for e in pending)
+                self._history_lines[filename] = lines
+                written += 1
+            except Exception as e:
+                self.logger.warning(f"历史记录保存失败: {e}")
+        return written
+    
+    def _append_history(self, filename: str, history: deque, entry: Dict[str, Any]):
+        """添加历史记录并登记为待追加写入
+        
+        Args:
+            filename: 历史记录文件名
+            history: 内存中的历史记录队列
+            entry: 历史记录
+        """
+        history.append(entry)
+        self._pending_history[filename].append(entry)
+        self._schedule_flush()
+    
+    def _session_file(self, session_id: str) -> Path:
+        """会话状态文件路径，会话ID经过转义后作为文件名
+        
+        Args:
+            session_id: 会话ID
             
-            # 保存任务历史
-            task_history_file = os.path.join(self.state_dir, "task_history.json")
-            with open(task_history_file, 'w', encoding='utf-8') as f:
-                json.dump(list(self.task_history), f, ensure_ascii=False, indent=2)
-                
-        except Exception as e:
-            self.logger.warning(f"历史记录保存失败: {e}")
+        Returns:
+            Path: 会话状态文件路径
+        """
+        return Path(self.state_dir) / self.SESSIONS_DIR / f"{quote(session_id, safe='')}.json"
+    
+    def _mark_dirty(self, session_id: Optional[str] = None, global_state: bool = False):
+        """登记待落盘的变更并安排防抖写入
+        
+        Args:
+            session_id: 有变更的会话ID
+            global_state: 全局状态是否有变更
+        """
+        if session_id is not None:
+            self._dirty_sessions.add(session_id)
+            self._removed_sessions.discard(session_id)
+        if global_state:
+            self._global_dirty = True
+        self._schedule_flush()
+    
+    def _schedule_flush(self):
+        """在 save_debounce 秒后由后台任务落盘，期间的变更合并为一次写入"""
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # 没有事件循环时由调用方通过 flush() 或 save_state() 落盘
+            return
+        self._flush_task = loop.create_task(self._debounced_flush())
+    
+    async def _debounced_flush(self):
+        """防抖写入任务"""
+        await asyncio.sleep(self.save_debounce)
+        self.flush()
     
     def get_statistics(self) -> Dict[str, Any]:
         """获取统计信息
@@ -631,12 +804,14 @@ class StateManager:
     def cleanup(self):
         """清理资源"""
         try:
-            # 停止自动保存
+            # 停止自动保存和防抖写入
             if hasattr(self, '_auto_save_task') and self._auto_save_task:
                 self._auto_save_task.cancel()
+            if self._flush_task is not None:
+                self._flush_task.cancel()
             
             # 保存当前状态
-            self.save_state()
+            self.flush()
             
             # 优化存储
             self.optimize_storage()
@@ -652,10 +827,12 @@ class StateManager:
                         format: str = "pickle") -> bool:
         """保存LangGraph状态
         
+        状态按字段拆分后写入会话的增量日志，只有相对上一个检查点变化的字段会被写入磁盘。
+        
         Args:
             session_id: 会话ID
             state: 要保存的图状态
-            format: 保存格式 ('pickle' 或 'json')
+            format: 保存格式，字段值使用pickle序列化，仅支持 'pickle'
             
         Returns:
             bool: 保存是否成功
@@ -663,43 +840,22 @@ class StateManager:
         start_time = time.time()
         
         try:
-            # 创建会话目录
-            session_dir = Path(self.state_dir) / "graph_states" / session_id
-            session_dir.mkdir(parents=True, exist_ok=True)
-            
-            # 生成文件名
-            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            filename = f"graph_state_{timestamp}.{format}"
-            filepath = session_dir / filename
-            
-            # 保存状态
-            if format == "pickle":
-                with open(filepath, 'wb') as f:
-                    pickle.dump(state, f)
-            elif format == "json":
-                with open(filepath, 'w', encoding='utf-8') as f:
-                    json.dump(self._graph_state_to_dict(state), f, 
-                             ensure_ascii=False, indent=2)
-            else:
+            if format != "pickle":
                 raise ValueError(f"不支持的格式: {format}")
             
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+            written = self._get_journal(session_id).checkpoint(self._flatten_graph_state(state), timestamp)
+            
             # 更新缓存
             self.graph_state_cache[session_id] = state
             self.cache_timestamps[session_id] = time.time()
             
-            # 更新历史
-            if session_id not in self.graph_state_history:
-                self.graph_state_history[session_id] = []
-            
-            self.graph_state_history[session_id].append(state)
-            if len(self.graph_state_history[session_id]) > self.max_history_size:
-                self.graph_state_history[session_id].pop(0)
-            
             # 更新统计
             self.performance_stats["save_count"] += 1
+            self.performance_stats["bytes_written"] += written
             self.performance_stats["total_save_time"] += time.time() - start_time
             
-            self.logger.debug(f"图状态保存成功: {session_id}")
+            self.logger.debug(f"图状态保存成功: {session_id}，写入 {written} 字节")
             return True
             
         except Exception as e:
@@ -712,7 +868,8 @@ class StateManager:
         
         Args:
             session_id: 会话ID
-            timestamp: 时间戳，如果为None则加载最新状态
+            timestamp: 时间戳（格式 %Y%m%d_%H%M%S，可只给前缀），加载不晚于该时间的状态；
+                为None则加载最新状态
             
         Returns:
             GraphState: 加载的状态，失败时返回None
@@ -721,52 +878,26 @@ class StateManager:
         
         try:
             # 检查缓存
-            if (session_id in self.graph_state_cache and 
+            if (timestamp is None and session_id in self.graph_state_cache and 
                 self._is_cache_valid(session_id)):
                 self.performance_stats["cache_hits"] += 1
                 return self.graph_state_cache[session_id]
             
             self.performance_stats["cache_misses"] += 1
             
-            # 从文件加载
-            session_dir = Path(self.state_dir) / "graph_states" / session_id
-            if not session_dir.exists():
+            # 通过索引判断是否有检查点，然后重放基准快照和增量记录
+            journal = self._get_journal(session_id)
+            if not journal.exists():
                 return None
-            
-            # 查找状态文件
-            state_files = list(session_dir.glob("graph_state_*.pickle")) + \
-                         list(session_dir.glob("graph_state_*.json"))
-            
-            if not state_files:
-                return None
-            
-            # 选择文件
-            if timestamp:
-                target_file = None
-                for file in state_files:
-                    if timestamp in file.name:
-                        target_file = file
-                        break
-                if not target_file:
-                    return None
-            else:
-                # 选择最新文件
-                target_file = max(state_files, key=lambda f: f.stat().st_mtime)
-            
-            # 加载状态
-            if target_file.suffix == ".pickle":
-                with open(target_file, 'rb') as f:
-                    state = pickle.load(f)
-            elif target_file.suffix == ".json":
-                with open(target_file, 'r', encoding='utf-8') as f:
-                    state_dict = json.load(f)
-                    state = self._dict_to_graph_state(state_dict)
-            else:
+            replayed = journal.replay(until=timestamp)
+            if replayed is None:
                 return None
+            state = self._restore_graph_state(replayed[1])
             
             # 更新缓存
-            self.graph_state_cache[session_id] = state
-            self.cache_timestamps[session_id] = time.time()
+            if timestamp is None:
+                self.graph_state_cache[session_id] = state
+                self.cache_timestamps[session_id] = time.time()
             
             # 更新统计
             self.performance_stats["load_count"] += 1
@@ -786,9 +917,14 @@ class StateManager:
             session_id: 会话ID
             
         Returns:
-            List[GraphState]: 状态历史列表
+            List[GraphState]: 状态历史列表，最多 max_history_size 个，按时间顺序排列
         """
-        return self.graph_state_history.get(session_id, [])
+        try:
+            history = self._get_journal(session_id).history(self.max_history_size)
+        except Exception as e:
+            self.logger.error(f"读取图状态历史失败: {e}")
+            return []
+        return [self._restore_graph_state(values) for _, _, values in history]
     
     def rollback_graph_state(self, session_id: str, steps: int = 1) -> Optional[GraphState]:
         """回滚图状态
@@ -800,11 +936,16 @@ class StateManager:
         Returns:
             GraphState: 回滚后的状态
         """
-        history = self.graph_state_history.get(session_id, [])
+        try:
+            # 与历史列表一致，最多回滚到 max_history_size 个检查点中最早的一个
+            history = self._get_journal(session_id).history(min(steps + 1, self.max_history_size))
+        except Exception as e:
+            self.logger.error(f"读取图状态历史失败: {e}")
+            return None
         if len(history) <= steps:
             return None
         
-        target_state = history[-(steps + 1)]
+        target_state = self._restore_graph_state(history[0][2])
         
         # 更新缓存
         self.graph_state_cache[session_id] = target_state
@@ -813,6 +954,83 @@ class StateManager:
         self.logger.info(f"图状态回滚成功: {session_id}, 步数: {steps}")
         return target_state
     
+    def _get_journal(self, session_id: str) -> StateJournal:
+        """获取会话的增量日志
+        
+        Args:
+            session_id: 会话ID
+            
+        Returns:
+            StateJournal: 增量日志
+        """
+        journal = self.graph_journals.get(session_id)
+        if journal is None:
+            journal = StateJournal(Path(self.state_dir) / "graph_states" / session_id,
+                                   compact_every=self.journal_compact_every,
+                                   keep_history=self.max_history_size)
+            self.graph_journals[session_id] = journal
+        return journal
+    
+    @staticmethod
+    def _flatten_graph_state(state: GraphState) -> Dict[str, bytes]:
+        """把图状态拆分为字段路径 -> 序列化值，嵌套的数据类再展开一层
+        
+        列表按下标拆分为 "路径[i]"，另以 "路径[]" 记录长度，追加任务或分析结果时只有新元素和长度变化。
+        
+        Args:
+            state: 图状态
+            
+        Returns:
+            Dict[str, bytes]: 字段路径 -> pickle序列化后的值
+        """
+        values = {}
+        
+        def put(path: str, value: Any):
+            if isinstance(value, list):
+                values[f"{path}[]"] = pickle.dumps(len(value), protocol=pickle.HIGHEST_PROTOCOL)
+                for i, item in enumerate(value):
+                    values[f"{path}[{i}]"] = pickle.dumps(item, protocol=pickle.HIGHEST_PROTOCOL)
+            else:
+                values[path] = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        
+        for f in fields(state):
+            value = getattr(state, f.name)
+            if is_dataclass(value) and not isinstance(value, type):
+                for sub in fields(value):
+                    put(f"{f.name}.{sub.name}", getattr(value, sub.name))
+            else:
+                put(f.name, value)
+        return values
+    
+    @staticmethod
+    def _restore_graph_state(values: Dict[str, bytes]) -> GraphState:
+        """由字段路径 -> 序列化值恢复图状态
+        
+        Args:
+            values: 字段路径 -> pickle序列化后的值
+            
+        Returns:
+            GraphState: 图状态
+        """
+        state = GraphState()
+        restored = {}
+        for path, data in values.items():
+            if _LIST_ITEM.match(path):
+                continue
+            if path.endswith("[]"):
+                path = path[:-2]
+                restored[path] = [pickle.loads(values[f"{path}[{i}]"]) for i in range(pickle.loads(data))]
+            else:
+                restored[path] = pickle.loads(data)
+        # 先恢复顶层字段，再恢复嵌套数据类的字段
+        for path in sorted(restored, key=lambda key: key.count(".")):
+            target = state
+            *parents, name = path.split(".")
+            for parent in parents:
+                target = getattr(target, parent)
+            setattr(target, name, restored[path])
+        return state
+    
     def clear_graph_cache(self, session_id: Optional[str] = None):
         """清理图状态缓存
         
@@ -897,7 +1115,7 @@ class StateManager:
         return time.time() - self.cache_timestamps[session_id] < self.cache_ttl
     
     def _cleanup_old_graph_states(self, days: int = 7):
-        """清理旧的图状态文件
+        """清理长时间没有新检查点的会话的图状态文件
         
         Args:
             days: 保留天数
@@ -912,13 +1130,15 @@ class StateManager:
             if not session_dir.is_dir():
                 continue
             
-            for state_file in session_dir.glob("graph_state_*"):
-                file_time = datetime.fromtimestamp(state_file.stat().st_mtime)
-                if file_time < cutoff_time:
-                    try:
-                        state_file.unlink()
-                    except Exception as e:
-                        self.logger.warning(f"删除旧图状态文件失败: {e}")
+            index_file = session_dir / StateJournal.INDEX_FILE
+            last_update = index_file if index_file.exists() else session_dir
+            if datetime.fromtimestamp(last_update.stat().st_mtime) >= cutoff_time:
+                continue
+            try:
+                shutil.rmtree(session_dir)
+                self.graph_journals.pop(session_dir.name, None)
+            except Exception as e:
+                self.logger.warning(f"删除旧图状态文件失败: {e}")
     
     def _graph_state_to_dict(self, state: GraphState) -> Dict[str, Any]:
         """将图状态转换为字典
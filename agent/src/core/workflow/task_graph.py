@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+"""
+任务依赖图执行器
+
+面试分析的各模态之间只有少量依赖：语音和视觉特征提取互相独立，内容分析只依赖转写文本，
+综合评分依赖全部结果。按依赖图调度后每个节点在其依赖完成时立即开始，
+端到端耗时接近最慢的一条依赖链，而不是所有步骤之和。
+
+- 协程函数直接在事件循环中执行
+- 普通函数（特征提取等CPU/IO阻塞操作）在线程池中执行，可传入进程池执行器
+- 节点函数以关键字参数接收其依赖节点的结果
+- 任一节点失败时取消其余节点并抛出该异常
+"""
+
+import time
+import asyncio
+import inspect
+import logging
+from concurrent.futures import Executor, ThreadPoolExecutor
+from functools import partial
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TaskGraph:
+    """任务依赖图"""
+
+    def __init__(self, name: str = "task_graph", executor: Optional[Executor] = None):
+        """初始化任务依赖图
+
+        Args:
+            name: 图名称，用于日志
+            executor: 执行普通函数的执行器，为None时使用事件循环的默认线程池
+        """
+        self.name = name
+        self.executor = executor
+        self._nodes: Dict[str, Tuple[Callable[..., Any], Tuple[str, ...]]] = {}
+        self.timings: Dict[str, Tuple[float, float]] = {}
+
+    def add(self, name: str, func: Callable[..., Any], deps: Iterable[str] = ()) -> "TaskGraph":
+        """添加节点
+
+        Args:
+            name: 节点名称，同时是下游节点接收其结果的参数名
+            func: 节点函数，协程函数或普通函数
+            deps: 依赖的节点名称，必须已经添加
+
+        Returns:
+            TaskGraph: 自身，便于链式调用
+
+        Raises:
+            ValueError: 节点重名或依赖不存在
+        """
+        if name in self._nodes:
+            raise ValueError(f"节点已存在: {name}")
+        deps = tuple(deps)
+        missing = [dep for dep in deps if dep not in self._nodes]
+        if missing:
+            raise ValueError(f"节点 {name} 的依赖不存在: {missing}")
+        # 依赖必须先添加，图天然无环，添加顺序即拓扑序
+        self._nodes[name] = (func, deps)
+        return self
+
+    async def run(self) -> Dict[str, Any]:
+        """执行依赖图
+
+        Returns:
+            Dict[str, Any]: 节点名称 -> 结果
+        """
+        loop = asyncio.get_running_loop()
+        start = time.monotonic()
+        self.timings = {}
+        tasks: Dict[str, asyncio.Task] = {}
+
+        async def run_node(name: str, func: Callable[..., Any], deps: Tuple[str, ...]) -> Any:
+            kwargs = {dep: await tasks[dep] for dep in deps}
+            node_start = time.monotonic()
+            try:
+                if inspect.iscoroutinefunction(func):
+                    return await func(**kwargs)
+                result = await loop.run_in_executor(self.executor, partial(func, **kwargs))
+                if inspect.isawaitable(result):
+                    result = await result
+                return result
+            finally:
+                self.timings[name] = (node_start - start, time.monotonic() - start)
+
+        for name, (func, deps) in self._nodes.items():
+            tasks[name] = asyncio.ensure_future(run_node(name, func, deps))
+
+        try:
+            await asyncio.gather(*tasks.values())
+        except BaseException:
+            for task in tasks.values():
+                task.cancel()
+            await asyncio.gather(*tasks.values(), return_exceptions=True)
+            raise
+
+        logger.debug(f"{self.name} 执行完成，用时 {time.monotonic() - start:.3f}s，"
+                     f"各节点: { {name: f'{s:.3f}-{e:.3f}' for name, (s, e) in self.timings.items()} }")
+        return {name: task.result() for name, task in tasks.items()}
+
+    def run_sync(self) -> Dict[str, Any]:
+        """在同步代码中执行依赖图；当前线程已有运行中的事件循环时在新线程中执行
+
+        Returns:
+            Dict[str, Any]: 节点名称 -> 结果
+        """
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self.run())
+        with ThreadPoolExecutor(max_workers=1) as runner:
+            return runner.submit(asyncio.run, self.run()).result()
@@ -8,10 +8,13 @@
 import logging
 import asyncio
 import uuid
-from typing import Dict, Any, Optional, List, Union
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Awaitable, Callable, Dict, Any, Optional, List, Union
 from unittest.mock import MagicMock
 
 from .state import GraphState, TaskType, TaskStatus
+from .task_graph import TaskGraph
 from ...nodes.task_parser import TaskParser
 from ...nodes.strategy_decider import StrategyDecider
 from ...nodes.task_planner import TaskPlanner
@@ -304,60 +307,18 @@ class InterviewAnalysisWorkflow:
             )
         
         try:
-            # 1. 语音分析
-            if self.notification_service:
-                await self.notification_service.notify_analysis_progress(
-                    client_id, "SPEECH_ANALYSIS", "正在分析语音..."
-                )
-            
-            speech_results = await self._analyze_speech(interview_data.get("audio_file"))
-            
-            if self.notification_service:
-                await self.notification_service.send_partial_feedback(
-                    client_id, "speech", speech_results
-                )
-            
-            # 2. 视觉分析
-            if self.notification_service:
-                await self.notification_service.notify_analysis_progress(
-                    client_id, "VISUAL_ANALYSIS", "正在分析视频..."
-                )
-            
-            visual_results = await self._analyze_visual(interview_data.get("video_file"))
-            
-            if self.notification_service:
-                await self.notification_service.send_partial_feedback(
-                    client_id, "visual", visual_results
-                )
-            
-            # 3. 内容分析
-            if self.notification_service:
-                await self.notification_service.notify_analysis_progress(
-                    client_id, "CONTENT_ANALYSIS", "正在分析内容..."
-                )
-            
-            content_results = await self._analyze_content(
-                interview_data.get("transcript"),
-                interview_data.get("job_position")
-            )
-            
-            if self.notification_service:
-                await self.notification_service.send_partial_feedback(
-                    client_id, "content", content_results
-                )
-            
-            # 4. 生成最终报告
-            if self.notification_service:
-                await self.notification_service.notify_analysis_progress(
-                    client_id, "GENERATING_REPORT", "正在生成报告..."
-                )
-            
-            report = await self._generate_final_report(
-                speech_results,
-                visual_results,
-                content_results,
-                interview_data
-            )
+            # 语音和视觉分析并发执行；内容分析在转写文本可用时开始，
+            # 面试数据已包含转写文本时无需等待语音分析
+            graph = TaskGraph("interview_analysis")
+            graph.add("speech", partial(self._run_speech_step, client_id, interview_data))
+            graph.add("visual", partial(self._run_visual_step, client_id, interview_data))
+            graph.add("content", partial(self._run_content_step, client_id, interview_data),
+                      deps=[] if interview_data.get("transcript") else ["speech"])
+            # 生成最终报告（依赖全部分析结果）
+            graph.add("report", partial(self._run_report_step, client_id, interview_data),
+                      deps=["speech", "visual", "content"])
+            
+            report = (await graph.run())["report"]
             
             # 5. 发送完成通知
             if self.notification_service:
@@ -377,11 +338,107 @@ class InterviewAnalysisWorkflow:
             
             raise
     
-    async def _analyze_speech(self, audio_file: Optional[str]) -> Dict[str, Any]:
+    async def _run_speech_step(self, client_id: str, interview_data: Dict[str, Any]) -> Dict[str, Any]:
+        """语音分析步骤：通知进度、流式分析并推送部分反馈"""
+        if self.notification_service:
+            await self.notification_service.notify_analysis_progress(
+                client_id, "SPEECH_ANALYSIS", "正在分析语音..."
+            )
+        
+        async with self._feedback_stream(client_id, "speech") as on_token:
+            speech_results = await self._analyze_speech(interview_data.get("audio_file"), on_token)
+        
+        if self.notification_service:
+            await self.notification_service.send_partial_feedback(
+                client_id, "speech", speech_results
+            )
+        return speech_results
+    
+    async def _run_visual_step(self, client_id: str, interview_data: Dict[str, Any]) -> Dict[str, Any]:
+        """视觉分析步骤：通知进度、分析并推送部分反馈"""
+        if self.notification_service:
+            await self.notification_service.notify_analysis_progress(
+                client_id, "VISUAL_ANALYSIS", "正在分析视频..."
+            )
+        
+        visual_results = await self._analyze_visual(interview_data.get("video_file"))
+        
+        if self.notification_service:
+            await self.notification_service.send_partial_feedback(
+                client_id, "visual", visual_results
+            )
+        return visual_results
+    
+    async def _run_content_step(self, client_id: str, interview_data: Dict[str, Any],
+                                speech: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """内容分析步骤：通知进度、流式分析并推送部分反馈
+        
+        面试数据未提供转写文本时使用语音分析结果中的转写文本
+        """
+        transcript = interview_data.get("transcript") or (speech or {}).get("transcript")
+        if self.notification_service:
+            await self.notification_service.notify_analysis_progress(
+                client_id, "CONTENT_ANALYSIS", "正在分析内容..."
+            )
+        
+        async with self._feedback_stream(client_id, "content") as on_token:
+            content_results = await self._analyze_content(
+                transcript,
+                interview_data.get("job_position"),
+                on_token
+            )
+        
+        if self.notification_service:
+            await self.notification_service.send_partial_feedback(
+                client_id, "content", content_results
+            )
+        return content_results
+    
+    async def _run_report_step(self, client_id: str, interview_data: Dict[str, Any], speech: Dict[str, Any],
+                               visual: Dict[str, Any], content: Dict[str, Any]) -> Dict[str, Any]:
+        """报告生成步骤"""
+        if self.notification_service:
+            await self.notification_service.notify_analysis_progress(
+                client_id, "GENERATING_REPORT", "正在生成报告..."
+            )
+        
+        return await self._generate_final_report(
+            speech,
+            visual,
+            content,
+            interview_data
+        )
+    
+    @asynccontextmanager
+    async def _feedback_stream(self, client_id: str, feedback_type: str):
+        """打开流式反馈，LLM评估的文本片段实时推送给客户端
+        
+        通知服务不支持流式反馈时产出None，分析器走非流式调用
+        
+        Args:
+            client_id: 客户端ID
+            feedback_type: 反馈类型
+            
+        Yields:
+            Optional[Callable]: 文本片段回调
+        """
+        factory = getattr(self.notification_service, "partial_feedback_stream", None)
+        if factory is None:
+            yield None
+            return
+        stream = factory(client_id, feedback_type)
+        try:
+            yield stream
+        finally:
+            await stream.close()
+    
+    async def _analyze_speech(self, audio_file: Optional[str],
+                              on_token: Optional[Callable[[str], Awaitable[None]]] = None) -> Dict[str, Any]:
         """分析语音
         
         Args:
             audio_file: 音频文件路径
+            on_token: 可选的LLM文本片段回调，提供时使用分析器的流式LLM分析
                 
         Returns:
             Dict[str, Any]: 语音分析结果
@@ -394,6 +451,8 @@ class InterviewAnalysisWorkflow:
         
         try:
             if self.speech_analyzer:
+                if on_token is not None and hasattr(self.speech_analyzer, "analyze_async"):
+                    return await self.speech_analyzer.analyze_async(audio_file, on_token=on_token)
                 return await self.speech_analyzer.analyze(audio_file)
             else:
                 # 模拟分析结果
@@ -441,12 +500,14 @@ class InterviewAnalysisWorkflow:
                 "eye_contact": {"score": 0, "feedback": "分析失败"}
             }
     
-    async def _analyze_content(self, transcript: Optional[str], job_position: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    async def _analyze_content(self, transcript: Optional[str], job_position: Optional[Dict[str, Any]],
+                               on_token: Optional[Callable[[str], Awaitable[None]]] = None) -> Dict[str, Any]:
         """分析内容
         
         Args:
             transcript: 文本内容
             job_position: 职位信息
+            on_token: 可选的LLM文本片段回调，提供时使用分析器的流式LLM分析
             
         Returns:
             Dict[str, Any]: 分析结果
@@ -462,6 +523,10 @@ class InterviewAnalysisWorkflow:
                 
             # 使用内容分析器
             if self.content_analyzer:
+                if on_token is not None and hasattr(self.content_analyzer, "analyze_async"):
+                    return await self.content_analyzer.analyze_async(
+                        transcript, params={"job_position": job_position}, on_token=on_token
+                    )
                 # 先提取特征
                 features = self.content_analyzer.extract_features(transcript)
                 # 再进行分析
@@ -5,17 +5,68 @@
 负责执行具体的分析任务
 """
 
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+import os
+import atexit
 import logging
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
 import time
 
 from ...core.workflow.state import GraphState, TaskStatus, AnalysisResult, TaskType
+from ...core.workflow.deadline import (
+    CancelToken,
+    NodeCancelled,
+    current_cancel_token,
+    record_timeout,
+    remaining_time,
+    run_with_token,
+)
 from ...analyzers.base.analyzer_adapter import AnalyzerFactory
 
 logger = logging.getLogger(__name__)
 
+# 进程级分析线程池大小上限，与标准库默认值一致
+ANALYZER_POOL_SIZE = min(32, (os.cpu_count() or 1) + 4)
+
+_analyzer_pool: Optional[ThreadPoolExecutor] = None
+_analyzer_pool_lock = threading.Lock()
+_analyzer_pool_atexit = False
+
+
+def get_analyzer_pool() -> ThreadPoolExecutor:
+    """获取进程级共享的分析线程池，首次使用时创建
+
+    每次并行执行都新建线程池会反复创建和销毁线程，共享线程池让工作线程在各次执行间复用，
+    线程数不超过 ANALYZER_POOL_SIZE。
+
+    Returns:
+        ThreadPoolExecutor: 共享线程池
+    """
+    global _analyzer_pool, _analyzer_pool_atexit
+    with _analyzer_pool_lock:
+        if _analyzer_pool is None:
+            _analyzer_pool = ThreadPoolExecutor(max_workers=ANALYZER_POOL_SIZE,
+                                                thread_name_prefix="analyzer")
+            if not _analyzer_pool_atexit:
+                atexit.register(shutdown_analyzer_pool)
+                _analyzer_pool_atexit = True
+        return _analyzer_pool
+
+
+def shutdown_analyzer_pool(wait: bool = True):
+    """关闭共享分析线程池，之后再次使用时重新创建
+
+    Args:
+        wait: 是否等待执行中的任务完成
+    """
+    global _analyzer_pool
+    with _analyzer_pool_lock:
+        pool, _analyzer_pool = _analyzer_pool, None
+    if pool is not None:
+        pool.shutdown(wait=wait, cancel_futures=True)
+
 
 class AnalyzerExecutor:
     """分析执行节点
@@ -59,25 +110,25 @@ class AnalyzerExecutor:
             }
     
     def execute(self, state: GraphState) -> GraphState:
-        logger.info(f"分析执行节点开始，输入状态: {state}")
+        """同步执行待执行的分析任务
+        
+        在事件循环中应使用 execute_async，避免在事件循环线程上阻塞等待线程池中的任务。
+        
+        Args:
+            state: 当前状态
+            
+        Returns:
+            GraphState: 更新后的状态
+        """
+        logger.info(f"分析执行节点开始，{self._summarize_state(state)}")
         start_time = time.time()
-        task_times = []
-        success_count = 0
-        fail_count = 0
         try:
             logger.info("开始执行分析任务")
-            
-            # 获取待执行的任务
-            pending_tasks = [
-                task for task in state.task_state.tasks 
-                if task.status == TaskStatus.PENDING
-            ]
-            
+            pending_tasks = self._pending_tasks(state)
             if not pending_tasks:
                 logger.info("没有待执行的任务")
                 return state
             
-            # 执行任务
             if state.task_state.parallel_execution:
                 # 并行执行
                 results = self._execute_parallel(pending_tasks, state)
@@ -85,89 +136,315 @@ class AnalyzerExecutor:
                 # 串行执行
                 results = self._execute_sequential(pending_tasks, state)
             
-            # 更新分析结果
-            state.analysis_state.results.extend(results)
+            return self._apply_results(state, pending_tasks, results, start_time)
+        except Exception as e:
+            return self._on_error(state, e)
+    
+    async def execute_async(self, state: GraphState) -> GraphState:
+        """在事件循环中执行待执行的分析任务
+        
+        并行执行时在当前事件循环中等待共享线程池中的任务，串行执行时整体放到线程池中运行，
+        事件循环线程在等待期间不被阻塞。
+        
+        Args:
+            state: 当前状态
             
-            # 更新任务状态
-            for task, result in zip(pending_tasks, results):
-                task.status = TaskStatus.COMPLETED if result else TaskStatus.FAILED
-                elapsed = getattr(result, 'elapsed', None)
-                if elapsed is not None:
-                    task_times.append(elapsed)
-                if result:
-                    success_count += 1
-                else:
-                    fail_count += 1
+        Returns:
+            GraphState: 更新后的状态
+        """
+        logger.info(f"分析执行节点开始，{self._summarize_state(state)}")
+        start_time = time.time()
+        try:
+            logger.info("开始执行分析任务")
+            pending_tasks = self._pending_tasks(state)
+            if not pending_tasks:
+                logger.info("没有待执行的任务")
+                return state
             
-            logger.info(f"完成 {len(results)} 个分析任务")
+            if state.task_state.parallel_execution:
+                results = await self._gather_tasks(pending_tasks, state, current_cancel_token())
+            else:
+                loop = asyncio.get_running_loop()
+                results = await loop.run_in_executor(get_analyzer_pool(), run_with_token, current_cancel_token(),
+                                                     self._execute_sequential, pending_tasks, state)
             
-            # 假设有分析执行主流程
-            result = self._run_analysis(state)
-            logger.info(f"分析执行完成，结果: {result}")
-            # 更新状态
-            state.analysis_state.result = result
-            total_time = time.time() - start_time
-            avg_time = (sum(task_times) / len(task_times)) if task_times else 0
-            logger.info(f"分析执行统计: 总耗时: {total_time:.2f}s, 平均单任务耗时: {avg_time:.2f}s, 成功: {success_count}, 失败: {fail_count}")
-            return state
+            return self._apply_results(state, pending_tasks, results, start_time)
         except Exception as e:
-            logger.error(f"分析执行异常: {e}")
-            state.error = str(e)
-            # 标记任务为失败
-            for task in state.task_state.tasks:
-                if task.status == TaskStatus.PENDING:
-                    task.status = TaskStatus.FAILED
-            return state
+            return self._on_error(state, e)
     
-    def _execute_parallel(self, tasks: List, state: GraphState) -> List[AnalysisResult]:
+    @staticmethod
+    def _pending_tasks(state: GraphState) -> List:
+        """获取待执行的任务
+        
+        Args:
+            state: 当前状态
+            
+        Returns:
+            List: 状态为 PENDING 的任务
+        """
+        return [task for task in state.task_state.tasks if task.status == TaskStatus.PENDING]
+    
+    def _apply_results(self, state: GraphState, tasks: List, results: List[Optional[AnalysisResult]],
+                       start_time: float) -> GraphState:
+        """把分析结果写回状态并更新任务状态
+        
+        Args:
+            state: 当前状态
+            tasks: 已执行的任务
+            results: 与任务一一对应的分析结果
+            start_time: 开始执行的时间
+            
+        Returns:
+            GraphState: 更新后的状态
+        """
+        task_times = []
+        success_count = 0
+        fail_count = 0
+        
+        # 更新分析结果，超时或被取消的任务没有结果，保留其余任务的部分结果
+        state.analysis_state.results.extend(result for result in results if result)
+        
+        # 更新任务状态
+        for task, result in zip(tasks, results):
+            if task.status == TaskStatus.CANCELLED:
+                continue
+            task.status = TaskStatus.COMPLETED if result else TaskStatus.FAILED
+            elapsed = getattr(result, 'elapsed', None)
+            if elapsed is not None:
+                task_times.append(elapsed)
+            if result:
+                success_count += 1
+            else:
+                fail_count += 1
+        
+        logger.info(f"完成 {success_count} 个分析任务")
+        
+        total_time = time.time() - start_time
+        avg_time = (sum(task_times) / len(task_times)) if task_times else 0
+        logger.info(f"分析执行统计: 总耗时: {total_time:.2f}s, 平均单任务耗时: {avg_time:.2f}s, 成功: {success_count}, 失败: {fail_count}")
+        return state
+    
+    @staticmethod
+    def _on_error(state: GraphState, error: Exception) -> GraphState:
+        """分析执行异常：记录错误并把未执行的任务标记为失败
+        
+        Args:
+            state: 当前状态
+            error: 异常
+            
+        Returns:
+            GraphState: 更新后的状态
+        """
+        logger.error(f"分析执行异常: {error}")
+        state.error = str(error)
+        for task in state.task_state.tasks:
+            if task.status == TaskStatus.PENDING:
+                task.status = TaskStatus.FAILED
+        return state
+    
+    def _execute_parallel(self, tasks: List, state: GraphState) -> List[Optional[AnalysisResult]]:
         """并行执行任务
         
+        任务在共享线程池中执行，每个任务按其分析器类型的超时时间等待，
+        超时的任务被取消且没有结果；请求截止时间先到时未完成的任务同样被取消，
+        两种情况下任务都记为缺失的分析器，其余任务的结果照常返回。
+        
         Args:
             tasks: 任务列表
             state: 当前状态
             
         Returns:
-            List[AnalysisResult]: 分析结果列表
+            List[Optional[AnalysisResult]]: 与任务一一对应的分析结果，失败或被取消的任务为None
         """
-        results = []
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            return asyncio.run(self._gather_tasks(tasks, state, current_cancel_token()))
+        # 当前线程已有运行中的事件循环，不能嵌套运行，只能阻塞等待线程池中的任务，异步调用方应使用 execute_async
+        logger.warning("在运行中的事件循环里同步执行分析任务会阻塞事件循环，请使用 execute_async")
+        return self._wait_tasks(tasks, state)
+    
+    async def _gather_tasks(self, tasks: List, state: GraphState,
+                            parent: Optional[CancelToken] = None) -> List[Optional[AnalysisResult]]:
+        """在事件循环中并发执行任务，单次执行的并发数不超过 max_workers
         
-        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
-            # 提交所有任务
-            futures = [
-                executor.submit(self._execute_single_task, task, state)
-                for task in tasks
-            ]
+        Args:
+            tasks: 任务列表
+            state: 当前状态
+            parent: 节点的取消令牌，asyncio.run 在新的上下文中运行，需要显式传入
             
-            # 收集结果
-            for future in futures:
+        Returns:
+            List[Optional[AnalysisResult]]: 与任务一一对应的分析结果
+        """
+        loop = asyncio.get_running_loop()
+        pool = get_analyzer_pool()
+        slots = asyncio.Semaphore(self.max_workers)
+        
+        async def run(task) -> Optional[AnalysisResult]:
+            async with slots:
+                timeout, by_deadline = self._wait_budget(task, state)
+                token = CancelToken(parent)
+                if timeout <= 0:
+                    return self._on_deadline(task, state, token)
+                future = loop.run_in_executor(pool, run_with_token, token,
+                                              self._execute_single_task, task, state)
                 try:
-                    result = future.result(timeout=self.timeout)
-                    if result:
-                        results.append(result)
+                    return await asyncio.wait_for(future, timeout)
+                except asyncio.TimeoutError:
+                    if by_deadline:
+                        return self._on_deadline(task, state, token)
+                    return self._on_task_timeout(task, state, token)
                 except Exception as e:
                     logger.error(f"任务执行失败: {e}")
+                    return None
+        
+        return await asyncio.gather(*(run(task) for task in tasks))
+    
+    def _wait_tasks(self, tasks: List, state: GraphState) -> List[Optional[AnalysisResult]]:
+        """提交任务到共享线程池并逐个等待结果
         
+        Args:
+            tasks: 任务列表
+            state: 当前状态
+            
+        Returns:
+            List[Optional[AnalysisResult]]: 与任务一一对应的分析结果
+        """
+        pool = get_analyzer_pool()
+        parent = current_cancel_token()
+        tokens = [CancelToken(parent) for _ in tasks]
+        futures = [pool.submit(run_with_token, token, self._execute_single_task, task, state)
+                   for task, token in zip(tasks, tokens)]
+        deadline = time.monotonic() + max((self._task_timeout(task) for task in tasks), default=0)
+        results = []
+        for task, token, future in zip(tasks, tokens, futures):
+            timeout, by_deadline = self._wait_budget(task, state)
+            try:
+                remaining = max(0.0, min(timeout, deadline - time.monotonic()))
+                results.append(future.result(timeout=remaining))
+            except FutureTimeoutError:
+                future.cancel()
+                if by_deadline:
+                    results.append(self._on_deadline(task, state, token))
+                    continue
+                results.append(self._on_task_timeout(task, state, token))
+            except Exception as e:
+                logger.error(f"任务执行失败: {e}")
+                results.append(None)
         return results
     
-    def _execute_sequential(self, tasks: List, state: GraphState) -> List[AnalysisResult]:
-        """串行执行任务
+    def _task_timeout(self, task) -> float:
+        """获取任务的超时时间，可按分析器类型配置 {类型}_timeout
+        
+        Args:
+            task: 任务对象
+            
+        Returns:
+            float: 超时时间（秒）
+        """
+        analyzer_type = self._analyzer_type(task)
+        return self.config.get(f"{analyzer_type}_timeout", self.timeout) if analyzer_type else self.timeout
+    
+    def _wait_budget(self, task, state: GraphState):
+        """任务的等待时间：分析器类型的超时时间和请求剩余时间中的较小值
+        
+        Args:
+            task: 任务对象
+            state: 当前状态
+            
+        Returns:
+            Tuple[float, bool]: (等待时间（秒）, 是否受请求截止时间约束)
+        """
+        timeout = self._task_timeout(task)
+        remaining = remaining_time(state)
+        if remaining is not None and remaining < timeout:
+            return remaining, True
+        return timeout, False
+    
+    def _on_deadline(self, task, state: GraphState, token: CancelToken) -> None:
+        """请求截止时间已过：取消任务令牌让工作线程尽快退出，任务没有结果
+        
+        Args:
+            task: 任务对象
+            state: 当前状态
+            token: 任务的取消令牌
+        """
+        analyzer_type = self._analyzer_type(task) or str(task.type)
+        token.cancel(f"请求截止时间已过，取消{analyzer_type}分析")
+        logger.warning(f"请求截止时间已过，取消任务并保留其他任务的结果: {task.type}")
+        task.status = TaskStatus.CANCELLED
+        record_timeout(state, analyzer_type)
+        return None
+    
+    def _on_task_timeout(self, task, state: GraphState, token: CancelToken) -> None:
+        """分析器超时：与截止时间已过一样取消任务令牌，任务没有结果并记为缺失的分析器
+        
+        Args:
+            task: 任务对象
+            state: 当前状态
+            token: 任务的取消令牌
+        """
+        timeout = self._task_timeout(task)
+        analyzer_type = self._analyzer_type(task) or str(task.type)
+        token.cancel(f"任务超时({timeout}s)，取消{analyzer_type}分析")
+        logger.warning(f"任务执行超时({timeout}s)，取消任务并保留其他任务的结果: {task.type}")
+        task.status = TaskStatus.CANCELLED
+        record_timeout(state, analyzer_type)
+        return None
+    
+    @staticmethod
+    def _analyzer_type(task) -> Optional[str]:
+        """获取任务对应的分析器类型
+        
+        Args:
+            task: 任务对象
+            
+        Returns:
+            Optional[str]: 分析器类型，不支持的任务类型返回None
+        """
+        return {
+            TaskType.SPEECH_ANALYSIS: "speech",
+            TaskType.VISUAL_ANALYSIS: "visual",
+            TaskType.CONTENT_ANALYSIS: "content",
+        }.get(task.type)
+    
+    @staticmethod
+    def _summarize_state(state: GraphState) -> str:
+        """生成用于日志的状态摘要，避免输出完整状态
+        
+        Args:
+            state: 当前状态
+            
+        Returns:
+            str: 状态摘要
+        """
+        tasks = state.task_state.tasks
+        pending = sum(1 for task in tasks if getattr(task, "status", None) == TaskStatus.PENDING)
+        return (f"会话: {state.user_context.session_id}, 任务: {len(tasks)}（待执行 {pending}）, "
+                f"并行: {state.task_state.parallel_execution}, 已有结果: {len(state.analysis_state.results)}")
+    
+    def _execute_sequential(self, tasks: List, state: GraphState) -> List[Optional[AnalysisResult]]:
+        """串行执行任务，请求截止时间已过时不再开始新的任务
         
         Args:
             tasks: 任务列表
             state: 当前状态
             
         Returns:
-            List[AnalysisResult]: 分析结果列表
+            List[Optional[AnalysisResult]]: 与任务一一对应的分析结果
         """
         results = []
         
         for task in tasks:
+            remaining = remaining_time(state)
+            if remaining is not None and remaining <= 0:
+                results.append(self._on_deadline(task, state, CancelToken(current_cancel_token())))
+                continue
             try:
-                result = self._execute_single_task(task, state)
-                if result:
-                    results.append(result)
+                results.append(self._execute_single_task(task, state))
             except Exception as e:
                 logger.error(f"任务执行失败: {e}")
+                results.append(None)
         
         return results
     
@@ -182,28 +459,24 @@ class AnalyzerExecutor:
             AnalysisResult: 分析结果
         """
         try:
-            logger.info(f"执行任务: {task.task_type.value}")
+            logger.debug(f"执行任务: {task.type.value}")
             
             # 根据任务类型选择分析器适配器
-            adapter = None
-            if task.task_type == TaskType.SPEECH_ANALYSIS:
-                adapter = self.analyzer_adapters.get("speech")
-            elif task.task_type == TaskType.VISUAL_ANALYSIS:
-                adapter = self.analyzer_adapters.get("visual")
-            elif task.task_type == TaskType.CONTENT_ANALYSIS:
-                adapter = self.analyzer_adapters.get("content")
+            adapter = self.analyzer_adapters.get(self._analyzer_type(task))
             
             if adapter is None:
-                logger.warning(f"未找到适配器，使用模拟分析器: {task.task_type}")
+                logger.warning(f"未找到适配器，使用模拟分析器: {task.type}")
                 return self._mock_analyzer(task, state)
             
             # 执行分析
             result = adapter.process(state, task.data)
             
-            logger.info(f"任务执行完成: {task.task_type.value}, 得分: {result.score}")
+            logger.debug(f"任务执行完成: {task.type.value}, 得分: {result.score}")
             
             return result
             
+        except NodeCancelled:
+            raise
         except Exception as e:
             logger.error(f"执行单个任务失败: {e}")
             # 返回模拟结果作为后备
@@ -222,7 +495,7 @@ class AnalyzerExecutor:
         import random
         
         # 根据任务类型生成模拟结果
-        if task.task_type == TaskType.SPEECH_ANALYSIS:
+        if task.type == TaskType.SPEECH_ANALYSIS:
             score = random.uniform(6.0, 9.0)
             details = {
                 "clarity": random.uniform(6.0, 9.0),
@@ -231,7 +504,7 @@ class AnalyzerExecutor:
                 "confidence": random.uniform(0.7, 0.9),
                 "mock": True
             }
-        elif task.task_type == TaskType.VISUAL_ANALYSIS:
+        elif task.type == TaskType.VISUAL_ANALYSIS:
             score = random.uniform(6.0, 9.0)
             details = {
                 "eye_contact": random.uniform(6.0, 9.0),
@@ -240,7 +513,7 @@ class AnalyzerExecutor:
                 "engagement": random.uniform(6.0, 9.0),
                 "mock": True
             }
-        elif task.task_type == TaskType.CONTENT_ANALYSIS:
+        elif task.type == TaskType.CONTENT_ANALYSIS:
             score = random.uniform(6.0, 9.0)
             details = {
                 "relevance": random.uniform(6.0, 9.0),
@@ -254,10 +527,11 @@ class AnalyzerExecutor:
             details = {"error": "未知任务类型", "mock": True}
         
         return AnalysisResult(
-            task_type=task.task_type,
+            task_id=task.id,
+            type=task.type,
             score=score,
             details=details,
-            confidence=0.5  # 模拟结果置信度较低
+            metadata={"confidence": 0.5}  # 模拟结果置信度较低
         )
     
     def get_analyzer_status(self) -> Dict[str, bool]:
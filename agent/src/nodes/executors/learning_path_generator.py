@@ -5,6 +5,7 @@ import logging
 import asyncio
 import time
 import json
+import weakref
 from pydantic import BaseModel, Field
 
 from ...core.system.config import AgentConfig
@@ -78,6 +79,12 @@ class LearningPathGenerator:
         self.max_resources_per_need = self.config.get_learning_config("max_resources_per_need", 5)
         self.search_results_limit = self.config.get_learning_config("search_results_limit", 10)
         self.context_window = self.config.get_learning_config("context_window", 4000)
+        # 检索、搜索和LLM调用共享的并发上限
+        self.max_concurrency = self.config.get_learning_config("max_concurrency", 6)
+        # 单次LLM调用分析的资源数
+        self.resource_batch_size = self.config.get_learning_config("resource_batch_size", 5)
+        # 按事件循环区分的并发名额，循环被回收时自动移除
+        self._slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, asyncio.Semaphore]" = weakref.WeakKeyDictionary()
         self.default_tech_field_model = self.config.get_learning_config(
             "default_tech_field_model", 
             "damo/nlp_structbert_text-classification_chinese-base"
@@ -131,6 +138,27 @@ class LearningPathGenerator:
             self.openai_service = OpenAIService(self.config)
             logger.info("OpenAI服务初始化完成")
     
+    async def _limited(self, coro):
+        """在共享并发上限内执行一次外部调用
+        
+        只包裹检索、搜索和LLM等叶子调用，嵌套的任务不会因互相等待名额而死锁
+        
+        Args:
+            coro: 协程
+            
+        Returns:
+            Any: 协程的返回值
+        """
+        loop = asyncio.get_running_loop()
+        slots = self._slots.get(loop)
+        if slots is None:
+            # 有过等待者的信号量会引用所属循环，弱引用字典无法自行回收，创建新名额时顺便清理已关闭的循环
+            for closed in [other for other in self._slots if other.is_closed()]:
+                del self._slots[closed]
+            slots = self._slots[loop] = asyncio.Semaphore(self.max_concurrency)
+        async with slots:
+            return await coro
+    
     async def _generate_learning_report(self, input_data: LearningPathGeneratorInput) -> Dict[str, Any]:
         """生成学习需求报告
         
@@ -235,7 +263,7 @@ class LearningPathGenerator:
         self._ensure_services_initialized()
         
         # 构建搜索查询
-        search_query = f"{tech_field} {need.area} {need.level} 学习资源 教程"
+        search_query = self._build_search_query(need, tech_field)
         
         try:
             # 并行执行RAG检索和Web搜索
@@ -263,6 +291,10 @@ class LearningPathGenerator:
             logger.error(f"搜索学习资源异常: {e}")
             return []
     
+    def _build_search_query(self, need: LearningNeed, tech_field: str) -> str:
+        """构建学习需求的搜索查询"""
+        return f"{tech_field} {need.area} {need.level} 学习资源 教程"
+    
     async def _rag_search(self, query: str) -> List[Dict[str, Any]]:
         """RAG检索
         
@@ -275,23 +307,27 @@ class LearningPathGenerator:
             List[Dict[str, Any]]: 检索结果
         """
         try:
-            # 使用混合检索器
-            hybrid_results = await self.hybrid_retriever.retrieve(query, max_results=self.search_results_limit // 2)
-            
-            # 使用Context7检索器 - 尝试常见的学习资源库
+            # 混合检索器与各Context7学习资源库并发检索
             learning_libraries = ["learning-resources", "programming-courses", "tech-tutorials"]
+            hybrid_task = self._limited(
+                self.hybrid_retriever.retrieve(query, max_results=self.search_results_limit // 2)
+            )
+            library_tasks = [
+                self._limited(self.context7_retriever.retrieve(query, library_name=lib, tokens=3000))
+                for lib in learning_libraries
+            ]
+            hybrid_results, *library_results = await asyncio.gather(
+                hybrid_task, *library_tasks, return_exceptions=True
+            )
+            if isinstance(hybrid_results, BaseException):
+                raise hybrid_results
             
             context7_results = []
-            for lib in learning_libraries:
-                try:
-                    results = await self.context7_retriever.retrieve(
-                        query, 
-                        library_name=lib, 
-                        tokens=3000
-                    )
+            for lib, results in zip(learning_libraries, library_results):
+                if isinstance(results, BaseException):
+                    logger.warning(f"Context7检索库 {lib} 失败: {results}")
+                else:
                     context7_results.extend(results)
-                except Exception as e:
-                    logger.warning(f"Context7检索库 {lib} 失败: {e}")
             
             # 合并结果
             all_results = hybrid_results + context7_results
@@ -319,10 +355,10 @@ class LearningPathGenerator:
         """
         try:
             # 使用WebSearch服务
-            search_result = await self.websearch_service.search(
+            search_result = await self._limited(self.websearch_service.search(
                 query=query,
                 num_results=self.search_results_limit // 2
-            )
+            ))
             
             if search_result.get("status") == "success" and "results" in search_result:
                 # 转换为统一格式
@@ -390,18 +426,22 @@ class LearningPathGenerator:
         """
         self._ensure_services_initialized()
         
-        resources = []
+        # 资源分批交给LLM分析，各批次并发
+        batches = [results[i:i + self.resource_batch_size]
+                   for i in range(0, len(results), self.resource_batch_size)]
+        batch_infos = await asyncio.gather(*(self._analyze_resources_batch(batch, need) for batch in batches))
         
-        for result in results:
+        resources = []
+        for result, resource_info in zip(results, [info for infos in batch_infos for info in infos]):
             # 提取基本信息
             text = result.get("text", "")
             metadata = result.get("metadata", {})
             title = metadata.get("title", "未知资源")
             url = metadata.get("url", None)
             
-            # 使用LLM分析资源类型和预计学习时间
             try:
-                resource_info = await self._analyze_resource(text, title, need)
+                if isinstance(resource_info, BaseException):
+                    raise resource_info
                 
                 # 创建学习资源
                 resource = LearningResource(
@@ -432,6 +472,88 @@ class LearningPathGenerator:
         
         return resources
     
+    async def _analyze_resources_batch(self, results: List[Dict[str, Any]], need: LearningNeed) -> List[Any]:
+        """用一次LLM调用分析多个资源
+        
+        响应无法解析或数量不符时，对缺失的资源逐个调用_analyze_resource
+        
+        Args:
+            results: 检索结果
+            need: 学习需求
+            
+        Returns:
+            List[Any]: 与results顺序一致的资源信息，单个资源分析失败时为异常对象
+        """
+        if len(results) == 1:
+            return await self._analyze_resources_individually(results, need)
+        
+        resources_text = ""
+        for i, result in enumerate(results):
+            title = result.get("metadata", {}).get("title", "未知资源")
+            resources_text += f"{i+1}. 资源标题: {title}\n   资源内容: {result.get('text', '')[:300]}...\n"
+        
+        prompt = f"""
+        分析以下 {len(results)} 个学习资源，分别提供资源类型、适合难度和预计学习时间：
+        
+        {resources_text}
+        
+        这些资源将用于提升以下能力:
+        - 领域: {need.area}
+        - 当前水平: {need.level}
+        - 提升目标: {need.description}
+        
+        请按资源编号顺序输出JSON数组，每个资源一项，包含以下字段:
+        1. index: 资源编号
+        2. source: 资源类型(article, course, video, ebook, tool)
+        3. level: 适合水平(beginner, intermediate, advanced)
+        4. estimated_time: 预计学习时间
+        5. description: 简短描述该资源(100字以内)
+        """
+        
+        messages = [
+            {"role": "system", "content": "你是一个专业的学习资源分析师，擅长分析学习资源的类型、难度和学习时间。"},
+            {"role": "user", "content": prompt}
+        ]
+        
+        infos: List[Any] = [None] * len(results)
+        try:
+            result = await self._limited(self.openai_service.chat_completion(
+                messages=messages,
+                temperature=0.3,
+                max_tokens=300 * len(results)
+            ))
+            if result.get("status") == "success" and "content" in result:
+                content = result["content"]
+                json_start = content.find('[')
+                json_end = content.rfind(']') + 1
+                items = json.loads(content[json_start:json_end]) if 0 <= json_start < json_end else []
+                by_order = len(items) == len(results)
+                for position, item in enumerate(items):
+                    if not isinstance(item, dict):
+                        continue
+                    index = item.get("index")
+                    index = index - 1 if isinstance(index, int) and 1 <= index <= len(results) else (
+                        position if by_order else None)
+                    if index is not None and infos[index] is None:
+                        infos[index] = item
+        except Exception as e:
+            logger.warning(f"批量分析资源失败: {e}")
+        
+        missing = [i for i, info in enumerate(infos) if info is None]
+        if missing:
+            logger.info(f"批量分析有 {len(missing)} 个资源未得到结果，逐个分析")
+            retried = await self._analyze_resources_individually([results[i] for i in missing], need)
+            for i, info in zip(missing, retried):
+                infos[i] = info
+        return infos
+    
+    async def _analyze_resources_individually(self, results: List[Dict[str, Any]], need: LearningNeed) -> List[Any]:
+        """并发地逐个分析资源，失败的资源返回异常对象"""
+        return await asyncio.gather(*(
+            self._analyze_resource(result.get("text", ""), result.get("metadata", {}).get("title", "未知资源"), need)
+            for result in results
+        ), return_exceptions=True)
+    
     async def _analyze_resource(self, text: str, title: str, need: LearningNeed) -> Dict[str, str]:
         """分析资源信息
         
@@ -468,11 +590,11 @@ class LearningPathGenerator:
             {"role": "user", "content": prompt}
         ]
         
-        result = await self.openai_service.chat_completion(
+        result = await self._limited(self.openai_service.chat_completion(
             messages=messages,
             temperature=0.3,
             max_tokens=500
-        )
+        ))
         
         if result.get("status") == "success" and "content" in result:
             content = result["content"]
@@ -548,11 +670,11 @@ class LearningPathGenerator:
             {"role": "user", "content": prompt}
         ]
         
-        result = await self.openai_service.chat_completion(
+        result = await self._limited(self.openai_service.chat_completion(
             messages=messages,
             temperature=0.3,
             max_tokens=1000
-        )
+        ))
         
         if result.get("status") == "success" and "content" in result:
             content = result["content"]
@@ -602,6 +724,26 @@ class LearningPathGenerator:
             milestones=["理解基本概念", "掌握核心技能", "实践应用"]
         )
     
+    async def _build_learning_path(self, need: LearningNeed, tech_field: str,
+                                   time_constraint: Optional[str] = None) -> Optional[LearningPath]:
+        """为单个学习需求搜索资源并生成学习路径
+        
+        Args:
+            need: 学习需求
+            tech_field: 技术领域
+            time_constraint: 时间约束
+            
+        Returns:
+            Optional[LearningPath]: 学习路径，没有找到资源时为None
+        """
+        # 搜索学习资源
+        resources = await self._search_learning_resources(need, tech_field)
+        
+        # 生成学习路径
+        if not resources:
+            return None
+        return await self._generate_learning_path(need, resources, time_constraint)
+    
     async def generate(self, input_data: Union[Dict[str, Any], LearningPathGeneratorInput]) -> LearningPathGeneratorOutput:
         """生成个性化学习路径
         
@@ -649,23 +791,12 @@ class LearningPathGenerator:
             # 按优先级排序
             learning_needs.sort(key=lambda x: x.priority, reverse=True)
             
-            # 为每个学习需求生成学习路径
-            learning_paths = []
-            for need in learning_needs:
-                # 搜索学习资源
-                resources = await self._search_learning_resources(
-                    need, 
-                    input_data.tech_field or ""
-                )
-                
-                # 生成学习路径
-                if resources:
-                    learning_path = await self._generate_learning_path(
-                        need, 
-                        resources, 
-                        input_data.time_constraint
-                    )
-                    learning_paths.append(learning_path)
+            # 各学习需求的检索、资源分析和路径生成并发进行，结果保持优先级顺序
+            paths = await asyncio.gather(*(
+                self._build_learning_path(need, input_data.tech_field or "", input_data.time_constraint)
+                for need in learning_needs
+            ))
+            learning_paths = [path for path in paths if path is not None]
             
             # 准备元数据
             metadata = {
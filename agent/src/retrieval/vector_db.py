@@ -11,6 +11,8 @@ import numpy as np
 from pathlib import Path
 
 from ..core.system.config import AgentConfig
+from ..services.llm_cache import make_cache_key
+from ..services.single_flight import get_single_flight
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +36,10 @@ class VectorDatabase:
         self.embedding_model = self.config.get_db_config("vector", "embedding_model", "openai")
         self.embedding_dim = self.config.get_db_config("vector", "embedding_dim", 1536)  # OpenAI默认维度
         self.distance_metric = self.config.get_db_config("vector", "distance_metric", "cosine")
+        # 相同文本的并发嵌入请求共享一次调用
+        self.coalesce_requests = self.config.get_db_config("vector", "coalesce_requests", True)
+        self.coalesce_timeout = self.config.get_db_config("vector", "coalesce_timeout", None)
+        self._single_flight = get_single_flight("embedding")
         
         # 初始化数据存储
         self._documents = {}
@@ -196,15 +202,34 @@ class VectorDatabase:
                 logger.error(f"导入嵌入服务失败: {e}")
                 raise
     
-    async def create_embedding(self, text: str) -> np.ndarray:
+    async def create_embedding(self, text: str, timeout: Optional[float] = None) -> np.ndarray:
         """创建文本的嵌入向量
         
+        相同文本的并发请求（包括同一批文档中的重复文本）只调用一次嵌入服务
+        
         Args:
             text: 输入文本
+            timeout: 本次调用的等待超时（秒），超时不会取消其他调用方仍在等待的请求
             
         Returns:
             np.ndarray: 嵌入向量
+            
+        Raises:
+            asyncio.TimeoutError: 等待超时
         """
+        if not self.coalesce_requests:
+            return await self._create_embedding(text)
+        
+        key = make_cache_key(self.embedding_model, "embedding", [{"content": text}],
+                             distance_metric=self.distance_metric)
+        return await self._single_flight.do(
+            key,
+            lambda: self._create_embedding(text),
+            timeout=timeout if timeout is not None else self.coalesce_timeout
+        )
+    
+    async def _create_embedding(self, text: str) -> np.ndarray:
+        """调用嵌入服务并归一化向量"""
         self._ensure_embedding_service()
         
         try:
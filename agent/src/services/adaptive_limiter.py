@@ -0,0 +1,420 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+外部API自适应并发限制
+
+替代固定大小的信号量，按服务提供方（讯飞、OpenAI、ModelScope）共享：
+1. 自适应并发上限（AIMD）：延迟和错误率正常且并发已用满时逐步增加上限；
+   遇到429、超时或提供方流控错误码时成倍降低上限。延迟基线按端点分别统计
+   （同一提供方的识别、评测和大模型接口延迟相差数倍），只在并发用满时才把延迟上升视为排队
+2. 令牌桶：按端点限制每秒请求数，避免触发提供方的QPS限制
+3. 跨事件循环：等待队列不依赖某个事件循环的同步原语，同一限制器可在多个事件循环间共享
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Callable, Deque, Dict, List, Optional, Tuple
+
+from ..core.system.config import AgentConfig
+
+logger = logging.getLogger(__name__)
+
+# 各提供方的默认限制，可通过 services.<provider>.concurrency / rate_limits 覆盖
+PROVIDER_DEFAULTS: Dict[str, Dict[str, Any]] = {
+    "xunfei": {
+        "concurrency": {"initial_limit": 4, "min_limit": 1, "max_limit": 20},
+        "rate_limits": {
+            "iat": {"rate": 10, "burst": 10},
+            "ise": {"rate": 10, "burst": 10},
+            "emotion": {"rate": 10, "burst": 10},
+            "spark": {"rate": 5, "burst": 5}
+        }
+    },
+    "openai": {
+        "concurrency": {"initial_limit": 8, "min_limit": 1, "max_limit": 64},
+        "rate_limits": {
+            "chat": {"rate": 10, "burst": 20},
+            "embedding": {"rate": 20, "burst": 40}
+        }
+    },
+    "modelscope": {
+        "concurrency": {"initial_limit": 2, "min_limit": 1, "max_limit": 8},
+        "rate_limits": {}
+    },
+    "websearch": {
+        "concurrency": {"initial_limit": 8, "min_limit": 2, "max_limit": 16},
+        "rate_limits": {}
+    }
+}
+
+
+def is_overload_exception(error: BaseException) -> bool:
+    """判断异常是否表示提供方过载（429、超时、限流）
+
+    Args:
+        error: 调用外部API时抛出的异常
+
+    Returns:
+        bool: 是否应视为过载信号
+    """
+    if isinstance(error, (asyncio.TimeoutError, TimeoutError)):
+        return True
+    status = getattr(error, "status_code", None) or getattr(error, "status", None)
+    if status in (429, 503):
+        return True
+    name = type(error).__name__
+    return "RateLimit" in name or "Timeout" in name
+
+
+class TokenBucket:
+    """令牌桶速率限制"""
+
+    def __init__(self, rate: float, burst: Optional[float] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        """初始化令牌桶
+
+        Args:
+            rate: 每秒补充的令牌数
+            burst: 桶容量（允许的突发请求数），默认等于rate
+            clock: 时钟函数（秒）
+        """
+        self.rate = float(rate)
+        self.capacity = float(burst if burst is not None else max(1.0, rate))
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = threading.Lock()
+        self.total_wait = 0.0
+
+    def _reserve(self, tokens: float) -> float:
+        """尝试取出令牌，返回需要等待的秒数（0表示已取出）"""
+        with self._lock:
+            now = self._clock()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    async def acquire(self, tokens: float = 1.0):
+        """等待直到取得令牌"""
+        while True:
+            wait = self._reserve(tokens)
+            if wait <= 0:
+                return
+            self.total_wait += wait
+            await asyncio.sleep(wait)
+
+
+class SlotOutcome:
+    """单次调用的结果标记，调用方可在响应体中发现错误码时手动标记"""
+
+    def __init__(self):
+        self.overloaded = False
+        self.failed = False
+
+    def mark_overloaded(self):
+        """提供方返回限流/过载（如HTTP 429、流控错误码）"""
+        self.overloaded = True
+
+    def mark_failed(self):
+        """请求失败但不是过载"""
+        self.failed = True
+
+
+class AdaptiveConcurrencyLimiter:
+    """AIMD自适应并发限制器"""
+
+    def __init__(self, name: str, initial_limit: int = 4, min_limit: int = 1, max_limit: int = 32,
+                 latency_tolerance: float = 2.0, backoff_ratio: float = 0.5,
+                 error_rate_threshold: float = 0.3, cooldown: float = 1.0, window_size: int = 50,
+                 latency_floor: float = 0.005):
+        """初始化限制器
+
+        Args:
+            name: 名称（用于日志）
+            initial_limit: 初始并发上限
+            min_limit: 最小并发上限
+            max_limit: 最大并发上限
+            latency_tolerance: 端点平均延迟超过其最小延迟多少倍时视为拥塞
+            backoff_ratio: 过载时上限的缩减比例
+            error_rate_threshold: 最近窗口内错误率超过该值时缩减上限
+            cooldown: 两次缩减之间的最短间隔（秒），避免同一批并发失败把上限压到最低
+            window_size: 统计错误率的窗口大小
+            latency_floor: 延迟基线的下限（秒），毫秒以下的调度抖动不视为拥塞
+        """
+        self.name = name
+        self.min_limit = max(1, int(min_limit))
+        self.max_limit = max(self.min_limit, int(max_limit))
+        self._limit = float(min(max(initial_limit, self.min_limit), self.max_limit))
+        self.latency_tolerance = latency_tolerance
+        self.backoff_ratio = backoff_ratio
+        self.error_rate_threshold = error_rate_threshold
+        self.cooldown = cooldown
+        self.latency_floor = latency_floor
+
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._waiters: Deque[Tuple[asyncio.AbstractEventLoop, asyncio.Future]] = deque()
+        self._outcomes: Deque[bool] = deque(maxlen=window_size)
+        self._last_decrease = 0.0
+        # 端点 -> [最小延迟, 平均延迟]
+        self._latency: Dict[Optional[str], List[float]] = {}
+
+        self.stats = {
+            "requests": 0,
+            "successes": 0,
+            "errors": 0,
+            "overloads": 0,
+            "increases": 0,
+            "decreases": 0,
+            "max_in_flight": 0
+        }
+
+    @property
+    def limit(self) -> int:
+        """当前并发上限"""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        """当前进行中的请求数"""
+        return self._in_flight
+
+    async def acquire(self):
+        """获取一个并发名额"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            if self._in_flight < self.limit and not self._waiters:
+                self._take_slot()
+                return
+            future = loop.create_future()
+            self._waiters.append((loop, future))
+
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                try:
+                    self._waiters.remove((loop, future))
+                    handed_off = False
+                except ValueError:
+                    handed_off = True
+            # 名额已经转交但任务被取消时归还名额
+            if handed_off and future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def _take_slot(self):
+        self._in_flight += 1
+        self.stats["requests"] += 1
+        self.stats["max_in_flight"] = max(self.stats["max_in_flight"], self._in_flight)
+
+    def release(self):
+        """归还一个并发名额"""
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            self._wake_waiters()
+
+    def _wake_waiters(self):
+        """在上限允许的范围内把名额转交给等待者（需持有锁）"""
+        while self._waiters and self._in_flight < self.limit:
+            loop, future = self._waiters.popleft()
+            if future.done():
+                continue
+            try:
+                loop.call_soon_threadsafe(self._resolve_waiter, future)
+            except RuntimeError:
+                # 等待者所在的事件循环已关闭
+                continue
+            self._take_slot()
+
+    def _resolve_waiter(self, future: asyncio.Future):
+        if future.cancelled():
+            self.release()
+        elif not future.done():
+            future.set_result(None)
+
+    def record_success(self, latency: float, endpoint: Optional[str] = None):
+        """记录一次成功调用，延迟正常且并发已用满时增加上限
+
+        Args:
+            latency: 调用延迟（秒）
+            endpoint: 端点名称，延迟只与同一端点的基线比较
+        """
+        with self._lock:
+            self.stats["successes"] += 1
+            self._outcomes.append(True)
+
+            baseline = self._latency.get(endpoint)
+            if baseline is None:
+                baseline = self._latency[endpoint] = [latency, latency]
+            baseline[0] = min(baseline[0], latency)
+            baseline[1] = 0.8 * baseline[1] + 0.2 * latency
+            min_latency, avg_latency = baseline
+
+            saturated = self._in_flight >= self.limit or bool(self._waiters)
+            if saturated and avg_latency > max(min_latency, self.latency_floor) * self.latency_tolerance:
+                # 并发用满且该端点延迟明显上升：提供方开始排队，小幅回退
+                self._decrease(0.9, f"{endpoint or '默认'}端点延迟上升")
+            elif saturated and self._limit < self.max_limit:
+                # 加性增加：每 limit 次成功约增加1
+                self._limit = min(self.max_limit, self._limit + 1.0 / self._limit)
+                self.stats["increases"] += 1
+                self._wake_waiters()
+
+            # 最小延迟缓慢上浮，适应提供方延迟基线的变化
+            baseline[0] *= 1.001
+
+    def record_overload(self):
+        """记录一次过载信号（429、超时、流控错误码），成倍降低上限"""
+        with self._lock:
+            self.stats["overloads"] += 1
+            self._outcomes.append(False)
+            self._decrease(self.backoff_ratio, "过载")
+
+    def record_error(self):
+        """记录一次普通错误，错误率过高时降低上限"""
+        with self._lock:
+            self.stats["errors"] += 1
+            self._outcomes.append(False)
+            if len(self._outcomes) >= 10:
+                error_rate = self._outcomes.count(False) / len(self._outcomes)
+                if error_rate > self.error_rate_threshold:
+                    self._decrease(self.backoff_ratio, f"错误率{error_rate:.0%}")
+
+    def _decrease(self, ratio: float, reason: str):
+        """按比例降低上限（需持有锁），冷却期内只降低一次"""
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        old_limit = self.limit
+        self._limit = max(float(self.min_limit), self._limit * ratio)
+        self.stats["decreases"] += 1
+        if self.limit != old_limit:
+            logger.info(f"[{self.name}] 并发上限 {old_limit} -> {self.limit}（{reason}）")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        with self._lock:
+            return {
+                **self.stats,
+                "limit": self.limit,
+                "in_flight": self._in_flight,
+                "waiting": len(self._waiters),
+                "latency": {
+                    endpoint or "default": {"min": baseline[0], "avg": baseline[1]}
+                    for endpoint, baseline in self._latency.items()
+                }
+            }
+
+
+class ProviderLimiter:
+    """单个服务提供方的限制器：自适应并发上限 + 各端点令牌桶"""
+
+    def __init__(self, name: str, concurrency: Optional[Dict[str, Any]] = None,
+                 rate_limits: Optional[Dict[str, Dict[str, float]]] = None):
+        """初始化提供方限制器
+
+        Args:
+            name: 提供方名称
+            concurrency: AdaptiveConcurrencyLimiter参数
+            rate_limits: 端点 -> {"rate": 每秒请求数, "burst": 突发容量}
+        """
+        self.name = name
+        self.concurrency = AdaptiveConcurrencyLimiter(name, **(concurrency or {}))
+        self.buckets: Dict[str, TokenBucket] = {
+            endpoint: TokenBucket(spec["rate"], spec.get("burst"))
+            for endpoint, spec in (rate_limits or {}).items()
+        }
+
+    @asynccontextmanager
+    async def slot(self, endpoint: Optional[str] = None) -> AsyncIterator[SlotOutcome]:
+        """在限制下执行一次调用
+
+        先按端点取令牌，再获取并发名额；退出时根据异常或调用方的标记更新并发上限
+
+        Args:
+            endpoint: 端点名称，未配置令牌桶的端点只受并发限制
+
+        Yields:
+            SlotOutcome: 结果标记
+        """
+        bucket = self.buckets.get(endpoint) if endpoint else None
+        if bucket is not None:
+            await bucket.acquire()
+
+        await self.concurrency.acquire()
+        outcome = SlotOutcome()
+        start_time = time.monotonic()
+        try:
+            yield outcome
+        except (asyncio.CancelledError, GeneratorExit):
+            # 调用方取消或提前关闭流式响应，不作为提供方的健康信号
+            raise
+        except BaseException as e:
+            if outcome.overloaded or is_overload_exception(e):
+                self.concurrency.record_overload()
+            else:
+                self.concurrency.record_error()
+            raise
+        else:
+            if outcome.overloaded:
+                self.concurrency.record_overload()
+            elif outcome.failed:
+                self.concurrency.record_error()
+            else:
+                self.concurrency.record_success(time.monotonic() - start_time, endpoint)
+        finally:
+            self.concurrency.release()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        return {
+            "concurrency": self.concurrency.get_stats(),
+            "rate_limit_wait": {endpoint: bucket.total_wait for endpoint, bucket in self.buckets.items()}
+        }
+
+
+# 全局提供方限制器（同一进程内同一提供方的所有服务实例共享配额）
+_provider_limiters: Dict[str, ProviderLimiter] = {}
+_provider_limiters_lock = threading.Lock()
+
+
+def get_provider_limiter(provider: str, config: Optional[AgentConfig] = None,
+                         **concurrency_overrides) -> ProviderLimiter:
+    """获取提供方的共享限制器
+
+    Args:
+        provider: 提供方名称（xunfei、openai、modelscope）
+        config: 配置对象，仅在首次创建时读取 services.<provider>.concurrency / rate_limits
+        **concurrency_overrides: 覆盖并发参数（如initial_limit），仅在首次创建时生效
+
+    Returns:
+        ProviderLimiter: 共享限制器
+    """
+    with _provider_limiters_lock:
+        limiter = _provider_limiters.get(provider)
+        if limiter is None:
+            defaults = PROVIDER_DEFAULTS.get(provider, {})
+            concurrency = dict(defaults.get("concurrency", {}))
+            rate_limits = dict(defaults.get("rate_limits", {}))
+            if config is not None:
+                concurrency.update(config.get_service_config(provider, "concurrency", {}) or {})
+                rate_limits.update(config.get_service_config(provider, "rate_limits", {}) or {})
+            concurrency.update(concurrency_overrides)
+            limiter = ProviderLimiter(provider, concurrency, rate_limits)
+            _provider_limiters[provider] = limiter
+        return limiter
+
+
+def reset_provider_limiters():
+    """清空全局限制器（配置变更或测试时使用）"""
+    with _provider_limiters_lock:
+        _provider_limiters.clear()
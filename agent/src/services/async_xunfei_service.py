@@ -1,6 +1,6 @@
 # agent/services/async_xunfei_service.py
 
-from typing import Dict, Optional, Any, List
+from typing import AsyncIterator, Dict, Optional, Any, List, Tuple
 import hashlib
 import base64
 import hmac
@@ -14,9 +14,20 @@ import time
 
 from wsgiref.handlers import format_date_time
 from ..core.system.config import AgentConfig
+from .http_session_manager import get_http_session_manager
+from .adaptive_limiter import SlotOutcome, get_provider_limiter, is_overload_exception
+from .llm_cache import get_llm_cache, make_cache_key
 
 logger = logging.getLogger(__name__)
 
+# 讯飞流控类错误码：11201 日流控超限、11202 秒级流控超限、11203 并发流控超限、10007 用户流量受限
+XUNFEI_OVERLOAD_CODES = {"10007", "11201", "11202", "11203"}
+
+
+class SparkChatError(Exception):
+    """星火对话返回错误码或响应不完整"""
+
+
 class AsyncXunFeiService:
     """讯飞服务的异步实现
     
@@ -24,15 +35,16 @@ class AsyncXunFeiService:
     
     Args:
         config: 配置对象，如果为None则创建默认配置
-        max_concurrent_requests: 最大并发请求数，默认为1
+        max_concurrent_requests: 初始并发上限，None表示使用配置
     """
     
-    def __init__(self, config: Optional[AgentConfig] = None, max_concurrent_requests: int = 1):
+    def __init__(self, config: Optional[AgentConfig] = None, max_concurrent_requests: Optional[int] = None):
         """初始化讯飞服务
         
         Args:
             config: 配置对象，如果为None则创建默认配置
-            max_concurrent_requests: 最大并发请求数，控制API调用的并发数量
+            max_concurrent_requests: 初始并发上限，仅在创建进程内共享的限制器时生效；
+                之后上限随延迟、错误率和流控信号自适应调整
         """
         self.config = config or AgentConfig()
         
@@ -54,10 +66,10 @@ class AsyncXunFeiService:
         # 星火API URL（默认使用Lite版本）- 使用正确的Lite版本URL
         self.spark_api_url = self.config.get_service_config("xunfei", "spark_api_url", "wss://spark-api.xf-yun.com/v1.1/chat")
         
-        # 创建一个信号量，限制并发请求数量
-        self.max_concurrent_requests = max_concurrent_requests
-        self.api_semaphore = asyncio.Semaphore(max_concurrent_requests)
-        logger.info(f"初始化讯飞服务，最大并发请求数: {max_concurrent_requests}")
+        # 进程内共享的自适应并发限制器和各端点令牌桶
+        overrides = {"initial_limit": max_concurrent_requests} if max_concurrent_requests else {}
+        self.limiter = get_provider_limiter("xunfei", self.config, **overrides)
+        logger.info(f"初始化讯飞服务，当前并发上限: {self.limiter.concurrency.limit}")
         
         # 检查语音识别配置
         if not self.xunfei_app_id or not self.xunfei_api_key or not self.xunfei_api_secret:
@@ -72,6 +84,22 @@ class AsyncXunFeiService:
             logger.info(f"讯飞星火大模型API配置完成，APPID: {self.spark_app_id[:4] if len(self.spark_app_id) > 4 else '****'}")
             logger.info(f"星火API URL: {self.spark_api_url} (星火Lite版本)")
     
+    @staticmethod
+    def _mark_error_code(outcome: SlotOutcome, error_code: Any):
+        """根据讯飞错误码标记调用结果，流控类错误码视为过载"""
+        if str(error_code) in XUNFEI_OVERLOAD_CODES:
+            outcome.mark_overloaded()
+        else:
+            outcome.mark_failed()
+    
+    @staticmethod
+    def _mark_exception(outcome: SlotOutcome, error: Exception):
+        """根据异常类型标记调用结果"""
+        if is_overload_exception(error):
+            outcome.mark_overloaded()
+        else:
+            outcome.mark_failed()
+    
     async def _create_auth_params(self, url: str, is_spark: bool = False) -> Dict:
         """生成讯飞API鉴权参数(异步版本)
         
@@ -113,10 +141,7 @@ class AsyncXunFeiService:
         Returns:
             str: 识别结果文本
         """
-        # 获取信号量，限制并发请求
-        logger.debug(f"等待信号量，当前可用: {self.api_semaphore._value}/{self.max_concurrent_requests}")
-        async with self.api_semaphore:
-            logger.debug(f"获取到信号量，开始语音识别请求，剩余可用: {self.api_semaphore._value}/{self.max_concurrent_requests}")
+        async with self.limiter.slot("iat") as outcome:
             url = self.iat_url
             
             # 检查音频数据大小
@@ -179,57 +204,61 @@ class AsyncXunFeiService:
                 logger.info(f"请求头: host=api.xfyun.cn, X-Appid={self.xunfei_app_id[:4] if len(self.xunfei_app_id) > 4 else '****'}, X-CurTime={cur_time}")
                 logger.info(f"请求参数: {json.dumps(api_params, ensure_ascii=False)}")
                 
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(url, headers=headers, data=form_data) as response:
-                        # 检查HTTP状态码
-                        status_code = response.status
-                        resp_text = await response.text()
-                        logger.info(f"响应状态码: {status_code}")
-                        logger.info(f"响应内容类型: {response.headers.get('Content-Type', 'unknown')}")
-                        logger.info(f"响应JSON: {resp_text}")
-                        
-                        if status_code != 200:
-                            logger.error(f"HTTP错误: {status_code} - {resp_text}")
-                            return ''
+                async with get_http_session_manager().post(url, headers=headers, data=form_data) as response:
+                    # 检查HTTP状态码
+                    status_code = response.status
+                    resp_text = await response.text()
+                    logger.info(f"响应状态码: {status_code}")
+                    logger.info(f"响应内容类型: {response.headers.get('Content-Type', 'unknown')}")
+                    logger.info(f"响应JSON: {resp_text}")
+                    
+                    if status_code != 200:
+                        logger.error(f"HTTP错误: {status_code} - {resp_text}")
+                        if status_code == 429:
+                            outcome.mark_overloaded()
+                        else:
+                            outcome.mark_failed()
+                        return ''
+                    
+                    # 尝试解析JSON响应
+                    try:
+                        result = json.loads(resp_text)
                         
-                        # 尝试解析JSON响应
-                        try:
-                            result = json.loads(resp_text)
+                        if result.get('code') == '0':
+                            logger.info("语音识别成功")
+                            return result.get('data', '')
+                        else:
+                            error_code = result.get('code', '未知')
+                            error_desc = result.get('desc', '未知错误')
+                            logger.error(f"语音识别失败: {error_desc} (错误码: {error_code})")
+                            self._mark_error_code(outcome, error_code)
                             
-                            if result.get('code') == '0':
-                                logger.info("语音识别成功")
-                                return result.get('data', '')
-                            else:
-                                error_code = result.get('code', '未知')
-                                error_desc = result.get('desc', '未知错误')
-                                logger.error(f"语音识别失败: {error_desc} (错误码: {error_code})")
-                                
-                                # 增加错误码说明
-                                error_info = {
-                                    "10105": "应用未授权或IP地址不在白名单中",
-                                    "10106": "参数不合法，请检查X-Param格式",
-                                    "10107": "音频文件格式有问题",
-                                    "10110": "无效的token请求"
-                                }
-                                
-                                if error_code in error_info:
-                                    logger.error(f"错误详情: {error_info[error_code]}")
-                                    
-                                    # 特别处理10105错误
-                                    if error_code == "10105":
-                                        logger.error("请检查讯飞控制台中是否将当前服务器IP添加到白名单")
+                            # 增加错误码说明
+                            error_info = {
+                                "10105": "应用未授权或IP地址不在白名单中",
+                                "10106": "参数不合法，请检查X-Param格式",
+                                "10107": "音频文件格式有问题",
+                                "10110": "无效的token请求"
+                            }
+                            
+                            if error_code in error_info:
+                                logger.error(f"错误详情: {error_info[error_code]}")
                                 
-                                logger.error(f"完整响应: {json.dumps(result, ensure_ascii=False)}")
-                                return ''
-                        except Exception as e:
-                            logger.error(f"解析响应失败: {e}")
-                            logger.error(f"原始响应: {resp_text}")
+                                # 特别处理10105错误
+                                if error_code == "10105":
+                                    logger.error("请检查讯飞控制台中是否将当前服务器IP添加到白名单")
+                            
+                            logger.error(f"完整响应: {json.dumps(result, ensure_ascii=False)}")
                             return ''
+                    except Exception as e:
+                        logger.error(f"解析响应失败: {e}")
+                        logger.error(f"原始响应: {resp_text}")
+                        outcome.mark_failed()
+                        return ''
             except Exception as e:
                 logger.error(f"语音识别请求异常: {e}")
+                self._mark_exception(outcome, e)
                 return ''
-            finally:
-                logger.debug(f"语音识别请求完成，释放信号量，当前可用: {self.api_semaphore._value + 1}/{self.max_concurrent_requests}")
     
     async def speech_assessment(self, audio_data: bytes) -> Dict:
         """异步语音评测服务
@@ -242,9 +271,7 @@ class AsyncXunFeiService:
         Returns:
             Dict: 评测结果
         """
-        logger.debug(f"等待信号量，当前可用: {self.api_semaphore._value}/{self.max_concurrent_requests}")
-        async with self.api_semaphore:
-            logger.debug(f"获取到信号量，开始语音评测请求，剩余可用: {self.api_semaphore._value}/{self.max_concurrent_requests}")
+        async with self.limiter.slot("ise") as outcome:
             url = self.ise_url
             # 使用讯飞语音识别API凭证，不是星火的
             auth_params = await self._create_auth_params(url, is_spark=False)
@@ -263,26 +290,25 @@ class AsyncXunFeiService:
             }
             
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(url, headers=headers, data=data) as response:
-                        result = await response.json()
-                        
-                        if result.get('code') == '0':
-                            logger.info("语音评测成功")
-                            return {
-                                'clarity': result.get('clarity', 0),  # 清晰度
-                                'fluency': result.get('fluency', 0),  # 流畅度
-                                'integrity': result.get('integrity', 0),  # 完整度
-                                'speed': result.get('speed', 0)  # 语速
-                            }
-                        else:
-                            logger.error(f"语音评测失败: {result.get('desc', '未知错误')}")
-                            return {}
+                async with get_http_session_manager().post(url, headers=headers, data=data) as response:
+                    result = await response.json()
+                    
+                    if result.get('code') == '0':
+                        logger.info("语音评测成功")
+                        return {
+                            'clarity': result.get('clarity', 0),  # 清晰度
+                            'fluency': result.get('fluency', 0),  # 流畅度
+                            'integrity': result.get('integrity', 0),  # 完整度
+                            'speed': result.get('speed', 0)  # 语速
+                        }
+                    else:
+                        logger.error(f"语音评测失败: {result.get('desc', '未知错误')}")
+                        self._mark_error_code(outcome, result.get('code'))
+                        return {}
             except Exception as e:
                 logger.error(f"语音评测请求异常: {e}")
+                self._mark_exception(outcome, e)
                 return {}
-            finally:
-                logger.debug(f"语音评测请求完成，释放信号量，当前可用: {self.api_semaphore._value + 1}/{self.max_concurrent_requests}")
     
     async def emotion_analysis(self, audio_data: bytes) -> Dict:
         """异步情感分析服务
@@ -295,9 +321,7 @@ class AsyncXunFeiService:
         Returns:
             Dict: 情感分析结果
         """
-        logger.debug(f"等待信号量，当前可用: {self.api_semaphore._value}/{self.max_concurrent_requests}")
-        async with self.api_semaphore:
-            logger.debug(f"获取到信号量，开始情感分析请求，剩余可用: {self.api_semaphore._value}/{self.max_concurrent_requests}")
+        async with self.limiter.slot("emotion") as outcome:
             url = self.emotion_url
             # 使用讯飞语音识别API凭证，不是星火的
             auth_params = await self._create_auth_params(url, is_spark=False)
@@ -314,162 +338,248 @@ class AsyncXunFeiService:
             }
             
             try:
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(url, headers=headers, data=data) as response:
-                        result = await response.json()
-                        
-                        if result.get('code') == '0':
-                            logger.info("情感分析成功")
-                            return {
-                                'emotion': result.get('emotion', '中性'),  # 情感类型
-                                'confidence': result.get('confidence', 0.0)  # 置信度
-                            }
-                        else:
-                            logger.error(f"情感分析失败: {result.get('desc', '未知错误')}")
-                            return {}
+                async with get_http_session_manager().post(url, headers=headers, data=data) as response:
+                    result = await response.json()
+                    
+                    if result.get('code') == '0':
+                        logger.info("情感分析成功")
+                        return {
+                            'emotion': result.get('emotion', '中性'),  # 情感类型
+                            'confidence': result.get('confidence', 0.0)  # 置信度
+                        }
+                    else:
+                        logger.error(f"情感分析失败: {result.get('desc', '未知错误')}")
+                        self._mark_error_code(outcome, result.get('code'))
+                        return {}
             except Exception as e:
                 logger.error(f"情感分析请求异常: {e}")
+                self._mark_exception(outcome, e)
                 return {}
-            finally:
-                logger.debug(f"情感分析请求完成，释放信号量，当前可用: {self.api_semaphore._value + 1}/{self.max_concurrent_requests}")
             
-    async def chat_spark(self, messages: List[Dict[str, str]], 
-                         temperature: float = 0.5, 
-                         max_tokens: int = 2048) -> Dict[str, any]:
-        """修复鉴权逻辑的星火对话方法"""
-        logger.debug(f"等待信号量，当前可用: {self.api_semaphore._value}/{self.max_concurrent_requests}")
-        async with self.api_semaphore:
-            logger.debug(f"获取到信号量，开始星火对话请求，剩余可用: {self.api_semaphore._value}/{self.max_concurrent_requests}")
-            try:
-                # 1. 基础配置
-                spark_api_url = self.spark_api_url
-                host = "spark-api.xf-yun.com"
-                path = "/v1.1/chat"
-                logger.info(f'星火对话请求开始，使用app_id: {self.spark_app_id[:4]}****')
-                
-                # 构造正确的请求体
-                request_body = {
-                    "header": {
-                        "app_id": self.spark_app_id,
-                        "uid": f"user_{int(time.time())}"  # 生成唯一用户ID
-                    },
-                    "parameter": {
-                        "chat": {
-                            "domain": "lite",  # 关键修正：使用正确的domain
-                            "temperature": temperature,
-                            "max_tokens": max_tokens
-                        }
-                    },
-                    "payload": {
-                        "message": {
-                            "text": [
-                                # 系统角色提示
-                                {"role": "system", "content": "你现在扮演一个专业的面试官,请用面试官的口吻和我说话。"},
-                                # 用户消息（从参数中获取content）
-                                {"role": "user", "content": messages[0]["content"] if messages else "你好"}
-                            ]
-                        }
-                    }
+    @staticmethod
+    def _spark_messages(messages: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """把对话消息转换为星火的消息列表
+        
+        调用方的系统提示词合并到第一条用户消息前面，其余用户和助手消息按顺序保留，
+        不会只发送第一条消息而丢掉后面的用户内容（如待评分的转写文本）。
+        调用方没有系统提示词时使用默认的面试官角色。
+        
+        Args:
+            messages: 对话消息列表
+            
+        Returns:
+            List[Dict[str, str]]: 星火消息列表
+        """
+        system = "\n\n".join(m["content"] for m in messages if m.get("role") == "system" and m.get("content"))
+        turns = [{"role": "assistant" if m.get("role") == "assistant" else "user", "content": m.get("content", "")}
+                 for m in messages if m.get("role") != "system"]
+        if not turns:
+            turns = [{"role": "user", "content": system or "你好"}]
+            system = ""
+        if not system:
+            return [{"role": "system", "content": "你现在扮演一个专业的面试官,请用面试官的口吻和我说话。"}] + turns
+        for turn in turns:
+            if turn["role"] == "user":
+                turn["content"] = f"{system}\n\n{turn['content']}"
+                break
+        else:
+            turns.insert(0, {"role": "user", "content": system})
+        return turns
+    
+    def _build_spark_request(self, messages: List[Dict[str, str]],
+                             temperature: float, max_tokens: int) -> Tuple[str, Dict[str, Any]]:
+        """生成星火对话的鉴权URL和请求体
+        
+        Args:
+            messages: 对话消息列表
+            temperature: 采样温度
+            max_tokens: 最大生成的令牌数量
+            
+        Returns:
+            Tuple[str, Dict[str, Any]]: WebSocket URL和请求体
+        """
+        # 1. 基础配置
+        spark_api_url = self.spark_api_url
+        host = "spark-api.xf-yun.com"
+        path = "/v1.1/chat"
+        
+        # 构造正确的请求体
+        request_body = {
+            "header": {
+                "app_id": self.spark_app_id,
+                "uid": f"user_{int(time.time())}"  # 生成唯一用户ID
+            },
+            "parameter": {
+                "chat": {
+                    "domain": "lite",  # 关键修正：使用正确的domain
+                    "temperature": temperature,
+                    "max_tokens": max_tokens
                 }
-                
-                # 3. 生成标准鉴权参数（关键修复）
-                current_time = format_date_time(time.mktime(datetime.datetime.now().timetuple()))
-                signature_origin = f"host: {host}\ndate: {current_time}\nGET {path} HTTP/1.1"
-                
-                # 4. 计算 HMAC-SHA256 签名
-                signature = base64.b64encode(
-                    hmac.new(
-                        self.spark_api_secret.encode('utf-8'),
-                        signature_origin.encode('utf-8'),
-                        digestmod=hashlib.sha256
-                    ).digest()
-                ).decode()
-                
-                # 5. 构造授权头
-                authorization = base64.b64encode(
-                    f'api_key="{self.spark_api_key}", algorithm="hmac-sha256", '
-                    f'headers="host date request-line", signature="{signature}"'
-                    .encode('utf-8')
-                ).decode()
-                
-                # 6. 拼接完整 URL
-                url_params = {
-                    "authorization": authorization,
-                    "date": current_time,
-                    "host": host
+            },
+            "payload": {
+                "message": {
+                    "text": self._spark_messages(messages)
                 }
-                url = f"{spark_api_url}?{urlencode(url_params)}"
-                
-                # 7. WebSocket 连接（优化错误处理）
-                response = {"status": "error", "content": "", "error": ""}
-                logger.debug(f'星火对话请求体: {json.dumps(request_body, ensure_ascii=False)}')
-                
-                # 用于拼接完整回答内容的变量
-                full_content = ""
-                token_usage = {}
-                
-                async with aiohttp.ClientSession() as session:
-                    try:
-                        async with session.ws_connect(url, timeout=aiohttp.ClientTimeout(total=30)) as ws:
-                            logger.info("WebSocket连接已建立，发送请求数据...")
-                            await ws.send_str(json.dumps(request_body))
-                            
-                            async for msg in ws:
-                                if msg.type == aiohttp.WSMsgType.TEXT:
-                                    result = json.loads(msg.data)
-                                    logger.debug(f"收到响应: {result}")
-                                    
-                                    if result["header"]["code"] == 0:
-                                        # 检查payload和choices是否存在
-                                        if "payload" in result and "choices" in result["payload"]:
-                                            # 获取当前回答片段
-                                            if "text" in result["payload"]["choices"]:
-                                                text_list = result["payload"]["choices"]["text"]
-                                                if text_list and len(text_list) > 0:
-                                                    content_piece = text_list[0].get("content", "")
-                                                    
-                                                    # 拼接内容片段
-                                                    full_content += content_piece
-                                                    logger.debug(f"收到内容片段: 「{content_piece}」")
-                                                    logger.debug(f"当前拼接结果: 「{full_content}」")
-                                        
-                                        # 如果是最后一条消息，完成拼接
-                                        if result["header"]["status"] == 2:
-                                            logger.info("接收到最终响应，内容拼接完成")
-                                            # 记录token使用情况
-                                            if "payload" in result and "usage" in result["payload"]:
-                                                if "text" in result["payload"]["usage"]:
-                                                    token_usage = result["payload"]["usage"]["text"]
-                                                    logger.info(f"Token使用: 提问={token_usage.get('prompt_tokens', 0)}, "
-                                                                f"回答={token_usage.get('completion_tokens', 0)}, "
-                                                                f"总计={token_usage.get('total_tokens', 0)}")
-                                            
-                                            response["status"] = "success"
-                                            response["content"] = full_content
-                                            response["token_usage"] = token_usage
-                                            break
-                                    else:
-                                        error_code = result["header"]["code"]
-                                        error_msg = result["header"]["message"]
-                                        logger.error(f"星火对话错误: Code {error_code}: {error_msg}")
-                                        response["error"] = f"Code {error_code}: {error_msg}"
-                                        break
-                    except aiohttp.ClientError as e:
-                        logger.error(f"WebSocket 连接失败: {str(e)}")
-                        response["error"] = f"WebSocket 连接失败: {str(e)}"
-                    except json.JSONDecodeError:
-                        logger.error("无效的响应格式")
-                        response["error"] = "无效的响应格式"
-                    except Exception as e:
-                        logger.error(f"处理WebSocket响应时发生错误: {str(e)}")
-                        response["error"] = f"处理响应错误: {str(e)}"
-                
-                logger.info(f'星火对话响应状态: {response.get("status")}')
-                logger.info(f'星火对话响应内容: {response.get("content", "")[:50]}...')
-                return response
+            }
+        }
+        
+        # 3. 生成标准鉴权参数（关键修复）
+        current_time = format_date_time(time.mktime(datetime.datetime.now().timetuple()))
+        signature_origin = f"host: {host}\ndate: {current_time}\nGET {path} HTTP/1.1"
+        
+        # 4. 计算 HMAC-SHA256 签名
+        signature = base64.b64encode(
+            hmac.new(
+                self.spark_api_secret.encode('utf-8'),
+                signature_origin.encode('utf-8'),
+                digestmod=hashlib.sha256
+            ).digest()
+        ).decode()
+        
+        # 5. 构造授权头
+        authorization = base64.b64encode(
+            f'api_key="{self.spark_api_key}", algorithm="hmac-sha256", '
+            f'headers="host date request-line", signature="{signature}"'
+            .encode('utf-8')
+        ).decode()
+        
+        # 6. 拼接完整 URL
+        url_params = {
+            "authorization": authorization,
+            "date": current_time,
+            "host": host
+        }
+        return f"{spark_api_url}?{urlencode(url_params)}", request_body
+    
+    async def stream_chat_spark(self, messages: List[Dict[str, str]],
+                                temperature: float = 0.5,
+                                max_tokens: int = 2048,
+                                usage: Optional[Dict[str, Any]] = None,
+                                use_cache: bool = True) -> AsyncIterator[str]:
+        """流式星火对话，WebSocket每收到一个回答片段就立即产出
+        
+        低温度调用经过LLM响应缓存，命中时一次性产出完整回答
+        
+        Args:
+            messages: 对话消息列表
+            temperature: 采样温度
+            max_tokens: 最大生成的令牌数量
+            usage: 可选的字典，对话完成后写入token使用情况
+            use_cache: 是否允许使用缓存
+            
+        Yields:
+            str: 回答片段
+            
+        Raises:
+            SparkChatError: 星火返回错误码或响应在完成前中断
+            aiohttp.ClientError: WebSocket连接失败
+        """
+        cache = get_llm_cache()
+        key = make_cache_key("xunfei", self.spark_api_url, messages, temperature=temperature, max_tokens=max_tokens)
+        async for piece in cache.stream(
+            key, "xunfei",
+            lambda token_usage: self._stream_chat_spark(messages, temperature, max_tokens, token_usage),
+            cacheable=cache.is_cacheable(temperature, use_cache),
+            usage=usage
+        ):
+            yield piece
+    
+    async def _stream_chat_spark(self, messages: List[Dict[str, str]], temperature: float,
+                                 max_tokens: int, usage: Dict[str, Any]) -> AsyncIterator[str]:
+        """发送流式星火对话请求（不经过缓存）"""
+        async with self.limiter.slot("spark") as outcome:
+            logger.info(f'星火对话请求开始，使用app_id: {self.spark_app_id[:4]}****')
+            url, request_body = self._build_spark_request(messages, temperature, max_tokens)
+            logger.debug(f'星火对话请求体: {json.dumps(request_body, ensure_ascii=False)}')
+            
+            try:
+                # 7. WebSocket 连接
+                async with get_http_session_manager().ws_connect(url, timeout=aiohttp.ClientTimeout(total=30)) as ws:
+                    logger.info("WebSocket连接已建立，发送请求数据...")
+                    await ws.send_str(json.dumps(request_body))
+                    
+                    async for msg in ws:
+                        if msg.type != aiohttp.WSMsgType.TEXT:
+                            continue
+                        result = json.loads(msg.data)
+                        logger.debug(f"收到响应: {result}")
+                        
+                        if result["header"]["code"] != 0:
+                            error_code = result["header"]["code"]
+                            error_msg = result["header"]["message"]
+                            logger.error(f"星火对话错误: Code {error_code}: {error_msg}")
+                            self._mark_error_code(outcome, error_code)
+                            raise SparkChatError(f"Code {error_code}: {error_msg}")
+                        
+                        # 获取当前回答片段并立即产出
+                        text_list = result.get("payload", {}).get("choices", {}).get("text", [])
+                        if text_list:
+                            content_piece = text_list[0].get("content", "")
+                            if content_piece:
+                                logger.debug(f"收到内容片段: 「{content_piece}」")
+                                yield content_piece
+                        
+                        # 最后一条消息
+                        if result["header"]["status"] == 2:
+                            logger.info("接收到最终响应，星火对话完成")
+                            token_usage = result.get("payload", {}).get("usage", {}).get("text", {})
+                            if token_usage:
+                                logger.info(f"Token使用: 提问={token_usage.get('prompt_tokens', 0)}, "
+                                            f"回答={token_usage.get('completion_tokens', 0)}, "
+                                            f"总计={token_usage.get('total_tokens', 0)}")
+                            usage.update(token_usage)
+                            return
                 
+                outcome.mark_failed()
+                raise SparkChatError("响应在完成前中断")
+            except SparkChatError:
+                raise
+            except json.JSONDecodeError:
+                outcome.mark_failed()
+                raise
             except Exception as e:
-                logger.error(f"星火对话异常: {str(e)}")
-                return {"status": "error", "content": "", "error": str(e)}
-            finally:
-                logger.debug(f"星火对话请求完成，释放信号量，当前可用: {self.api_semaphore._value + 1}/{self.max_concurrent_requests}")
\ No newline at end of file
+                self._mark_exception(outcome, e)
+                raise
+    
+    async def chat_spark(self, messages: List[Dict[str, str]], 
+                         temperature: float = 0.5, 
+                         max_tokens: int = 2048,
+                         use_cache: bool = True) -> Dict[str, any]:
+        """星火对话，等待完整回答后一次性返回
+        
+        需要边生成边展示时使用 stream_chat_spark
+        
+        Args:
+            messages: 对话消息列表
+            temperature: 采样温度
+            max_tokens: 最大生成的令牌数量
+            use_cache: 是否允许使用缓存
+            
+        Returns:
+            Dict: 包含status、content、token_usage或error的结果
+        """
+        response = {"status": "error", "content": "", "error": ""}
+        pieces = []
+        token_usage = {}
+        try:
+            async for content_piece in self.stream_chat_spark(messages, temperature, max_tokens,
+                                                              usage=token_usage, use_cache=use_cache):
+                pieces.append(content_piece)
+            response["status"] = "success"
+            response["content"] = "".join(pieces)
+            response["token_usage"] = token_usage
+        except SparkChatError as e:
+            response["error"] = str(e)
+        except aiohttp.ClientError as e:
+            logger.error(f"WebSocket 连接失败: {str(e)}")
+            response["error"] = f"WebSocket 连接失败: {str(e)}"
+        except json.JSONDecodeError:
+            logger.error("无效的响应格式")
+            response["error"] = "无效的响应格式"
+        except Exception as e:
+            logger.error(f"星火对话异常: {str(e)}")
+            response["error"] = str(e)
+        
+        logger.info(f'星火对话响应状态: {response.get("status")}')
+        logger.info(f'星火对话响应内容: {response.get("content", "")[:50]}...')
+        return response
@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+共享HTTP/WebSocket会话管理器
+
+进程内所有外部API调用（讯飞、搜索引擎等）共用同一个aiohttp.ClientSession，
+避免每个请求都重新进行DNS解析、TCP握手和TLS握手：
+1. 保活连接池：TCPConnector复用空闲连接，按主机限制连接数
+2. DNS缓存：解析结果在ttl内复用
+3. 生命周期：提供FastAPI启动/关闭和Celery工作进程初始化/退出时调用的钩子
+4. 监控：统计请求数、延迟以及连接池使用率
+
+aiohttp会话绑定到创建它的事件循环，因此每个事件循环各自持有一个会话。
+"""
+
+import os
+import time
+import asyncio
+import logging
+import threading
+import weakref
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Optional
+
+import aiohttp
+
+from ..core.system.config import AgentConfig
+
+logger = logging.getLogger(__name__)
+
+
+class HttpSessionManager:
+    """进程级共享会话管理器"""
+
+    def __init__(self, config: Optional[AgentConfig] = None):
+        """初始化会话管理器
+
+        Args:
+            config: 配置对象，连接池参数读取自 services.http
+        """
+        self.config = config or AgentConfig()
+        self.limit = self.config.get_service_config("http", "limit", 100)
+        self.limit_per_host = self.config.get_service_config("http", "limit_per_host", 20)
+        self.keepalive_timeout = self.config.get_service_config("http", "keepalive_timeout", 30)
+        self.dns_cache_ttl = self.config.get_service_config("http", "dns_cache_ttl", 300)
+        self.connect_timeout = self.config.get_service_config("http", "connect_timeout", 10)
+        self.request_timeout = self.config.get_service_config("http", "request_timeout", 60)
+
+        self._sessions: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, aiohttp.ClientSession]" = \
+            weakref.WeakKeyDictionary()
+        self._lock = threading.Lock()
+        self._pid = os.getpid()
+
+        self.stats = {
+            "sessions_created": 0,
+            "requests": 0,
+            "errors": 0,
+            "in_flight": 0,
+            "total_latency": 0.0,
+            "max_latency": 0.0
+        }
+
+    def _create_session(self) -> aiohttp.ClientSession:
+        """创建绑定到当前事件循环的会话"""
+        connector = aiohttp.TCPConnector(
+            limit=self.limit,
+            limit_per_host=self.limit_per_host,
+            keepalive_timeout=self.keepalive_timeout,
+            use_dns_cache=True,
+            ttl_dns_cache=self.dns_cache_ttl
+        )
+        timeout = aiohttp.ClientTimeout(total=self.request_timeout, connect=self.connect_timeout)
+        self.stats["sessions_created"] += 1
+        logger.info(
+            f"创建共享HTTP会话: limit={self.limit}, limit_per_host={self.limit_per_host}, "
+            f"keepalive={self.keepalive_timeout}s, dns_ttl={self.dns_cache_ttl}s"
+        )
+        return aiohttp.ClientSession(connector=connector, timeout=timeout)
+
+    def get_session(self) -> aiohttp.ClientSession:
+        """获取当前事件循环的共享会话（必须在事件循环中调用）
+
+        Returns:
+            aiohttp.ClientSession: 共享会话，调用方不要关闭
+        """
+        self._check_fork()
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            session = self._sessions.get(loop)
+            if session is None or session.closed:
+                self._discard_stale_sessions()
+                session = self._create_session()
+                self._sessions[loop] = session
+            return session
+
+    def _discard_stale_sessions(self):
+        """丢弃事件循环已关闭的会话（如Celery任务中asyncio.run结束后遗留的会话）"""
+        for loop in [loop for loop in self._sessions.keys() if loop.is_closed()]:
+            self._discard_session(self._sessions.pop(loop))
+
+    @staticmethod
+    def _discard_session(session: aiohttp.ClientSession):
+        """在事件循环已关闭时丢弃会话"""
+        connector = session.connector
+        session.detach()
+        if connector is not None:
+            # 事件循环已关闭，连接无法再使用，只需将连接器标记为关闭
+            connector._close()
+
+    @asynccontextmanager
+    async def request(self, method: str, url: str, **kwargs) -> AsyncIterator[aiohttp.ClientResponse]:
+        """使用共享会话发送HTTP请求
+
+        Args:
+            method: HTTP方法
+            url: 请求URL
+            **kwargs: 传给 aiohttp.ClientSession.request 的参数
+
+        Yields:
+            aiohttp.ClientResponse: 响应对象
+        """
+        session = self.get_session()
+        start_time = time.perf_counter()
+        self.stats["requests"] += 1
+        self.stats["in_flight"] += 1
+        try:
+            async with session.request(method, url, **kwargs) as response:
+                yield response
+        except Exception:
+            self.stats["errors"] += 1
+            raise
+        finally:
+            self.stats["in_flight"] -= 1
+            latency = time.perf_counter() - start_time
+            self.stats["total_latency"] += latency
+            self.stats["max_latency"] = max(self.stats["max_latency"], latency)
+
+    def get(self, url: str, **kwargs):
+        """发送GET请求"""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url: str, **kwargs):
+        """发送POST请求"""
+        return self.request("POST", url, **kwargs)
+
+    def ws_connect(self, url: str, **kwargs):
+        """使用共享会话建立WebSocket连接
+
+        握手复用连接池的DNS缓存；WebSocket连接本身在关闭前独占底层连接
+        """
+        self._check_fork()
+        self.stats["requests"] += 1
+        return self.get_session().ws_connect(url, **kwargs)
+
+    async def close(self):
+        """关闭当前事件循环的共享会话"""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            session = self._sessions.pop(loop, None)
+        if session is not None and not session.closed:
+            await session.close()
+            logger.info("共享HTTP会话已关闭")
+
+    def close_all(self):
+        """关闭所有事件循环的共享会话（在事件循环之外调用，如工作进程退出时）"""
+        with self._lock:
+            sessions = list(self._sessions.items())
+            self._sessions = weakref.WeakKeyDictionary()
+
+        for loop, session in sessions:
+            if session.closed:
+                continue
+            try:
+                if loop.is_closed():
+                    self._discard_session(session)
+                elif loop.is_running():
+                    asyncio.run_coroutine_threadsafe(session.close(), loop).result(timeout=5)
+                else:
+                    loop.run_until_complete(session.close())
+            except Exception as e:
+                logger.warning(f"关闭共享HTTP会话失败: {e}")
+
+    def reset_after_fork(self):
+        """fork之后在子进程中调用，丢弃从父进程继承的会话（不关闭父进程的连接）"""
+        self._lock = threading.Lock()
+        self._sessions = weakref.WeakKeyDictionary()
+        self._pid = os.getpid()
+
+    def _check_fork(self):
+        if os.getpid() != self._pid:
+            self.reset_after_fork()
+
+    def get_pool_stats(self) -> Dict[str, Any]:
+        """获取连接池使用情况
+
+        Returns:
+            Dict[str, Any]: 使用中/空闲连接数、使用率及按主机统计的使用中连接数
+        """
+        in_use = 0
+        idle = 0
+        per_host: Dict[str, int] = {}
+        with self._lock:
+            sessions = [session for session in self._sessions.values() if not session.closed]
+
+        for session in sessions:
+            connector = session.connector
+            if connector is None:
+                continue
+            in_use += len(getattr(connector, "_acquired", ()))
+            idle += sum(len(conns) for conns in getattr(connector, "_conns", {}).values())
+            for key, protos in getattr(connector, "_acquired_per_host", {}).items():
+                host = f"{key.host}:{key.port}"
+                per_host[host] = per_host.get(host, 0) + len(protos)
+
+        capacity = self.limit * max(1, len(sessions))
+        return {
+            "sessions": len(sessions),
+            "limit": self.limit,
+            "limit_per_host": self.limit_per_host,
+            "in_use": in_use,
+            "idle": idle,
+            "utilization": in_use / capacity if self.limit else 0.0,
+            "in_use_per_host": per_host
+        }
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        requests = self.stats["requests"]
+        return {
+            **self.stats,
+            "avg_latency": self.stats["total_latency"] / requests if requests else 0.0,
+            "pool": self.get_pool_stats()
+        }
+
+
+# 全局会话管理器实例
+_session_manager: Optional[HttpSessionManager] = None
+
+
+def get_http_session_manager() -> HttpSessionManager:
+    """获取全局会话管理器实例"""
+    global _session_manager
+    if _session_manager is None:
+        _session_manager = HttpSessionManager()
+    return _session_manager
+
+
+def init_http_session_manager(config: Optional[AgentConfig] = None) -> HttpSessionManager:
+    """使用指定配置初始化全局会话管理器"""
+    global _session_manager
+    _session_manager = HttpSessionManager(config)
+    return _session_manager
+
+
+async def startup_http_sessions(config: Optional[AgentConfig] = None) -> HttpSessionManager:
+    """FastAPI启动钩子：在应用事件循环中预先创建共享会话
+
+    Args:
+        config: 配置对象，为None时沿用已有的全局管理器
+
+    Returns:
+        HttpSessionManager: 全局会话管理器
+    """
+    manager = init_http_session_manager(config) if config is not None else get_http_session_manager()
+    manager.get_session()
+    return manager
+
+
+async def shutdown_http_sessions():
+    """FastAPI关闭钩子：关闭当前事件循环的共享会话"""
+    if _session_manager is not None:
+        await _session_manager.close()
+
+
+def reset_http_sessions_after_fork():
+    """Celery工作进程初始化钩子：丢弃继承自父进程的会话"""
+    if _session_manager is not None:
+        _session_manager.reset_after_fork()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_http_sessions_after_fork)
@@ -0,0 +1,270 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+LLM响应缓存
+
+内容、语音、视觉评分的提示词由固定模板生成，并以低温度调用大模型，同一回答
+重复评分时请求完全相同。缓存以“提供方 + 模型 + 消息 + 采样参数”的指纹为键：
+1. 存储后端可插拔：复用缓存系统的 MemoryCache / FileCache，或任何实现 get/set/clear 的对象
+2. 只缓存成功响应；温度高于阈值的调用（如题目生成）需要多样性，不缓存
+3. 单次调用可通过 use_cache=False 绕过缓存
+4. 统计命中率以及节省的延迟、token和费用
+"""
+
+import time
+import json
+import copy
+import hashlib
+import logging
+import threading
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+from ..core.system.config import AgentConfig
+from ..core.system.cache_system import FileCache, MemoryCache
+
+logger = logging.getLogger(__name__)
+
+# 缓存条目格式版本，条目结构变化时递增以避免读到旧格式
+CACHE_KEY_VERSION = 1
+
+
+def make_cache_key(provider: str, model: str, messages: List[Dict[str, Any]], **params) -> str:
+    """生成LLM调用的指纹
+
+    Args:
+        provider: 提供方名称
+        model: 模型名称或端点
+        messages: 对话消息
+        **params: 影响输出的采样参数（temperature、max_tokens、functions等）
+
+    Returns:
+        str: sha256指纹
+    """
+    payload = {
+        "v": CACHE_KEY_VERSION,
+        "provider": provider,
+        "model": model,
+        "messages": messages,
+        "params": {key: value for key, value in params.items() if value is not None}
+    }
+    canonical = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class LLMResponseCache:
+    """LLM响应缓存"""
+
+    def __init__(self, config: Optional[AgentConfig] = None, backend: Any = None):
+        """初始化LLM响应缓存
+
+        Args:
+            config: 配置对象，参数读取自 services.llm_cache
+            backend: 存储后端，为None时按配置创建 MemoryCache 或 FileCache
+        """
+        self.config = config or AgentConfig()
+        self.enabled = self.config.get_service_config("llm_cache", "enabled", True)
+        self.ttl = self.config.get_service_config("llm_cache", "ttl", 7 * 24 * 3600)
+        self.max_temperature = self.config.get_service_config("llm_cache", "max_temperature", 0.5)
+        self.cost_per_1k_tokens: Dict[str, float] = self.config.get_service_config(
+            "llm_cache", "cost_per_1k_tokens", {}) or {}
+        self.backend = backend if backend is not None else self._create_backend()
+
+        self._lock = threading.Lock()
+        self.stats = {
+            "hits": 0,
+            "misses": 0,
+            "stores": 0,
+            "bypassed": 0,
+            "latency_saved": 0.0,
+            "tokens_saved": 0,
+            "cost_saved": 0.0
+        }
+
+    def _create_backend(self):
+        backend_type = self.config.get_service_config("llm_cache", "backend", "memory")
+        if backend_type == "file":
+            return FileCache(
+                cache_dir=self.config.get_service_config("llm_cache", "cache_dir", "./cache/llm"),
+                max_files=self.config.get_service_config("llm_cache", "max_entries", 5000),
+                default_ttl=self.ttl
+            )
+        return MemoryCache(
+            max_size=self.config.get_service_config("llm_cache", "max_entries", 5000),
+            default_ttl=self.ttl
+        )
+
+    def is_cacheable(self, temperature: Optional[float] = None, use_cache: bool = True) -> bool:
+        """判断本次调用是否走缓存
+
+        Args:
+            temperature: 采样温度
+            use_cache: 调用方是否允许使用缓存
+
+        Returns:
+            bool: 是否走缓存
+        """
+        if not self.enabled or not use_cache:
+            return False
+        return temperature is None or temperature <= self.max_temperature
+
+    def lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        """查询缓存，命中时累计节省的延迟、token和费用
+
+        Args:
+            key: 调用指纹
+
+        Returns:
+            Optional[Dict[str, Any]]: 缓存的响应副本（带 cached=True），未命中时为None
+        """
+        entry = self.backend.get(key)
+        with self._lock:
+            if entry is None:
+                self.stats["misses"] += 1
+                return None
+            self.stats["hits"] += 1
+            self.stats["latency_saved"] += entry.get("latency", 0.0)
+            self.stats["tokens_saved"] += entry.get("tokens", 0)
+            self.stats["cost_saved"] += entry.get("tokens", 0) / 1000.0 * \
+                self.cost_per_1k_tokens.get(entry.get("provider"), 0.0)
+
+        response = copy.deepcopy(entry["response"])
+        response["cached"] = True
+        return response
+
+    def store(self, key: str, provider: str, response: Dict[str, Any], latency: float) -> bool:
+        """写入成功的响应
+
+        Args:
+            key: 调用指纹
+            provider: 提供方名称
+            response: 响应结果
+            latency: 本次调用耗时（秒），命中时计入节省的延迟
+
+        Returns:
+            bool: 是否写入
+        """
+        if response.get("status") != "success":
+            return False
+        usage = response.get("usage") or response.get("token_usage") or {}
+        entry = {
+            "provider": provider,
+            "response": copy.deepcopy(response),
+            "latency": latency,
+            "tokens": int(usage.get("total_tokens", 0) or 0),
+            "created_at": time.time()
+        }
+        stored = self.backend.set(key, entry, self.ttl)
+        if stored:
+            with self._lock:
+                self.stats["stores"] += 1
+        return stored
+
+    async def get_or_call(self, key: str, provider: str, call: Callable[[], Awaitable[Dict[str, Any]]],
+                          cacheable: bool = True) -> Dict[str, Any]:
+        """命中缓存时直接返回，否则调用接口并缓存成功结果
+
+        Args:
+            key: 调用指纹
+            provider: 提供方名称
+            call: 实际发起请求的协程函数
+            cacheable: 本次调用是否走缓存
+
+        Returns:
+            Dict[str, Any]: 响应结果
+        """
+        if not cacheable:
+            self._record_bypass()
+            return await call()
+
+        cached = self.lookup(key)
+        if cached is not None:
+            logger.debug(f"LLM缓存命中: {provider} {key[:12]}")
+            return cached
+
+        start_time = time.perf_counter()
+        response = await call()
+        self.store(key, provider, response, time.perf_counter() - start_time)
+        return response
+
+    async def stream(self, key: str, provider: str,
+                     open_stream: Callable[[Dict[str, Any]], AsyncIterator[str]],
+                     cacheable: bool = True, usage: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """流式调用的缓存：命中时一次性产出完整内容，未命中时边转发边收集，完整结束后写入
+
+        与非流式调用共用指纹，流式评分的结果可被后续的非流式调用复用，反之亦然
+
+        Args:
+            key: 调用指纹
+            provider: 提供方名称
+            open_stream: 接收usage字典、返回文本片段迭代器的函数
+            cacheable: 本次调用是否走缓存
+            usage: 可选的字典，结束后写入token使用情况
+
+        Yields:
+            str: 文本片段
+        """
+        token_usage: Dict[str, Any] = {}
+        if not cacheable:
+            self._record_bypass()
+            async for piece in open_stream(token_usage):
+                yield piece
+            if usage is not None:
+                usage.update(token_usage)
+            return
+
+        cached = self.lookup(key)
+        if cached is not None:
+            if usage is not None:
+                usage.update(cached.get("token_usage") or cached.get("usage") or {})
+            if cached.get("content"):
+                yield cached["content"]
+            return
+
+        start_time = time.perf_counter()
+        pieces = []
+        async for piece in open_stream(token_usage):
+            pieces.append(piece)
+            yield piece
+        if usage is not None:
+            usage.update(token_usage)
+        # 调用方提前关闭或出错时不会执行到这里，不完整的回答不会被缓存
+        response = {"status": "success", "content": "".join(pieces), "token_usage": token_usage}
+        self.store(key, provider, response, time.perf_counter() - start_time)
+
+    def _record_bypass(self):
+        with self._lock:
+            self.stats["bypassed"] += 1
+
+    def clear(self):
+        """清空缓存"""
+        self.backend.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        with self._lock:
+            lookups = self.stats["hits"] + self.stats["misses"]
+            return {
+                **self.stats,
+                "enabled": self.enabled,
+                "hit_rate": self.stats["hits"] / lookups if lookups else 0.0,
+                "backend": type(self.backend).__name__
+            }
+
+
+# 全局LLM响应缓存实例
+_llm_cache: Optional[LLMResponseCache] = None
+
+
+def get_llm_cache() -> LLMResponseCache:
+    """获取全局LLM响应缓存"""
+    global _llm_cache
+    if _llm_cache is None:
+        _llm_cache = LLMResponseCache()
+    return _llm_cache
+
+
+def init_llm_cache(config: Optional[AgentConfig] = None, backend: Any = None) -> LLMResponseCache:
+    """使用指定配置或后端初始化全局LLM响应缓存"""
+    global _llm_cache
+    _llm_cache = LLMResponseCache(config, backend)
+    return _llm_cache
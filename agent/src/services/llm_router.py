@@ -0,0 +1,455 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+多提供方LLM路由
+
+内容分析默认调用OpenAI兼容接口，语音和视觉分析默认调用星火，任何一方变慢时
+所有分析都要等到超时。路由器在已配置的提供方之间选择并容错：
+1. 健康度：按提供方统计延迟和错误率的指数加权移动平均（EWMA），进程内共享
+2. 选择：优先选择加权延迟最低的健康提供方，尚无统计时使用调用方偏好的提供方
+3. 对冲：首选提供方超过其p95延迟仍未返回时，向次优提供方发出第二个请求，先成功者胜出，
+   另一个请求被取消；对冲次数受比例预算限制，避免放大上游负载
+4. 容错：请求失败时立即切换到下一个提供方；流式调用只在产出第一个片段之前切换
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import deque
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional
+
+from ..core.system.config import AgentConfig
+from ..core.system.resource_registry import config_fingerprint, get_resource_registry
+
+logger = logging.getLogger(__name__)
+
+ROUTER_DEFAULTS = {
+    "enabled": True,
+    "providers": ["openai", "xunfei"],  # 参与路由的提供方，未配置凭据的提供方会被跳过
+    "hedge": True,
+    "hedge_percentile": 95,  # 首选提供方超过该分位延迟仍未返回时发出对冲请求
+    "hedge_min_delay": 0.2,  # 对冲等待的下限（秒）
+    "default_hedge_delay": 3.0,  # 样本不足时的对冲等待（秒）
+    "max_hedge_ratio": 0.2,  # 对冲请求占总请求的最大比例
+    "ewma_alpha": 0.2,
+    "min_samples": 10,  # 计算分位延迟所需的最少样本数
+    "unhealthy_error_rate": 0.5,  # 错误率EWMA超过该值视为不健康，排到最后
+    "error_penalty": 4.0  # 选择时按 延迟 * (1 + error_penalty * 错误率) 加权
+}
+
+
+class LLMRouterError(RuntimeError):
+    """所有提供方均调用失败"""
+
+
+class ProviderHealth:
+    """单个提供方的延迟与错误率统计"""
+
+    def __init__(self, name: str, alpha: float = 0.2, window: int = 200):
+        """初始化健康度统计
+
+        Args:
+            name: 提供方名称
+            alpha: EWMA平滑系数
+            window: 保留用于计算分位延迟的样本数
+        """
+        self.name = name
+        self.alpha = alpha
+        self.latency_ewma: Optional[float] = None
+        self.error_ewma = 0.0
+        self.latencies = deque(maxlen=window)
+        self.successes = 0
+        self.failures = 0
+        self._lock = threading.Lock()
+
+    def record_success(self, latency: float):
+        """记录一次成功调用"""
+        with self._lock:
+            self.successes += 1
+            self.latencies.append(latency)
+            self._update_latency(latency)
+            self.error_ewma = (1 - self.alpha) * self.error_ewma
+
+    def record_failure(self, latency: float):
+        """记录一次失败调用"""
+        with self._lock:
+            self.failures += 1
+            self._update_latency(latency)
+            self.error_ewma = (1 - self.alpha) * self.error_ewma + self.alpha
+
+    def record_abandoned(self, elapsed: float):
+        """记录被对冲请求取代而取消的调用
+
+        真实延迟至少为已等待的时间，只在高于当前估计时更新，避免慢的提供方一直被首选；
+        没有估计时下限不足以说明快慢，不做记录
+        """
+        with self._lock:
+            if self.latency_ewma is not None and elapsed > self.latency_ewma:
+                self._update_latency(elapsed)
+
+    def _update_latency(self, latency: float):
+        if self.latency_ewma is None:
+            self.latency_ewma = latency
+        else:
+            self.latency_ewma = (1 - self.alpha) * self.latency_ewma + self.alpha * latency
+
+    def percentile(self, percent: float, min_samples: int = 10) -> Optional[float]:
+        """成功调用延迟的分位数，样本不足时返回None"""
+        with self._lock:
+            if len(self.latencies) < min_samples:
+                return None
+            ordered = sorted(self.latencies)
+        index = min(len(ordered) - 1, int(round(percent / 100.0 * (len(ordered) - 1))))
+        return ordered[index]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        with self._lock:
+            return {
+                "latency_ewma": self.latency_ewma,
+                "error_ewma": self.error_ewma,
+                "successes": self.successes,
+                "failures": self.failures,
+                "samples": len(self.latencies)
+            }
+
+
+# 全局提供方健康度，同一进程内所有路由器共享
+_provider_health: Dict[str, ProviderHealth] = {}
+_provider_health_lock = threading.Lock()
+
+
+def get_provider_health(name: str, alpha: float = 0.2) -> ProviderHealth:
+    """获取指定提供方的全局健康度统计"""
+    with _provider_health_lock:
+        health = _provider_health.get(name)
+        if health is None:
+            health = ProviderHealth(name, alpha)
+            _provider_health[name] = health
+        return health
+
+
+def reset_provider_health():
+    """清空全局健康度统计（主要用于测试）"""
+    with _provider_health_lock:
+        _provider_health.clear()
+
+
+class LLMProvider(ABC):
+    """提供方适配器基类
+
+    服务实例通过resolve在调用时获取，分析器替换服务实例后立即生效
+    """
+
+    name = "base"
+
+    def __init__(self, resolve: Callable[[], Any]):
+        self.resolve = resolve
+
+    @abstractmethod
+    async def chat(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int) -> Dict[str, Any]:
+        """非流式对话，返回包含status、content的结果"""
+        pass
+
+    @abstractmethod
+    def stream(self, messages: List[Dict[str, str]], temperature: float, max_tokens: int,
+               usage: Dict[str, Any]) -> AsyncIterator[str]:
+        """流式对话，逐个产出文本片段，失败时抛出异常"""
+        pass
+
+
+class OpenAIProvider(LLMProvider):
+    """OpenAI兼容接口（含ModelScope推理服务）"""
+
+    name = "openai"
+
+    async def chat(self, messages, temperature, max_tokens):
+        return await self.resolve().chat_completion(
+            messages=messages, temperature=temperature, max_tokens=max_tokens)
+
+    def stream(self, messages, temperature, max_tokens, usage):
+        return self.resolve().stream_chat_completion(
+            messages=messages, temperature=temperature, max_tokens=max_tokens)
+
+
+class SparkProvider(LLMProvider):
+    """讯飞星火"""
+
+    name = "xunfei"
+
+    async def chat(self, messages, temperature, max_tokens):
+        return await self.resolve().chat_spark(
+            messages=messages, temperature=temperature, max_tokens=max_tokens)
+
+    def stream(self, messages, temperature, max_tokens, usage):
+        return self.resolve().stream_chat_spark(
+            messages, temperature=temperature, max_tokens=max_tokens, usage=usage)
+
+
+class LLMRouter:
+    """按延迟和错误率在多个提供方之间路由，支持对冲请求"""
+
+    def __init__(self, providers: List[LLMProvider], config: Optional[AgentConfig] = None,
+                 preferred: Optional[str] = None, **overrides):
+        """初始化路由器
+
+        Args:
+            providers: 提供方适配器列表
+            config: 配置对象，参数读取自 services.llm_router
+            preferred: 尚无统计时优先使用的提供方
+            **overrides: 覆盖配置中的参数
+        """
+        self.config = config or AgentConfig()
+        settings = dict(ROUTER_DEFAULTS)
+        settings.update(self.config.get_section("services").get("llm_router", {}) or {})
+        settings.update(overrides)
+        self.settings = settings
+
+        self.providers = list(providers)
+        self.preferred = preferred
+        self.health = {p.name: get_provider_health(p.name, settings["ewma_alpha"]) for p in self.providers}
+
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "hedged": 0, "hedge_wins": 0, "failovers": 0, "failures": 0}
+
+    def rank(self) -> List[LLMProvider]:
+        """按加权延迟排序，健康的提供方在前；没有延迟统计的提供方排在有统计的之后，偏好的提供方优先"""
+        threshold = self.settings["unhealthy_error_rate"]
+        penalty = self.settings["error_penalty"]
+
+        def sort_key(indexed):
+            index, provider = indexed
+            health = self.health[provider.name]
+            unhealthy = health.error_ewma >= threshold
+            if health.latency_ewma is None:
+                weighted = float("inf")
+            else:
+                weighted = health.latency_ewma * (1 + penalty * health.error_ewma)
+            return (unhealthy, weighted, provider.name != self.preferred, index)
+
+        return [provider for _, provider in sorted(enumerate(self.providers), key=sort_key)]
+
+    def _hedge_delay(self, provider: LLMProvider) -> Optional[float]:
+        """首选提供方的对冲等待时间，不对冲时返回None"""
+        if not self.settings["hedge"] or len(self.providers) < 2:
+            return None
+        with self._lock:
+            if self.stats["hedged"] >= self.settings["max_hedge_ratio"] * self.stats["requests"]:
+                return None
+        percentile = self.health[provider.name].percentile(
+            self.settings["hedge_percentile"], self.settings["min_samples"])
+        if percentile is None:
+            return self.settings["default_hedge_delay"]
+        return max(self.settings["hedge_min_delay"], percentile)
+
+    async def _timed_chat(self, provider: LLMProvider, messages, temperature, max_tokens) -> Dict[str, Any]:
+        health = self.health[provider.name]
+        start = time.perf_counter()
+        try:
+            response = await provider.chat(messages, temperature, max_tokens)
+        except asyncio.CancelledError:
+            health.record_abandoned(time.perf_counter() - start)
+            raise
+        except Exception as e:
+            logger.warning(f"LLM提供方 {provider.name} 调用异常: {e}")
+            response = {"status": "error", "content": "", "error": str(e)}
+
+        latency = time.perf_counter() - start
+        if response.get("status") == "success":
+            # 缓存命中不反映提供方的真实延迟
+            if not response.get("cached"):
+                health.record_success(latency)
+        else:
+            health.record_failure(latency)
+        return response
+
+    def _record(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    async def chat(self, messages: List[Dict[str, str]], temperature: float = 0.3,
+                   max_tokens: int = 2000) -> Dict[str, Any]:
+        """路由一次非流式对话
+
+        Args:
+            messages: 对话消息
+            temperature: 采样温度
+            max_tokens: 最大生成的令牌数量
+
+        Returns:
+            Dict[str, Any]: 首个成功的响应（带 provider 字段），全部失败时返回最后的错误
+        """
+        candidates = self.rank()
+        if not candidates:
+            return {"status": "error", "content": "", "error": "没有可用的LLM提供方"}
+
+        self._record("requests")
+        primary = candidates[0]
+        hedge_delay = self._hedge_delay(primary)
+        pending: Dict[asyncio.Task, LLMProvider] = {}
+        errors = []
+        next_index = 0
+        hedged = False
+
+        def launch():
+            nonlocal next_index
+            provider = candidates[next_index]
+            next_index += 1
+            task = asyncio.ensure_future(self._timed_chat(provider, messages, temperature, max_tokens))
+            pending[task] = provider
+
+        launch()
+        try:
+            while pending:
+                can_hedge = hedge_delay is not None and not hedged and next_index < len(candidates)
+                done, _ = await asyncio.wait(
+                    pending, timeout=hedge_delay if can_hedge else None,
+                    return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    hedged = True
+                    self._record("hedged")
+                    logger.info(f"{primary.name} 超过 {hedge_delay:.2f}s 未返回，向 {candidates[next_index].name} 发出对冲请求")
+                    launch()
+                    continue
+
+                for task in done:
+                    provider = pending.pop(task)
+                    response = task.result()
+                    if response.get("status") == "success":
+                        if provider is not primary:
+                            self._record("hedge_wins" if hedged else "failovers")
+                        response["provider"] = provider.name
+                        return response
+                    errors.append(f"{provider.name}: {response.get('error', '未知错误')}")
+
+                if not pending and next_index < len(candidates):
+                    logger.warning(f"LLM调用失败，切换到 {candidates[next_index].name}")
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+        self._record("failures")
+        return {"status": "error", "content": "", "error": "; ".join(errors)}
+
+    async def stream(self, messages: List[Dict[str, str]], temperature: float = 0.3, max_tokens: int = 2000,
+                     usage: Optional[Dict[str, Any]] = None) -> AsyncIterator[str]:
+        """路由一次流式对话，首个片段产出之前失败时切换提供方
+
+        已经推送给客户端的片段无法撤回，因此流式调用不做对冲，开始输出后的失败直接抛出
+
+        Args:
+            messages: 对话消息
+            temperature: 采样温度
+            max_tokens: 最大生成的令牌数量
+            usage: 可选的字典，结束后写入token使用情况
+
+        Yields:
+            str: 文本片段
+
+        Raises:
+            LLMRouterError: 所有提供方均在输出前失败
+        """
+        candidates = self.rank()
+        self._record("requests")
+        errors = []
+        for provider in candidates:
+            health = self.health[provider.name]
+            token_usage: Dict[str, Any] = {}
+            started = False
+            start = time.perf_counter()
+            try:
+                async for piece in provider.stream(messages, temperature, max_tokens, token_usage):
+                    if not started:
+                        started = True
+                        # 流式调用以首个片段的延迟衡量提供方的响应速度
+                        health.record_success(time.perf_counter() - start)
+                    yield piece
+            except (GeneratorExit, asyncio.CancelledError):
+                raise
+            except Exception as e:
+                if started:
+                    raise
+                health.record_failure(time.perf_counter() - start)
+                errors.append(f"{provider.name}: {e}")
+                logger.warning(f"LLM提供方 {provider.name} 流式调用失败: {e}")
+                continue
+
+            if provider is not candidates[0]:
+                self._record("failovers")
+            if usage is not None:
+                usage.update(token_usage)
+            return
+
+        self._record("failures")
+        raise LLMRouterError("; ".join(errors) or "没有可用的LLM提供方")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取路由统计和各提供方的健康度"""
+        with self._lock:
+            stats = dict(self.stats)
+        stats["providers"] = {name: health.get_stats() for name, health in self.health.items()}
+        stats["order"] = [provider.name for provider in self.rank()]
+        return stats
+
+
+def build_llm_router(config: Optional[AgentConfig] = None, preferred: str = "openai",
+                     openai_service: Any = None, xunfei_service: Any = None,
+                     resolve_openai: Optional[Callable[[], Any]] = None,
+                     resolve_xunfei: Optional[Callable[[], Any]] = None) -> LLMRouter:
+    """为分析器创建路由器
+
+    调用方已持有的服务直接加入；其余提供方只有在配置了凭据时才从进程级资源注册表获取，
+    与其他分析器共享同一个服务实例。路由关闭时只保留偏好的提供方，行为与直接调用该服务一致
+
+    Args:
+        config: 配置对象
+        preferred: 偏好的提供方（"openai"或"xunfei"）
+        openai_service: 已有的OpenAI服务实例
+        xunfei_service: 已有的星火服务实例
+        resolve_openai: 调用时获取OpenAI服务的函数，优先于openai_service
+        resolve_xunfei: 调用时获取星火服务的函数，优先于xunfei_service
+
+    Returns:
+        LLMRouter: 路由器
+    """
+    config = config or AgentConfig()
+    settings = dict(ROUTER_DEFAULTS)
+    settings.update(config.get_section("services").get("llm_router", {}) or {})
+    names = list(settings["providers"]) if settings["enabled"] else [preferred]
+
+    registry = get_resource_registry()
+    services_fingerprint = config_fingerprint(config.get_section("services"))
+    providers: List[LLMProvider] = []
+    for name in names:
+        if name == "openai":
+            if resolve_openai is None and openai_service is None and config.get_service_config("openai", "api_key"):
+                from .openai_service import OpenAIService
+                openai_service = registry.acquire(
+                    ("llm.openai_service", OpenAIService, services_fingerprint),
+                    lambda: OpenAIService(config)
+                )
+            if resolve_openai is not None or openai_service is not None:
+                providers.append(OpenAIProvider(resolve_openai or (lambda service=openai_service: service)))
+        elif name == "xunfei":
+            if resolve_xunfei is None and xunfei_service is None and all(
+                    config.get_service_config("xunfei", key) for key in
+                    ("spark_app_id", "spark_api_key", "spark_api_secret")):
+                from .async_xunfei_service import AsyncXunFeiService
+                # 与语音分析器使用同一个注册名，整个进程只有一个星火客户端
+                xunfei_service = registry.acquire(
+                    ("speech.async_xunfei_service", AsyncXunFeiService, services_fingerprint),
+                    lambda: AsyncXunFeiService(config)
+                )
+            if resolve_xunfei is not None or xunfei_service is not None:
+                providers.append(SparkProvider(resolve_xunfei or (lambda service=xunfei_service: service)))
+        else:
+            logger.warning(f"未知的LLM提供方: {name}")
+
+    logger.info(f"LLM路由器提供方: {[p.name for p in providers]}，偏好: {preferred}")
+    return LLMRouter(providers, config, preferred)
@@ -8,6 +8,7 @@ from concurrent.futures import ThreadPoolExecutor
 import time
 
 from ..core.system.config import AgentConfig
+from .adaptive_limiter import get_provider_limiter
 
 logger = logging.getLogger(__name__)
 
@@ -32,6 +33,9 @@ class ModelScopeService:
         # 线程池用于并行处理
         self.executor = ThreadPoolExecutor(max_workers=self.max_workers)
         
+        # 本地推理同样按延迟自适应限流，避免排队请求把线程池和显存占满
+        self.limiter = get_provider_limiter("modelscope", self.config)
+        
         # 初始化模型字典
         self._models = {}
         self._pipelines = {}
@@ -114,10 +118,13 @@ class ModelScopeService:
             loop = asyncio.get_event_loop()
             start_time = time.time()
             
-            result = await loop.run_in_executor(
-                self.executor,
-                lambda: self._run_pipeline_sync(task, model_id, inputs, **kwargs)
-            )
+            async with self.limiter.slot(task) as outcome:
+                result = await loop.run_in_executor(
+                    self.executor,
+                    lambda: self._run_pipeline_sync(task, model_id, inputs, **kwargs)
+                )
+                if result.get("status") == "error":
+                    outcome.mark_failed()
             
             elapsed = time.time() - start_time
             logger.info(f"管道运行完成: {task}, 用时: {elapsed:.2f}s")
@@ -1,11 +1,13 @@
 # agent/services/openai_service.py
 
-from typing import Dict, List, Optional, Any, Union
+from typing import AsyncIterator, Dict, List, Optional, Any, Union
 import logging
 import json
 import asyncio
 from openai import AsyncOpenAI
 from ..core.system.config import AgentConfig
+from .adaptive_limiter import get_provider_limiter
+from .llm_cache import get_llm_cache, make_cache_key
 
 logger = logging.getLogger(__name__)
 
@@ -34,6 +36,9 @@ class OpenAIService:
             base_url=self.api_base
         )
         
+        # 同一进程内所有OpenAI兼容服务实例共享自适应并发上限和速率限制
+        self.limiter = get_provider_limiter("openai", self.config)
+        
         # 检查必要的配置是否存在
         if not self.api_key:
             logger.warning("OpenAI API配置不完整，某些功能可能无法正常工作")
@@ -43,19 +48,42 @@ class OpenAIService:
                              model: Optional[str] = None, 
                              temperature: float = 0.7,
                              max_tokens: int = 1000,
-                             stream: bool = False) -> Dict[str, Any]:
+                             stream: bool = False,
+                             use_cache: bool = True) -> Dict[str, Any]:
         """异步获取聊天完成结果
         
+        低温度的非流式调用经过LLM响应缓存，相同请求不再访问网络
+        
         Args:
             messages: 对话历史消息列表
             model: 模型名称，如果为None则使用默认模型
             temperature: 采样温度
             max_tokens: 最大生成的令牌数量
             stream: 是否使用流式响应
+            use_cache: 是否允许使用缓存
             
         Returns:
-            Dict: 完成结果
+            Dict: 完成结果，命中缓存时带 cached=True
         """
+        if stream:
+            return await self._chat_completion(messages, model, temperature, max_tokens, stream=True)
+        
+        model_name = model or self.default_model
+        cache = get_llm_cache()
+        key = make_cache_key("openai", model_name, messages, temperature=temperature, max_tokens=max_tokens)
+        return await cache.get_or_call(
+            key, "openai",
+            lambda: self._chat_completion(messages, model_name, temperature, max_tokens),
+            cacheable=cache.is_cacheable(temperature, use_cache)
+        )
+    
+    async def _chat_completion(self,
+                               messages: List[Dict[str, str]],
+                               model: Optional[str],
+                               temperature: float,
+                               max_tokens: int,
+                               stream: bool = False) -> Dict[str, Any]:
+        """发送聊天完成请求（不经过缓存）"""
         try:
             # 使用提供的模型或默认模型
             model_name = model or self.default_model
@@ -63,13 +91,14 @@ class OpenAIService:
             logger.info(f"请求OpenAI API, 模型: {model_name}, 温度: {temperature}, 最大token: {max_tokens}")
             
             # 发送请求
-            response = await self.client.chat.completions.create(
-                model=model_name,
-                messages=messages,
-                temperature=temperature,
-                max_tokens=max_tokens,
-                stream=stream
-            )
+            async with self.limiter.slot("chat"):
+                response = await self.client.chat.completions.create(
+                    model=model_name,
+                    messages=messages,
+                    temperature=temperature,
+                    max_tokens=max_tokens,
+                    stream=stream
+                )
             
             # 处理流式响应
             if stream:
@@ -106,6 +135,54 @@ class OpenAIService:
                 "error": str(e)
             }
     
+    async def stream_chat_completion(self,
+                                     messages: List[Dict[str, str]],
+                                     model: Optional[str] = None,
+                                     temperature: float = 0.7,
+                                     max_tokens: int = 1000,
+                                     use_cache: bool = True) -> AsyncIterator[str]:
+        """流式获取聊天完成结果，逐个产出模型返回的文本片段
+        
+        并发名额在整个流式响应期间保持占用；请求失败时抛出异常，由调用方决定回退方式。
+        命中缓存时一次性产出完整内容
+        
+        Args:
+            messages: 对话历史消息列表
+            model: 模型名称，如果为None则使用默认模型
+            temperature: 采样温度
+            max_tokens: 最大生成的令牌数量
+            use_cache: 是否允许使用缓存
+            
+        Yields:
+            str: 文本片段
+        """
+        model_name = model or self.default_model
+        cache = get_llm_cache()
+        key = make_cache_key("openai", model_name, messages, temperature=temperature, max_tokens=max_tokens)
+        async for piece in cache.stream(
+            key, "openai",
+            lambda usage: self._stream_chat_completion(messages, model_name, temperature, max_tokens),
+            cacheable=cache.is_cacheable(temperature, use_cache)
+        ):
+            yield piece
+    
+    async def _stream_chat_completion(self, messages: List[Dict[str, str]], model_name: str,
+                                      temperature: float, max_tokens: int) -> AsyncIterator[str]:
+        """发送流式聊天完成请求（不经过缓存）"""
+        logger.info(f"请求OpenAI流式API, 模型: {model_name}, 温度: {temperature}, 最大token: {max_tokens}")
+        
+        async with self.limiter.slot("chat"):
+            response = await self.client.chat.completions.create(
+                model=model_name,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens,
+                stream=True
+            )
+            async for chunk in response:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+    
     async def _handle_streaming_response(self, response):
         """处理流式响应
         
@@ -152,13 +229,14 @@ class OpenAIService:
             logger.info(f"请求OpenAI API函数调用, 模型: {model_name}, 函数数量: {len(functions)}")
             
             # 发送请求
-            response = await self.client.chat.completions.create(
-                model=model_name,
-                messages=messages,
-                functions=functions,
-                function_call="auto",
-                temperature=temperature
-            )
+            async with self.limiter.slot("chat"):
+                response = await self.client.chat.completions.create(
+                    model=model_name,
+                    messages=messages,
+                    functions=functions,
+                    function_call="auto",
+                    temperature=temperature
+                )
             
             # 解析响应
             if response.choices and len(response.choices) > 0:
@@ -230,10 +308,11 @@ class OpenAIService:
             logger.info(f"请求OpenAI嵌入API, 模型: {model}")
             
             # 发送请求
-            response = await self.client.embeddings.create(
-                model=model,
-                input=text
-            )
+            async with self.limiter.slot("embedding"):
+                response = await self.client.embeddings.create(
+                    model=model,
+                    input=text
+                )
             
             # 解析响应
             if response.data and len(response.data) > 0:
@@ -0,0 +1,334 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+提示词token预算
+
+内容、语音、视觉分析把完整转写文本和特征数据直接拼进提示词，回答越长，
+LLM延迟和费用越高，还可能超出星火Lite的上下文长度。本模块在调用前控制提示词大小：
+1. 估算：按中文字符约1个token、其他字符约4个字符1个token粗略估算，无需加载分词器
+2. 压缩：超出预算时对转写文本做抽取式节选，保留开头、结尾以及与职位关键词、
+   数字和技术术语相关度最高的句子，按原顺序拼接并标注省略位置
+3. 特征：数值保留两位小数，序列特征只保留均值、最值和样本数
+4. 统计：按分析器记录提示词token数和压缩次数，便于观察延迟和费用
+"""
+
+import re
+import math
+import logging
+import threading
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from ..core.system.config import AgentConfig
+
+logger = logging.getLogger(__name__)
+
+# 中日韩文字及全角标点
+_CJK_PATTERN = re.compile(r"[　-〿㐀-䶿一-鿿＀-￯]")
+# 句子切分：保留句末标点
+_SENTENCE_PATTERN = re.compile(r"[^。！？!?；;\n]+[。！？!?；;\n]*")
+_TERM_PATTERN = re.compile(r"[A-Za-z][A-Za-z0-9+#.\-]*")
+_GAP_MARKER = "……"
+
+BUDGET_DEFAULTS = {
+    "enabled": True,
+    "max_prompt_tokens": {"content": 3000, "content_batch": 6000, "speech": 1800, "visual": 1800},
+    "default_max_prompt_tokens": 2000,
+    "min_transcript_tokens": 200,  # 模板本身很长时转写文本至少保留的token数
+    "max_sentence_chars": 120  # 没有标点的语音转写按该长度切分为片段
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """粗略估算文本的token数
+
+    Args:
+        text: 文本
+
+    Returns:
+        int: 估算的token数
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK_PATTERN.findall(text))
+    others = len(re.sub(r"\s+", " ", text)) - cjk
+    return cjk + math.ceil(max(others, 0) / 4)
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """截取文本开头，按与estimate_tokens相同的折算比例使其不超过token预算
+
+    Args:
+        text: 文本
+        max_tokens: token预算
+
+    Returns:
+        str: 截取后的文本
+    """
+    cjk = others = 0
+    for end, char in enumerate(text):
+        if _CJK_PATTERN.match(char):
+            cjk += 1
+        else:
+            others += 1
+        if cjk + math.ceil(others / 4) > max_tokens:
+            return text[:end]
+    return text
+
+
+def split_sentences(text: str, max_chars: int = 120) -> List[str]:
+    """按句末标点切分文本，过长的句子（如无标点的语音转写）再按长度切分"""
+    sentences = []
+    for sentence in _SENTENCE_PATTERN.findall(text):
+        if not sentence.strip():
+            continue
+        for start in range(0, len(sentence), max_chars):
+            sentences.append(sentence[start:start + max_chars])
+    return sentences
+
+
+def extract_keywords(texts: Iterable[Any]) -> List[str]:
+    """从职位名称、要求和技能中提取压缩时优先保留的关键词
+
+    Args:
+        texts: 文本或文本列表
+
+    Returns:
+        List[str]: 去重后的关键词（小写）
+    """
+    keywords = []
+    for text in texts:
+        if not text:
+            continue
+        if isinstance(text, (list, tuple)):
+            keywords.extend(extract_keywords(text))
+            continue
+        text = str(text)
+        keywords.extend(part.strip() for part in re.split(r"[，,、/；;：:\s]+", text))
+        keywords.extend(_TERM_PATTERN.findall(text))
+    return list(dict.fromkeys(k.lower() for k in keywords if len(k.strip()) > 1))
+
+
+def _sentence_score(sentence: str, keywords: List[str]) -> float:
+    lowered = sentence.lower()
+    score = 3.0 * sum(1 for keyword in keywords if keyword in lowered)
+    score += 1.0 if re.search(r"\d", sentence) else 0.0
+    score += 0.5 * min(len(_TERM_PATTERN.findall(sentence)), 4)
+    # 很短的句子（语气词、寒暄）信息量低
+    score += min(len(sentence.strip()), 40) / 40.0
+    return score
+
+
+def compress_transcript(text: str, max_tokens: int, keywords: Optional[Iterable[str]] = None,
+                        max_sentence_chars: int = 120) -> str:
+    """把转写文本抽取式压缩到token预算以内
+
+    保留开头和结尾的句子，其余句子按与关键词、数字和技术术语的相关度择优保留，
+    按原顺序拼接，省略处用“……”标注
+
+    Args:
+        text: 转写文本
+        max_tokens: token预算
+        keywords: 职位相关的关键词
+        max_sentence_chars: 无标点文本的切分长度
+
+    Returns:
+        str: 压缩后的文本，未超出预算时原样返回
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    keywords = [k.lower() for k in (keywords or []) if k and len(k.strip()) > 1]
+    sentences = split_sentences(text, max_sentence_chars)
+    header = f"（回答较长，以下为节选，原文约{len(text)}字）\n"
+    gap_cost = estimate_tokens(_GAP_MARKER)
+    # 每个句子的成本已包含其前面的省略标记，另为末尾的省略标记预留
+    budget = max_tokens - estimate_tokens(header) - gap_cost
+    costs = [estimate_tokens(s) + estimate_tokens(_GAP_MARKER) for s in sentences]
+
+    # 开头和结尾通常是对问题的概括和结论，优先保留
+    mandatory = [0, len(sentences) - 1] if len(sentences) > 1 else [0]
+    ranked = sorted(range(1, len(sentences) - 1),
+                    key=lambda i: (-_sentence_score(sentences[i], keywords), i))
+
+    selected, used = set(), 0
+    for index in mandatory + ranked:
+        if index in selected:
+            continue
+        if used + costs[index] <= budget:
+            selected.add(index)
+            used += costs[index]
+
+    if not selected:
+        # 单个句子就超出预算时截断开头部分；预算连说明都放不下时省略说明
+        if budget > 0:
+            return header + truncate_to_tokens(text, budget) + _GAP_MARKER
+        return truncate_to_tokens(text, max(max_tokens - gap_cost, 0)) + _GAP_MARKER
+
+    parts, previous = [], -1
+    for index in sorted(selected):
+        if index != previous + 1:
+            parts.append(_GAP_MARKER)
+        parts.append(sentences[index].strip())
+        previous = index
+    if previous != len(sentences) - 1:
+        parts.append(_GAP_MARKER)
+    return header + "".join(parts)
+
+
+def format_feature(value: Any, default: str = "未知") -> str:
+    """把特征值格式化为紧凑的文本
+
+    Args:
+        value: 特征值，可以是数值、序列或其他对象
+        default: 缺失时的占位文本
+
+    Returns:
+        str: 数值保留两位小数，序列只保留均值、最值和样本数
+    """
+    if value is None:
+        return default
+    if isinstance(value, (bool, np.bool_)):
+        return str(bool(value))
+    if isinstance(value, (int, np.integer)):
+        return str(int(value))
+    if isinstance(value, (float, np.floating)):
+        return f"{float(value):.2f}"
+    if isinstance(value, (list, tuple, np.ndarray)):
+        try:
+            values = np.asarray(value, dtype=float).ravel()
+        except (TypeError, ValueError):
+            values = None
+        if values is not None:
+            values = values[np.isfinite(values)]
+            if not values.size:
+                return default
+            return f"均值{values.mean():.2f}，最小{values.min():.2f}，最大{values.max():.2f}（{values.size}个样本）"
+    text = str(value)
+    return text if len(text) <= 80 else text[:80] + _GAP_MARKER
+
+
+class PromptMetrics:
+    """提示词大小统计"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, name: str, original_tokens: int, prompt_tokens: int, budget: int):
+        """记录一次提示词构建
+
+        Args:
+            name: 分析器名称
+            original_tokens: 压缩前的估算token数
+            prompt_tokens: 实际提示词的估算token数
+            budget: 预算
+        """
+        with self._lock:
+            stats = self._stats.setdefault(name, {
+                "prompts": 0,
+                "compressed": 0,
+                "original_tokens": 0,
+                "prompt_tokens": 0,
+                "max_prompt_tokens": 0,
+                "over_budget": 0
+            })
+            stats["prompts"] += 1
+            stats["compressed"] += 1 if prompt_tokens < original_tokens else 0
+            stats["original_tokens"] += original_tokens
+            stats["prompt_tokens"] += prompt_tokens
+            stats["max_prompt_tokens"] = max(stats["max_prompt_tokens"], prompt_tokens)
+            stats["over_budget"] += 1 if prompt_tokens > budget else 0
+
+    def get_stats(self) -> Dict[str, Dict[str, Any]]:
+        """获取各分析器的统计信息"""
+        with self._lock:
+            result = {}
+            for name, stats in self._stats.items():
+                prompts = stats["prompts"] or 1
+                result[name] = {
+                    **stats,
+                    "avg_prompt_tokens": stats["prompt_tokens"] / prompts,
+                    "tokens_saved": stats["original_tokens"] - stats["prompt_tokens"]
+                }
+            return result
+
+    def reset(self):
+        """清空统计"""
+        with self._lock:
+            self._stats.clear()
+
+
+_prompt_metrics = PromptMetrics()
+
+
+def get_prompt_metrics() -> PromptMetrics:
+    """获取全局提示词统计"""
+    return _prompt_metrics
+
+
+class PromptBudget:
+    """按分析器控制提示词大小"""
+
+    def __init__(self, config: Optional[AgentConfig] = None):
+        """初始化提示词预算
+
+        Args:
+            config: 配置对象，参数读取自 services.prompt_budget
+        """
+        self.config = config or AgentConfig()
+        settings = dict(BUDGET_DEFAULTS)
+        settings.update(self.config.get_section("services").get("prompt_budget", {}) or {})
+        self.settings = settings
+        self.metrics = get_prompt_metrics()
+
+    def budget_for(self, name: str) -> int:
+        """获取分析器的提示词token预算"""
+        return (self.settings.get("max_prompt_tokens") or {}).get(
+            name, self.settings["default_max_prompt_tokens"])
+
+    def fit(self, name: str, render: Callable[[str], str], transcript: str,
+            keywords: Optional[Iterable[str]] = None) -> str:
+        """渲染提示词，超出预算时压缩转写文本后重新渲染
+
+        Args:
+            name: 分析器名称，用于选择预算和记录统计
+            render: 接收转写文本、返回完整提示词的函数
+            transcript: 转写文本
+            keywords: 压缩时优先保留的关键词
+
+        Returns:
+            str: 提示词
+        """
+        prompt = render(transcript)
+        original_tokens = estimate_tokens(prompt)
+        budget = self.budget_for(name)
+
+        if self.settings["enabled"] and original_tokens > budget and transcript:
+            overhead = estimate_tokens(render(""))
+            available = max(budget - overhead, self.settings["min_transcript_tokens"])
+            compressed = compress_transcript(transcript, available, keywords, self.settings["max_sentence_chars"])
+            prompt = render(compressed)
+            logger.info(f"{name}提示词超出预算({original_tokens}>{budget} tokens)，"
+                        f"转写文本由{len(transcript)}字压缩为{len(compressed)}字")
+
+        self.metrics.record(name, original_tokens, estimate_tokens(prompt), budget)
+        return prompt
+
+    def record(self, name: str, prompt: str) -> str:
+        """只记录不含转写文本的提示词大小
+
+        Args:
+            name: 分析器名称
+            prompt: 提示词
+
+        Returns:
+            str: 原提示词
+        """
+        tokens = estimate_tokens(prompt)
+        budget = self.budget_for(name)
+        if tokens > budget:
+            logger.warning(f"{name}提示词超出预算({tokens}>{budget} tokens)")
+        self.metrics.record(name, tokens, tokens, budget)
+        return prompt
@@ -6,6 +6,7 @@
 """
 
 import json
+import asyncio
 import logging
 import re
 from typing import Dict, List, Any, Optional, Union
@@ -13,6 +14,8 @@ from typing import Dict, List, Any, Optional, Union
 from ..core.system.config import AgentConfig
 from ..services.openai_service import OpenAIService
 from ..services.content_filter_service import ContentFilterService, FilterResult
+from ..services.llm_cache import make_cache_key
+from ..services.single_flight import get_single_flight
 from ..prompts.quick_interview_questions import (
     QUICK_BASIC_QUESTIONS_PROMPT,
     QUICK_TECHNICAL_QUESTIONS_PROMPT,
@@ -38,7 +41,9 @@ class QuestionServiceConfig:
                  api_model: str = "gpt-4-turbo", 
                  temperature: float = 0.7,
                  max_tokens: int = 2000,
-                 enable_content_filter: bool = True):
+                 enable_content_filter: bool = True,
+                 enable_coalescing: bool = True,
+                 coalesce_timeout: Optional[float] = None):
         """初始化配置
         
         Args:
@@ -46,11 +51,15 @@ class QuestionServiceConfig:
             temperature: 采样温度
             max_tokens: 最大生成的token数量
             enable_content_filter: 是否启用内容过滤
+            enable_coalescing: 是否合并参数相同的并发生成请求
+            coalesce_timeout: 默认的单个调用方等待超时（秒），None表示不限
         """
         self.api_model = api_model
         self.temperature = temperature
         self.max_tokens = max_tokens
         self.enable_content_filter = enable_content_filter
+        self.enable_coalescing = enable_coalescing
+        self.coalesce_timeout = coalesce_timeout
 
 
 class QuestionService:
@@ -86,6 +95,9 @@ class QuestionService:
         
         # 初始化内容过滤服务
         self.content_filter = ContentFilterService.get_instance()
+        
+        # 参数相同的并发生成请求共享一次调用
+        self.single_flight = get_single_flight("question_generation")
     
     async def generate_interview_questions(
         self, 
@@ -94,11 +106,15 @@ class QuestionService:
         difficulty_level: str = "medium",
         candidate_background: Optional[str] = None,
         mode: str = "full",
-        question_type: Optional[str] = None
+        question_type: Optional[str] = None,
+        timeout: Optional[float] = None
     ) -> List[Dict[str, Any]]:
         """
         生成面试问题
         
+        多名候选人同时练习同一题库时，参数相同的并发请求只调用一次模型，
+        每个调用方拿到独立的结果副本。
+        
         Args:
             position_info: 职位信息，包含title, description, tech_field, skills等
             question_count: 需要生成的问题数量，默认为5道
@@ -106,6 +122,7 @@ class QuestionService:
             candidate_background: 候选人背景信息（可选）
             mode: 面试模式，"quick"或"full"
             question_type: 问题类型（可选），如"technical", "behavioral"等
+            timeout: 本次调用的等待超时（秒），超时后返回备用问题，不影响其他等待的调用方
             
         Returns:
             问题列表，每个问题包含问题内容、类型、建议回答时长和难度级别等
@@ -116,6 +133,43 @@ class QuestionService:
         # 参数验证
         self._validate_params(position_info, question_count, difficulty_level, mode)
         
+        def generate():
+            return self._generate_questions(
+                position_info, question_count, difficulty_level, candidate_background, mode, question_type
+            )
+        
+        if not self.config.enable_coalescing:
+            return await generate()
+        
+        key = make_cache_key(
+            "question_service",
+            self.config.api_model,
+            [position_info],
+            question_count=question_count,
+            difficulty_level=difficulty_level,
+            candidate_background=candidate_background,
+            mode=mode,
+            question_type=question_type,
+            content_filter=self.config.enable_content_filter
+        )
+        try:
+            return await self.single_flight.do(
+                key, generate, timeout=timeout if timeout is not None else self.config.coalesce_timeout
+            )
+        except asyncio.TimeoutError:
+            logger.warning("等待问题生成超时，使用备用问题")
+            return self._get_fallback_questions(position_info, question_count, difficulty_level, mode)
+    
+    async def _generate_questions(
+        self,
+        position_info: Dict[str, Any],
+        question_count: int,
+        difficulty_level: str,
+        candidate_background: Optional[str],
+        mode: str,
+        question_type: Optional[str]
+    ) -> List[Dict[str, Any]]:
+        """按模式生成并过滤问题，失败时使用备用问题"""
         # 根据模式选择不同的生成策略
         try:
             if mode == "quick":
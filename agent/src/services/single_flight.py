@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+请求合并（single-flight）
+
+大量候选人练习同一题库时，相同的题目生成、嵌入请求会在同一时刻到达。
+同一事件循环中指纹相同的并发调用共享一个进行中的任务，只向上游发出一次请求：
+1. 首个调用方发起请求，后到的调用方等待同一个任务；任务结束后即移除，不做长期缓存
+2. 每个调用方可单独设置超时或被取消，不影响其他仍在等待的调用方
+3. 所有调用方都离开后取消共享任务，避免无人等待的请求继续占用上游
+4. 后到的调用方拿到结果的副本，修改结果不会影响其他调用方
+"""
+
+import copy
+import asyncio
+import logging
+import threading
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class _Flight:
+    """一次进行中的共享调用"""
+
+    def __init__(self, task: asyncio.Task):
+        self.task = task
+        self.waiters = 0
+
+
+class SingleFlight:
+    """按指纹合并并发请求"""
+
+    def __init__(self, name: str = "default"):
+        """初始化请求合并组
+
+        Args:
+            name: 名称，用于日志和统计
+        """
+        self.name = name
+        self._flights: Dict[Tuple[int, str], _Flight] = {}
+        self._lock = threading.Lock()
+        self.stats = {
+            "calls": 0,
+            "executions": 0,
+            "coalesced": 0,
+            "timeouts": 0,
+            "cancelled": 0,
+            "abandoned": 0
+        }
+
+    async def do(self, key: str, call: Callable[[], Awaitable[Any]],
+                 timeout: Optional[float] = None, copy_result: bool = True) -> Any:
+        """执行调用，指纹相同的并发调用共享同一个进行中的任务
+
+        Args:
+            key: 请求指纹
+            call: 实际发起请求的协程函数
+            timeout: 本调用方的等待超时（秒），超时不会取消其他调用方仍在等待的任务
+            copy_result: 后到的调用方是否拿到结果的深拷贝
+
+        Returns:
+            Any: 调用结果
+
+        Raises:
+            asyncio.TimeoutError: 本调用方等待超时
+            Exception: 共享调用抛出的异常会传递给所有调用方
+        """
+        loop = asyncio.get_running_loop()
+        flight_key = (id(loop), key)
+
+        with self._lock:
+            flight = self._flights.get(flight_key)
+            leader = flight is None
+            if leader:
+                flight = _Flight(loop.create_task(call()))
+                self._flights[flight_key] = flight
+                flight.task.add_done_callback(lambda _, fk=flight_key, f=flight: self._forget(fk, f))
+                self.stats["executions"] += 1
+            else:
+                self.stats["coalesced"] += 1
+            flight.waiters += 1
+            self.stats["calls"] += 1
+
+        if not leader:
+            logger.debug(f"合并请求 [{self.name}] {key[:12]}，当前等待 {flight.waiters} 个")
+
+        try:
+            if timeout is None:
+                result = await asyncio.shield(flight.task)
+            else:
+                result = await asyncio.wait_for(asyncio.shield(flight.task), timeout)
+        except asyncio.TimeoutError:
+            # 共享任务自身抛出的超时照常传递，只统计调用方的等待超时
+            if not flight.task.done():
+                self._record("timeouts")
+            raise
+        except asyncio.CancelledError:
+            if not flight.task.done():
+                self._record("cancelled")
+            raise
+        finally:
+            self._leave(flight_key, flight)
+
+        return copy.deepcopy(result) if copy_result and not leader else result
+
+    def _leave(self, flight_key: Tuple[int, str], flight: _Flight):
+        with self._lock:
+            flight.waiters -= 1
+            abandoned = flight.waiters == 0 and not flight.task.done()
+            if abandoned:
+                # 立即移除，之后到达的相同请求重新发起，不会等到一个正在取消的任务
+                if self._flights.get(flight_key) is flight:
+                    del self._flights[flight_key]
+                self.stats["abandoned"] += 1
+        if abandoned:
+            logger.debug(f"所有调用方已离开，取消共享请求 [{self.name}]")
+            flight.task.cancel()
+
+    def _forget(self, flight_key: Tuple[int, str], flight: _Flight):
+        with self._lock:
+            if self._flights.get(flight_key) is flight:
+                del self._flights[flight_key]
+        # 所有调用方都已超时离开时，避免“异常未被获取”的警告
+        if not flight.task.cancelled():
+            flight.task.exception()
+
+    def _record(self, stat: str):
+        with self._lock:
+            self.stats[stat] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        with self._lock:
+            executions = self.stats["executions"]
+            return {
+                **self.stats,
+                "name": self.name,
+                "in_flight": len(self._flights),
+                "coalesce_ratio": self.stats["calls"] / executions if executions else 0.0
+            }
+
+
+# 全局请求合并组，按名称区分（如题目生成、嵌入）
+_single_flights: Dict[str, SingleFlight] = {}
+_single_flights_lock = threading.Lock()
+
+
+def get_single_flight(name: str) -> SingleFlight:
+    """获取指定名称的全局请求合并组
+
+    Args:
+        name: 名称
+
+    Returns:
+        SingleFlight: 请求合并组
+    """
+    with _single_flights_lock:
+        group = _single_flights.get(name)
+        if group is None:
+            group = SingleFlight(name)
+            _single_flights[name] = group
+        return group
+
+
+def reset_single_flights():
+    """清空全局请求合并组（主要用于测试）"""
+    with _single_flights_lock:
+        _single_flights.clear()
@@ -4,15 +4,88 @@ from typing import Dict, List, Optional, Any
 import logging
 import aiohttp
 import asyncio
+import copy
 import json
 import re
 import time
-from urllib.parse import quote
+import threading
+import unicodedata
+from urllib.parse import quote, urlsplit, parse_qsl, urlencode
 
 from ..core.system.config import AgentConfig
+from ..core.system.cache_system import MemoryCache
+from .adaptive_limiter import get_provider_limiter
+from .http_session_manager import get_http_session_manager
+from .single_flight import get_single_flight
 
 logger = logging.getLogger(__name__)
 
+# 跟踪参数不影响页面内容，去重时忽略
+_TRACKING_PARAMS = re.compile(r"^(utm_\w+|spm|from|source|ref|fbclid|gclid)$", re.IGNORECASE)
+
+# 搜索结果缓存（同一进程内所有WebSearchService实例共享）
+_search_cache: Optional[MemoryCache] = None
+_search_cache_lock = threading.Lock()
+
+
+def get_search_cache(max_entries: int = 1000) -> MemoryCache:
+    """获取全局搜索结果缓存
+
+    Args:
+        max_entries: 最大缓存条目数，仅在首次创建时生效
+
+    Returns:
+        MemoryCache: 搜索结果缓存
+    """
+    global _search_cache
+    with _search_cache_lock:
+        if _search_cache is None:
+            _search_cache = MemoryCache(max_size=max_entries)
+        return _search_cache
+
+
+def reset_search_cache():
+    """清空全局搜索结果缓存（配置变更或测试时使用）"""
+    global _search_cache
+    with _search_cache_lock:
+        _search_cache = None
+
+
+def normalize_query(query: str) -> str:
+    """规范化搜索查询，用作缓存键
+
+    全角转半角、英文转小写、合并空白并去掉首尾标点，使“Python 教程”与“ python　教程？”命中同一缓存
+
+    Args:
+        query: 搜索查询
+
+    Returns:
+        str: 规范化后的查询
+    """
+    text = unicodedata.normalize("NFKC", query or "").lower()
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" ?？!！。.,，;；")
+
+
+def canonical_url(url: str) -> str:
+    """规范化URL用于去重：忽略协议、www前缀、末尾斜杠、锚点和跟踪参数
+
+    Args:
+        url: 原始URL
+
+    Returns:
+        str: 规范化后的URL
+    """
+    if not url:
+        return ""
+    parts = urlsplit(url.strip())
+    host = parts.netloc.lower()
+    if host.startswith("www."):
+        host = host[4:]
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parts.query) if not _TRACKING_PARAMS.match(k)))
+    path = parts.path.rstrip("/")
+    return f"{host}{path}" + (f"?{query}" if query else "")
+
 class WebSearchService:
     """Web搜索服务
     
@@ -35,6 +108,16 @@ class WebSearchService:
         self.max_results = self.config.get_service_config("websearch", "max_results", 5)
         self.request_timeout = self.config.get_service_config("websearch", "request_timeout", 30)
         
+        # 结果缓存：按引擎和规范化查询缓存成功的结果
+        self.cache_enabled = self.config.get_service_config("websearch", "cache_enabled", True)
+        self.cache_ttl = self.config.get_service_config("websearch", "cache_ttl", 3600)
+        self.cache = get_search_cache(self.config.get_service_config("websearch", "cache_max_entries", 1000))
+        # 多引擎搜索等待各引擎的最长时间（秒），超时的引擎结果被丢弃
+        self.engine_deadline = self.config.get_service_config("websearch", "engine_deadline", 5.0)
+        # 所有搜索共享并发上限，同时发起的大量查询不会压垮搜索API
+        self.limiter = get_provider_limiter("websearch", self.config)
+        self.single_flight = get_single_flight("websearch")
+        
         self.serper_url = "https://google.serper.dev/search"
         self.serpapi_url = "https://serpapi.com/search"
         self.bing_url = "https://api.bing.microsoft.com/v7.0/search"
@@ -69,24 +152,21 @@ class WebSearchService:
         search_engine = engine or self.default_engine
         result_limit = num_results or self.max_results
         
+        cache_key = f"{search_engine}|{normalize_query(query)}|{result_limit}|{language}|{country}"
+        if self.cache_enabled:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                logger.debug(f"Web搜索命中缓存: '{query}', 引擎: {search_engine}")
+                return {**copy.deepcopy(cached), "cached": True}
+        
         logger.info(f"执行Web搜索: '{query}', 引擎: {search_engine}, 结果数量: {result_limit}")
         
         try:
-            if search_engine == "serper":
-                search_results = await self._search_serper(query, result_limit, language, country)
-            elif search_engine == "serpapi":
-                search_results = await self._search_serpapi(query, result_limit, language, country)
-            elif search_engine == "bing":
-                search_results = await self._search_bing(query, result_limit, language, country)
-            else:
-                logger.error(f"不支持的搜索引擎: {search_engine}")
-                search_results = {
-                    "status": "error",
-                    "error": f"不支持的搜索引擎: {search_engine}"
-                }
-            
-            return search_results
-            
+            # 并发的相同查询只请求一次
+            search_results = await self.single_flight.do(
+                cache_key,
+                lambda: self._search_engine(search_engine, query, result_limit, language, country)
+            )
         except Exception as e:
             logger.error(f"搜索失败: {e}")
             return {
@@ -94,6 +174,94 @@ class WebSearchService:
                 "error": str(e),
                 "results": []
             }
+        
+        if self.cache_enabled and search_results.get("status") == "success":
+            self.cache.set(cache_key, copy.deepcopy(search_results), ttl=self.cache_ttl)
+        return search_results
+    
+    async def _search_engine(self, search_engine: str, query: str, result_limit: int,
+                             language: str, country: str) -> Dict[str, Any]:
+        """在全局并发限制下调用搜索引擎，并把结果规范化为统一格式
+        
+        Args:
+            search_engine: 搜索引擎
+            query: 搜索查询
+            result_limit: 结果数量
+            language: 语言代码
+            country: 国家代码
+            
+        Returns:
+            Dict: 搜索结果
+        """
+        if search_engine == "serper":
+            search = self._search_serper
+        elif search_engine == "serpapi":
+            search = self._search_serpapi
+        elif search_engine == "bing":
+            search = self._search_bing
+        else:
+            logger.error(f"不支持的搜索引擎: {search_engine}")
+            return {
+                "status": "error",
+                "error": f"不支持的搜索引擎: {search_engine}"
+            }
+        
+        async with self.limiter.slot(search_engine) as outcome:
+            search_results = await search(query, result_limit, language, country)
+            if search_results.get("status") != "success":
+                outcome.mark_failed()
+        
+        if search_results.get("status") == "success":
+            search_results["results"] = [
+                self._normalize_result(item, search_engine) for item in search_results.get("results", [])
+            ]
+        return search_results
+    
+    def _normalize_result(self, item: Dict[str, Any], engine: str) -> Dict[str, Any]:
+        """把各引擎的结果项规范化为统一字段：title、link、snippet、source、engine
+        
+        Args:
+            item: 引擎返回的结果项
+            engine: 搜索引擎
+            
+        Returns:
+            Dict: 保留原有字段并补齐统一字段的结果项
+        """
+        result = dict(item)
+        result["title"] = (item.get("title") or item.get("question") or item.get("displayText")
+                           or item.get("text") or item.get("query") or "").strip()
+        result["link"] = (item.get("link") or "").strip()
+        result["snippet"] = (item.get("snippet") or item.get("description") or item.get("answer") or "").strip()
+        result.setdefault("source", "organic")
+        result["engine"] = engine
+        return result
+    
+    async def search_many(self,
+                          queries: List[str],
+                          engine: Optional[str] = None,
+                          num_results: Optional[int] = None,
+                          language: str = "zh",
+                          country: str = "cn") -> Dict[str, Dict[str, Any]]:
+        """并发执行多个搜索，受全局并发上限约束，规范化后相同的查询只搜索一次
+        
+        Args:
+            queries: 搜索查询列表
+            engine: 搜索引擎
+            num_results: 每个查询的结果数量
+            language: 语言代码
+            country: 国家代码
+            
+        Returns:
+            Dict[str, Dict]: 查询 -> 搜索结果
+        """
+        unique = {}
+        for query in queries:
+            unique.setdefault(normalize_query(query), query)
+        results = await asyncio.gather(*(
+            self.search(query, engine, num_results, language, country) for query in unique.values()
+        ))
+        by_normalized = dict(zip(unique.keys(), results))
+        return {query: by_normalized[normalize_query(query)] for query in queries}
     
     async def _search_serper(self, query: str, num_results: int, language: str, country: str) -> Dict[str, Any]:
         """使用Serper API搜索
@@ -123,33 +291,32 @@ class WebSearchService:
         }
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.post(
-                    self.serper_url,
-                    headers=headers,
-                    json=payload,
-                    timeout=self.request_timeout
-                ) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error(f"Serper API错误: {response.status}, {error_text}")
-                        return {
-                            "status": "error",
-                            "error": f"API返回错误: {response.status}",
-                            "results": []
-                        }
-                    
-                    data = await response.json()
-                    
-                    # 处理搜索结果
-                    processed_results = self._process_serper_results(data, num_results)
-                    
+            async with get_http_session_manager().post(
+                self.serper_url,
+                headers=headers,
+                json=payload,
+                timeout=self.request_timeout
+            ) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.error(f"Serper API错误: {response.status}, {error_text}")
                     return {
-                        "status": "success",
-                        "engine": "serper",
-                        "results": processed_results
+                        "status": "error",
+                        "error": f"API返回错误: {response.status}",
+                        "results": []
                     }
-                    
+                
+                data = await response.json()
+                
+                # 处理搜索结果
+                processed_results = self._process_serper_results(data, num_results)
+                
+                return {
+                    "status": "success",
+                    "engine": "serper",
+                    "results": processed_results
+                }
+                
         except aiohttp.ClientError as e:
             logger.error(f"Serper API请求错误: {e}")
             return {
@@ -236,28 +403,27 @@ class WebSearchService:
         url = f"{self.serpapi_url}?{query_string}"
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, timeout=self.request_timeout) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error(f"SerpAPI错误: {response.status}, {error_text}")
-                        return {
-                            "status": "error",
-                            "error": f"API返回错误: {response.status}",
-                            "results": []
-                        }
-                    
-                    data = await response.json()
-                    
-                    # 处理搜索结果
-                    processed_results = self._process_serpapi_results(data, num_results)
-                    
+            async with get_http_session_manager().get(url, timeout=self.request_timeout) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.error(f"SerpAPI错误: {response.status}, {error_text}")
                     return {
-                        "status": "success",
-                        "engine": "serpapi",
-                        "results": processed_results
+                        "status": "error",
+                        "error": f"API返回错误: {response.status}",
+                        "results": []
                     }
-                    
+                
+                data = await response.json()
+                
+                # 处理搜索结果
+                processed_results = self._process_serpapi_results(data, num_results)
+                
+                return {
+                    "status": "success",
+                    "engine": "serpapi",
+                    "results": processed_results
+                }
+                
         except aiohttp.ClientError as e:
             logger.error(f"SerpAPI请求错误: {e}")
             return {
@@ -348,28 +514,27 @@ class WebSearchService:
         url = f"{self.bing_url}?{query_string}"
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.get(url, headers=headers, timeout=self.request_timeout) as response:
-                    if response.status != 200:
-                        error_text = await response.text()
-                        logger.error(f"Bing API错误: {response.status}, {error_text}")
-                        return {
-                            "status": "error",
-                            "error": f"API返回错误: {response.status}",
-                            "results": []
-                        }
-                    
-                    data = await response.json()
-                    
-                    # 处理搜索结果
-                    processed_results = self._process_bing_results(data, num_results)
-                    
+            async with get_http_session_manager().get(url, headers=headers, timeout=self.request_timeout) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.error(f"Bing API错误: {response.status}, {error_text}")
                     return {
-                        "status": "success",
-                        "engine": "bing",
-                        "results": processed_results
+                        "status": "error",
+                        "error": f"API返回错误: {response.status}",
+                        "results": []
                     }
-                    
+                
+                data = await response.json()
+                
+                # 处理搜索结果
+                processed_results = self._process_bing_results(data, num_results)
+                
+                return {
+                    "status": "success",
+                    "engine": "bing",
+                    "results": processed_results
+                }
+                
         except aiohttp.ClientError as e:
             logger.error(f"Bing API请求错误: {e}")
             return {
@@ -427,12 +592,16 @@ class WebSearchService:
         
         return results[:limit]
     
-    async def multi_engine_search(self, query: str, num_results: int = 5) -> Dict[str, Any]:
+    async def multi_engine_search(self, query: str, num_results: int = 5,
+                                  deadline: Optional[float] = None) -> Dict[str, Any]:
         """使用多个搜索引擎执行搜索，并合并结果
         
+        各引擎并行搜索，到达截止时间后只合并已返回的结果，不等待最慢的引擎
+        
         Args:
             query: 搜索查询
             num_results: 每个引擎的结果数量
+            deadline: 等待各引擎的最长时间（秒），默认取 websearch.engine_deadline
             
         Returns:
             Dict: 合并后的搜索结果
@@ -456,12 +625,22 @@ class WebSearchService:
             }
         
         # 并行执行搜索
-        tasks = [self.search(query, engine, num_results) for engine in engines]
-        search_results = await asyncio.gather(*tasks)
+        tasks = {asyncio.ensure_future(self.search(query, engine, num_results)): engine for engine in engines}
+        done, pending = await asyncio.wait(tasks, timeout=deadline if deadline is not None else self.engine_deadline)
+        
+        timed_out = [tasks[task] for task in pending]
+        for task in pending:
+            task.cancel()
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+            logger.warning(f"多引擎搜索超过截止时间，未返回的引擎: {timed_out}")
         
-        # 合并结果
+        # 按引擎顺序合并结果
         all_results = []
-        for result in search_results:
+        for task, engine in tasks.items():
+            if task not in done:
+                continue
+            result = task.result()
             if result.get("status") == "success" and "results" in result:
                 all_results.extend(result["results"])
         
@@ -473,7 +652,8 @@ class WebSearchService:
             "engine": "multi",
             "results": unique_results[:num_results],
             "total_engines": len(engines),
-            "engines_used": engines
+            "engines_used": [engine for engine in engines if engine not in timed_out],
+            "engines_timed_out": timed_out
         }
     
     def _remove_duplicates(self, results: List[Dict]) -> List[Dict]:
@@ -490,8 +670,8 @@ class WebSearchService:
         titles = set()
         
         for result in results:
-            url = result.get("link", "")
-            title = result.get("title", "")
+            url = canonical_url(result.get("link", ""))
+            title = (result.get("title", "") or "").strip().lower()
             
             # 如果URL和标题都没有出现过，添加到结果中
             if (not url or url not in urls) and (not title or title not in titles):
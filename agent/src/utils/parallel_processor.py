@@ -6,17 +6,21 @@
 """
 
 import asyncio
+import itertools
+import math
+import random
 import threading
 import time
-from typing import Dict, List, Any, Optional, Callable, Awaitable
-from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
-from dataclasses import dataclass
+from collections import OrderedDict, deque
+from typing import Dict, List, Any, Optional, Callable, Awaitable, Tuple
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from dataclasses import dataclass, field
 from enum import Enum
 import logging
-from queue import Queue, PriorityQueue
-import multiprocessing as mp
+from queue import Empty, Queue, PriorityQueue
 
-from .state import Task, TaskType, TaskPriority, TaskStatus, AnalysisResult
+from ..core.workflow.state import Task, TaskType, TaskPriority, TaskStatus, AnalysisResult
+from .process_backend import DEFAULT_SHARE_THRESHOLD, ProcessBackend, get_process_backend, warm_up_cpu_worker
 
 
 class ProcessorType(Enum):
@@ -36,6 +40,10 @@ class ProcessorConfig:
     retry_delay: float = 1.0
     enable_load_balancing: bool = True
     resource_limits: Dict[str, Any] = None
+    result_ttl: float = 300.0  # 已完成结果未被取走时的保留时间（秒）
+    max_results: int = 10000  # 最多保留的未取走结果数
+    warm_up: Optional[Callable[[], Any]] = warm_up_cpu_worker  # 多进程模式下工作进程启动时执行一次的预热函数
+    share_threshold: int = DEFAULT_SHARE_THRESHOLD  # 任务数据中的数组达到该字节数时通过共享内存传递
     
     def __post_init__(self):
         if self.resource_limits is None:
@@ -74,6 +82,8 @@ class ResourceMonitor:
             "completed_tasks": 0,
             "failed_tasks": 0
         }
+        self._checked_at = float("-inf")
+        self._available = True
     
     def start_monitoring(self):
         """开始监控"""
@@ -88,13 +98,32 @@ class ResourceMonitor:
         """获取统计信息"""
         return self._stats.copy()
     
-    def is_resource_available(self, limits: Dict[str, Any]) -> bool:
-        """检查资源是否可用"""
+    def is_resource_available(self, limits: Dict[str, Any], max_age: float = 1.0) -> bool:
+        """检查资源是否可用
+        
+        每次提交任务都采样会拖慢提交方，检查结果缓存 max_age 秒。
+        
+        Args:
+            limits: 资源限制
+            max_age: 检查结果的缓存时间（秒）
+            
+        Returns:
+            bool: 资源是否可用
+        """
+        now = time.monotonic()
+        if now - self._checked_at < max_age:
+            return self._available
+        self._checked_at = now
+        self._available = self._check_resources(limits)
+        return self._available
+    
+    def _check_resources(self, limits: Dict[str, Any]) -> bool:
+        """采样CPU和内存使用情况"""
         try:
             import psutil
             
-            # 检查CPU使用率
-            cpu_percent = psutil.cpu_percent(interval=0.1)
+            # 检查CPU使用率（与上次调用之间的平均值，不阻塞）
+            cpu_percent = psutil.cpu_percent(interval=None)
             if cpu_percent > limits.get("cpu_limit_percent", 80):
                 return False
             
@@ -138,7 +167,11 @@ class ResourceMonitor:
 
 
 class TaskQueue:
-    """任务队列"""
+    """任务队列
+    
+    基于 PriorityQueue（内部由条件变量实现），工作线程阻塞等待新任务而不是定时轮询。
+    同优先级的任务按提交顺序出队，任务的处理函数随任务一起入队。
+    """
     
     def __init__(self, enable_priority: bool = True):
         self.enable_priority = enable_priority
@@ -147,33 +180,47 @@ class TaskQueue:
         else:
             self._queue = Queue()
         
-        self._task_map = {}  # 任务ID到任务的映射
+        self._sequence = itertools.count()  # 同优先级按提交顺序，避免比较任务对象
+        self._task_map = {}  # 排队中的任务ID到任务的映射
         self.logger = logging.getLogger(self.__class__.__name__)
     
-    def put(self, task: Task):
-        """添加任务"""
-        if self.enable_priority:
-            # 优先级越高，数值越小
-            priority = self._get_priority_value(task.priority)
-            self._queue.put((priority, time.time(), task))
-        else:
-            self._queue.put(task)
+    def put(self, task: Optional[Task], handler: Any = None, priority: Optional[int] = None):
+        """添加任务
         
-        self._task_map[task.id] = task
-        self.logger.debug(f"任务已添加到队列: {task.id}")
+        Args:
+            task: 任务，为None时作为通知工作线程退出的哨兵
+            handler: 任务的处理函数，出队时随任务一起返回
+            priority: 优先级数值（越小越先执行），为None时按任务优先级计算
+        """
+        if priority is None:
+            priority = self._get_priority_value(task.priority) if task is not None else 0
+        if task is not None:
+            self._task_map[task.id] = task
+        self._queue.put((priority, next(self._sequence), task, handler))
+        if task is not None:
+            self.logger.debug(f"任务已添加到队列: {task.id}")
     
     def get(self, timeout: Optional[float] = None) -> Optional[Task]:
         """获取任务"""
-        try:
-            if self.enable_priority:
-                _, _, task = self._queue.get(timeout=timeout)
-            else:
-                task = self._queue.get(timeout=timeout)
-            
-            return task
+        entry = self.get_entry(timeout)
+        return entry[0] if entry else None
+    
+    def get_entry(self, timeout: Optional[float] = None) -> Optional[Tuple[Optional[Task], Any]]:
+        """获取任务及其处理函数
+        
+        Args:
+            timeout: 超时时间，为None时阻塞直到有任务入队
             
-        except:
+        Returns:
+            Optional[Tuple[Optional[Task], Any]]: (任务, 处理函数)，超时返回None；任务为None表示退出哨兵
+        """
+        try:
+            _, _, task, handler = self._queue.get(timeout=timeout)
+        except Empty:
             return None
+        if task is not None:
+            self._task_map.pop(task.id, None)
+        return task, handler
     
     def task_done(self):
         """标记任务完成"""
@@ -188,7 +235,7 @@ class TaskQueue:
         return self._queue.qsize()
     
     def get_task(self, task_id: str) -> Optional[Task]:
-        """根据ID获取任务"""
+        """根据ID获取排队中的任务"""
         return self._task_map.get(task_id)
     
     def remove_task(self, task_id: str):
@@ -198,6 +245,7 @@ class TaskQueue:
     def _get_priority_value(self, priority: TaskPriority) -> int:
         """获取优先级数值"""
         priority_map = {
+            TaskPriority.CRITICAL: 0,
             TaskPriority.HIGH: 1,
             TaskPriority.MEDIUM: 2,
             TaskPriority.LOW: 3
@@ -205,10 +253,213 @@ class TaskQueue:
         return priority_map.get(priority, 2)
 
 
+class ResultStore:
+    """任务结果存储
+    
+    每个提交的任务对应一个完成Future，调用方阻塞在Future上等待结果而不是轮询。
+    已完成但未被取走的结果按完成顺序保留，超过有效期或条数上限时淘汰最早完成的结果，
+    内存占用不会随处理过的任务数增长。
+    """
+    
+    def __init__(self, ttl: float = 300.0, max_results: int = 10000):
+        """初始化结果存储
+        
+        Args:
+            ttl: 已完成结果的保留时间（秒）
+            max_results: 最多保留的已完成结果数
+        """
+        self.ttl = ttl
+        self.max_results = max_results
+        self.evicted = 0
+        self._futures: Dict[str, Future] = {}
+        self._completed: "OrderedDict[str, float]" = OrderedDict()  # 任务ID -> 完成时间，按完成顺序
+        self._lock = threading.Lock()
+    
+    def create(self, task_id: str) -> Future:
+        """为新提交的任务创建完成Future
+        
+        Args:
+            task_id: 任务ID
+            
+        Returns:
+            Future: 完成Future
+        """
+        future = Future()
+        with self._lock:
+            self._futures[task_id] = future
+        return future
+    
+    def future(self, task_id: str) -> Optional[Future]:
+        """获取任务的完成Future，任务不存在或结果已被淘汰时返回None"""
+        with self._lock:
+            self._expire_locked()
+            return self._futures.get(task_id)
+    
+    def complete(self, task_id: str, result: "TaskResult"):
+        """记录任务结果并唤醒等待方
+        
+        Args:
+            task_id: 任务ID
+            result: 任务结果
+        """
+        with self._lock:
+            future = self._futures.get(task_id)
+            if future is None:
+                return
+            self._completed[task_id] = time.monotonic()
+            self._expire_locked()
+        if not future.done():
+            future.set_result(result)
+    
+    def wait(self, task_id: str, timeout: Optional[float] = None) -> Optional["TaskResult"]:
+        """等待并取走任务结果
+        
+        Args:
+            task_id: 任务ID
+            timeout: 超时时间，为None时一直等待
+            
+        Returns:
+            Optional[TaskResult]: 任务结果，超时、任务不存在或结果已被淘汰时返回None
+        """
+        future = self.future(task_id)
+        if future is None:
+            return None
+        try:
+            result = future.result(timeout=timeout)
+        except FutureTimeoutError:
+            return None
+        self.discard(task_id)
+        return result
+    
+    def discard(self, task_id: str):
+        """丢弃任务的结果"""
+        with self._lock:
+            self._futures.pop(task_id, None)
+            self._completed.pop(task_id, None)
+    
+    def pop_completed(self) -> Dict[str, "TaskResult"]:
+        """取走所有已完成的结果"""
+        with self._lock:
+            self._expire_locked()
+            completed = list(self._completed)
+            self._completed.clear()
+            futures = [self._futures.pop(task_id) for task_id in completed]
+        return {task_id: future.result() for task_id, future in zip(completed, futures)}
+    
+    def completed_count(self) -> int:
+        """已完成但未被取走的结果数（先淘汰过期结果）"""
+        with self._lock:
+            self._expire_locked()
+            return len(self._completed)
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._futures)
+    
+    def _expire_locked(self):
+        """淘汰过期或超出条数上限的已完成结果，调用方需持有锁"""
+        now = time.monotonic()
+        while self._completed:
+            task_id, completed_at = next(iter(self._completed.items()))
+            if len(self._completed) <= self.max_results and now - completed_at < self.ttl:
+                break
+            self._completed.popitem(last=False)
+            self._futures.pop(task_id, None)
+            self.evicted += 1
+
+
+class TaskTimedOut(Exception):
+    """同步任务已超时并被看门狗以失败结果结束，其迟到的结果或异常不再记录"""
+    pass
+
+
+class TaskWatchdog:
+    """同步任务超时看门狗
+    
+    线程模式下同步任务直接在工作线程中执行，无法从外部中断。看门狗线程在任务超时时回调 on_timeout，
+    由处理器以失败结果结束任务，等待结果的调用方和负载均衡器的在途计数不会被挂起的任务卡住。
+    每个工作线程同一时间只执行一个任务，看门狗只跟踪各工作线程当前的任务，不随任务总数增长。
+    """
+    
+    def __init__(self, on_timeout: Callable[[Task, float, int], None]):
+        """初始化看门狗
+        
+        Args:
+            on_timeout: 超时回调，参数为 (任务, 超时时间, 工作线程ID)，在看门狗线程中调用
+        """
+        self._on_timeout = on_timeout
+        self._cond = threading.Condition()
+        self._running: Dict[int, Tuple[Task, float, float]] = {}  # 工作线程ID -> (任务, 截止时间, 超时时间)
+        self._wake_at = math.inf
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = False
+        self.timeouts = 0
+    
+    def begin(self, task: Task, timeout: float):
+        """当前工作线程开始执行任务
+        
+        Args:
+            task: 任务
+            timeout: 超时时间（秒）
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            if self._thread is None or self._stopped:
+                self._stopped = False
+                self._thread = threading.Thread(target=self._loop, name="TaskWatchdog", daemon=True)
+                self._thread.start()
+            self._running[threading.get_ident()] = (task, deadline, timeout)
+            if deadline < self._wake_at:
+                self._cond.notify()
+    
+    def end(self):
+        """当前工作线程的任务执行结束
+        
+        Raises:
+            TaskTimedOut: 任务已超时并被看门狗结束
+        """
+        with self._cond:
+            if self._running.pop(threading.get_ident(), None) is None:
+                raise TaskTimedOut()
+    
+    def stop(self):
+        """停止看门狗线程"""
+        with self._cond:
+            self._stopped = True
+            self._cond.notify()
+            thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+    
+    def _loop(self):
+        """等待到最早的截止时间，结束超时的任务"""
+        with self._cond:
+            while not self._stopped:
+                now = time.monotonic()
+                expired = [(ident, entry) for ident, entry in self._running.items() if entry[1] <= now]
+                for ident, _ in expired:
+                    del self._running[ident]
+                self.timeouts += len(expired)
+                if expired:
+                    # 回调会记录结果并唤醒等待方，在锁外调用
+                    self._cond.release()
+                    try:
+                        for ident, (task, _, timeout) in expired:
+                            self._on_timeout(task, timeout, ident)
+                    finally:
+                        self._cond.acquire()
+                    continue
+                self._wake_at = min((entry[1] for entry in self._running.values()), default=math.inf)
+                self._cond.wait(None if self._wake_at == math.inf else self._wake_at - now)
+                self._wake_at = math.inf
+
+
 class ParallelProcessor:
     """并行处理器
     
-    支持多线程、多进程和异步处理
+    支持多线程、多进程和异步处理。工作线程阻塞在任务队列上，取到任务后直接执行
+    （多进程模式转交进程后端，异步模式调度到事件循环），结果通过完成Future交给等待方。
+    以 cpu_bound=True 提交的任务在其他模式下也转交全局进程后端，避免被GIL串行化。
     """
     
     def __init__(self, config: ProcessorConfig = None):
@@ -223,8 +474,8 @@ class ParallelProcessor:
         # 任务队列
         self.task_queue = TaskQueue(enable_priority=True)
         
-        # 执行器
-        self._executor = None
+        # 进程后端（仅多进程模式使用）
+        self._executor: Optional[ProcessBackend] = None
         self._async_loop = None
         
         # 资源监控
@@ -233,10 +484,15 @@ class ParallelProcessor:
         # 状态跟踪
         self._running = False
         self._workers = []
-        self._results = {}
-        self._task_futures = {}
+        self._workers_lock = threading.Lock()
+        self._worker_seq = itertools.count()
+        self._watchdog = TaskWatchdog(self._on_task_timeout)
+        self._results = ResultStore(self.config.result_ttl, self.config.max_results)
+        self._outstanding = 0  # 已提交但未完成的任务数
+        self._idle = threading.Condition()
         
         # 统计信息
+        self._stats_lock = threading.Lock()
         self._stats = {
             "total_tasks": 0,
             "completed_tasks": 0,
@@ -248,14 +504,15 @@ class ParallelProcessor:
         self._initialize_executor()
     
     def _initialize_executor(self):
-        """初始化执行器"""
-        if self.config.processor_type == ProcessorType.THREAD:
-            self._executor = ThreadPoolExecutor(
-                max_workers=self.config.max_workers
-            )
-        elif self.config.processor_type == ProcessorType.PROCESS:
-            self._executor = ProcessPoolExecutor(
-                max_workers=self.config.max_workers
+        """初始化执行器
+        
+        线程模式下工作线程直接执行任务，不再转交第二个线程池。
+        """
+        if self.config.processor_type == ProcessorType.PROCESS:
+            self._executor = ProcessBackend(
+                max_workers=self.config.max_workers,
+                warm_up=self.config.warm_up,
+                share_threshold=self.config.share_threshold
             )
         elif self.config.processor_type == ProcessorType.ASYNC:
             try:
@@ -266,10 +523,8 @@ class ParallelProcessor:
                 ).start()
             except Exception as e:
                 self.logger.error(f"异步循环初始化失败: {e}")
-                # 回退到线程池
-                self._executor = ThreadPoolExecutor(
-                    max_workers=self.config.max_workers
-                )
+                # 回退到工作线程直接执行
+                self._async_loop = None
     
     def start(self):
         """启动处理器"""
@@ -279,26 +534,46 @@ class ParallelProcessor:
         self._running = True
         self.resource_monitor.start_monitoring()
         
+        # 多进程模式下先拉起并预热全部工作进程
+        if self._executor:
+            self._executor.start()
+        
         # 启动工作线程
-        for i in range(self.config.max_workers):
-            worker = threading.Thread(
-                target=self._worker_loop,
-                name=f"ParallelWorker-{i}",
-                daemon=True
-            )
-            worker.start()
-            self._workers.append(worker)
+        for _ in range(self.config.max_workers):
+            self._start_worker()
         
         self.logger.info(f"并行处理器已启动，工作线程数: {self.config.max_workers}")
     
     def stop(self):
-        """停止处理器"""
+        """停止处理器
+        
+        工作线程执行完当前任务后退出，尚未开始的任务以失败结果结束。
+        """
         if not self._running:
             return
         
         self._running = False
         self.resource_monitor.stop_monitoring()
         
+        # 优先级最高的哨兵让阻塞中的工作线程立即醒来并退出；被超时任务卡住的线程已被替换，不等待
+        with self._workers_lock:
+            workers, self._workers = self._workers, []
+        for _ in workers:
+            self.task_queue.put(None, priority=-1)
+        for worker in workers:
+            worker.join()
+        self._watchdog.stop()
+        
+        while True:
+            entry = self.task_queue.get_entry(timeout=0)
+            if entry is None:
+                break
+            task, _ = entry
+            self.task_queue.task_done()
+            if task is not None:
+                self._finish(task, TaskResult(task_id=task.id, success=False,
+                                              error=RuntimeError("处理器已停止")))
+        
         # 关闭执行器
         if self._executor:
             self._executor.shutdown(wait=True)
@@ -309,12 +584,15 @@ class ParallelProcessor:
         self.logger.info("并行处理器已停止")
     
     def submit_task(self, task: Task, 
-                   processor_func: Callable[[Task], Any]) -> str:
+                   processor_func: Callable[[Task], Any],
+                   cpu_bound: bool = False) -> str:
         """提交任务
         
         Args:
             task: 要执行的任务
             processor_func: 处理函数
+            cpu_bound: 是否为CPU密集任务。为True时在工作进程中执行，task.data中的大数组通过共享内存传递，
+                处理函数需为模块级函数
             
         Returns:
             str: 任务ID
@@ -325,13 +603,7 @@ class ParallelProcessor:
             self.logger.warning(f"资源不足，任务延迟执行: {task.id}")
             time.sleep(1)  # 等待资源释放
         
-        # 添加处理函数到任务元数据
-        task.metadata["processor_func"] = processor_func
-        
-        # 添加到队列
-        self.task_queue.put(task)
-        self._stats["total_tasks"] += 1
-        
+        self._enqueue(task, (processor_func, False, cpu_bound))
         self.logger.debug(f"任务已提交: {task.id}")
         return task.id
     
@@ -349,47 +621,90 @@ class ParallelProcessor:
         if not self._async_loop:
             raise RuntimeError("异步循环未初始化")
         
-        # 添加异步函数到任务元数据
-        task.metadata["async_func"] = async_func
-        task.metadata["is_async"] = True
-        
-        # 添加到队列
-        self.task_queue.put(task)
-        self._stats["total_tasks"] += 1
-        
+        self._enqueue(task, (async_func, True, False))
         self.logger.debug(f"异步任务已提交: {task.id}")
         return task.id
     
+    def _enqueue(self, task: Task, handler: Tuple[Callable, bool]):
+        """创建任务的完成Future并入队
+        
+        Args:
+            task: 任务
+            handler: (处理函数, 是否为异步函数, 是否为CPU密集任务)
+        """
+        self._results.create(task.id)
+        with self._idle:
+            self._outstanding += 1
+        with self._stats_lock:
+            self._stats["total_tasks"] += 1
+        self.task_queue.put(task, handler)
+    
     def get_result(self, task_id: str, timeout: Optional[float] = None) -> Optional[TaskResult]:
-        """获取任务结果
+        """获取任务结果，阻塞在任务的完成Future上直到任务完成
         
         Args:
             task_id: 任务ID
             timeout: 超时时间
             
         Returns:
-            TaskResult: 任务结果
+            TaskResult: 任务结果，超时、任务不存在或结果已过期时返回None
         """
-        start_time = time.time()
+        return self._results.wait(task_id, timeout)
+    
+    def get_future(self, task_id: str) -> Optional[Future]:
+        """获取任务的完成Future，可用于注册完成回调而不取走结果
         
-        while True:
-            if task_id in self._results:
-                return self._results.pop(task_id)
+        Args:
+            task_id: 任务ID
             
-            if timeout and (time.time() - start_time) > timeout:
-                return None
+        Returns:
+            Optional[Future]: 完成时结果为 TaskResult，任务不存在或结果已过期时返回None
+        """
+        return self._results.future(task_id)
+    
+    async def get_result_async(self, task_id: str, timeout: Optional[float] = None) -> Optional[TaskResult]:
+        """在事件循环中等待任务结果，不占用线程
+        
+        Args:
+            task_id: 任务ID
+            timeout: 超时时间
+            
+        Returns:
+            TaskResult: 任务结果，超时、任务不存在或结果已过期时返回None
+        """
+        future = self._results.future(task_id)
+        if future is None:
+            return None
+        try:
+            # shield 防止超时取消传递到完成Future
+            result = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), timeout)
+        except asyncio.TimeoutError:
+            return None
+        self._results.discard(task_id)
+        return result
+    
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """等待所有已提交的任务完成
+        
+        Args:
+            timeout: 超时时间
             
-            time.sleep(0.1)
+        Returns:
+            bool: 是否已全部完成
+        """
+        with self._idle:
+            return self._idle.wait_for(lambda: self._outstanding == 0, timeout)
     
     def get_all_results(self) -> Dict[str, TaskResult]:
-        """获取所有结果"""
-        results = self._results.copy()
-        self._results.clear()
-        return results
+        """获取所有已完成的结果"""
+        return self._results.pop_completed()
     
     def get_stats(self) -> Dict[str, Any]:
         """获取统计信息"""
-        stats = self._stats.copy()
+        # 资源监控信息在前，处理器自身的任务计数不被覆盖
+        stats = self.resource_monitor.get_stats()
+        with self._stats_lock:
+            stats.update(self._stats)
         
         # 计算平均执行时间
         if stats["completed_tasks"] > 0:
@@ -397,97 +712,137 @@ class ParallelProcessor:
                 stats["total_execution_time"] / stats["completed_tasks"]
             )
         
-        # 添加资源监控信息
-        stats.update(self.resource_monitor.get_stats())
-        
         # 添加队列信息
         stats["queue_size"] = self.task_queue.qsize()
-        stats["pending_results"] = len(self._results)
+        stats["in_flight"] = self._outstanding
+        stats["pending_results"] = self._results.completed_count()
+        stats["evicted_results"] = self._results.evicted
+        stats["timed_out_tasks"] = self._watchdog.timeouts
         
         return stats
     
+    def _start_worker(self):
+        """启动一个工作线程"""
+        worker = threading.Thread(
+            target=self._worker_loop,
+            name=f"ParallelWorker-{next(self._worker_seq)}",
+            daemon=True
+        )
+        with self._workers_lock:
+            self._workers.append(worker)
+        worker.start()
+    
     def _worker_loop(self):
-        """工作线程循环"""
-        while self._running:
+        """工作线程循环：阻塞等待任务，取到后直接执行"""
+        while True:
+            task, handler = self.task_queue.get_entry()
             try:
-                # 获取任务
-                task = self.task_queue.get(timeout=1.0)
-                if not task:
-                    continue
-                
-                # 执行任务
-                result = self._execute_task(task)
-                
-                # 存储结果
-                self._results[task.id] = result
-                
-                # 更新统计
-                if result.success:
-                    self._stats["completed_tasks"] += 1
+                if task is None:
+                    return
+                func, is_async, cpu_bound = handler
+                if is_async:
+                    # 调度到事件循环后立即处理下一个任务，协程完成时自行记录结果
+                    asyncio.run_coroutine_threadsafe(self._execute_async_task(task, func), self._async_loop)
                 else:
-                    self._stats["failed_tasks"] += 1
-                
-                self._stats["total_execution_time"] += result.execution_time
-                
-                # 标记任务完成
-                self.task_queue.task_done()
-                
+                    result = self._execute_task(task, func, cpu_bound)
+                    if result is None:
+                        # 任务超时后已由看门狗结束，并已启动替代的工作线程
+                        return
+                    self._finish(task, result)
             except Exception as e:
                 self.logger.error(f"工作线程错误: {e}")
-                time.sleep(1)
+                self._finish(task, TaskResult(task_id=task.id, success=False, error=e))
+            finally:
+                self.task_queue.task_done()
     
-    def _execute_task(self, task: Task) -> TaskResult:
+    def _on_task_timeout(self, task: Task, timeout: float, ident: int):
+        """看门狗回调：以超时失败结束任务，并启动新的工作线程替代被卡住的线程
+        
+        Args:
+            task: 超时的任务
+            timeout: 超时时间（秒）
+            ident: 执行该任务的工作线程ID
+        """
+        task.status = TaskStatus.FAILED
+        self.logger.error(f"任务执行超时({timeout}s)，以失败结束: {task.id}")
+        with self._workers_lock:
+            stuck = [worker for worker in self._workers if worker.ident == ident]
+            for worker in stuck:
+                self._workers.remove(worker)
+        if stuck and self._running:
+            self._start_worker()
+        self._finish(task, TaskResult(
+            task_id=task.id,
+            success=False,
+            error=TimeoutError(f"任务执行超时({timeout}s)"),
+            execution_time=timeout
+        ))
+    
+    def _finish(self, task: Task, result: TaskResult):
+        """记录任务结果，更新统计并唤醒等待方
+        
+        Args:
+            task: 任务
+            result: 执行结果
+        """
+        with self._stats_lock:
+            if result.success:
+                self._stats["completed_tasks"] += 1
+            else:
+                self._stats["failed_tasks"] += 1
+            self._stats["total_execution_time"] += result.execution_time
+        
+        self._results.complete(task.id, result)
+        with self._idle:
+            self._outstanding -= 1
+            if self._outstanding == 0:
+                self._idle.notify_all()
+    
+    def _execute_task(self, task: Task, processor_func: Callable[[Task], Any],
+                      cpu_bound: bool = False) -> Optional[TaskResult]:
         """执行任务
         
         Args:
             task: 要执行的任务
+            processor_func: 处理函数
+            cpu_bound: 是否为CPU密集任务
             
         Returns:
-            TaskResult: 执行结果
+            Optional[TaskResult]: 执行结果，任务已超时并由看门狗结束时返回None
         """
         start_time = time.time()
         retry_count = 0
+        backend = self._executor or (get_process_backend() if cpu_bound else None)
         
-        while retry_count <= self.config.retry_count:
+        while True:
             try:
                 # 更新任务状态
-                task.status = TaskStatus.RUNNING
+                task.status = TaskStatus.IN_PROGRESS
                 
-                # 获取处理函数
-                if task.metadata.get("is_async"):
-                    async_func = task.metadata.get("async_func")
-                    if not async_func:
-                        raise ValueError("异步处理函数未找到")
-                    
-                    # 在异步循环中执行
-                    future = asyncio.run_coroutine_threadsafe(
-                        async_func(task), self._async_loop
-                    )
-                    result = future.result(timeout=self.config.timeout)
+                if backend:
+                    # CPU密集任务转交进程后端，任务数据中的数组通过共享内存传递
+                    result = backend.submit(processor_func, task).result(timeout=self.config.timeout)
                 else:
-                    processor_func = task.metadata.get("processor_func")
-                    if not processor_func:
-                        raise ValueError("处理函数未找到")
-                    
-                    # 同步执行
-                    if self._executor:
-                        future = self._executor.submit(processor_func, task)
-                        result = future.result(timeout=self.config.timeout)
-                    else:
+                    # 在工作线程中直接执行，超时由看门狗以失败结束任务
+                    self._watchdog.begin(task, self.config.timeout)
+                    try:
                         result = processor_func(task)
+                    finally:
+                        self._watchdog.end()
                 
                 # 成功执行
-                execution_time = time.time() - start_time
                 task.status = TaskStatus.COMPLETED
-                
                 return TaskResult(
                     task_id=task.id,
                     success=True,
                     result=result,
-                    execution_time=execution_time,
+                    execution_time=time.time() - start_time,
                     retry_count=retry_count
                 )
                 
+            except TaskTimedOut:
+                self.logger.warning(f"已超时的任务执行结束，丢弃其结果: {task.id}")
+                return None
             except Exception as e:
                 retry_count += 1
                 
@@ -497,19 +852,65 @@ class ParallelProcessor:
                     )
                     time.sleep(self.config.retry_delay * retry_count)
                 else:
-                    # 最终失败
-                    execution_time = time.time() - start_time
-                    task.status = TaskStatus.FAILED
-                    
-                    self.logger.error(f"任务执行最终失败: {task.id}, 错误: {e}")
-                    
-                    return TaskResult(
-                        task_id=task.id,
-                        success=False,
-                        error=e,
-                        execution_time=execution_time,
-                        retry_count=retry_count - 1
+                    return self._failed_result(task, e, start_time, retry_count - 1)
+    
+    async def _execute_async_task(self, task: Task, async_func: Callable[[Task], Awaitable[Any]]):
+        """在事件循环中执行异步任务并记录结果
+        
+        Args:
+            task: 要执行的任务
+            async_func: 异步处理函数
+        """
+        start_time = time.time()
+        retry_count = 0
+        
+        while True:
+            try:
+                task.status = TaskStatus.IN_PROGRESS
+                result = await asyncio.wait_for(async_func(task), self.config.timeout)
+                task.status = TaskStatus.COMPLETED
+                self._finish(task, TaskResult(
+                    task_id=task.id,
+                    success=True,
+                    result=result,
+                    execution_time=time.time() - start_time,
+                    retry_count=retry_count
+                ))
+                return
+                
+            except Exception as e:
+                retry_count += 1
+                
+                if retry_count <= self.config.retry_count:
+                    self.logger.warning(
+                        f"异步任务执行失败，重试 {retry_count}/{self.config.retry_count}: {task.id}, 错误: {e}"
                     )
+                    await asyncio.sleep(self.config.retry_delay * retry_count)
+                else:
+                    self._finish(task, self._failed_result(task, e, start_time, retry_count - 1))
+                    return
+    
+    def _failed_result(self, task: Task, error: Exception, start_time: float, retry_count: int) -> TaskResult:
+        """生成最终失败的任务结果
+        
+        Args:
+            task: 任务
+            error: 最后一次的异常
+            start_time: 开始时间
+            retry_count: 已重试次数
+            
+        Returns:
+            TaskResult: 执行结果
+        """
+        task.status = TaskStatus.FAILED
+        self.logger.error(f"任务执行最终失败: {task.id}, 错误: {error}")
+        return TaskResult(
+            task_id=task.id,
+            success=False,
+            error=error,
+            execution_time=time.time() - start_time,
+            retry_count=retry_count
+        )
     
     def _run_async_loop(self):
         """运行异步循环"""
@@ -522,55 +923,284 @@ class ParallelProcessor:
             self._async_loop.close()
 
 
+
+
+class BalancingStrategy(Enum):
+    """负载均衡策略"""
+    ROUND_ROBIN = "round_robin"
+    LEAST_OUTSTANDING = "least_outstanding"  # 随机取两个目标，选未完成请求较少的
+    PEAK_EWMA = "peak_ewma"  # 随机取两个目标，选 峰值EWMA延迟×(未完成请求数+1) 较小的
+
+
+class TargetState(Enum):
+    """负载均衡目标状态"""
+    HEALTHY = "healthy"
+    EJECTED = "ejected"  # 错误率过高，暂停分配请求
+    HALF_OPEN = "half_open"  # 驱逐期满，放行少量探测请求
+
+
+@dataclass
+class LoadBalancerConfig:
+    """负载均衡器配置"""
+    strategy: BalancingStrategy = BalancingStrategy.PEAK_EWMA
+    decay_time: float = 10.0  # 峰值EWMA的衰减时间常数（秒）
+    error_window: int = 20  # 统计错误率的最近请求数
+    min_requests: int = 10  # 窗口内结果数达到该值才判断是否驱逐
+    error_threshold: float = 0.5  # 错误率超过该值时驱逐目标
+    ejection_time: float = 30.0  # 首次驱逐时长（秒），连续驱逐时翻倍
+    max_ejection_time: float = 300.0  # 驱逐时长上限（秒）
+    max_ejection_percent: float = 50.0  # 同时被驱逐的目标最多占比
+    half_open_probes: int = 1  # 半开状态下同时放行的探测请求数
+
+
+# 还没有延迟样本的目标已有请求在途时的代价，避免新目标在第一个结果返回前被压满
+_UNKNOWN_LATENCY_PENALTY = 1e6
+
+
+@dataclass
+class TargetStats:
+    """负载均衡目标的运行统计"""
+    outstanding: int = 0
+    ewma: float = 0.0  # 峰值EWMA延迟（秒），0表示还没有样本
+    last_update: Optional[float] = None
+    results: deque = field(default_factory=deque)  # 最近请求是否成功
+    state: TargetState = TargetState.HEALTHY
+    ejected_until: float = 0.0
+    ejections: int = 0  # 连续驱逐次数，决定下次驱逐时长
+    probes: int = 0  # 在途的探测请求数
+    completed: int = 0
+    failed: int = 0
+    
+    @property
+    def error_rate(self) -> float:
+        """窗口内的错误率"""
+        if not self.results:
+            return 0.0
+        return 1.0 - sum(self.results) / len(self.results)
+    
+    def observe(self, latency: float, now: float, decay_time: float):
+        """记录一次延迟样本
+        
+        比当前估计高的样本直接成为新估计（峰值），较低的样本按距上次更新的时间指数衰减地融合，
+        因此目标变慢时立即被避开，变快后逐渐恢复。
+        
+        Args:
+            latency: 延迟（秒）
+            now: 当前时间
+            decay_time: 衰减时间常数（秒）
+        """
+        if self.last_update is None or latency > self.ewma:
+            self.ewma = latency
+        else:
+            weight = math.exp(-max(now - self.last_update, 0.0) / decay_time)
+            self.ewma = self.ewma * weight + latency * (1.0 - weight)
+        self.last_update = now
+
+
 class LoadBalancer:
-    """负载均衡器"""
+    """负载均衡器
+    
+    按请求实际耗时在处理器之间分配任务：
+    1. 二选一（power of two choices）：随机取两个可用目标，按策略的代价选较小者，
+       既避开慢目标，又不会让所有请求同时涌向同一个"最优"目标
+    2. 驱逐：目标最近请求的错误率超过阈值时暂停分配，驱逐期满后进入半开状态放行探测请求，
+       探测成功则恢复，失败则以加倍的时长再次驱逐
     
-    def __init__(self, processors: List[ParallelProcessor]):
+    时钟和随机数生成器可注入，便于确定性地模拟。
+    """
+    
+    def __init__(self, processors: List[ParallelProcessor], config: LoadBalancerConfig = None,
+                 clock: Callable[[], float] = time.monotonic, rng: Optional[random.Random] = None):
         """初始化负载均衡器
         
         Args:
             processors: 处理器列表
+            config: 负载均衡器配置
+            clock: 时钟函数（秒）
+            rng: 随机数生成器
         """
         self.processors = processors
+        self.config = config or LoadBalancerConfig()
         self.logger = logging.getLogger(self.__class__.__name__)
+        self._clock = clock
+        self._rng = rng or random.Random()
+        self._lock = threading.Lock()
         self._current_index = 0
+        self._targets = [
+            TargetStats(results=deque(maxlen=self.config.error_window)) for _ in processors
+        ]
     
-    def submit_task(self, task: Task, processor_func: Callable[[Task], Any]) -> str:
+    def submit_task(self, task: Task, processor_func: Callable[[Task], Any],
+                    cpu_bound: bool = False) -> str:
         """提交任务到最优处理器
         
         Args:
             task: 任务
             processor_func: 处理函数
+            cpu_bound: 是否为CPU密集任务
             
         Returns:
             str: 任务ID
         """
-        # 选择最优处理器
-        processor = self._select_processor()
+        index = self.acquire()
+        processor = self.processors[index]
+        start = self._clock()
+        try:
+            task_id = processor.submit_task(task, processor_func, cpu_bound)
+        except Exception:
+            self.release(index, self._clock() - start, success=False)
+            raise
         
-        # 提交任务
-        return processor.submit_task(task, processor_func)
+        # 任务完成时记录从提交到完成的延迟和是否成功
+        future = processor.get_future(task_id)
+        if future is None:
+            self.release(index, self._clock() - start, success=True)
+        else:
+            future.add_done_callback(lambda done: self._release_done(index, start, done))
+        return task_id
     
-    def _select_processor(self) -> ParallelProcessor:
-        """选择最优处理器
+    def _release_done(self, index: int, start: float, done: Future):
+        """任务Future完成时释放目标，被取消或以异常结束的任务记为失败
+        
+        Args:
+            index: 目标下标
+            start: 提交时间
+            done: 已完成的任务Future
+        """
+        success = not done.cancelled() and done.exception() is None and done.result().success
+        self.release(index, self._clock() - start, success)
+    
+    def acquire(self) -> int:
+        """选择目标并记为一个在途请求
         
         Returns:
-            ParallelProcessor: 选中的处理器
+            int: 目标下标
         """
-        # 简单的轮询策略
-        processor = self.processors[self._current_index]
-        self._current_index = (self._current_index + 1) % len(self.processors)
+        with self._lock:
+            index = self._select_index(self._clock())
+            target = self._targets[index]
+            target.outstanding += 1
+            if target.state is TargetState.HALF_OPEN:
+                target.probes += 1
+            return index
+    
+    def release(self, index: int, latency: float, success: bool = True):
+        """请求完成时更新目标的延迟估计和健康状态
+        
+        Args:
+            index: acquire 返回的目标下标
+            latency: 请求延迟（秒）
+            success: 是否成功
+        """
+        with self._lock:
+            now = self._clock()
+            target = self._targets[index]
+            target.outstanding = max(target.outstanding - 1, 0)
+            if success:
+                target.completed += 1
+                target.observe(latency, now, self.config.decay_time)
+            else:
+                target.failed += 1
+                # 快速失败不应让目标显得更快，失败只会抬高延迟估计
+                if latency > target.ewma:
+                    target.observe(latency, now, self.config.decay_time)
+            target.results.append(success)
+            
+            if target.state is TargetState.HALF_OPEN:
+                target.probes = max(target.probes - 1, 0)
+                if success:
+                    target.state = TargetState.HEALTHY
+                    target.ejections = 0
+                    target.results.clear()
+                    self.logger.info(f"探测请求成功，目标恢复: {index}")
+                else:
+                    self._eject(index, now)
+            elif (target.state is TargetState.HEALTHY
+                  and len(target.results) >= self.config.min_requests
+                  and target.error_rate > self.config.error_threshold
+                  and self._can_eject()):
+                self._eject(index, now)
+    
+    def _select_index(self, now: float) -> int:
+        """选择目标（调用方持有锁）"""
+        candidates = []
+        for index, target in enumerate(self._targets):
+            if target.state is TargetState.EJECTED and now >= target.ejected_until:
+                target.state = TargetState.HALF_OPEN
+                target.probes = 0
+                self.logger.info(f"驱逐期满，目标进入半开状态: {index}")
+            if target.state is TargetState.HALF_OPEN:
+                # 半开目标优先接收探测请求，尽快确认是否恢复
+                if target.probes < self.config.half_open_probes:
+                    return index
+            elif target.state is TargetState.HEALTHY:
+                candidates.append(index)
         
-        # 可以扩展为基于负载的选择策略
-        # min_load_processor = min(self.processors, 
-        #                         key=lambda p: p.task_queue.qsize())
+        if not candidates:
+            # 没有可用目标时在全部目标中选择，而不是拒绝请求
+            candidates = list(range(len(self._targets)))
         
-        return processor
+        if self.config.strategy is BalancingStrategy.ROUND_ROBIN:
+            for _ in range(len(self._targets)):
+                index = self._current_index
+                self._current_index = (self._current_index + 1) % len(self._targets)
+                if index in candidates:
+                    return index
+            return candidates[0]
+        
+        if len(candidates) == 1:
+            return candidates[0]
+        first, second = self._rng.sample(candidates, 2)
+        return first if self._cost(first) <= self._cost(second) else second
+    
+    def _cost(self, index: int) -> float:
+        """目标的代价，越小越优先"""
+        target = self._targets[index]
+        if self.config.strategy is BalancingStrategy.LEAST_OUTSTANDING:
+            return target.outstanding
+        if target.last_update is None:
+            return _UNKNOWN_LATENCY_PENALTY * target.outstanding
+        return target.ewma * (target.outstanding + 1)
+    
+    def _can_eject(self) -> bool:
+        """被驱逐的目标数是否还低于上限"""
+        ejected = sum(1 for target in self._targets if target.state is not TargetState.HEALTHY)
+        return ejected + 1 <= len(self._targets) * self.config.max_ejection_percent / 100
+    
+    def _eject(self, index: int, now: float):
+        """驱逐目标，连续驱逐时时长翻倍"""
+        target = self._targets[index]
+        duration = min(self.config.ejection_time * 2 ** target.ejections, self.config.max_ejection_time)
+        target.state = TargetState.EJECTED
+        target.ejections += 1
+        target.ejected_until = now + duration
+        target.results.clear()
+        self.logger.warning(f"目标错误率过高，驱逐 {duration:.1f}s: {index}")
+    
+    def get_target_stats(self) -> List[Dict[str, Any]]:
+        """获取各目标的负载均衡统计"""
+        with self._lock:
+            return [
+                {
+                    "state": target.state.value,
+                    "outstanding": target.outstanding,
+                    "ewma_latency": target.ewma,
+                    "error_rate": target.error_rate,
+                    "ejections": target.ejections,
+                    "completed": target.completed,
+                    "failed": target.failed
+                }
+                for target in self._targets
+            ]
     
     def get_overall_stats(self) -> Dict[str, Any]:
         """获取整体统计信息"""
+        targets = self.get_target_stats()
         overall_stats = {
             "total_processors": len(self.processors),
+            "strategy": self.config.strategy.value,
+            "ejected_processors": sum(1 for target in targets if target["state"] != TargetState.HEALTHY.value),
+            "targets": targets,
             "total_tasks": 0,
             "total_completed": 0,
             "total_failed": 0,
@@ -587,4 +1217,4 @@ class LoadBalancer:
         if len(self.processors) > 0:
             overall_stats["average_queue_size"] /= len(self.processors)
         
-        return overall_stats
\ No newline at end of file
+        return overall_stats
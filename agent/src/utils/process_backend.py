@@ -0,0 +1,362 @@
+# -*- coding: utf-8 -*-
+"""
+多进程执行后端
+
+librosa特征提取、OpenCV人脸检测等CPU密集计算放在线程池中执行时会被GIL串行化。
+进程后端把这类任务交给常驻的工作进程：
+1. 共享内存：参数中较大的NumPy数组（音频缓冲区、视频帧）写入 multiprocessing.shared_memory，
+   只把块名、形状和类型随任务发送，工作进程直接映射为数组视图，不再整体序列化
+2. 预热：工作进程启动时执行一次预热函数（加载人脸检测器、触发librosa的JIT编译），
+   之后的任务直接复用进程内资源注册表中的实例
+3. 生命周期：共享内存块由提交方创建，任务结束（成功、失败或取消）后由提交方释放
+"""
+
+import os
+import copy
+import logging
+import threading
+import dataclasses
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+from ..core.system.resource_registry import get_resource_registry
+
+logger = logging.getLogger(__name__)
+
+# 小于该大小的数组直接随任务序列化，复制成本低于创建共享内存块
+DEFAULT_SHARE_THRESHOLD = 64 * 1024
+
+
+@dataclass(frozen=True)
+class SharedArrayRef:
+    """共享内存中数组的引用，代替数组本身随任务发送"""
+    name: str
+    shape: Tuple[int, ...]
+    dtype: str
+
+
+def share_arrays(value: Any, blocks: List[shared_memory.SharedMemory],
+                 threshold: int = DEFAULT_SHARE_THRESHOLD) -> Any:
+    """把参数中的大数组复制到共享内存，替换为 SharedArrayRef
+
+    递归处理字典、列表、元组和数据类实例（如 Task），没有数组被替换的部分原样返回。
+
+    Args:
+        value: 任务参数
+        blocks: 收集新建的共享内存块，由调用方负责释放
+        threshold: 数组字节数达到该值时才放入共享内存
+
+    Returns:
+        Any: 替换后的参数
+    """
+    if isinstance(value, np.ndarray):
+        if value.nbytes == 0 or value.nbytes < threshold or value.dtype.hasobject:
+            return value
+        shm = shared_memory.SharedMemory(create=True, size=value.nbytes)
+        blocks.append(shm)
+        np.ndarray(value.shape, dtype=value.dtype, buffer=shm.buf)[...] = value
+        return SharedArrayRef(shm.name, value.shape, value.dtype.str)
+    return _map_container(value, lambda item: share_arrays(item, blocks, threshold))
+
+
+def attach_arrays(value: Any, opened: List[shared_memory.SharedMemory]) -> Any:
+    """把参数中的 SharedArrayRef 映射为共享内存上的数组视图（工作进程中调用）
+
+    Args:
+        value: 收到的任务参数
+        opened: 收集打开的共享内存块，任务结束后关闭
+
+    Returns:
+        Any: 还原后的参数
+    """
+    if isinstance(value, SharedArrayRef):
+        shm = shared_memory.SharedMemory(name=value.name)
+        opened.append(shm)
+        return np.ndarray(value.shape, dtype=np.dtype(value.dtype), buffer=shm.buf)
+    return _map_container(value, lambda item: attach_arrays(item, opened))
+
+
+def _own_arrays(value: Any) -> Any:
+    """复制结果中不拥有内存的数组，避免返回共享内存上的视图"""
+    if isinstance(value, np.ndarray):
+        return value if value.flags.owndata else value.copy()
+    return _map_container(value, _own_arrays)
+
+
+def _map_container(value: Any, func: Callable[[Any], Any]) -> Any:
+    """对容器中的元素逐个应用 func，没有元素变化时返回原对象"""
+    if isinstance(value, dict):
+        items = {key: func(item) for key, item in value.items()}
+        changed = any(items[key] is not item for key, item in value.items())
+        return items if changed else value
+    if isinstance(value, (list, tuple)):
+        items = [func(item) for item in value]
+        if all(new is old for new, old in zip(items, value)):
+            return value
+        if isinstance(value, list):
+            return items
+        return type(value)(*items) if hasattr(value, "_fields") else type(value)(items)
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        updates = {}
+        for f in dataclasses.fields(value):
+            item = getattr(value, f.name)
+            new = func(item)
+            if new is not item:
+                updates[f.name] = new
+        if not updates:
+            return value
+        result = copy.copy(value)
+        for name, item in updates.items():
+            object.__setattr__(result, name, item)
+        return result
+    return value
+
+
+def _release_blocks(blocks: List[shared_memory.SharedMemory]):
+    """关闭并删除提交方创建的共享内存块"""
+    for shm in blocks:
+        try:
+            shm.close()
+            shm.unlink()
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error(f"释放共享内存失败: {shm.name}, 错误: {e}")
+
+
+# ---- 工作进程侧 ----
+
+_worker_state: Dict[str, Any] = {"pid": None, "warmed": [], "tasks": 0}
+# 仍被引用（如异常回溯持有数组视图）而暂时无法关闭的共享内存块，下个任务结束时重试
+_unclosed: List[shared_memory.SharedMemory] = []
+
+
+def _init_worker(warm_up: Optional[Callable[[], Any]], ready: Any):
+    """工作进程初始化：执行一次预热，完成后通过就绪队列通知提交方"""
+    _worker_state["pid"] = os.getpid()
+    try:
+        if warm_up is not None:
+            _worker_state["warmed"] = list(warm_up() or [])
+    except Exception as e:
+        logger.error(f"工作进程预热失败: {e}")
+    finally:
+        ready.put(os.getpid())
+
+
+def _close_blocks(opened: List[shared_memory.SharedMemory]):
+    """关闭工作进程打开的共享内存块（只关闭映射，删除由提交方负责）"""
+    pending = _unclosed + opened
+    _unclosed.clear()
+    for shm in pending:
+        try:
+            shm.close()
+        except BufferError:
+            _unclosed.append(shm)
+
+
+def _call_attached(func: Callable, args: tuple, kwargs: dict,
+                   opened: List[shared_memory.SharedMemory]) -> Any:
+    """还原参数并执行函数，返回前复制结果中的共享内存视图"""
+    args = attach_arrays(args, opened)
+    kwargs = attach_arrays(kwargs, opened)
+    return _own_arrays(func(*args, **kwargs))
+
+
+def _run_shared(func: Callable, args: tuple, kwargs: dict) -> Any:
+    """工作进程中执行任务的入口"""
+    opened: List[shared_memory.SharedMemory] = []
+    try:
+        return _call_attached(func, args, kwargs, opened)
+    finally:
+        _worker_state["tasks"] += 1
+        _close_blocks(opened)
+
+
+def worker_status() -> Dict[str, Any]:
+    """工作进程状态（作为任务提交，在工作进程中执行）
+
+    Returns:
+        Dict[str, Any]: 进程ID、预热的资源、已执行任务数和资源注册表的加载统计
+    """
+    stats = get_resource_registry().get_stats()
+    return {
+        "pid": os.getpid(),
+        "warmed": [str(name) for name in _worker_state["warmed"]],
+        "tasks": _worker_state["tasks"],
+        "loads": stats["loads"],
+        "hits": stats["hits"],
+    }
+
+
+def warm_up_cpu_worker() -> List[Hashable]:
+    """CPU任务工作进程的默认预热
+
+    注册并加载Haar人脸检测器，并对一小段合成音频提取一次特征，
+    使librosa的JIT编译在启动时完成，而不是落在第一个任务上。
+
+    Returns:
+        List[Hashable]: 预热的资源名称
+    """
+    from ..analyzers.visual.frame_inference_service import FACE_DETECTOR_RESOURCE, create_haar_face_detector
+    from ..analyzers.speech.audio_feature_extractor import AudioFeatureExtractor
+
+    registry = get_resource_registry()
+    registry.register(FACE_DETECTOR_RESOURCE, create_haar_face_detector, warm_up=True)
+    warmed = registry.warm_up()
+
+    sr = 16000
+    t = np.arange(sr, dtype=np.float32) / sr
+    AudioFeatureExtractor.extract_all_features(0.1 * np.sin(2 * np.pi * 220 * t), sr)
+    return warmed
+
+
+def _noop():
+    """空任务，用于拉起工作进程"""
+    return None
+
+
+# ---- 提交方 ----
+
+class ProcessBackend:
+    """基于共享内存传递数组的进程池后端"""
+
+    def __init__(self, max_workers: Optional[int] = None,
+                 warm_up: Optional[Callable[[], Any]] = warm_up_cpu_worker,
+                 start_method: str = "spawn",
+                 share_threshold: int = DEFAULT_SHARE_THRESHOLD):
+        """初始化进程后端
+
+        Args:
+            max_workers: 工作进程数，默认为CPU核数
+            warm_up: 每个工作进程启动时执行一次的预热函数（需可被pickle，即模块级函数）
+            start_method: 进程启动方式。提交方进程通常已有工作线程和事件循环，默认使用spawn而不是fork
+            share_threshold: 数组字节数达到该值时通过共享内存传递
+        """
+        self.max_workers = max_workers or os.cpu_count() or 1
+        self.share_threshold = share_threshold
+        context = multiprocessing.get_context(start_method)
+        self._ready = context.Queue()
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=context,
+            initializer=_init_worker,
+            initargs=(warm_up, self._ready)
+        )
+        self.pids: List[int] = []
+        self._lock = threading.Lock()
+        self.stats = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "shared_arrays": 0,
+            "shared_bytes": 0
+        }
+
+    def start(self, timeout: Optional[float] = None) -> List[int]:
+        """启动全部工作进程并等待每个进程预热完成
+
+        Args:
+            timeout: 等待每个进程就绪的最长时间（秒）
+
+        Returns:
+            List[int]: 工作进程ID
+        """
+        with self._lock:
+            if self.pids:
+                return list(self.pids)
+            # 进程池在没有空闲进程时为每次提交新建一个进程，同时提交即可拉起全部工作进程
+            for _ in range(self.max_workers):
+                self._pool.submit(_noop)
+            self.pids = sorted(self._ready.get(timeout=timeout) for _ in range(self.max_workers))
+        logger.info(f"进程后端已启动，工作进程数: {self.max_workers}")
+        return list(self.pids)
+
+    def submit(self, func: Callable, *args, **kwargs) -> Future:
+        """提交任务到工作进程
+
+        Args:
+            func: 模块级函数（需可被pickle）
+            *args: 位置参数，其中的大数组通过共享内存传递
+            **kwargs: 关键字参数，其中的大数组通过共享内存传递
+
+        Returns:
+            Future: 任务结果
+        """
+        blocks: List[shared_memory.SharedMemory] = []
+        try:
+            args = share_arrays(args, blocks, self.share_threshold)
+            kwargs = share_arrays(kwargs, blocks, self.share_threshold)
+            future = self._pool.submit(_run_shared, func, args, kwargs)
+        except BaseException:
+            _release_blocks(blocks)
+            raise
+
+        with self._lock:
+            self.stats["submitted"] += 1
+            self.stats["shared_arrays"] += len(blocks)
+            self.stats["shared_bytes"] += sum(shm.size for shm in blocks)
+        future.add_done_callback(lambda done: self._on_done(done, blocks))
+        return future
+
+    def _on_done(self, future: Future, blocks: List[shared_memory.SharedMemory]):
+        """任务结束后释放共享内存并更新统计"""
+        _release_blocks(blocks)
+        with self._lock:
+            if not future.cancelled() and future.exception() is None:
+                self.stats["completed"] += 1
+            else:
+                self.stats["failed"] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        with self._lock:
+            return {**self.stats, "max_workers": self.max_workers}
+
+    def shutdown(self, wait: bool = True):
+        """关闭进程池
+
+        Args:
+            wait: 是否等待已提交的任务完成
+        """
+        self._pool.shutdown(wait=wait, cancel_futures=not wait)
+        self._ready.close()
+        logger.info("进程后端已关闭")
+
+
+# 全局进程后端实例
+_process_backend: Optional[ProcessBackend] = None
+_backend_lock = threading.Lock()
+
+
+def get_process_backend(max_workers: Optional[int] = None,
+                        warm_up: Optional[Callable[[], Any]] = warm_up_cpu_worker) -> ProcessBackend:
+    """获取全局进程后端，首次调用时创建并预热工作进程
+
+    Args:
+        max_workers: 工作进程数（仅首次调用生效）
+        warm_up: 预热函数（仅首次调用生效）
+
+    Returns:
+        ProcessBackend: 进程后端
+    """
+    global _process_backend
+    with _backend_lock:
+        if _process_backend is None:
+            backend = ProcessBackend(max_workers=max_workers, warm_up=warm_up)
+            backend.start()
+            _process_backend = backend
+        return _process_backend
+
+
+def shutdown_process_backend(wait: bool = True):
+    """关闭全局进程后端"""
+    global _process_backend
+    with _backend_lock:
+        backend, _process_backend = _process_backend, None
+    if backend is not None:
+        backend.shutdown(wait=wait)
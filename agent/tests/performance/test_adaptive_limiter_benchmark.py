@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+"""
+自适应并发限制器基准测试：提供方容量有限时自适应上限与固定信号量的吞吐量对比
+"""
+import asyncio
+import time
+
+import pytest
+
+from agent.src.services.adaptive_limiter import ProviderLimiter
+
+
+class RateLimitError(Exception):
+    """模拟SDK抛出的429异常"""
+
+    def __init__(self):
+        super().__init__("Too Many Requests")
+        self.status_code = 429
+
+
+class StubProvider:
+    """最多同时处理capacity个请求的桩服务，超出时立即返回429"""
+
+    def __init__(self, capacity: int, latency: float):
+        self.capacity = capacity
+        self.latency = latency
+        self.active = 0
+        self.rejected = 0
+
+    async def call(self):
+        if self.active >= self.capacity:
+            self.rejected += 1
+            raise RateLimitError()
+        self.active += 1
+        try:
+            await asyncio.sleep(self.latency)
+        finally:
+            self.active -= 1
+
+
+async def _run_workload(provider: StubProvider, requests: int, acquire_slot):
+    """429时短暂退避后重试，返回耗时"""
+    async def call():
+        while True:
+            try:
+                async with acquire_slot():
+                    await provider.call()
+                return
+            except RateLimitError:
+                await asyncio.sleep(provider.latency)
+
+    start = time.monotonic()
+    await asyncio.gather(*(call() for _ in range(requests)))
+    return time.monotonic() - start
+
+
+@pytest.mark.asyncio
+async def test_simulation_adaptive_beats_fixed_semaphore():
+    """模拟：提供方容量为6，自适应上限收敛到容量附近，吞吐量高于保守的固定信号量"""
+    capacity, latency, requests = 6, 0.01, 300
+
+    fixed_provider = StubProvider(capacity, latency)
+    semaphore = asyncio.Semaphore(2)
+    fixed_time = await _run_workload(fixed_provider, requests, lambda: semaphore)
+
+    adaptive_provider = StubProvider(capacity, latency)
+    limiter = ProviderLimiter("sim", {"initial_limit": 2, "max_limit": 32, "cooldown": latency})
+    adaptive_time = await _run_workload(adaptive_provider, requests, limiter.slot)
+
+    stats = limiter.get_stats()["concurrency"]
+    print(f"\n固定信号量(2): {requests / fixed_time:.0f} req/s")
+    print(f"自适应限制:    {requests / adaptive_time:.0f} req/s, 最终上限={stats['limit']}, "
+          f"最大并发={stats['max_in_flight']}, 429次数={adaptive_provider.rejected}")
+
+    assert adaptive_time < fixed_time
+    assert stats["max_in_flight"] > 2
+    assert 3 <= stats["limit"] <= capacity + 2
+    # 429只出现在探测容量边界时，远少于请求总数
+    assert adaptive_provider.rejected < requests * 0.2
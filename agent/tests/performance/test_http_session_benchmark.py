@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+共享HTTP会话基准测试：每次请求新建会话与共享连接池的p50/p99延迟对比
+"""
+import statistics
+import time
+from contextlib import asynccontextmanager
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from agent.src.core.system.config import AgentConfig
+from agent.src.services.http_session_manager import HttpSessionManager
+
+
+@asynccontextmanager
+async def stub_server():
+    """启动本地桩服务器"""
+    async def handle(request):
+        return web.json_response({"organic": []})
+
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        await runner.cleanup()
+
+
+def _percentile(values, percent):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+@pytest.mark.asyncio
+async def test_benchmark_shared_session_latency():
+    """基准：每次请求新建会话 vs 共享连接池的p50/p99延迟"""
+    rounds = 200
+    manager = HttpSessionManager(AgentConfig())
+
+    async with stub_server() as base_url:
+        url = f"{base_url}/bench"
+
+        per_request = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            async with aiohttp.ClientSession() as session:
+                async with session.get(url) as response:
+                    await response.read()
+            per_request.append(time.perf_counter() - start)
+
+        shared = []
+        for _ in range(rounds):
+            start = time.perf_counter()
+            async with manager.get(url) as response:
+                await response.read()
+            shared.append(time.perf_counter() - start)
+
+    await manager.close()
+
+    before = {"p50": statistics.median(per_request), "p99": _percentile(per_request, 99)}
+    after = {"p50": statistics.median(shared), "p99": _percentile(shared, 99)}
+    print(f"\n每请求新建会话: p50={before['p50'] * 1000:.2f}ms p99={before['p99'] * 1000:.2f}ms")
+    print(f"共享连接池:     p50={after['p50'] * 1000:.2f}ms p99={after['p99'] * 1000:.2f}ms")
+
+    assert after["p50"] < before["p50"]
@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+LLM路由基准测试：首选提供方偶发变慢时对冲请求对尾延迟的改善
+"""
+import asyncio
+import random
+import time
+
+import pytest
+
+from agent.src.core.system.config import AgentConfig
+from agent.src.services.llm_router import LLMProvider, LLMRouter, reset_provider_health
+
+MESSAGES = [{"role": "user", "content": "请评估这段回答"}]
+
+
+class FakeProvider(LLMProvider):
+    """按给定延迟序列返回结果的桩提供方"""
+
+    def __init__(self, name, latency=0.01, fail=False, stream_fail_after=None):
+        super().__init__(lambda: None)
+        self.name = name
+        self.latency = latency
+        self.fail = fail
+        self.stream_fail_after = stream_fail_after
+        self.calls = 0
+        self.cancelled = 0
+
+    def _next_latency(self):
+        return self.latency() if callable(self.latency) else self.latency
+
+    async def chat(self, messages, temperature, max_tokens):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self._next_latency())
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            return {"status": "error", "content": "", "error": f"{self.name}不可用"}
+        return {"status": "success", "content": f"来自{self.name}"}
+
+    async def stream(self, messages, temperature, max_tokens, usage):
+        self.calls += 1
+        await asyncio.sleep(self._next_latency())
+        if self.fail:
+            raise ConnectionError(f"{self.name}不可用")
+        for index, piece in enumerate(["评分", "结果"]):
+            if self.stream_fail_after is not None and index >= self.stream_fail_after:
+                raise ConnectionError("连接中断")
+            yield piece
+        usage["total_tokens"] = 10
+
+
+@pytest.fixture(autouse=True)
+def _reset_health():
+    reset_provider_health()
+    yield
+    reset_provider_health()
+
+
+def _router(*providers, preferred=None, **overrides):
+    return LLMRouter(list(providers), AgentConfig(), preferred=preferred, **overrides)
+
+
+@pytest.mark.asyncio
+async def test_simulation_hedging_bounds_tail_latency():
+    """模拟：首选提供方约4%的请求变慢到0.5s，对冲后尾延迟由较快的提供方决定"""
+    rng = random.Random(7)
+
+    def flaky_latency():
+        return 0.5 if rng.random() < 0.04 else 0.01
+
+    async def run(router, requests=100):
+        latencies = []
+
+        async def one():
+            start = time.monotonic()
+            response = await router.chat(MESSAGES)
+            assert response["status"] == "success"
+            latencies.append(time.monotonic() - start)
+
+        # 先用顺序请求积累延迟样本，再并发压测
+        for _ in range(20):
+            await one()
+        latencies.clear()
+        await asyncio.gather(*(one() for _ in range(requests)))
+        latencies.sort()
+        return latencies[int(len(latencies) * 0.99) - 1], latencies[len(latencies) // 2]
+
+    single = _router(FakeProvider("primary", latency=flaky_latency), hedge=False)
+    single_p99, single_p50 = await run(single)
+
+    reset_provider_health()
+    hedged = _router(FakeProvider("primary", latency=flaky_latency), FakeProvider("backup", latency=0.03),
+                     preferred="primary", hedge_min_delay=0.02)
+    hedged_p99, hedged_p50 = await run(hedged)
+
+    stats = hedged.get_stats()
+    print(f"\n单一提供方: p50={single_p50 * 1000:.0f}ms p99={single_p99 * 1000:.0f}ms")
+    print(f"对冲路由:   p50={hedged_p50 * 1000:.0f}ms p99={hedged_p99 * 1000:.0f}ms, "
+          f"对冲 {stats['hedged']}/{stats['requests']} 次, 对冲胜出 {stats['hedge_wins']} 次")
+
+    assert single_p99 >= 0.45
+    assert hedged_p99 < 0.25
+    assert stats["hedged"] <= 0.2 * stats["requests"]
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+"""
+并行处理器基准测试：10万个空任务的吞吐、处理大量任务后未取走结果的内存占用保持有界
+"""
+import threading
+import time
+import tracemalloc
+import uuid
+
+import pytest
+
+from agent.src.core.workflow.state import Task, TaskStatus, TaskType
+from agent.src.utils.parallel_processor import ParallelProcessor, ProcessorConfig
+
+TASKS = 100000
+
+
+def _task() -> Task:
+    return Task(id=str(uuid.uuid4()), type=TaskType.CUSTOM)
+
+
+def _noop(task):
+    return None
+
+
+@pytest.fixture
+def make_processor():
+    processors = []
+
+    def make(**config) -> ParallelProcessor:
+        config.setdefault("retry_count", 0)
+        processor = ParallelProcessor(ProcessorConfig(**config))
+        processor.start()
+        processors.append(processor)
+        return processor
+
+    yield make
+    for processor in processors:
+        processor.stop()
+
+
+def test_noop_throughput_without_extra_threads(make_processor):
+    baseline = threading.active_count()
+    processor = make_processor(max_workers=4)
+    tasks = [_task() for _ in range(TASKS)]
+
+    start = time.monotonic()
+    for task in tasks:
+        processor.submit_task(task, _noop)
+    assert processor.wait_idle(timeout=60)
+    elapsed = time.monotonic() - start
+
+    stats = processor.get_stats()
+    assert stats["completed_tasks"] == TASKS and stats["failed_tasks"] == 0
+    # 只有工作线程、资源监控线程和超时看门狗线程，没有第二层线程池
+    assert threading.active_count() <= baseline + 4 + 2
+    assert all(task.status == TaskStatus.COMPLETED for task in tasks)
+    print(f"\n{TASKS}个空任务耗时 {elapsed:.2f}s，吞吐 {TASKS / elapsed:.0f} 任务/秒")
+
+
+def test_unclaimed_results_stay_bounded(make_processor):
+    processor = make_processor(max_workers=2, max_results=1000)
+
+    def run(count):
+        for _ in range(count):
+            processor.submit_task(_task(), _noop)
+        assert processor.wait_idle(timeout=30)
+
+    run(2000)
+    tracemalloc.start()
+    run(2000)
+    warm, _ = tracemalloc.get_traced_memory()
+    run(16000)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    stats = processor.get_stats()
+    assert stats["pending_results"] == 1000
+    assert stats["evicted_results"] == 19000
+    assert len(processor._results) == 1000
+    assert not processor.task_queue._task_map
+    # 再处理8倍的任务后，保留的内存不随任务数增长
+    assert current - warm < 512 * 1024
+    print(f"\n处理2万个任务后未取走的结果 {stats['pending_results']} 条，内存增长 {(current - warm) / 1024:.0f}KB")
@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+"""
+进程后端基准测试：多个工作进程上特征提取和人脸检测的结果与进程内一致、工作进程只预热一次、随核数加速
+"""
+import os
+import time
+
+import numpy as np
+import pytest
+
+from agent.src.analyzers.speech.audio_feature_extractor import AudioFeatureExtractor
+from agent.src.analyzers.visual.frame_inference_service import FACE_DETECTOR_RESOURCE, detect_faces
+from agent.src.utils.process_backend import ProcessBackend, worker_status
+
+SR = 16000
+CPU_COUNT = os.cpu_count() or 1
+WORKERS = max(2, min(4, CPU_COUNT))
+
+
+def _audio(seconds: float, seed: int = 0) -> np.ndarray:
+    """带噪声的合成语音信号"""
+    t = np.arange(int(SR * seconds), dtype=np.float32) / SR
+    noise = np.random.default_rng(seed).standard_normal(t.size).astype(np.float32)
+    return 0.3 * np.sin(2 * np.pi * 180 * t) * (1 + np.sin(2 * np.pi * 2 * t)) + 0.05 * noise
+
+
+def _frame(seed: int = 0) -> np.ndarray:
+    """640x480的合成BGR视频帧"""
+    return np.random.default_rng(seed).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+
+
+def _wait_released(backend: ProcessBackend, timeout: float = 5.0) -> bool:
+    """等待已完成任务的共享内存块被释放"""
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        stats = backend.get_stats()
+        if stats["completed"] + stats["failed"] == stats["submitted"]:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture(scope="module")
+def backend():
+    backend = ProcessBackend(max_workers=WORKERS)
+    backend.start()
+    yield backend
+    backend.shutdown()
+
+
+def _shm_blocks() -> set:
+    return {name for name in os.listdir("/dev/shm") if name.startswith("psm_")} if os.path.isdir("/dev/shm") else set()
+
+
+def test_results_match_in_process_and_memory_is_released(backend):
+    before = _shm_blocks()
+    audio, frame = _audio(3, seed=1), _frame(1)
+    audio_future = backend.submit(AudioFeatureExtractor.extract_all_features, audio, SR)
+    face_future = backend.submit(detect_faces, frame)
+
+    assert audio_future.result(timeout=60) == AudioFeatureExtractor.extract_all_features(audio, SR)
+    assert face_future.result(timeout=60) == detect_faces(frame)
+
+    # 工作进程中的异常原样传回，共享内存同样被释放
+    with pytest.raises(Exception):
+        backend.submit(detect_faces, np.zeros((480, 640, 5), dtype=np.uint8)).result(60)
+
+    assert _wait_released(backend)
+    stats = backend.get_stats()
+    assert stats["shared_arrays"] == 3 and stats["failed"] == 1
+    assert _shm_blocks() <= before
+
+
+def test_workers_preload_models_once(backend):
+    frames = [_frame(i) for i in range(4 * WORKERS)]
+    futures = [backend.submit(detect_faces, frame) for frame in frames]
+    assert [future.result(timeout=120) for future in futures] == [detect_faces(frame) for frame in frames]
+
+    statuses = [backend.submit(worker_status).result(timeout=60) for _ in range(2 * WORKERS)]
+    assert {s["pid"] for s in statuses} <= set(backend.pids) and len(backend.pids) == WORKERS
+    for status in statuses:
+        assert FACE_DETECTOR_RESOURCE in status["warmed"]
+        # 检测器只在预热时加载一次，之后的任务都命中进程内实例
+        assert status["loads"] == 1
+
+
+def _run_batch(backend: ProcessBackend, clips, frames) -> float:
+    start = time.monotonic()
+    futures = [backend.submit(AudioFeatureExtractor.extract_all_features, clip, SR) for clip in clips]
+    futures += [backend.submit(detect_faces, frame) for frame in frames]
+    for future in futures:
+        future.result(timeout=300)
+    return time.monotonic() - start
+
+
+def test_speedup_with_core_count(backend):
+    clips = [_audio(10, seed=i) for i in range(8)]
+    frames = [_frame(i) for i in range(8)]
+
+    single = ProcessBackend(max_workers=1)
+    single.start()
+    try:
+        serial_time = _run_batch(single, clips, frames)
+    finally:
+        single.shutdown()
+    parallel_time = _run_batch(backend, clips, frames)
+
+    speedup = serial_time / parallel_time
+    print(f"\n8段10s音频+8帧640x480: 1个工作进程 {serial_time:.2f}s，{WORKERS}个工作进程 {parallel_time:.2f}s，"
+          f"加速比 {speedup:.2f}x（CPU核数 {CPU_COUNT}）")
+    # 单核机器上多进程无法加速，只在有多个核时检查
+    if CPU_COUNT >= 2:
+        assert speedup > 1.3
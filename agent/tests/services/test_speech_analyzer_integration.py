@@ -131,7 +131,7 @@ async def run_integration_test():
             return
             
         print("\n讯飞服务状态: 正常")
-        print(f"并发限制: {speech_analyzer.async_xunfei_service.api_semaphore._value} 个并发请求")
+        print(f"并发限制: {speech_analyzer.async_xunfei_service.limiter.concurrency.limit} 个并发请求（自适应）")
         
         # 测试1: 语音转文字
         print("\n" + "-"*40)
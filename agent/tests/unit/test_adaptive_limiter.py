@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+"""
+自适应并发限制器单元测试
+"""
+import asyncio
+import threading
+
+import pytest
+
+from agent.src.core.system.config import AgentConfig
+from agent.src.services import adaptive_limiter as limiter_module
+from agent.src.services.adaptive_limiter import (
+    AdaptiveConcurrencyLimiter,
+    ProviderLimiter,
+    TokenBucket,
+    get_provider_limiter,
+    is_overload_exception,
+    reset_provider_limiters,
+)
+
+
+class RateLimitError(Exception):
+    """模拟SDK抛出的429异常"""
+
+    def __init__(self):
+        super().__init__("Too Many Requests")
+        self.status_code = 429
+
+
+class FakeClock:
+    """可手动推进的时钟"""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def _reset_registry():
+    reset_provider_limiters()
+    yield
+    reset_provider_limiters()
+
+
+def test_is_overload_exception():
+    assert is_overload_exception(asyncio.TimeoutError())
+    assert is_overload_exception(RateLimitError())
+    assert not is_overload_exception(ValueError("bad request"))
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_limits_rate(monkeypatch):
+    """令牌桶在突发容量用完后按速率放行"""
+    clock = FakeClock()
+
+    async def fake_sleep(seconds):
+        clock.now += seconds
+
+    monkeypatch.setattr(limiter_module.asyncio, "sleep", fake_sleep)
+    bucket = TokenBucket(rate=64, burst=5, clock=clock)
+    for _ in range(15):
+        await bucket.acquire()
+
+    # 前5个立即放行，后10个按64/s放行共10/64s
+    assert clock.now == pytest.approx(10 / 64)
+    assert bucket.total_wait == pytest.approx(10 / 64)
+
+
+@pytest.mark.asyncio
+async def test_limit_grows_when_saturated_and_healthy():
+    """延迟稳定且并发用满时上限加性增加"""
+    limiter = ProviderLimiter("test", {"initial_limit": 2, "max_limit": 10})
+
+    async def call():
+        async with limiter.slot():
+            await asyncio.sleep(0.005)
+
+    await asyncio.gather(*(call() for _ in range(100)))
+
+    stats = limiter.get_stats()["concurrency"]
+    assert limiter.concurrency.limit > 2
+    assert stats["increases"] > 0
+    assert stats["in_flight"] == 0
+    assert stats["successes"] == 100
+
+
+@pytest.mark.asyncio
+async def test_limit_does_not_grow_when_idle():
+    """并发未用满时不增加上限"""
+    limiter = ProviderLimiter("test", {"initial_limit": 4})
+    for _ in range(20):
+        async with limiter.slot():
+            await asyncio.sleep(0)
+    assert limiter.concurrency.limit == 4
+
+
+@pytest.mark.asyncio
+async def test_mixed_endpoint_latencies_do_not_shrink_limit():
+    """同一提供方的快慢端点混合的健康流量（无错误）不会因延迟差异降低上限"""
+    limiter = ProviderLimiter("test", {"initial_limit": 4, "cooldown": 0.01})
+
+    async def worker(index):
+        for i in range(20):
+            endpoint, latency = ("iat", 0.01) if (index + i) % 2 else ("spark", 0.05)
+            async with limiter.slot(endpoint):
+                await asyncio.sleep(latency)
+
+    await asyncio.gather(*(worker(index) for index in range(4)))
+
+    stats = limiter.get_stats()["concurrency"]
+    assert stats["decreases"] == 0 and limiter.concurrency.limit >= 4
+    assert set(stats["latency"]) == {"iat", "spark"}
+
+
+@pytest.mark.asyncio
+async def test_latency_rise_backs_off_only_when_saturated():
+    limiter = AdaptiveConcurrencyLimiter("test", initial_limit=2, cooldown=0)
+    for _ in range(5):
+        limiter.record_success(0.01, "iat")
+    # 未用满并发时延迟上升不是排队信号
+    for _ in range(5):
+        limiter.record_success(0.1, "iat")
+    assert limiter.limit == 2
+
+    await limiter.acquire()
+    await limiter.acquire()
+    limiter.record_success(0.1, "iat")
+    assert limiter.limit == 1
+
+
+@pytest.mark.asyncio
+async def test_overload_backs_off_with_cooldown():
+    """429异常和流控标记使上限减半，冷却期内同一批失败只减一次"""
+    limiter = ProviderLimiter("test", {"initial_limit": 16, "cooldown": 60})
+
+    for _ in range(3):
+        with pytest.raises(RateLimitError):
+            async with limiter.slot():
+                raise RateLimitError()
+
+    stats = limiter.get_stats()["concurrency"]
+    assert limiter.concurrency.limit == 8
+    assert stats["overloads"] == 3
+    assert stats["in_flight"] == 0
+
+    limiter.concurrency._last_decrease = 0.0
+    async with limiter.slot() as outcome:
+        outcome.mark_overloaded()
+    assert limiter.concurrency.limit == 4
+
+
+@pytest.mark.asyncio
+async def test_error_rate_backoff():
+    """普通错误只有在错误率超过阈值后才降低上限"""
+    limiter = AdaptiveConcurrencyLimiter("test", initial_limit=8, error_rate_threshold=0.3, cooldown=0)
+    for _ in range(7):
+        limiter.record_success(0.01)
+    limiter.record_error()
+    limiter.record_error()
+    assert limiter.limit == 8
+    limiter.record_error()
+    limiter.record_error()
+    assert limiter.limit == 4
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiters_do_not_leak_slots():
+    """排队中被取消的请求不会占用名额"""
+    limiter = AdaptiveConcurrencyLimiter("test", initial_limit=1)
+    await limiter.acquire()
+
+    waiters = [asyncio.create_task(limiter.acquire()) for _ in range(5)]
+    await asyncio.sleep(0)
+    for task in waiters[:4]:
+        task.cancel()
+    limiter.release()
+    await asyncio.gather(*waiters, return_exceptions=True)
+
+    assert waiters[4].done() and not waiters[4].cancelled()
+    assert limiter.in_flight == 1
+    limiter.release()
+    assert limiter.in_flight == 0
+    assert limiter.get_stats()["waiting"] == 0
+
+
+def test_limiter_shared_across_event_loops():
+    """不同线程中的事件循环共享同一个并发上限"""
+    limiter = AdaptiveConcurrencyLimiter("test", initial_limit=2, max_limit=2)
+    state = {"active": 0, "max_active": 0}
+    state_lock = threading.Lock()
+
+    async def worker():
+        for _ in range(5):
+            await limiter.acquire()
+            try:
+                with state_lock:
+                    state["active"] += 1
+                    state["max_active"] = max(state["max_active"], state["active"])
+                await asyncio.sleep(0.005)
+                with state_lock:
+                    state["active"] -= 1
+            finally:
+                limiter.release()
+
+    threads = [threading.Thread(target=lambda: asyncio.run(worker())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=10)
+
+    assert state["max_active"] == 2
+    assert limiter.in_flight == 0
+    assert limiter.get_stats()["requests"] == 20
+
+
+def test_registry_shares_limiter_per_provider():
+    """同一提供方的所有服务实例共享限制器，配置只在首次创建时读取"""
+    config = AgentConfig()
+    config.config["services"]["xunfei"]["concurrency"] = {"initial_limit": 3}
+    first = get_provider_limiter("xunfei", config)
+    second = get_provider_limiter("xunfei", AgentConfig())
+
+    assert first is second
+    assert first.concurrency.limit == 3
+    assert set(first.buckets) == set(limiter_module.PROVIDER_DEFAULTS["xunfei"]["rate_limits"])
+    assert get_provider_limiter("openai") is not first
@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+"""
+分析执行节点线程池单元测试：共享线程池在多次执行间复用线程，单个分析器超时不阻塞整体
+"""
+import asyncio
+import threading
+import time
+import uuid
+
+import pytest
+
+from agent.src.core.workflow.state import AnalysisResult, GraphState, Task, TaskStatus, TaskType
+from agent.src.nodes.executors import analyzer_executor
+from agent.src.nodes.executors.analyzer_executor import (
+    AnalyzerExecutor,
+    get_analyzer_pool,
+    shutdown_analyzer_pool,
+)
+
+TASK_TYPES = [TaskType.SPEECH_ANALYSIS, TaskType.VISUAL_ANALYSIS, TaskType.CONTENT_ANALYSIS]
+
+
+class RecordingAdapter:
+    """记录执行线程的分析器适配器桩"""
+
+    def __init__(self, task_type, seconds=0.0):
+        self.task_type = task_type
+        self.seconds = seconds
+        self.threads = set()
+
+    def process(self, state, task_data):
+        self.threads.add(threading.current_thread().name)
+        if self.seconds:
+            time.sleep(self.seconds)
+        return AnalysisResult(task_id=task_data["id"], type=self.task_type, score=8.0)
+
+
+def _executor(speech_seconds=0.0, **config) -> AnalyzerExecutor:
+    executor = AnalyzerExecutor(config)
+    executor.analyzer_adapters = {
+        "speech": RecordingAdapter(TaskType.SPEECH_ANALYSIS, speech_seconds),
+        "visual": RecordingAdapter(TaskType.VISUAL_ANALYSIS),
+        "content": RecordingAdapter(TaskType.CONTENT_ANALYSIS),
+    }
+    return executor
+
+
+def _state() -> GraphState:
+    state = GraphState()
+    state.task_state.parallel_execution = True
+    for task_type in TASK_TYPES:
+        task_id = str(uuid.uuid4())
+        state.task_state.tasks.append(Task(id=task_id, type=task_type, data={"id": task_id}))
+    return state
+
+
+@pytest.fixture(autouse=True)
+def _fresh_pool():
+    shutdown_analyzer_pool()
+    yield
+    shutdown_analyzer_pool()
+
+
+def test_thread_count_stays_flat_across_executions():
+    executor = _executor()
+    baseline = threading.active_count()
+    bound = baseline + analyzer_executor.ANALYZER_POOL_SIZE
+
+    counts = []
+    for _ in range(1000):
+        state = executor.execute(_state())
+        counts.append(threading.active_count())
+        assert state.error is None
+        assert all(task.status == TaskStatus.COMPLETED for task in state.task_state.tasks)
+
+    # 线程池按需启动线程后不再增长，每次执行新建线程池时共需创建3000个线程
+    assert max(counts) <= bound
+    assert counts[-1] == max(counts[100:])
+    used = set().union(*(adapter.threads for adapter in executor.analyzer_adapters.values()))
+    assert all(name.startswith("analyzer") for name in used)
+    assert len(used) <= analyzer_executor.ANALYZER_POOL_SIZE
+    assert get_analyzer_pool() is get_analyzer_pool()
+
+    shutdown_analyzer_pool()
+    assert threading.active_count() == baseline
+
+
+def test_slow_adapter_times_out_without_result():
+    executor = _executor(speech_timeout=0.1, speech_seconds=0.5)
+
+    state = executor.execute(_state())
+
+    # 超时的分析器不再用模拟分数充当结果，任务被取消并记为缺失，其余分析器的结果保留
+    results = {result.type: result for result in state.analysis_state.results}
+    assert set(results) == {TaskType.VISUAL_ANALYSIS, TaskType.CONTENT_ANALYSIS}
+    assert all(not result.details.get("mock") for result in results.values())
+    assert [task.status for task in state.task_state.tasks] == [
+        TaskStatus.CANCELLED, TaskStatus.COMPLETED, TaskStatus.COMPLETED
+    ]
+    assert state.metadata == {"timed_out": ["speech"], "partial_result": True}
+
+
+@pytest.mark.asyncio
+async def test_execute_async_does_not_block_event_loop():
+    executor = _executor(speech_timeout=0.1, speech_seconds=0.5)
+    ticks = []
+
+    async def ticker():
+        while True:
+            ticks.append(time.monotonic())
+            await asyncio.sleep(0.01)
+
+    ticking = asyncio.create_task(ticker())
+    try:
+        state = await executor.execute_async(_state())
+    finally:
+        ticking.cancel()
+
+    # 等待线程池中的任务期间事件循环仍在调度其他协程
+    assert len(ticks) >= 5
+    assert {result.type for result in state.analysis_state.results} == {
+        TaskType.VISUAL_ANALYSIS, TaskType.CONTENT_ANALYSIS
+    }
+    assert state.task_state.tasks[0].status == TaskStatus.CANCELLED
+    assert all(name.startswith("analyzer") for name in executor.analyzer_adapters["visual"].threads)
+
+
+@pytest.mark.asyncio
+async def test_execute_async_runs_sequential_tasks_off_loop():
+    executor = _executor()
+    state = _state()
+    state.task_state.parallel_execution = False
+
+    state = await executor.execute_async(state)
+
+    assert len(state.analysis_state.results) == 3
+    assert all(task.status == TaskStatus.COMPLETED for task in state.task_state.tasks)
+    assert all(name.startswith("analyzer") for name in executor.analyzer_adapters["speech"].threads)
+
+
+@pytest.mark.asyncio
+async def test_execute_inside_running_loop_uses_shared_pool():
+    executor = _executor(speech_timeout=0.1, speech_seconds=0.5)
+
+    state = executor.execute(_state())
+
+    # 已有运行中的事件循环时不嵌套运行，直接等待共享线程池中的任务
+    assert len(state.analysis_state.results) == 2
+    assert state.task_state.tasks[0].status == TaskStatus.CANCELLED
+    assert all(name.startswith("analyzer") for name in executor.analyzer_adapters["visual"].threads)
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+批量内容评分单元测试：问答打包、按编号解析结果与解析失败时逐个重新评分
+"""
+import asyncio
+import json
+import re
+
+import pytest
+
+from agent.src.analyzers.content.content_analyzer import ContentAnalyzer
+from agent.src.core.system.config import AgentConfig
+from agent.src.services.prompt_budget import estimate_tokens
+
+JOB_POSITION = {"title": "后端开发工程师", "requirements": ["熟悉Redis", "高并发系统设计"], "skills": ["Python"]}
+QA_PAIRS = [
+    {"question": f"问题{i}：请介绍你在项目中如何使用缓存", "answer": f"回答{i}：我用Redis缓存热点数据，接口延迟降低了{i * 10}%。"}
+    for i in range(8)
+]
+FILLER = "我们团队平时的沟通比较多，大家也会互相帮忙解决问题。"
+
+
+def _item(index, overall):
+    return {
+        "index": index,
+        "scores": {"professional_relevance": overall, "fluency": overall, "overall_score": overall},
+        "analysis": {"strengths": ["结合实际"], "suggestions": ["补充细节"]},
+        "summary": f"回答{index}"
+    }
+
+
+class FakeRouter:
+    """按提示词中的问答编号返回结果的桩路由，记录调用次数"""
+
+    def __init__(self, drop=(), broken=False):
+        self.drop = set(drop)
+        self.broken = broken
+        self.batch_calls = 0
+        self.single_calls = 0
+        self.prompts = []
+
+    async def chat(self, messages, temperature=0.3, max_tokens=2000):
+        prompt = messages[-1]["content"]
+        self.prompts.append(prompt)
+        await asyncio.sleep(0.01)
+        if "### 问答" not in prompt:
+            self.single_calls += 1
+            return {"status": "success", "content": json.dumps(_item(0, 60), ensure_ascii=False)}
+        self.batch_calls += 1
+        if self.broken:
+            return {"status": "success", "content": "评分如下：无法给出JSON"}
+        numbers = [int(n) for n in re.findall(r"### 问答 (\d+)", prompt)]
+        # 打乱顺序返回，验证按index对应
+        results = [_item(n, 70 + n) for n in reversed(numbers) if n not in self.drop]
+        return {"status": "success", "content": "```json\n" + json.dumps({"results": results}, ensure_ascii=False) + "\n```"}
+
+
+def _analyzer(router, **content) -> ContentAnalyzer:
+    config = AgentConfig()
+    config.config["services"].setdefault("openai", {})["api_key"] = "test-key"
+    config.config["content"].update(content)
+    analyzer = ContentAnalyzer(config)
+    analyzer.llm_router = router
+    return analyzer
+
+
+@pytest.mark.asyncio
+async def test_session_answers_scored_in_few_calls():
+    router = FakeRouter()
+    analyzer = _analyzer(router, batch_size=6)
+
+    results = await analyzer.analyze_batch(QA_PAIRS, JOB_POSITION)
+
+    assert router.batch_calls == 2 and router.single_calls == 0
+    # 结果与问答顺序一致：第一批编号1-6，第二批编号1-2
+    assert [r["scores"]["overall_score"] for r in results] == [71, 72, 73, 74, 75, 76, 71, 72]
+    assert all("index" not in r for r in results)
+    assert "问题7" in router.prompts[1] and "熟悉Redis" in router.prompts[0]
+
+
+@pytest.mark.asyncio
+async def test_missing_items_rescored_individually():
+    router = FakeRouter(drop={2, 5})
+    analyzer = _analyzer(router, batch_size=8)
+
+    results = await analyzer.analyze_batch(QA_PAIRS, JOB_POSITION)
+
+    assert router.batch_calls == 1 and router.single_calls == 2
+    assert results[1]["scores"]["overall_score"] == 60
+    assert results[4]["scores"]["overall_score"] == 60
+    assert results[0]["scores"]["overall_score"] == 71
+
+
+@pytest.mark.asyncio
+async def test_unparseable_batch_falls_back_to_per_answer_calls():
+    router = FakeRouter(broken=True)
+    analyzer = _analyzer(router, batch_size=4)
+
+    results = await analyzer.analyze_batch(QA_PAIRS[:4], JOB_POSITION)
+
+    assert router.batch_calls == 1 and router.single_calls == 4
+    assert all(r["scores"]["overall_score"] == 60 for r in results)
+
+
+def test_batches_respect_token_budget():
+    analyzer = _analyzer(FakeRouter(), batch_size=10, batch_answer_tokens=800)
+    long_pairs = [{"question": f"问题{i}", "answer": FILLER * 100 + "我用Redis缓存热点数据。"} for i in range(10)]
+
+    batches = analyzer._pack_batches(long_pairs, JOB_POSITION)
+
+    budget = analyzer.prompt_budget.budget_for("content_batch")
+    assert len(batches) > 1
+    assert sum(len(batch["indices"]) for batch in batches) == 10
+    assert all(estimate_tokens(batch["prompt"]) <= budget for batch in batches)
+    assert all("节选" in batch["prompt"] and "Redis" in batch["prompt"] for batch in batches)
+
+
+def test_parse_batch_response_by_order_without_index():
+    analyzer = _analyzer(FakeRouter())
+    items = [{k: v for k, v in _item(n, 80).items() if k != "index"} for n in (1, 2)]
+    items[1]["scores"].pop("overall_score")
+
+    parsed = analyzer._parse_batch_response(json.dumps(items), 2)
+
+    assert set(parsed) == {1, 2}
+    assert parsed[2]["scores"]["overall_score"] == 80
+    assert analyzer._parse_batch_response(json.dumps({"results": [{"index": 1, "scores": {}}]}), 1) == {}
@@ -0,0 +1,166 @@
+# -*- coding: utf-8 -*-
+"""
+批量帧推理服务单元测试
+"""
+import threading
+import pytest
+import numpy as np
+
+from agent.src.analyzers.visual import frame_inference_service as service_module
+from agent.src.analyzers.visual.frame_inference_service import FACE_DETECTOR_RESOURCE, BatchedFrameInferenceService
+from agent.src.core.system.config import AgentConfig
+from agent.src.core.system.resource_registry import get_resource_registry
+
+
+def _make_frame(marker: int) -> np.ndarray:
+    """生成一个左上角像素带标记值的灰度帧"""
+    frame = np.zeros((48, 64), dtype=np.uint8)
+    frame[0, 0] = marker
+    return frame
+
+
+class RecordingDetector:
+    """记录每个批次大小的桩检测器，按帧标记返回可区分的人脸框"""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def __call__(self, frames):
+        self.batch_sizes.append(len(frames))
+        return [[(int(frame[0, 0]), 0, 10, 10)] for frame in frames]
+
+
+@pytest.fixture
+def batch_config():
+    config = AgentConfig()
+    config.set("visual", "inference_max_batch_size", 32)
+    config.set("visual", "inference_batch_window", 0.05)
+    return config
+
+
+def test_results_routed_back_to_each_session(batch_config):
+    """多个会话并发提交的帧应被聚成批次，且结果回到对应的会话"""
+    detector = RecordingDetector()
+    service = BatchedFrameInferenceService(batch_config, detector=detector)
+    service.start()
+
+    results = {}
+    barrier = threading.Barrier(20)
+
+    def session_worker(index):
+        barrier.wait()
+        results[index] = service.detect(f"session-{index}", _make_frame(index), timeout=5)
+
+    try:
+        threads = [threading.Thread(target=session_worker, args=(i,)) for i in range(20)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        service.stop()
+
+    for index in range(20):
+        assert results[index] == [(index, 0, 10, 10)]
+
+    stats = service.get_stats()
+    assert stats["total_frames"] == 20
+    assert stats["total_batches"] < 20
+    assert max(detector.batch_sizes) > 1
+
+
+def test_batch_size_is_bounded(batch_config):
+    """单个批次不超过配置的最大批次大小"""
+    batch_config.set("visual", "inference_max_batch_size", 4)
+    detector = RecordingDetector()
+    service = BatchedFrameInferenceService(batch_config, detector=detector)
+
+    futures = [service.submit("session", _make_frame(i)) for i in range(10)]
+    try:
+        assert [f.result(timeout=5) for f in futures] == [[(i, 0, 10, 10)] for i in range(10)]
+    finally:
+        service.stop()
+
+    assert max(detector.batch_sizes) <= 4
+    assert sum(detector.batch_sizes) == 10
+
+
+def test_detector_error_propagates_to_callers(batch_config):
+    """检测失败时，批次内的所有调用方都收到异常"""
+    def failing_detector(frames):
+        raise RuntimeError("模型推理失败")
+
+    service = BatchedFrameInferenceService(batch_config, detector=failing_detector)
+    try:
+        with pytest.raises(RuntimeError):
+            service.detect("session", _make_frame(1), timeout=5)
+    finally:
+        service.stop()
+
+    assert service.get_stats()["failed_batches"] == 1
+
+
+@pytest.mark.asyncio
+async def test_detect_async(batch_config):
+    """异步接口返回与同步接口一致的结果"""
+    service = BatchedFrameInferenceService(batch_config, detector=RecordingDetector())
+    try:
+        faces = await service.detect_async("session", _make_frame(7))
+    finally:
+        service.stop()
+
+    assert faces == [(7, 0, 10, 10)]
+
+
+def test_haar_backend_on_blank_frames(batch_config):
+    """默认Haar后端对空白帧返回空结果"""
+    service = BatchedFrameInferenceService(batch_config)
+    try:
+        faces = service.detect("session", np.zeros((120, 160, 3), dtype=np.uint8), timeout=10)
+    finally:
+        service.stop()
+
+    assert faces == []
+    assert service.get_stats()["backend"] == "haarcascade"
+
+
+def test_missing_results_fail_remaining_requests(batch_config):
+    """检测器返回的结果少于批次大小时，没有结果的请求以异常结束"""
+    batch_config.set("visual", "inference_batch_window", 0.2)
+    service = BatchedFrameInferenceService(batch_config, detector=lambda frames: [[(0, 0, 10, 10)]])
+
+    futures = [service.submit("session", _make_frame(i)) for i in range(3)]
+    try:
+        assert futures[0].result(timeout=5) == [(0, 0, 10, 10)]
+        for future in futures[1:]:
+            with pytest.raises(RuntimeError):
+                future.result(timeout=5)
+    finally:
+        service.stop()
+
+
+def test_haar_frames_detected_in_worker_pool(batch_config, monkeypatch):
+    """Haar后端不合批，各帧分发到线程池检测；停止时归还共享检测器的引用"""
+    batch_config.set("visual", "inference_haar_workers", 2)
+    threads = []
+    detect = service_module._detect_haar
+
+    def recording_detect(detector, frame):
+        threads.append(threading.current_thread().name)
+        return detect(detector, frame)
+
+    monkeypatch.setattr(service_module, "_detect_haar", recording_detect)
+    registry = get_resource_registry()
+    refs = registry.get_ref_count(FACE_DETECTOR_RESOURCE)
+
+    service = BatchedFrameInferenceService(batch_config)
+    service.start()
+    assert registry.get_ref_count(FACE_DETECTOR_RESOURCE) == refs + 1
+    futures = [service.submit(f"session-{i}", np.zeros((120, 160), dtype=np.uint8)) for i in range(6)]
+    assert [future.result(timeout=10) for future in futures] == [[]] * 6
+    service.stop()
+
+    assert registry.get_ref_count(FACE_DETECTOR_RESOURCE) == refs
+    assert len(threads) == 6 and all(name.startswith("FrameInferenceHaar") for name in threads)
+    stats = service.get_stats()
+    assert stats["total_frames"] == 6 and stats["max_batch_size"] == 1
@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+"""
+共享HTTP会话管理器单元测试
+"""
+import asyncio
+from contextlib import asynccontextmanager
+
+import aiohttp
+import pytest
+from aiohttp import web
+
+from agent.src.core.system.config import AgentConfig
+from agent.src.services import http_session_manager as manager_module
+from agent.src.services.http_session_manager import HttpSessionManager, init_http_session_manager
+from agent.src.services.websearch_service import WebSearchService
+
+
+@asynccontextmanager
+async def stub_server(delay: float = 0.0):
+    """启动本地桩服务器，记录客户端连接（对端端口）和最大并发数"""
+    state = {"peers": set(), "active": 0, "max_active": 0, "requests": 0}
+
+    async def handle(request):
+        state["requests"] += 1
+        state["peers"].add(request.transport.get_extra_info("peername"))
+        state["active"] += 1
+        state["max_active"] = max(state["max_active"], state["active"])
+        try:
+            if delay:
+                await asyncio.sleep(delay)
+            return web.json_response({"organic": [{"title": "结果", "link": "https://example.com", "snippet": "摘要"}]})
+        finally:
+            state["active"] -= 1
+
+    app = web.Application()
+    app.router.add_route("*", "/{tail:.*}", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}", state
+    finally:
+        await runner.cleanup()
+
+
+def _make_manager(**http_config) -> HttpSessionManager:
+    config = AgentConfig()
+    for key, value in http_config.items():
+        config.config["services"]["http"][key] = value
+    return HttpSessionManager(config)
+
+
+@pytest.mark.asyncio
+async def test_sequential_requests_reuse_connection():
+    """同一事件循环内的顺序请求复用同一个会话和保活连接"""
+    manager = _make_manager()
+    async with stub_server() as (base_url, state):
+        for _ in range(10):
+            async with manager.get(f"{base_url}/ping") as response:
+                assert response.status == 200
+                await response.json()
+
+        assert manager.get_session() is manager.get_session()
+        assert state["requests"] == 10
+        assert len(state["peers"]) == 1
+
+        stats = manager.get_stats()
+        assert stats["sessions_created"] == 1
+        assert stats["requests"] == 10
+        assert stats["in_flight"] == 0
+        assert stats["pool"]["idle"] == 1
+        assert stats["pool"]["in_use"] == 0
+    await manager.close()
+
+
+@pytest.mark.asyncio
+async def test_limit_per_host_and_pool_utilization():
+    """单主机连接数受限，并发期间可观察到连接池使用率"""
+    manager = _make_manager(limit=10, limit_per_host=4)
+    async with stub_server(delay=0.05) as (base_url, state):
+        async def call():
+            async with manager.get(f"{base_url}/slow") as response:
+                await response.read()
+
+        tasks = [asyncio.create_task(call()) for _ in range(12)]
+        await asyncio.sleep(0.02)
+        pool = manager.get_pool_stats()
+        await asyncio.gather(*tasks)
+
+        assert state["max_active"] <= 4
+        assert pool["in_use"] == 4
+        assert pool["utilization"] == pytest.approx(0.4)
+        assert list(pool["in_use_per_host"].values()) == [4]
+        assert len(state["peers"]) == 4
+    await manager.close()
+
+
+def test_sessions_are_per_event_loop_and_closed_outside_loop():
+    """每个事件循环各有一个会话；asyncio.run结束后遗留的会话在下次创建时被丢弃"""
+    manager = _make_manager()
+
+    async def get_session():
+        return manager.get_session()
+
+    first = asyncio.run(get_session())
+    second = asyncio.run(get_session())
+
+    assert first is not second
+    assert first.closed
+    assert manager.get_stats()["sessions_created"] == 2
+
+    manager.close_all()
+    assert second.closed
+    assert manager.get_pool_stats()["sessions"] == 0
+
+
+def test_reset_after_fork_drops_inherited_sessions():
+    manager = _make_manager()
+    loop = asyncio.new_event_loop()
+    try:
+        async def get_session():
+            return manager.get_session()
+
+        parent_session = loop.run_until_complete(get_session())
+        manager._pid = -1
+        child_session = loop.run_until_complete(get_session())
+
+        assert child_session is not parent_session
+        loop.run_until_complete(parent_session.close())
+        loop.run_until_complete(child_session.close())
+    finally:
+        loop.close()
+
+
+@pytest.mark.asyncio
+async def test_websearch_uses_shared_session():
+    """Web搜索通过全局共享会话发送请求"""
+    manager = init_http_session_manager()
+    async with stub_server() as (base_url, state):
+        config = AgentConfig()
+        config.config["services"]["websearch"] = {"serper_api_key": "test-key", "cache_enabled": False}
+        service = WebSearchService(config)
+        service.serper_url = f"{base_url}/search"
+
+        for _ in range(3):
+            result = await service.search("面试技巧", engine="serper")
+            assert result["status"] == "success"
+            assert result["results"][0]["title"] == "结果"
+
+        assert len(state["peers"]) == 1
+        assert manager.get_stats()["requests"] == 3
+    await manager_module.shutdown_http_sessions()
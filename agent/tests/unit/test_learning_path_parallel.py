@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+学习路径并发生成单元测试：各需求并发处理、资源批量分析与共享并发上限
+"""
+import asyncio
+import json
+import re
+
+import pytest
+
+from agent.src.core.system.config import AgentConfig
+from agent.src.nodes.executors.learning_path_generator import LearningPathGenerator
+
+LATENCY = 0.05
+REPORT = {
+    f"need{i}": {"area": f"领域{i}", "level": "beginner", "priority": 5 - i, "description": "提升该领域能力"}
+    for i in range(4)
+}
+
+
+class Upstream:
+    """统计调用次数和最大并发数的桩服务"""
+
+    def __init__(self, batch_broken=False):
+        self.batch_broken = batch_broken
+        self.calls = {"retrieve": 0, "context7": 0, "search": 0, "batch": 0, "single": 0, "path": 0}
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    async def _call(self, kind):
+        self.calls[kind] += 1
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(LATENCY)
+        finally:
+            self.in_flight -= 1
+
+    async def retrieve(self, query, max_results=5):
+        await self._call("retrieve")
+        return [{"text": f"{query} 内部资料{i}", "metadata": {"title": f"{query} 内部资料{i}"}, "score": 0.9}
+                for i in range(3)]
+
+    async def context7(self, query, library_name=None, tokens=3000):
+        await self._call("context7")
+        return []
+
+    async def search(self, query, num_results=5):
+        await self._call("search")
+        return {"status": "success", "results": [
+            {"title": f"{query} 在线教程{i}", "link": f"https://example.com/{query}/{i}", "snippet": "教程"}
+            for i in range(2)
+        ]}
+
+    async def chat_completion(self, messages, temperature=0.3, max_tokens=500):
+        prompt = messages[-1]["content"]
+        if "学习路径规划师" in messages[0]["content"]:
+            await self._call("path")
+            return {"status": "success", "content": json.dumps({"timeline": "两周", "milestones": ["入门", "实践", "总结"]})}
+        if "JSON数组" in prompt:
+            await self._call("batch")
+            if self.batch_broken:
+                return {"status": "success", "content": "无法分析"}
+            count = len(re.findall(r"资源标题:", prompt))
+            items = [{"index": i + 1, "source": "course", "level": "beginner", "estimated_time": "2小时",
+                      "description": f"资源{i + 1}"} for i in reversed(range(count))]
+            return {"status": "success", "content": json.dumps(items, ensure_ascii=False)}
+        await self._call("single")
+        return {"status": "success", "content": json.dumps({"source": "article", "level": "advanced",
+                                                            "estimated_time": "1小时", "description": "单个"})}
+
+
+def _generator(upstream, **learning) -> LearningPathGenerator:
+    config = AgentConfig()
+    config.config["learning_path"] = {"max_resources_per_need": 5, **learning}
+    generator = LearningPathGenerator(config)
+    generator.modelscope_service = object()
+    generator.openai_service = type("OpenAI", (), {"chat_completion": staticmethod(upstream.chat_completion)})()
+    generator.websearch_service = type("Search", (), {"search": staticmethod(upstream.search)})()
+    generator.hybrid_retriever = type("Hybrid", (), {"retrieve": staticmethod(upstream.retrieve)})()
+    generator.context7_retriever = type("Context7", (), {"retrieve": staticmethod(upstream.context7)})()
+
+    async def report(input_data):
+        return dict(REPORT)
+
+    generator._generate_learning_report = report
+    return generator
+
+
+@pytest.mark.asyncio
+async def test_needs_generated_concurrently_with_batched_analysis():
+    upstream = Upstream()
+    generator = _generator(upstream, max_concurrency=32)
+
+    output = await generator.generate({"analysis_result": {}, "tech_field": "后端"})
+
+    # 4个需求的检索和搜索同时进行
+    assert upstream.max_in_flight >= 4
+    assert [path.need.area for path in output.learning_paths] == ["领域0", "领域1", "领域2", "领域3"]
+    assert upstream.calls["batch"] == 4 and upstream.calls["single"] == 0
+    assert upstream.calls["path"] == 4
+    resources = output.learning_paths[0].resources
+    assert len(resources) == 5
+    # 批量结果按index对应到资源
+    assert [r.description for r in resources] == [f"资源{i}" for i in range(1, 6)]
+
+
+@pytest.mark.asyncio
+async def test_shared_concurrency_budget_is_respected():
+    upstream = Upstream()
+    generator = _generator(upstream, max_concurrency=3)
+
+    output = await generator.generate({"analysis_result": {}, "tech_field": "后端"})
+
+    assert len(output.learning_paths) == 4
+    assert upstream.max_in_flight == 3
+
+
+@pytest.mark.asyncio
+async def test_unparseable_batch_falls_back_to_individual_analysis():
+    upstream = Upstream(batch_broken=True)
+    generator = _generator(upstream, max_concurrency=32, resource_batch_size=3)
+
+    output = await generator.generate({"analysis_result": {}, "tech_field": "后端"})
+
+    # 每个需求5个资源分为3+2两批，批量失败后逐个分析
+    assert upstream.calls["batch"] == 8 and upstream.calls["single"] == 20
+    assert all(r.level == "advanced" for path in output.learning_paths for r in path.resources)
+
+
+def test_slots_are_keyed_by_loop_and_pruned():
+    upstream = Upstream()
+    generator = _generator(upstream, max_concurrency=2)
+
+    async def run():
+        await generator.generate({"analysis_result": {}, "tech_field": "后端"})
+        return asyncio.get_running_loop()
+
+    # 每次 asyncio.run 都是新的事件循环，已关闭循环的名额不会累积
+    loops = [asyncio.run(run()) for _ in range(3)]
+    assert len(generator._slots) == 1 and loops[-1] in generator._slots
+    assert upstream.max_in_flight == 2
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+"""
+LLM响应缓存单元测试
+"""
+import asyncio
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+
+from agent.src.core.system.cache_system import FileCache
+from agent.src.core.system.config import AgentConfig
+from agent.src.services.adaptive_limiter import reset_provider_limiters
+from agent.src.services.llm_cache import LLMResponseCache, get_llm_cache, init_llm_cache, make_cache_key
+from agent.src.services.openai_service import OpenAIService
+
+MESSAGES = [
+    {"role": "system", "content": "你是一位专业的面试评估专家"},
+    {"role": "user", "content": "请评估这段回答：我主导了订单系统的重构。"}
+]
+
+
+def _completion(content="评分结果", total_tokens=300):
+    return SimpleNamespace(
+        choices=[SimpleNamespace(message=SimpleNamespace(content=content))],
+        usage=SimpleNamespace(prompt_tokens=200, completion_tokens=100, total_tokens=total_tokens)
+    )
+
+
+def _stream(pieces):
+    async def stream():
+        for piece in pieces:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+    return stream()
+
+
+def _config(**cache_config) -> AgentConfig:
+    config = AgentConfig()
+    config.config["services"].setdefault("openai", {})["api_key"] = "test-key"
+    config.config["services"]["llm_cache"].update(cache_config)
+    return config
+
+
+@pytest.fixture
+def openai_service():
+    """使用桩客户端的OpenAI服务，记录实际发出的请求"""
+    reset_provider_limiters()
+    config = _config(cost_per_1k_tokens={"openai": 0.01})
+    init_llm_cache(config)
+    service = OpenAIService(config)
+    service.requests = []
+
+    async def create(**kwargs):
+        service.requests.append(kwargs)
+        await asyncio.sleep(0.02)
+        if kwargs.get("stream"):
+            return _stream(["评分", "结果"])
+        return _completion()
+
+    service.client = MagicMock()
+    service.client.chat.completions.create = create
+    yield service
+    init_llm_cache()
+
+
+def test_cache_key_is_stable_and_parameter_sensitive():
+    reordered = [{"content": m["content"], "role": m["role"]} for m in MESSAGES]
+    key = make_cache_key("openai", "qwen", MESSAGES, temperature=0.3, max_tokens=2000)
+
+    assert key == make_cache_key("openai", "qwen", reordered, max_tokens=2000, temperature=0.3)
+    assert key != make_cache_key("openai", "qwen", MESSAGES, temperature=0.4, max_tokens=2000)
+    assert key != make_cache_key("openai", "qwen-max", MESSAGES, temperature=0.3, max_tokens=2000)
+    assert key != make_cache_key("xunfei", "qwen", MESSAGES, temperature=0.3, max_tokens=2000)
+
+
+@pytest.mark.asyncio
+async def test_repeated_scoring_skips_network(openai_service):
+    """相同的低温度评分请求第二次直接命中缓存，并累计节省的延迟、token和费用"""
+    first = await openai_service.chat_completion(MESSAGES, temperature=0.3, max_tokens=2000)
+    second = await openai_service.chat_completion(MESSAGES, temperature=0.3, max_tokens=2000)
+
+    assert len(openai_service.requests) == 1
+    assert second["content"] == first["content"] == "评分结果"
+    assert second["cached"] is True and "cached" not in first
+
+    # 命中结果是副本，调用方修改不会污染缓存
+    second["content"] = "被修改"
+    third = await openai_service.chat_completion(MESSAGES, temperature=0.3, max_tokens=2000)
+    assert third["content"] == "评分结果"
+
+    stats = get_llm_cache().get_stats()
+    assert stats["hits"] == 2 and stats["misses"] == 1 and stats["stores"] == 1
+    assert stats["latency_saved"] >= 0.04
+    assert stats["tokens_saved"] == 600
+    assert stats["cost_saved"] == pytest.approx(0.006)
+
+
+@pytest.mark.asyncio
+async def test_opt_out_and_high_temperature_bypass_cache(openai_service):
+    await openai_service.chat_completion(MESSAGES, temperature=0.3)
+    await openai_service.chat_completion(MESSAGES, temperature=0.3, use_cache=False)
+    # 题目生成等高温度调用需要多样性，不缓存
+    await openai_service.chat_completion(MESSAGES, temperature=0.7)
+    await openai_service.chat_completion(MESSAGES, temperature=0.7)
+
+    assert len(openai_service.requests) == 4
+    assert get_llm_cache().get_stats()["bypassed"] == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_responses_are_not_cached(openai_service):
+    async def failing_create(**kwargs):
+        openai_service.requests.append(kwargs)
+        raise RuntimeError("服务不可用")
+
+    openai_service.client.chat.completions.create = failing_create
+    for _ in range(2):
+        response = await openai_service.chat_completion(MESSAGES, temperature=0.3)
+        assert response["status"] == "error"
+    assert len(openai_service.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_stream_and_non_stream_share_entries(openai_service):
+    """流式评分的完整结果可被之后的流式或非流式调用复用"""
+    pieces = [p async for p in openai_service.stream_chat_completion(MESSAGES, temperature=0.3, max_tokens=2000)]
+    assert pieces == ["评分", "结果"]
+
+    cached_pieces = [p async for p in openai_service.stream_chat_completion(MESSAGES, temperature=0.3, max_tokens=2000)]
+    response = await openai_service.chat_completion(MESSAGES, temperature=0.3, max_tokens=2000)
+
+    assert cached_pieces == ["评分结果"]
+    assert response["content"] == "评分结果" and response["cached"] is True
+    assert len(openai_service.requests) == 1
+
+
+@pytest.mark.asyncio
+async def test_abandoned_stream_is_not_cached(openai_service):
+    async for _ in openai_service.stream_chat_completion(MESSAGES, temperature=0.3):
+        break
+    async for _ in openai_service.stream_chat_completion(MESSAGES, temperature=0.3):
+        pass
+    assert len(openai_service.requests) == 2
+
+
+@pytest.mark.asyncio
+async def test_file_backend_survives_restart(tmp_path):
+    """文件后端在进程重启（新缓存实例）后仍可命中，重复的测试运行不再访问网络"""
+    calls = []
+
+    async def call():
+        calls.append(1)
+        return {"status": "success", "content": "结果", "usage": {"total_tokens": 50}}
+
+    key = make_cache_key("openai", "qwen", MESSAGES, temperature=0.3)
+    for _ in range(2):
+        cache = LLMResponseCache(_config(), backend=FileCache(cache_dir=str(tmp_path)))
+        response = await cache.get_or_call(key, "openai", call)
+        assert response["content"] == "结果"
+
+    assert len(calls) == 1
+    assert cache.get_stats()["hits"] == 1
+
+
+def test_backend_selected_from_config(tmp_path):
+    cache = LLMResponseCache(_config(backend="file", cache_dir=str(tmp_path / "llm")))
+    assert cache.get_stats()["backend"] == "FileCache"
+    assert LLMResponseCache(_config(enabled=False)).is_cacheable(0.0) is False
@@ -0,0 +1,206 @@
+# -*- coding: utf-8 -*-
+"""
+多提供方LLM路由单元测试：延迟感知选择、失败切换与对冲请求
+"""
+import asyncio
+
+import pytest
+
+from agent.src.core.system.config import AgentConfig
+from agent.src.core.system.resource_registry import init_resource_registry
+from agent.src.services.async_xunfei_service import AsyncXunFeiService
+from agent.src.services.llm_router import (
+    LLMProvider,
+    LLMRouter,
+    LLMRouterError,
+    build_llm_router,
+    get_provider_health,
+    reset_provider_health,
+)
+
+MESSAGES = [{"role": "user", "content": "请评估这段回答"}]
+
+
+class FakeProvider(LLMProvider):
+    """按给定延迟序列返回结果的桩提供方"""
+
+    def __init__(self, name, latency=0.01, fail=False, stream_fail_after=None):
+        super().__init__(lambda: None)
+        self.name = name
+        self.latency = latency
+        self.fail = fail
+        self.stream_fail_after = stream_fail_after
+        self.calls = 0
+        self.cancelled = 0
+
+    def _next_latency(self):
+        return self.latency() if callable(self.latency) else self.latency
+
+    async def chat(self, messages, temperature, max_tokens):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self._next_latency())
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        if self.fail:
+            return {"status": "error", "content": "", "error": f"{self.name}不可用"}
+        return {"status": "success", "content": f"来自{self.name}"}
+
+    async def stream(self, messages, temperature, max_tokens, usage):
+        self.calls += 1
+        await asyncio.sleep(self._next_latency())
+        if self.fail:
+            raise ConnectionError(f"{self.name}不可用")
+        for index, piece in enumerate(["评分", "结果"]):
+            if self.stream_fail_after is not None and index >= self.stream_fail_after:
+                raise ConnectionError("连接中断")
+            yield piece
+        usage["total_tokens"] = 10
+
+
+@pytest.fixture(autouse=True)
+def _reset_health():
+    reset_provider_health()
+    yield
+    reset_provider_health()
+
+
+def _router(*providers, preferred=None, **overrides):
+    return LLMRouter(list(providers), AgentConfig(), preferred=preferred, **overrides)
+
+
+def test_rank_prefers_fastest_healthy_provider():
+    slow, fast, flaky = FakeProvider("slow"), FakeProvider("fast"), FakeProvider("flaky")
+    router = _router(slow, fast, flaky, preferred="slow")
+
+    # 尚无统计时偏好的提供方在前
+    assert router.rank()[0] is slow
+
+    for _ in range(5):
+        get_provider_health("slow").record_success(1.0)
+        get_provider_health("fast").record_success(0.1)
+        get_provider_health("flaky").record_failure(0.05)
+    assert [p.name for p in router.rank()] == ["fast", "slow", "flaky"]
+
+
+@pytest.mark.asyncio
+async def test_failover_to_next_provider_on_error():
+    primary, backup = FakeProvider("primary", fail=True), FakeProvider("backup")
+    router = _router(primary, backup, preferred="primary", hedge=False)
+
+    response = await router.chat(MESSAGES)
+
+    assert response["status"] == "success" and response["provider"] == "backup"
+    assert router.get_stats()["failovers"] == 1
+    assert get_provider_health("primary").error_ewma > 0
+
+
+@pytest.mark.asyncio
+async def test_all_providers_failing_returns_error():
+    router = _router(FakeProvider("a", fail=True), FakeProvider("b", fail=True), hedge=False)
+    response = await router.chat(MESSAGES)
+    assert response["status"] == "error"
+    assert "a不可用" in response["error"] and "b不可用" in response["error"]
+
+
+@pytest.mark.asyncio
+async def test_hedge_after_p95_delay_and_first_success_wins():
+    """首选提供方超过其p95延迟仍未返回时发出对冲请求，较慢的请求被取消"""
+    primary, backup = FakeProvider("primary", latency=1.0), FakeProvider("backup", latency=0.02)
+    for _ in range(20):
+        get_provider_health("primary").record_success(0.05)
+    router = _router(primary, backup, preferred="primary", hedge_min_delay=0.01)
+
+    response = await router.chat(MESSAGES)
+
+    # 首选提供方需要1s才返回，由备用提供方返回说明对冲已发出且胜出
+    assert response["provider"] == "backup"
+    assert primary.cancelled == 1
+    stats = router.get_stats()
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1
+    # 被取消的慢请求也计入延迟估计
+    assert get_provider_health("primary").latency_ewma > 0.05
+
+
+@pytest.mark.asyncio
+async def test_hedge_budget_limits_extra_requests():
+    """对冲请求受比例预算限制；对冲输掉的提供方不会因被取消而显得更快"""
+    primary, backup = FakeProvider("primary", latency=0.05), FakeProvider("backup", latency=0.5)
+    router = _router(primary, backup, preferred="primary", default_hedge_delay=0.01, max_hedge_ratio=0.25)
+
+    responses = [await router.chat(MESSAGES) for _ in range(8)]
+
+    assert all(response["provider"] == "primary" for response in responses)
+    assert router.get_stats()["hedged"] == 2
+    assert backup.calls == 2 and backup.cancelled == 2
+    assert router.rank()[0] is primary
+
+
+@pytest.mark.asyncio
+async def test_stream_fails_over_only_before_first_piece():
+    router = _router(FakeProvider("primary", fail=True), FakeProvider("backup"), preferred="primary")
+    usage = {}
+    pieces = [piece async for piece in router.stream(MESSAGES, usage=usage)]
+    assert pieces == ["评分", "结果"]
+    assert usage["total_tokens"] == 10
+
+    # 已输出片段后的失败直接抛出，不会切换提供方重复输出
+    broken, backup = FakeProvider("broken", stream_fail_after=1), FakeProvider("backup2")
+    router = _router(broken, backup, preferred="broken")
+    received = []
+    with pytest.raises(ConnectionError):
+        async for piece in router.stream(MESSAGES):
+            received.append(piece)
+    assert received == ["评分"] and backup.calls == 0
+
+    with pytest.raises(LLMRouterError):
+        async for _ in _router(FakeProvider("x", fail=True)).stream(MESSAGES):
+            pass
+
+
+def test_build_router_skips_unconfigured_providers():
+    config = AgentConfig()
+    config.config["services"].setdefault("openai", {})["api_key"] = ""
+    router = build_llm_router(config, preferred="xunfei", resolve_xunfei=lambda: object())
+    assert [p.name for p in router.providers] == ["xunfei"]
+
+    config.config["services"]["openai"]["api_key"] = "test-key"
+    router = build_llm_router(config, preferred="xunfei", resolve_xunfei=lambda: object())
+    assert [p.name for p in router.providers] == ["openai", "xunfei"]
+    assert router.rank()[0].name == "xunfei"
+
+    config.config["services"]["llm_router"]["enabled"] = False
+    router = build_llm_router(config, preferred="xunfei", resolve_xunfei=lambda: object())
+    assert [p.name for p in router.providers] == ["xunfei"]
+
+
+def test_build_router_shares_services_through_registry():
+    init_resource_registry()
+    config = AgentConfig()
+    config.config["services"].setdefault("openai", {})["api_key"] = "test-key"
+    first = build_llm_router(config, preferred="openai", resolve_xunfei=lambda: object())
+    second = build_llm_router(config, preferred="openai", resolve_xunfei=lambda: object())
+
+    # 各分析器的路由器共用注册表中的同一个客户端，而不是各自创建
+    assert first.providers[0].resolve() is second.providers[0].resolve()
+    init_resource_registry()
+
+
+def test_spark_request_keeps_system_prompt_and_user_turns():
+    messages = [{"role": "system", "content": "你是面试评分专家"},
+                {"role": "user", "content": "转写文本：我负责过缓存设计"}]
+    text = AsyncXunFeiService._spark_messages(messages)
+
+    # 系统提示词并入用户消息，对冲或切换到星火时评分内容不会丢失
+    assert text == [{"role": "user", "content": "你是面试评分专家\n\n转写文本：我负责过缓存设计"}]
+    assert AsyncXunFeiService._spark_messages([{"role": "user", "content": "你好"}])[-1] == \
+        {"role": "user", "content": "你好"}
+    multi_turn = AsyncXunFeiService._spark_messages(
+        [{"role": "user", "content": "问"}, {"role": "assistant", "content": "答"}, {"role": "user", "content": "追问"}])
+    assert [m["content"] for m in multi_turn[1:]] == ["问", "答", "追问"]
+
+
+def test_provider_base_requires_chat_and_stream():
+    with pytest.raises(TypeError):
+        LLMProvider(lambda: None)
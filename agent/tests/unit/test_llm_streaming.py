@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+LLM流式输出单元测试：星火WebSocket分片、OpenAI流式增量以及分析器回调
+"""
+import asyncio
+import json
+from contextlib import asynccontextmanager
+from types import SimpleNamespace
+from unittest.mock import MagicMock
+
+import pytest
+from aiohttp import web
+
+from agent.src.core.system.config import AgentConfig
+from agent.src.services.adaptive_limiter import reset_provider_limiters
+from agent.src.services.async_xunfei_service import AsyncXunFeiService, SparkChatError
+from agent.src.services.http_session_manager import init_http_session_manager
+from agent.src.services.llm_cache import init_llm_cache
+from agent.src.services.openai_service import OpenAIService
+from agent.src.analyzers.content.content_analyzer import ContentAnalyzer
+from agent.src.core.workflow.workflow import InterviewAnalysisWorkflow
+
+LLM_RESULT = {
+    "scores": {"professional_relevance": 80, "completeness": 70, "structure_logic": 75, "overall_score": 76},
+    "analysis": {"strengths": ["结构清晰"], "suggestions": ["补充案例"]},
+    "summary": "整体良好"
+}
+
+
+def _openai_config() -> AgentConfig:
+    config = AgentConfig()
+    config.config["services"].setdefault("openai", {})["api_key"] = "test-key"
+    return config
+
+
+def _split(text: str, parts: int):
+    size = -(-len(text) // parts)
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@asynccontextmanager
+async def spark_stub(fragments, delay: float = 0.05, error_code: int = 0, sent: list = None):
+    """模拟星火WebSocket：每隔delay秒推送一个回答分片，已推送的分片记录到sent"""
+    async def handle(request):
+        ws = web.WebSocketResponse()
+        await ws.prepare(request)
+        await ws.receive()
+        if error_code:
+            await ws.send_str(json.dumps({"header": {"code": error_code, "message": "流控超限", "status": 2}}))
+            await ws.close()
+            return ws
+        for index, fragment in enumerate(fragments):
+            await asyncio.sleep(delay)
+            last = index == len(fragments) - 1
+            message = {
+                "header": {"code": 0, "message": "Success", "status": 2 if last else 1},
+                "payload": {"choices": {"status": 2 if last else 1, "text": [{"content": fragment, "role": "assistant"}]}}
+            }
+            if last:
+                message["payload"]["usage"] = {"text": {"prompt_tokens": 10, "completion_tokens": 20, "total_tokens": 30}}
+            await ws.send_str(json.dumps(message, ensure_ascii=False))
+            if sent is not None:
+                sent.append(fragment)
+        await ws.close()
+        return ws
+
+    app = web.Application()
+    app.router.add_get("/v1.1/chat", handle)
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    try:
+        yield f"ws://127.0.0.1:{port}/v1.1/chat"
+    finally:
+        await runner.cleanup()
+
+
+@pytest.fixture
+def xunfei_service():
+    reset_provider_limiters()
+    init_http_session_manager()
+    init_llm_cache()
+    config = AgentConfig()
+    config.config["services"]["xunfei"].update({
+        "spark_app_id": "test-app", "spark_api_key": "test-key", "spark_api_secret": "test-secret"
+    })
+    service = AsyncXunFeiService(config)
+    yield service
+    reset_provider_limiters()
+
+
+@pytest.mark.asyncio
+async def test_stream_chat_spark_yields_fragments_as_they_arrive(xunfei_service):
+    """首个分片在第一帧到达时即产出，而不是等待全部分片"""
+    fragments = _split(json.dumps(LLM_RESULT, ensure_ascii=False), 10)
+    sent = []
+    async with spark_stub(fragments, delay=0.05, sent=sent) as url:
+        xunfei_service.spark_api_url = url
+        arrivals = []
+        usage = {}
+        async for piece in xunfei_service.stream_chat_spark([{"role": "user", "content": "评估"}], usage=usage):
+            arrivals.append((len(sent), piece))
+
+    assert [piece for _, piece in arrivals] == fragments
+    assert usage["total_tokens"] == 30
+    # 首个片段产出时服务端还没有推送完全部分片
+    assert arrivals[0][0] < len(fragments)
+
+
+@pytest.mark.asyncio
+async def test_chat_spark_collects_stream(xunfei_service):
+    fragments = ["你好，", "这是", "完整回答。"]
+    async with spark_stub(fragments, delay=0) as url:
+        xunfei_service.spark_api_url = url
+        response = await xunfei_service.chat_spark([{"role": "user", "content": "你好"}])
+
+    assert response["status"] == "success"
+    assert response["content"] == "你好，这是完整回答。"
+    assert response["token_usage"]["completion_tokens"] == 20
+
+
+@pytest.mark.asyncio
+async def test_spark_error_code_raises_and_marks_overload(xunfei_service):
+    """流控错误码使流式接口抛出异常、非流式接口返回错误，并降低并发上限"""
+    async with spark_stub([], error_code=11202) as url:
+        xunfei_service.spark_api_url = url
+        with pytest.raises(SparkChatError):
+            async for _ in xunfei_service.stream_chat_spark([{"role": "user", "content": "你好"}]):
+                pass
+
+        xunfei_service.limiter.concurrency._last_decrease = 0.0
+        response = await xunfei_service.chat_spark([{"role": "user", "content": "你好"}])
+
+    assert response["status"] == "error"
+    assert "11202" in response["error"]
+    assert xunfei_service.limiter.get_stats()["concurrency"]["overloads"] == 2
+
+
+async def _text_stream(pieces, delay=0.0, log=None):
+    for piece in pieces:
+        await asyncio.sleep(delay)
+        if log is not None:
+            log.append(("llm", piece))
+        yield piece
+
+
+def _openai_stream(pieces):
+    async def stream():
+        for piece in pieces:
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+    return stream()
+
+
+@pytest.mark.asyncio
+async def test_openai_stream_chat_completion_yields_deltas():
+    reset_provider_limiters()
+    service = OpenAIService(_openai_config())
+    pieces = ["一", "二", None, "三"]
+
+    async def create(**kwargs):
+        assert kwargs["stream"] is True
+        return _openai_stream(pieces)
+
+    service.client = MagicMock()
+    service.client.chat.completions.create = create
+
+    received = [piece async for piece in service.stream_chat_completion([{"role": "user", "content": "hi"}])]
+    assert received == ["一", "二", "三"]
+    assert service.limiter.get_stats()["concurrency"]["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_content_analyzer_streams_tokens_to_callback():
+    """提供on_token时内容分析器以流式调用LLM，回调收到全部片段后仍返回解析结果"""
+    analyzer = ContentAnalyzer(_openai_config())
+    fragments = _split(json.dumps(LLM_RESULT, ensure_ascii=False), 8)
+
+    def stream_chat_completion(**kwargs):
+        return _text_stream(fragments, delay=0.01)
+
+    analyzer.openai_service.stream_chat_completion = stream_chat_completion
+    analyzer.openai_service.chat_completion = MagicMock(side_effect=AssertionError("不应调用非流式接口"))
+
+    received = []
+
+    async def on_token(token):
+        received.append(token)
+
+    result = await analyzer.analyze_with_llm("我负责过一个高并发项目的架构设计。", on_token=on_token)
+
+    assert received == fragments
+    assert result["scores"]["overall_score"] == 76
+    assert result["summary"] == "整体良好"
+
+
+class StreamingNotificationService:
+    """记录流式增量和完整反馈的通知服务桩"""
+
+    def __init__(self):
+        self.events = []
+
+    async def notify_interview_status(self, *args):
+        pass
+
+    async def notify_analysis_progress(self, *args):
+        pass
+
+    async def notify_task_status(self, *args):
+        pass
+
+    async def notify_error(self, *args):
+        pass
+
+    async def send_partial_feedback(self, client_id, feedback_type, content):
+        self.events.append(("feedback", feedback_type))
+
+    def partial_feedback_stream(self, client_id, feedback_type):
+        events = self.events
+
+        class Stream:
+            async def __call__(self, token):
+                events.append(("delta", feedback_type))
+
+            async def close(self):
+                events.append(("done", feedback_type))
+
+        return Stream()
+
+
+@pytest.mark.asyncio
+async def test_workflow_pushes_tokens_before_full_feedback():
+    """工作流把内容分析的LLM片段先于完整结果推送给客户端"""
+    content_analyzer = ContentAnalyzer(_openai_config())
+    fragments = _split(json.dumps(LLM_RESULT, ensure_ascii=False), 10)
+    notifications = StreamingNotificationService()
+    content_analyzer.openai_service.stream_chat_completion = \
+        lambda **kwargs: _text_stream(fragments, delay=0.02, log=notifications.events)
+    workflow = InterviewAnalysisWorkflow(notification_service=notifications, content_analyzer=content_analyzer)
+
+    async with workflow._feedback_stream("c1", "content") as on_token:
+        content = await workflow._analyze_content("我负责过一个高并发项目的架构设计，并主导了性能优化。", None, on_token)
+
+    assert content["overall_score"] == 76
+    kinds = [kind for kind, _ in notifications.events]
+    assert kinds.count("delta") == len(fragments)
+    assert kinds[-1] == "done"
+    # 首个片段在LLM开始输出时就已推送，而不是等全部片段到达
+    assert kinds.index("delta") < len(kinds) - 1 - kinds[::-1].index("llm")
@@ -0,0 +1,174 @@
+# -*- coding: utf-8 -*-
+"""
+负载均衡器单元测试：用速度不同的桩工作者做确定性模拟，比较各策略的尾延迟；错误率过高时驱逐并半开恢复
+"""
+import heapq
+import random
+import uuid
+from concurrent.futures import Future
+
+import pytest
+
+from agent.src.core.workflow.state import Task, TaskType
+from agent.src.utils.parallel_processor import (
+    BalancingStrategy,
+    LoadBalancer,
+    LoadBalancerConfig,
+    ParallelProcessor,
+    ProcessorConfig,
+)
+
+
+class StubWorker:
+    """先进先出单队列的桩工作者，fail_until 之前到达的请求立即失败"""
+
+    def __init__(self, service_time: float, fail_until: float = 0.0):
+        self.service_time = service_time
+        self.fail_until = fail_until
+        self.free_at = 0.0
+
+    def handle(self, now: float):
+        if now < self.fail_until:
+            return now + 0.001, False
+        start = max(now, self.free_at)
+        self.free_at = start + self.service_time
+        return self.free_at, True
+
+
+def simulate(workers, strategy, rate, duration, seed=0, **config):
+    """按泊松到达模拟请求，返回 (到达时间, 目标, 延迟, 是否成功) 列表和负载均衡器"""
+    now = [0.0]
+    balancer = LoadBalancer(workers, LoadBalancerConfig(strategy=strategy, decay_time=1.0, **config),
+                            clock=lambda: now[0], rng=random.Random(seed))
+    arrivals = random.Random(seed + 1)
+    completions, log = [], []
+
+    def complete_until(t):
+        while completions and completions[0][0] <= t:
+            now[0], _, index, latency, success = heapq.heappop(completions)
+            balancer.release(index, latency, success)
+
+    t = arrivals.expovariate(rate)
+    while t < duration:
+        complete_until(t)
+        now[0] = t
+        index = balancer.acquire()
+        finish, success = workers[index].handle(t)
+        heapq.heappush(completions, (finish, len(log), index, finish - t, success))
+        log.append((t, index, finish - t, success))
+        t += arrivals.expovariate(rate)
+    complete_until(float("inf"))
+    return log, balancer
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(int(len(values) * q), len(values) - 1)]
+
+
+def test_latency_aware_strategies_cut_tail_latency():
+    results = {}
+    for strategy in BalancingStrategy:
+        # 三个10ms的工作者和一个60ms的慢工作者，每秒200个请求
+        workers = [StubWorker(0.01), StubWorker(0.01), StubWorker(0.01), StubWorker(0.06)]
+        log, balancer = simulate(workers, strategy, rate=200, duration=60)
+        latencies = [latency for _, _, latency, _ in log]
+        slow_share = sum(1 for _, index, _, _ in log if index == 3) / len(log)
+        results[strategy] = (percentile(latencies, 0.5), percentile(latencies, 0.99), slow_share)
+        assert all(target["outstanding"] == 0 for target in balancer.get_target_stats())
+
+    round_robin_p99 = results[BalancingStrategy.ROUND_ROBIN][1]
+    for strategy in (BalancingStrategy.LEAST_OUTSTANDING, BalancingStrategy.PEAK_EWMA):
+        p50, p99, slow_share = results[strategy]
+        # 轮询给慢工作者1/4的请求，超过其处理能力，队列持续增长
+        assert p99 < round_robin_p99 / 10
+        assert p99 < 0.2 and slow_share < 0.1
+
+
+def test_failing_target_is_ejected_and_recovers_through_half_open_probe():
+    # 第4个工作者在前5秒快速失败，快速失败的延迟很低，不能因此吸引更多请求
+    workers = [StubWorker(0.01), StubWorker(0.01), StubWorker(0.01), StubWorker(0.01, fail_until=5.0)]
+    log, balancer = simulate(workers, BalancingStrategy.PEAK_EWMA, rate=100, duration=12,
+                             ejection_time=1.0, min_requests=10, error_threshold=0.5)
+
+    failures = [t for t, index, _, success in log if not success]
+    to_failing = [t for t, index, _, _ in log if index == 3]
+    # 轮询会在失败期间发出约125个失败请求；驱逐后只有探测请求（1s、2s后各一次）会失败
+    assert len(failures) <= 15
+    # 第二次探测失败后驱逐4s，期间不再分配请求
+    second_probe = failures[-1]
+    assert not [t for t in to_failing if second_probe < t < second_probe + 3.9]
+    # 驱逐期满后探测成功，重新按延迟分得请求
+    recovered = [t for t in to_failing if t > second_probe + 4.5]
+    assert len(recovered) > 0.1 * sum(1 for t, *_ in log if t > second_probe + 4.5)
+    stats = balancer.get_target_stats()[3]
+    assert stats["state"] == "healthy" and stats["failed"] == len(failures)
+
+
+def test_never_ejects_more_than_max_percent():
+    workers = [StubWorker(0.01, fail_until=100.0) for _ in range(4)]
+    _, balancer = simulate(workers, BalancingStrategy.LEAST_OUTSTANDING, rate=100, duration=2,
+                           ejection_time=10.0)
+    states = [target["state"] for target in balancer.get_target_stats()]
+    assert states.count("healthy") == 2
+
+
+@pytest.fixture
+def processors():
+    processors = [ParallelProcessor(ProcessorConfig(max_workers=1, retry_count=0)) for _ in range(2)]
+    for processor in processors:
+        processor.start()
+    yield processors
+    for processor in processors:
+        processor.stop()
+
+
+def _fail(task):
+    raise ValueError(task.id)
+
+
+def test_submit_task_records_completion_of_processor_tasks(processors):
+    balancer = LoadBalancer(processors, LoadBalancerConfig(min_requests=100))
+    for i in range(25):
+        task = Task(id=str(uuid.uuid4()), type=TaskType.CUSTOM)
+        balancer.submit_task(task, _fail if i % 5 == 0 else (lambda task: task.id))
+    for processor in processors:
+        assert processor.wait_idle(timeout=5)
+
+    targets = balancer.get_target_stats()
+    assert sum(target["completed"] for target in targets) == 20
+    assert sum(target["failed"] for target in targets) == 5
+    assert all(target["outstanding"] == 0 for target in targets)
+    assert any(target["ewma_latency"] > 0 for target in targets)
+    overall = balancer.get_overall_stats()
+    assert overall["strategy"] == "peak_ewma" and overall["total_completed"] == 20
+
+
+class FutureProcessor:
+    """任务Future由测试控制完成方式的桩处理器"""
+
+    def __init__(self):
+        self.futures = {}
+
+    def submit_task(self, task, processor_func, cpu_bound=False):
+        self.futures[task.id] = Future()
+        return task.id
+
+    def get_future(self, task_id):
+        return self.futures.get(task_id)
+
+
+def test_cancelled_or_failed_futures_release_target():
+    processor = FutureProcessor()
+    balancer = LoadBalancer([processor], LoadBalancerConfig(min_requests=100))
+    task_ids = [balancer.submit_task(Task(id=str(uuid.uuid4()), type=TaskType.CUSTOM), None) for _ in range(3)]
+    assert balancer.get_target_stats()[0]["outstanding"] == 3
+
+    cancelled, failed, succeeded = (processor.futures[task_id] for task_id in task_ids)
+    cancelled.cancel()
+    failed.set_exception(RuntimeError("处理器已停止"))
+    succeeded.set_result(type("Result", (), {"success": True})())
+
+    target = balancer.get_target_stats()[0]
+    assert target["outstanding"] == 0
+    assert target["failed"] == 2 and target["completed"] == 1
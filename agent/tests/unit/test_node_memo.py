@@ -0,0 +1,187 @@
+# -*- coding: utf-8 -*-
+"""
+工作流节点记忆化单元测试：重复运行同一工作流时命中缓存、版本号与输入变化使结果失效、
+媒体文件内容变化使结果失效、无法序列化的输入跳过记忆化、有界缓存
+"""
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import pytest
+
+from agent.src.core.workflow.node_memo import NodeMemoizer, apply_patch, diff_value, make_node_key
+
+
+@dataclass
+class StubState:
+    """与WorkflowState字段一致的简化状态"""
+    query: str = ""
+    plan: List[Dict[str, Any]] = field(default_factory=list)
+    context: Dict[str, Any] = field(default_factory=dict)
+    results: Dict[str, Any] = field(default_factory=dict)
+    current_step: int = 0
+    metadata: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+
+class StubWorkflow:
+    """按计划经路由器依次执行分析器、RAG和生成器的工作流，节点写法与WorkflowBuilder一致"""
+
+    def __init__(self, memoizer: Optional[NodeMemoizer] = None, analyzer_version: str = "1"):
+        self.calls = {"analyzer": 0, "rag": 0}
+        self.nodes = {"analyzer": self._analyzer, "rag": self._rag, "generator": self._generator}
+        if memoizer is not None:
+            outputs = ["results", "context", "current_step", "metadata"]
+            self.nodes["analyzer"] = memoizer.wrap("analyzer", self._analyzer, ["query"], outputs,
+                                                   version=analyzer_version)
+            self.nodes["rag"] = memoizer.wrap("rag", self._rag, ["query", "context", "plan", "current_step"],
+                                              outputs)
+
+    async def _analyzer(self, state, config=None):
+        self.calls["analyzer"] += 1
+        state.results.setdefault("analyzer_results", []).append({"query": state.query, "score": 80})
+        state.context["analysis"] = {"score": 80}
+        state.current_step += 1
+        state.metadata["analyzer_time"] = 0.5
+        return state
+
+    async def _rag(self, state, config=None):
+        self.calls["rag"] += 1
+        if state.query == "失败":
+            state.error = "RAG失败"
+            return state
+        state.results["rag_result"] = {"answer": f"{state.query}的答案", "sources": ["doc"]}
+        state.context["rag_answer"] = f"{state.query}的答案"
+        state.current_step += 1
+        return state
+
+    async def _generator(self, state, config=None):
+        state.results["generator_result"] = {"content": state.results.get("rag_result", {}).get("answer")}
+        state.current_step += 1
+        return state
+
+    async def run(self, query: str) -> StubState:
+        state = StubState(query=query, plan=[{"type": "analyzer"}, {"type": "rag"}, {"type": "generator"}])
+        # 路由器：按计划的当前步骤选择节点，直到完成或出错
+        while not state.error and state.current_step < len(state.plan):
+            state = await self.nodes[state.plan[state.current_step]["type"]](state)
+        return state
+
+
+@pytest.mark.asyncio
+async def test_second_run_makes_zero_analyzer_calls():
+    memoizer = NodeMemoizer()
+    workflow = StubWorkflow(memoizer)
+
+    first = await workflow.run("Python面试")
+    assert workflow.calls == {"analyzer": 1, "rag": 1}
+    second = await workflow.run("Python面试")
+
+    assert workflow.calls == {"analyzer": 1, "rag": 1}
+    assert second == first
+    assert second.results["generator_result"] == {"content": "Python面试的答案"}
+    stats = memoizer.get_stats()
+    assert stats["hits"] == 2 and stats["misses"] == 2
+    assert stats["nodes"] == {"analyzer": {"hits": 1, "misses": 1, "skipped": 0},
+                              "rag": {"hits": 1, "misses": 1, "skipped": 0}}
+
+    # 查询不同则重新计算
+    await workflow.run("Java面试")
+    assert workflow.calls == {"analyzer": 2, "rag": 2}
+
+
+@pytest.mark.asyncio
+async def test_version_change_and_errors_bypass_cache():
+    memoizer = NodeMemoizer()
+    await StubWorkflow(memoizer).run("Go面试")
+
+    upgraded = StubWorkflow(memoizer, analyzer_version="2")
+    await upgraded.run("Go面试")
+    assert upgraded.calls == {"analyzer": 1, "rag": 0}
+
+    failing = StubWorkflow(memoizer)
+    for _ in range(2):
+        state = await failing.run("失败")
+        assert state.error == "RAG失败"
+    # 出错的节点结果不缓存
+    assert failing.calls == {"analyzer": 1, "rag": 2}
+
+
+@pytest.mark.asyncio
+async def test_cache_is_bounded():
+    memoizer = NodeMemoizer(max_entries=4)
+    workflow = StubWorkflow(memoizer)
+    for i in range(10):
+        await workflow.run(f"问题{i}")
+    assert memoizer.get_stats()["entries"] <= 4
+
+    await workflow.run("问题0")
+    assert workflow.calls["analyzer"] == 11
+
+
+def test_patch_applies_changes_relative_to_current_state():
+    before = {"results": {"analyzer_results": [1]}, "step": 2}
+    after = {"results": {"analyzer_results": [1, 2], "new": "x"}, "step": 3}
+    patch = diff_value(before, after)
+
+    # 路由器循环再次进入节点时，追加和递增基于当时的状态
+    current = {"results": {"analyzer_results": [0, 1], "other": True}, "step": 5}
+    assert apply_patch(current, patch) == {
+        "results": {"analyzer_results": [0, 1, 2], "other": True, "new": "x"}, "step": 6
+    }
+    assert diff_value({"a": 1}, {"a": 1}) is None
+
+    state = StubState(query="q", context={"b": 2, "a": 1})
+    reordered = StubState(query="q", context={"a": 1, "b": 2})
+    assert make_node_key("rag", state, ["query", "context"]) == make_node_key("rag", reordered, ["query", "context"])
+    assert make_node_key("rag", state, ["query"]) != make_node_key("rag", state, ["query"], version="2")
+
+
+@pytest.mark.asyncio
+async def test_reuploaded_media_at_same_path_is_not_served_stale(tmp_path):
+    memoizer = NodeMemoizer()
+    calls = []
+
+    async def analyzer(state, config=None):
+        with open(state.query, "rb") as f:
+            calls.append(f.read())
+        state.results["score"] = len(calls[-1])
+        return state
+
+    node = memoizer.wrap("analyzer", analyzer, ["query"], ["results"], media=["query"])
+    video = tmp_path / "upload.mp4"
+    video.write_bytes(b"first")
+    assert (await node(StubState(query=str(video)))).results == {"score": 5}
+    assert (await node(StubState(query=str(video)))).results == {"score": 5}
+    assert len(calls) == 1
+
+    # 同一路径重新上传：大小和修改时间相同、只有内容不同时也不命中旧结果
+    stat = video.stat()
+    video.write_bytes(b"other")
+    os.utime(video, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert (await node(StubState(query=str(video)))).results == {"score": 5}
+    assert calls == [b"first", b"other"]
+
+    # 查询不是文件路径时只按字段值计算键
+    assert make_node_key("analyzer", StubState(query="Python面试"), ["query"], media=["query"]) == \
+        make_node_key("analyzer", StubState(query="Python面试"), ["query"])
+
+
+@pytest.mark.asyncio
+async def test_unserializable_inputs_skip_memoization():
+    memoizer = NodeMemoizer()
+    calls = []
+
+    async def node_func(state, config=None):
+        calls.append(state.context["handle"])
+        state.results["done"] = True
+        return state
+
+    node = memoizer.wrap("rag", node_func, ["context"], ["results"])
+    # 对象的repr只有类名和地址，不能作为键，否则不同的对象可能命中同一结果
+    for _ in range(2):
+        assert (await node(StubState(context={"handle": object()}))).results == {"done": True}
+    assert len(calls) == 2
+    assert memoizer.get_stats()["nodes"]["rag"] == {"hits": 0, "misses": 0, "skipped": 2}
+    with pytest.raises(TypeError):
+        make_node_key("rag", StubState(context={"handle": object()}), ["context"])
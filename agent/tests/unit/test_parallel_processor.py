@@ -0,0 +1,147 @@
+# -*- coding: utf-8 -*-
+"""
+并行处理器单元测试：工作线程阻塞取任务并直接执行、结果通过完成Future等待、结果保留有界、
+挂起的同步任务超时后以失败结束（吞吐和内存基准在 tests/performance 中）
+"""
+import asyncio
+import threading
+import time
+import uuid
+
+import pytest
+
+from agent.src.core.workflow.state import Task, TaskPriority, TaskStatus, TaskType
+from agent.src.utils.parallel_processor import LoadBalancer, ParallelProcessor, ProcessorConfig, ProcessorType
+
+
+def _task(priority: TaskPriority = TaskPriority.MEDIUM) -> Task:
+    return Task(id=str(uuid.uuid4()), type=TaskType.CUSTOM, priority=priority)
+
+
+def _noop(task):
+    return None
+
+
+@pytest.fixture
+def make_processor():
+    processors = []
+
+    def make(**config) -> ParallelProcessor:
+        config.setdefault("retry_count", 0)
+        processor = ParallelProcessor(ProcessorConfig(**config))
+        processor.start()
+        processors.append(processor)
+        return processor
+
+    yield make
+    for processor in processors:
+        processor.stop()
+
+
+def test_unclaimed_results_are_evicted_beyond_limit(make_processor):
+    processor = make_processor(max_workers=2, max_results=10)
+    tasks = [_task() for _ in range(50)]
+    for task in tasks:
+        processor.submit_task(task, _noop)
+    assert processor.wait_idle(timeout=5)
+
+    stats = processor.get_stats()
+    assert stats["completed_tasks"] == 50 and stats["pending_results"] == 10
+    assert stats["evicted_results"] == 40
+    assert len(processor._results) == 10
+    assert not processor.task_queue._task_map
+    assert all(task.status == TaskStatus.COMPLETED for task in tasks)
+
+
+def test_hung_sync_task_times_out_and_worker_is_replaced(make_processor):
+    processor = make_processor(max_workers=1, timeout=0.2)
+    balancer = LoadBalancer([processor])
+    release = threading.Event()
+    hung = _task()
+    balancer.submit_task(hung, lambda task: release.wait(10) and "late")
+
+    # 看门狗在超时后以失败结束任务，而不是等挂起的任务返回
+    result = processor.get_result(hung.id, timeout=5)
+    assert not result.success and isinstance(result.error, TimeoutError)
+    assert hung.status == TaskStatus.FAILED
+    assert balancer.get_target_stats()[0]["outstanding"] == 0
+
+    # 被卡住的工作线程已被替换，后续任务照常执行
+    follow = processor.submit_task(_task(), lambda task: "ok")
+    assert processor.get_result(follow, timeout=5).result == "ok"
+    assert processor.get_stats()["timed_out_tasks"] == 1
+
+    # 挂起的任务之后返回时，迟到的结果被丢弃，线程退出
+    release.set()
+    assert processor.wait_idle(timeout=5)
+    time.sleep(0.05)
+    assert hung.status == TaskStatus.FAILED
+    assert processor.get_stats()["completed_tasks"] == 1
+    assert len([t for t in threading.enumerate() if t.name.startswith("ParallelWorker")]) == 1
+
+
+def test_get_result_waits_on_completion_and_expires(make_processor):
+    processor = make_processor(max_workers=2, result_ttl=0.2)
+    release = threading.Event()
+    slow = processor.submit_task(_task(), lambda task: release.wait(5) and "slow")
+
+    assert processor.get_result(slow, timeout=0.05) is None
+    threading.Timer(0.1, release.set).start()
+    result = processor.get_result(slow, timeout=5)
+    assert result.success and result.result == "slow"
+    assert processor.get_result(slow, timeout=0.01) is None
+
+    expired = processor.submit_task(_task(), lambda task: "fast")
+    assert processor.wait_idle(timeout=5)
+    time.sleep(0.3)
+    assert processor.get_result(expired, timeout=0.01) is None
+    assert processor.get_stats()["evicted_results"] == 1
+
+    failed = processor.submit_task(_task(), lambda task: 1 / 0)
+    result = processor.get_result(failed, timeout=5)
+    assert not result.success and isinstance(result.error, ZeroDivisionError)
+
+
+def test_priority_order_and_stop(make_processor):
+    processor = make_processor(max_workers=1)
+    release = threading.Event()
+    order = []
+    processor.submit_task(_task(), lambda task: release.wait(5))
+    time.sleep(0.05)
+    for priority in (TaskPriority.LOW, TaskPriority.MEDIUM, TaskPriority.HIGH, TaskPriority.CRITICAL):
+        processor.submit_task(_task(priority), lambda task: order.append(task.priority))
+    release.set()
+    assert processor.wait_idle(timeout=5)
+    assert order == [TaskPriority.CRITICAL, TaskPriority.HIGH, TaskPriority.MEDIUM, TaskPriority.LOW]
+
+    # 停止时尚未开始的任务以失败结果结束，等待方不会一直阻塞
+    processor.submit_task(_task(), lambda task: time.sleep(0.1))
+    queued = processor.submit_task(_task(), _noop)
+    time.sleep(0.02)
+    processor.stop()
+    result = processor.get_result(queued, timeout=1)
+    assert not result.success and "已停止" in str(result.error)
+
+
+@pytest.mark.asyncio
+async def test_async_tasks_complete_futures(make_processor):
+    processor = make_processor(max_workers=1, processor_type=ProcessorType.ASYNC)
+
+    running = {"now": 0, "max": 0}
+
+    async def work(task):
+        running["now"] += 1
+        running["max"] = max(running["max"], running["now"])
+        try:
+            await asyncio.sleep(0.1)
+        finally:
+            running["now"] -= 1
+        return task.id
+
+    task_ids = [processor.submit_async_task(_task(), work) for _ in range(20)]
+    results = await asyncio.gather(*(processor.get_result_async(task_id, timeout=5) for task_id in task_ids))
+
+    # 单个工作线程把协程调度到事件循环后立即处理下一个任务，多个任务同时执行
+    assert running["max"] > 1
+    assert [result.result for result in results] == task_ids
+    assert await processor.get_result_async(task_ids[0], timeout=0.01) is None
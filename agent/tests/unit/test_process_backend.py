@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+进程后端单元测试：数组通过共享内存传递、工作进程返回与进程内一致的结果并释放共享内存、CPU密集任务按 cpu_bound 路由
+（多进程预热和随核数加速的基准在 tests/performance 中）
+"""
+import os
+import pickle
+import time
+import uuid
+
+import numpy as np
+import pytest
+
+from agent.src.core.workflow.state import Task, TaskType
+from agent.src.utils import process_backend
+from agent.src.utils.parallel_processor import ParallelProcessor, ProcessorConfig
+from agent.src.utils.process_backend import (
+    ProcessBackend,
+    SharedArrayRef,
+    attach_arrays,
+    share_arrays,
+)
+
+SR = 16000
+
+
+def _audio(seconds: float, seed: int = 0) -> np.ndarray:
+    """带噪声的合成语音信号"""
+    t = np.arange(int(SR * seconds), dtype=np.float32) / SR
+    noise = np.random.default_rng(seed).standard_normal(t.size).astype(np.float32)
+    return 0.3 * np.sin(2 * np.pi * 180 * t) * (1 + np.sin(2 * np.pi * 2 * t)) + 0.05 * noise
+
+
+def _frame(seed: int = 0) -> np.ndarray:
+    """640x480的合成BGR视频帧"""
+    return np.random.default_rng(seed).integers(0, 256, (480, 640, 3), dtype=np.uint8)
+
+
+def _spectrum(task: Task) -> np.ndarray:
+    """在工作进程中执行的小型CPU任务"""
+    return np.abs(np.fft.rfft(task.data["audio"]))[:64]
+
+
+def _wait_released(backend: ProcessBackend, timeout: float = 5.0) -> bool:
+    """等待已完成任务的共享内存块被释放"""
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        stats = backend.get_stats()
+        if stats["completed"] + stats["failed"] == stats["submitted"]:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+@pytest.fixture(scope="module")
+def backend():
+    # 单个不预热的工作进程，只验证正确性，启动约1-2秒
+    backend = ProcessBackend(max_workers=1, warm_up=None)
+    backend.start()
+    yield backend
+    backend.shutdown()
+
+
+def test_arrays_cross_as_shared_refs():
+    audio, frames = _audio(5), [_frame(i) for i in range(3)]
+    task = Task(id=str(uuid.uuid4()), type=TaskType.SPEECH_ANALYSIS,
+                data={"audio": audio, "frames": frames, "sr": SR, "small": np.zeros(8)})
+    blocks = []
+    shared = share_arrays((task,), blocks)
+    try:
+        data = shared[0].data
+        assert isinstance(data["audio"], SharedArrayRef) and all(isinstance(f, SharedArrayRef) for f in data["frames"])
+        # 小数组和标量原样传递，原任务不被修改
+        assert data["small"] is task.data["small"] and data["sr"] == SR
+        assert task.data["audio"] is audio
+        # 序列化的只是块名和形状，而不是约4MB的数组内容
+        payload = len(pickle.dumps(shared))
+        assert payload < 4096 < audio.nbytes + sum(f.nbytes for f in frames)
+
+        opened = []
+        restored = attach_arrays(shared, opened)[0].data
+        assert np.array_equal(restored["audio"], audio) and restored["audio"].dtype == np.float32
+        assert all(np.array_equal(a, b) for a, b in zip(restored["frames"], frames))
+        del restored
+        for shm in opened:
+            shm.close()
+    finally:
+        process_backend._release_blocks(blocks)
+
+
+def _shm_blocks() -> set:
+    return {name for name in os.listdir("/dev/shm") if name.startswith("psm_")} if os.path.isdir("/dev/shm") else set()
+
+
+def test_results_match_in_process_and_memory_is_released(backend):
+    before = _shm_blocks()
+    audio = _audio(2, seed=1)
+    task = Task(id=str(uuid.uuid4()), type=TaskType.SPEECH_ANALYSIS, data={"audio": audio})
+
+    assert np.array_equal(backend.submit(_spectrum, task).result(timeout=60), _spectrum(task))
+
+    # 工作进程中的异常原样传回，共享内存同样被释放
+    with pytest.raises(KeyError):
+        backend.submit(_spectrum, Task(id="bad", type=TaskType.SPEECH_ANALYSIS, data={"frame": _frame()})).result(60)
+
+    assert _wait_released(backend)
+    stats = backend.get_stats()
+    assert stats["shared_arrays"] == 2 and stats["failed"] == 1
+    assert _shm_blocks() <= before
+
+
+def test_cpu_bound_tasks_route_to_process_backend(backend, monkeypatch):
+    monkeypatch.setattr(process_backend, "_process_backend", backend)
+    processor = ParallelProcessor(ProcessorConfig(max_workers=2, retry_count=0, timeout=60))
+    processor.start()
+    try:
+        task = Task(id=str(uuid.uuid4()), type=TaskType.SPEECH_ANALYSIS, data={"audio": _audio(1, seed=2)})
+        submitted = backend.get_stats()["submitted"]
+        processor.submit_task(task, _spectrum, cpu_bound=True)
+        result = processor.get_result(task.id, timeout=60)
+    finally:
+        processor.stop()
+
+    assert result.success and np.array_equal(result.result, _spectrum(task))
+    assert backend.get_stats()["submitted"] == submitted + 1
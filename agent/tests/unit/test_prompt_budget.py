@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+"""
+提示词token预算单元测试：token估算、转写文本压缩、特征格式化与分析器提示词大小
+"""
+import numpy as np
+import pytest
+
+from agent.src.analyzers.content.content_analyzer import ContentAnalyzer
+from agent.src.analyzers.speech.speech_analyzer import SpeechAnalyzer
+from agent.src.core.system.config import AgentConfig
+from agent.src.services.prompt_budget import (
+    PromptBudget,
+    compress_transcript,
+    estimate_tokens,
+    extract_keywords,
+    format_feature,
+    get_prompt_metrics,
+    truncate_to_tokens,
+)
+
+FILLER = "我们团队平时的沟通比较多，大家也会互相帮忙解决问题。"
+KEY_SENTENCE = "我用Redis缓存热点数据，把接口P99延迟从800ms降到了120ms。"
+OPENING = "我主要负责订单系统的后端开发。"
+CLOSING = "总的来说，这段经历让我对高并发系统有了更深的理解。"
+LONG_ANSWER = OPENING + FILLER * 150 + KEY_SENTENCE + FILLER * 150 + CLOSING
+
+JOB_POSITION = {"title": "后端开发工程师", "requirements": ["熟悉Redis", "高并发系统设计"], "skills": ["Python"]}
+
+
+@pytest.fixture(autouse=True)
+def _reset_metrics():
+    get_prompt_metrics().reset()
+    yield
+    get_prompt_metrics().reset()
+
+
+def _config() -> AgentConfig:
+    config = AgentConfig()
+    config.config["services"].setdefault("openai", {})["api_key"] = "test-key"
+    return config
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("面试回答") == 4
+    assert estimate_tokens("hello world!") == 3
+    assert estimate_tokens(LONG_ANSWER) > 7000
+
+
+def test_compress_keeps_opening_closing_and_relevant_sentences():
+    keywords = extract_keywords([JOB_POSITION["title"], JOB_POSITION["requirements"]])
+    compressed = compress_transcript(LONG_ANSWER, 300, keywords)
+
+    assert estimate_tokens(compressed) <= 300
+    assert OPENING in compressed and CLOSING in compressed
+    assert KEY_SENTENCE in compressed
+    assert "……" in compressed and "节选" in compressed
+    # 保留的句子按原顺序排列
+    assert compressed.index(OPENING) < compressed.index(KEY_SENTENCE) < compressed.index(CLOSING)
+
+
+def test_compress_returns_short_text_unchanged():
+    assert compress_transcript(KEY_SENTENCE, 300) == KEY_SENTENCE
+
+
+def test_compress_handles_unpunctuated_speech_transcript():
+    """语音转写可能没有标点，按长度切分后同样压缩到预算以内"""
+    transcript = "嗯我觉得这个问题主要是看怎么去做然后" * 400
+    compressed = compress_transcript(transcript, 200)
+    assert estimate_tokens(compressed) <= 200
+    assert compressed.startswith("（回答较长")
+
+
+def test_compress_truncates_single_long_sentence_by_tokens():
+    """单个句子超出预算时按token而不是字符数截断，说明和省略标记也计入预算"""
+    transcript = "the quick brown fox jumps over the lazy dog and keeps running " * 50
+    for max_tokens in (60, 10):
+        compressed = compress_transcript(transcript, max_tokens, max_sentence_chars=400)
+        assert max_tokens - 2 <= estimate_tokens(compressed) <= max_tokens
+        assert compressed.endswith("……")
+    assert truncate_to_tokens("面试ab面试ab", 3) == "面试ab"
+
+
+def test_format_feature():
+    assert format_feature(None) == "未知"
+    assert format_feature(3) == "3"
+    assert format_feature(np.float32(4.23456)) == "4.23"
+    assert format_feature([1.0, 2.0, np.nan, 6.0]) == "均值3.00，最小1.00，最大6.00（3个样本）"
+    assert format_feature("高兴") == "高兴"
+    assert len(format_feature("很长的描述" * 50)) <= 82
+
+
+def test_content_prompt_bounded_regardless_of_answer_length():
+    """回答从几十字增长到上万字，内容分析提示词大小始终不超过预算"""
+    analyzer = ContentAnalyzer(_config())
+    budget = analyzer.prompt_budget.budget_for("content")
+
+    short_prompt = analyzer._build_analysis_prompt(KEY_SENTENCE, JOB_POSITION)
+    sizes = [estimate_tokens(analyzer._build_analysis_prompt(OPENING + FILLER * n + KEY_SENTENCE + CLOSING, JOB_POSITION))
+             for n in (10, 100, 400, 1000)]
+
+    assert KEY_SENTENCE in short_prompt and "节选" not in short_prompt
+    assert max(sizes) <= budget
+
+    stats = get_prompt_metrics().get_stats()["content"]
+    assert stats["prompts"] == 5
+    assert stats["compressed"] >= 2
+    assert stats["over_budget"] == 0
+    assert stats["tokens_saved"] > 0
+
+
+def test_speech_prompt_fits_spark_lite_context():
+    config = _config()
+    config.config["speech"]["use_xunfei"] = False
+    analyzer = SpeechAnalyzer(config)
+    features = {
+        "speech_rate": 4.123456,
+        "pitch_mean": np.float64(182.98765),
+        "energy_mean": [0.1, 0.2, 0.3],
+        "xunfei_assessment": {"clarity": 85.5, "fluency": 80},
+        "xunfei_emotion": {"emotion": "平静"}
+    }
+
+    prompt = analyzer._build_speech_analysis_prompt(LONG_ANSWER, features)
+
+    assert estimate_tokens(prompt) <= PromptBudget(config).budget_for("speech")
+    assert "语速: 4.12 字/秒" in prompt
+    assert "平均音量: 均值0.20" in prompt
+    assert CLOSING in prompt
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+多会话实时分析单元测试：会话间反馈隔离、有界队列丢弃最旧数据与空闲会话回收
+"""
+import asyncio
+import random
+
+import pytest
+
+from agent.src.analyzers.visual.visual_analyzer import FrameStreamState
+from agent.src.core.agent.agent import InterviewAgent
+from agent.src.core.agent.realtime_sessions import RealtimeSessionRegistry
+from agent.src.core.system.config import AgentConfig
+
+SESSIONS = 200
+CHUNKS = 10
+
+
+class StreamSpeechAnalyzer:
+    """把音频块内容原样作为特征的语音分析器桩"""
+
+    def extract_stream_features(self, audio_data):
+        session_id, index = audio_data.decode().split(":")
+        return {"session_id": session_id, "index": int(index)}
+
+    def analyze_stream(self, features):
+        return {"source": features["session_id"], "index": features["index"], "pace": 6.0}
+
+
+class StreamVisualAnalyzer:
+    """记录每一帧使用的视频流状态的视觉分析器桩"""
+
+    def __init__(self):
+        self.streams = {}
+
+    def extract_frame_features(self, frame_data, session_id=None, stream=None):
+        stream.frame_buffer.append(frame_data)
+        self.streams.setdefault(session_id, set()).add(id(stream))
+        return {"buffer_size": len(stream.frame_buffer)}
+
+    def analyze_frame(self, features, stream=None):
+        return {"buffer_size": features["buffer_size"]}
+
+
+def _agent(**realtime) -> InterviewAgent:
+    agent = InterviewAgent.__new__(InterviewAgent)
+    agent.config = AgentConfig()
+    agent.config.config["realtime"].update(realtime)
+    agent.speech_analyzer = StreamSpeechAnalyzer()
+    agent.visual_analyzer = StreamVisualAnalyzer()
+    agent.sessions = agent._create_session_registry()
+    return agent
+
+
+@pytest.mark.asyncio
+async def test_interleaved_sessions_receive_only_their_feedback():
+    agent = _agent()
+    received = {f"s{i}": [] for i in range(SESSIONS)}
+
+    def collector(expected):
+        async def callback(session_id, feedback):
+            received[expected].append((session_id, feedback["analysis"]["source"], feedback["analysis"]["index"]))
+        return callback
+
+    for session_id in received:
+        assert await agent.start_real_time_analysis(session_id, feedback_callback=collector(session_id),
+                                                    use_langgraph=False)
+    assert agent.is_analyzing and len(agent.sessions) == SESSIONS
+
+    # 各会话的音频块随机交错到达
+    chunks = [(session_id, index) for session_id in received for index in range(CHUNKS)]
+    random.Random(7).shuffle(chunks)
+    next_index = {session_id: 0 for session_id in received}
+    ordered = []
+    for session_id, _ in chunks:
+        ordered.append((session_id, next_index[session_id]))
+        next_index[session_id] += 1
+
+    results = await asyncio.gather(*(
+        agent.analyze_audio_stream(session_id, f"{session_id}:{index}".encode(), use_langgraph=False)
+        for session_id, index in ordered
+    ))
+
+    assert [(r["source"], r["index"]) for r in results] == ordered
+    for session_id, feedback in received.items():
+        # 每个会话只收到自己的反馈，且按到达顺序
+        assert feedback == [(session_id, session_id, index) for index in range(CHUNKS)]
+        session = agent.sessions.get(session_id)
+        assert session.stats["processed"] == CHUNKS and session.stats["dropped"] == 0
+
+    assert await agent.stop_real_time_analysis("s0", use_langgraph=False)
+    assert await agent.analyze_audio_stream("s0", b"s0:99", use_langgraph=False) == {}
+    assert not await agent.stop_real_time_analysis("s0", use_langgraph=False)
+    await agent.sessions.close()
+    assert not agent.is_analyzing
+
+
+@pytest.mark.asyncio
+async def test_video_frames_use_per_session_stream_state():
+    agent = _agent()
+    for session_id in ("a", "b"):
+        await agent.start_real_time_analysis(session_id, use_langgraph=False)
+
+    results = await asyncio.gather(*(
+        agent.analyze_video_frame(session_id, b"frame", use_langgraph=False)
+        for session_id in ("a", "b", "a", "a")
+    ))
+
+    # 帧缓冲区按会话计数
+    assert [r["buffer_size"] for r in results] == [1, 1, 2, 3]
+    streams = agent.visual_analyzer.streams
+    assert streams["a"] == {id(agent.sessions.get("a").visual_stream)}
+    assert streams["a"] != streams["b"]
+    assert isinstance(agent.sessions.get("b").visual_stream, FrameStreamState)
+    await agent.sessions.close()
+
+
+@pytest.mark.asyncio
+async def test_backlog_drops_oldest_chunks():
+    release = asyncio.Event()
+
+    async def processor(session, kind, data, timestamp, options):
+        await release.wait()
+        return {"data": data}
+
+    registry = RealtimeSessionRegistry(processor, queue_size=3, batch_size=1)
+    registry.start("busy")
+    first = asyncio.ensure_future(registry.submit("busy", "audio", bytes([0])))
+    await asyncio.sleep(0.01)
+    pending = [asyncio.ensure_future(registry.submit("busy", "audio", bytes([i]))) for i in range(1, 8)]
+    await asyncio.sleep(0.01)
+    release.set()
+    results = await asyncio.gather(first, *pending)
+
+    # 第一块已在处理中，其余积压超过3块时丢弃最旧的
+    assert results == [{"data": bytes([0])}, {}, {}, {}, {}, {"data": bytes([5])}, {"data": bytes([6])},
+                       {"data": bytes([7])}]
+    assert registry.get("busy").stats["dropped"] == 4
+    await registry.close()
+
+
+@pytest.mark.asyncio
+async def test_idle_sessions_are_evicted():
+    async def processor(session, kind, data, timestamp, options):
+        return {}
+
+    registry = RealtimeSessionRegistry(processor, max_sessions=2, idle_timeout=0.05, sweep_interval=0.02)
+    assert registry.start("idle") and registry.start("active")
+    assert not registry.start("active")
+
+    for _ in range(6):
+        await registry.submit("active", "audio", b"x")
+        await asyncio.sleep(0.02)
+
+    assert registry.session_ids() == ["active"]
+    # 空出的名额可以分配给新会话
+    assert registry.start("new")
+    assert not registry.start("overflow")
+    await registry.close()
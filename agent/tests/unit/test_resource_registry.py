@@ -0,0 +1,163 @@
+# -*- coding: utf-8 -*-
+"""
+资源注册表单元测试
+"""
+import os
+import threading
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+
+from agent.src.core.system.resource_registry import ResourceRegistry, config_fingerprint
+from agent.src.core.system.config import AgentConfig
+
+
+class SlowModel:
+    """构造耗时的桩模型，记录构造次数"""
+    instances = 0
+
+    def __init__(self):
+        time.sleep(0.05)
+        SlowModel.instances += 1
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture
+def registry():
+    SlowModel.instances = 0
+    return ResourceRegistry()
+
+
+def test_lazy_load_once_under_concurrency(registry):
+    """并发获取同一资源只创建一次"""
+    registry.register("model", SlowModel)
+    assert not registry.is_loaded("model")
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(registry.acquire("model"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert SlowModel.instances == 1
+    assert all(result is results[0] for result in results)
+    assert registry.get_ref_count("model") == 8
+    assert registry.get_stats()["loads"] == 1
+
+
+def test_ref_counting_closes_non_persistent_resource(registry):
+    """非常驻资源在最后一个引用释放时关闭"""
+    registry.register("client", SlowModel, closer=lambda m: m.close(), keep_alive=False)
+
+    first = registry.acquire("client")
+    registry.acquire("client")
+    registry.release("client")
+    assert not first.closed
+    registry.release("client")
+
+    assert first.closed
+    assert not registry.is_loaded("client")
+    assert registry.acquire("client") is not first
+
+
+def test_keep_alive_resource_survives_release(registry):
+    """常驻资源引用计数归零后仍保留"""
+    model = registry.acquire("model", SlowModel)
+    registry.release("model")
+
+    assert registry.is_loaded("model")
+    assert registry.acquire("model") is model
+
+
+def test_unregistered_resource_without_factory(registry):
+    with pytest.raises(KeyError):
+        registry.acquire("missing")
+
+
+def test_warm_up(registry):
+    """预热只创建标记为预热的资源，失败的资源不影响其他资源"""
+    registry.register("warm", SlowModel, warm_up=True)
+    registry.register("cold", SlowModel)
+    registry.register("broken", MagicMock(side_effect=RuntimeError("加载失败")), warm_up=True)
+
+    warmed = registry.warm_up()
+
+    assert warmed == ["warm"]
+    assert registry.is_loaded("warm")
+    assert not registry.is_loaded("cold")
+    assert registry.get_ref_count("warm") == 0
+
+
+def test_reset_after_fork_recreates_resources(registry):
+    """fork后的子进程重新创建资源，不关闭父进程的实例"""
+    registry.register("model", SlowModel, closer=lambda m: m.close())
+    parent_model = registry.acquire("model")
+
+    # 模拟在子进程中检测到pid变化
+    registry._pid = -1
+    child_model = registry.acquire("model")
+
+    assert child_model is not parent_model
+    assert not parent_model.closed
+    assert registry.get_stats()["fork_resets"] == 1
+
+
+@pytest.mark.skipif(not hasattr(os, "fork"), reason="需要fork支持")
+def test_real_fork_child_reloads():
+    """真实fork出的子进程中，全局注册表不沿用父进程的实例"""
+    from agent.src.core.system.resource_registry import get_resource_registry
+
+    registry = get_resource_registry()
+    parent_model = registry.acquire("fork_test_model", SlowModel)
+
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        os.close(read_fd)
+        child_registry = get_resource_registry()
+        reloaded = child_registry.acquire("fork_test_model") is not parent_model
+        os.write(write_fd, b"1" if reloaded and not child_registry.is_loaded("other") else b"0")
+        os._exit(0)
+
+    os.close(write_fd)
+    result = os.read(read_fd, 1)
+    os.close(read_fd)
+    os.waitpid(pid, 0)
+
+    assert result == b"1"
+    registry.release("fork_test_model")
+
+
+def test_shutdown_closes_all(registry):
+    model = registry.acquire("model", SlowModel, closer=lambda m: m.close())
+
+    registry.shutdown()
+
+    assert model.closed
+    assert not registry.is_loaded("model")
+
+
+def test_config_fingerprint_stable():
+    assert config_fingerprint({"a": 1, "b": 2}) == config_fingerprint({"b": 2, "a": 1})
+    assert config_fingerprint({"a": 1}) != config_fingerprint({"a": 2})
+
+
+def test_speech_analyzers_share_services():
+    """多个语音分析器实例共享讯飞服务和线程池"""
+    from agent.src.analyzers.speech.speech_analyzer import SpeechAnalyzer
+
+    with patch("agent.src.analyzers.speech.speech_analyzer.XunFeiService") as mock_service_cls, \
+         patch("agent.src.analyzers.speech.speech_analyzer.AsyncXunFeiService") as mock_async_cls:
+        first = SpeechAnalyzer(config=AgentConfig())
+        second = SpeechAnalyzer(config=AgentConfig())
+
+        assert first.xunfei_service is second.xunfei_service
+        assert first.thread_pool is second.thread_pool
+        assert mock_service_cls.call_count == 1
+
+        first.close()
+        second.close()
@@ -0,0 +1,212 @@
+# -*- coding: utf-8 -*-
+"""
+请求合并（single-flight）单元测试：题目生成与嵌入的并发去重
+"""
+import asyncio
+import json
+from unittest.mock import MagicMock
+
+import numpy as np
+import pytest
+
+from agent.src.core.system.config import AgentConfig
+from agent.src.retrieval.vector_db import VectorDatabase
+from agent.src.services.question_service import QuestionService, QuestionServiceConfig
+from agent.src.services.single_flight import SingleFlight, get_single_flight, reset_single_flights
+
+POSITION_INFO = {
+    "title": "Python开发工程师",
+    "tech_field": "backend",
+    "description": "负责后端服务开发与维护",
+    "skills": ["Python", "FastAPI", "Redis"]
+}
+
+QUESTIONS = [
+    {"question": f"请介绍一个你用FastAPI实现的项目（{i}）", "type": "technical", "difficulty": "medium"}
+    for i in range(3)
+]
+
+
+@pytest.fixture(autouse=True)
+def _reset_groups():
+    reset_single_flights()
+    yield
+    reset_single_flights()
+
+
+class Upstream:
+    """记录调用次数的慢速上游"""
+
+    def __init__(self, latency: float = 0.05, result=None, error: Exception = None):
+        self.latency = latency
+        self.result = result if result is not None else {"value": 1}
+        self.error = error
+        self.calls = 0
+        self.cancelled = False
+
+    async def call(self):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.latency)
+        except asyncio.CancelledError:
+            self.cancelled = True
+            raise
+        if self.error:
+            raise self.error
+        return self.result
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_request():
+    group = SingleFlight("test")
+    upstream = Upstream()
+
+    results = await asyncio.gather(*(group.do("k", upstream.call) for _ in range(20)))
+    assert upstream.calls == 1
+    assert all(result == {"value": 1} for result in results)
+
+    # 后到的调用方拿到副本，修改不会影响其他调用方
+    results[1]["value"] = 2
+    assert results[0]["value"] == 1 and results[2]["value"] == 1
+
+    stats = group.get_stats()
+    assert stats["executions"] == 1 and stats["coalesced"] == 19
+    assert stats["in_flight"] == 0
+
+    # 任务结束后不保留结果，再次调用会重新请求
+    await group.do("k", upstream.call)
+    assert upstream.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_different_keys_are_not_merged():
+    group = SingleFlight("test")
+    upstream = Upstream()
+    await asyncio.gather(group.do("a", upstream.call), group.do("b", upstream.call))
+    assert upstream.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_caller_timeout_does_not_cancel_shared_call():
+    """一个调用方超时离开，其余调用方仍拿到结果"""
+    group = SingleFlight("test")
+    upstream = Upstream(latency=0.1)
+
+    impatient = group.do("k", upstream.call, timeout=0.01)
+    patient = group.do("k", upstream.call)
+    results = await asyncio.gather(impatient, patient, return_exceptions=True)
+
+    assert isinstance(results[0], asyncio.TimeoutError)
+    assert results[1] == {"value": 1}
+    assert upstream.calls == 1 and not upstream.cancelled
+    assert group.get_stats()["timeouts"] == 1
+
+
+@pytest.mark.asyncio
+async def test_shared_call_cancelled_when_all_callers_leave():
+    group = SingleFlight("test")
+    upstream = Upstream(latency=1.0)
+
+    tasks = [asyncio.create_task(group.do("k", upstream.call)) for _ in range(3)]
+    await asyncio.sleep(0.01)
+    tasks[0].cancel()
+    await asyncio.sleep(0)
+    assert not upstream.cancelled
+
+    for task in tasks[1:]:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    await asyncio.sleep(0)
+
+    stats = group.get_stats()
+    assert upstream.cancelled
+    assert stats["cancelled"] == 3 and stats["abandoned"] == 1
+    assert stats["in_flight"] == 0
+
+    # 被放弃的请求不会被之后的调用方复用
+    upstream.latency = 0.01
+    assert await group.do("k", upstream.call) == {"value": 1}
+    assert upstream.calls == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_propagate_to_every_caller():
+    group = SingleFlight("test")
+    upstream = Upstream(error=ValueError("服务不可用"))
+
+    results = await asyncio.gather(*(group.do("k", upstream.call) for _ in range(5)), return_exceptions=True)
+    assert upstream.calls == 1
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+def _question_service(latency: float = 0.05) -> QuestionService:
+    openai_service = MagicMock()
+    openai_service.calls = 0
+
+    async def chat_completion(**kwargs):
+        openai_service.calls += 1
+        await asyncio.sleep(latency)
+        return {"status": "success", "content": json.dumps(QUESTIONS, ensure_ascii=False)}
+
+    openai_service.chat_completion = chat_completion
+    return QuestionService(openai_service=openai_service,
+                           config=QuestionServiceConfig(enable_content_filter=False))
+
+
+@pytest.mark.asyncio
+async def test_question_generation_coalesced_across_candidates():
+    """同一时刻练习同一题库的多名候选人只触发一次题目生成"""
+    first = _question_service()
+    services = [first] + [QuestionService(openai_service=first.openai_service, config=first.config) for _ in range(9)]
+
+    results = await asyncio.gather(*(
+        service.generate_interview_questions(POSITION_INFO, question_count=3, mode="quick")
+        for service in services
+    ))
+
+    assert services[0].openai_service.calls == 1
+    assert all(result == QUESTIONS for result in results)
+    assert get_single_flight("question_generation").get_stats()["coalesced"] == 9
+
+    # 参数不同的请求分别生成
+    await asyncio.gather(
+        services[0].generate_interview_questions(POSITION_INFO, question_count=3, difficulty_level="easy", mode="quick"),
+        services[0].generate_interview_questions(POSITION_INFO, question_count=3, difficulty_level="hard", mode="quick")
+    )
+    assert services[0].openai_service.calls == 3
+
+
+@pytest.mark.asyncio
+async def test_question_generation_timeout_falls_back():
+    service = _question_service(latency=0.2)
+    quick, slow = await asyncio.gather(
+        service.generate_interview_questions(POSITION_INFO, question_count=3, mode="quick", timeout=0.01),
+        service.generate_interview_questions(POSITION_INFO, question_count=3, mode="quick")
+    )
+    assert quick and quick != QUESTIONS
+    assert slow == QUESTIONS
+    assert service.openai_service.calls == 1
+
+
+@pytest.mark.asyncio
+async def test_duplicate_embeddings_in_batch_call_upstream_once(tmp_path):
+    config = AgentConfig()
+    config.config["db"]["vector"].update({"db_type": "memory", "data_dir": str(tmp_path)})
+    db = VectorDatabase(config)
+
+    calls = []
+
+    async def create_embedding(text):
+        calls.append(text)
+        await asyncio.sleep(0.02)
+        return {"status": "success", "embedding": [3.0, 4.0]}
+
+    db._embedding_service = MagicMock(create_embedding=create_embedding)
+    db._embedding_service_imported = True
+
+    embeddings = await asyncio.gather(*(db.create_embedding(text) for text in ["面试题", "面试题", "项目经历", "面试题"]))
+
+    assert sorted(calls) == ["面试题", "项目经历"]
+    np.testing.assert_allclose(embeddings[0], [0.6, 0.8])
+    embeddings[1][0] = 0.0
+    np.testing.assert_allclose(embeddings[3], [0.6, 0.8])
@@ -0,0 +1,191 @@
+# -*- coding: utf-8 -*-
+"""
+图状态增量检查点单元测试：写入量与变化量成正比、列表按下标记录变化、压缩后保留历史、截断记录恢复与回滚
+"""
+import json
+
+import pytest
+
+from agent.src.core.workflow.state import AnalysisResult, GraphState, Task, TaskStatus, TaskType
+from agent.src.core.workflow.state_journal import StateJournal
+from agent.src.core.workflow.state_manager import StateManager
+
+LARGE_BLOB = "面试转写文本" * 50000  # 约900KB
+
+
+@pytest.fixture
+def manager(tmp_path):
+    return StateManager(state_dir=str(tmp_path))
+
+
+def _large_state() -> GraphState:
+    state = GraphState()
+    state.user_context.interview_data = {"transcript": LARGE_BLOB}
+    return state
+
+
+def _fresh(manager):
+    """清空内存缓存和日志对象，强制从磁盘恢复"""
+    manager.clear_graph_cache()
+    manager.graph_journals.clear()
+
+
+def test_bytes_written_scale_with_delta_not_state_size(manager):
+    state = _large_state()
+    assert manager.save_graph_state("s1", state)
+    base_bytes = manager.performance_stats["bytes_written"]
+    assert base_bytes > len(LARGE_BLOB)
+
+    steps = 20
+    for step in range(steps):
+        state.metadata["step"] = step
+        state.next_node = f"node_{step}"
+        assert manager.save_graph_state("s1", state)
+    per_step = (manager.performance_stats["bytes_written"] - base_bytes) / steps
+
+    # 每步只写入变化的两个字段和索引，与约1MB的状态大小无关
+    assert per_step < 1024
+
+    _fresh(manager)
+    loaded = manager.load_graph_state("s1")
+    assert loaded.metadata == {"step": steps - 1}
+    assert loaded.next_node == f"node_{steps - 1}"
+    assert loaded.user_context.interview_data["transcript"] == LARGE_BLOB
+    assert loaded.user_context.session_id == state.user_context.session_id
+
+
+def test_journal_compacts_into_base_snapshot(manager):
+    manager.journal_compact_every = 5
+    state = _large_state()
+    for step in range(12):
+        state.metadata["step"] = step
+        manager.save_graph_state("s1", state)
+
+    journal = manager.graph_journals["s1"]
+    index = json.loads(journal.index_path.read_text())
+    assert journal.compactions == 3
+    # 基准快照为第1个检查点，之后每第5个检查点压缩：6、11
+    assert index["seq"] == 12 and index["base_seq"] == 11 and index["records"] == 1
+    assert sorted(p.name for p in journal.directory.iterdir()) == ["base.pickle", "history", "index.json", "journal.log"]
+    # 最近10个检查点（2-11）跨越以1和6为基准的两个分段，两者都被保留
+    assert sorted(p.name for p in journal.history_dir.iterdir()) == [
+        "base.0000000001.pickle", "base.0000000006.pickle", "journal.0000000001.log", "journal.0000000006.log"
+    ]
+
+    _fresh(manager)
+    assert manager.load_graph_state("s1").metadata == {"step": 11}
+
+
+def test_truncated_final_record_is_discarded(manager):
+    state = GraphState()
+    for step in range(3):
+        state.metadata["step"] = step
+        manager.save_graph_state("s1", state)
+    journal_path = manager.graph_journals["s1"].journal_path
+    data = journal_path.read_bytes()
+
+    # 模拟写入最后一条记录时崩溃：文件末尾只剩半条记录
+    journal_path.write_bytes(data[:-5])
+    _fresh(manager)
+    assert manager.load_graph_state("s1").metadata == {"step": 1}
+
+    # 恢复后继续写入，残缺的尾部被截断
+    state.metadata["step"] = 3
+    assert manager.save_graph_state("s1", state)
+    _fresh(manager)
+    assert manager.load_graph_state("s1").metadata == {"step": 3}
+    history = manager.get_graph_state_history("s1")
+    assert [s.metadata["step"] for s in history] == [0, 1, 3]
+
+
+def test_uncommitted_tail_beyond_index_is_ignored(tmp_path):
+    blob = b"x" * 4096
+    journal = StateJournal(tmp_path / "s1")
+    journal.checkpoint({"a": b"1", "blob": blob}, "20250101_000000_000000")
+    journal.checkpoint({"a": b"2", "blob": blob}, "20250101_000001_000000")
+    index = journal.index_path.read_text()
+    journal.checkpoint({"a": b"3"}, "20250101_000002_000000")
+
+    # 追加记录后、更新索引前崩溃
+    journal.index_path.write_text(index)
+    assert StateJournal(tmp_path / "s1").replay() == (2, {"a": b"2", "blob": blob})
+    assert StateJournal(tmp_path / "s1").replay(until="20250101_000000") == (1, {"a": b"1", "blob": blob})
+
+    # 新的写入从已提交位置继续，被删除的键不再出现
+    recovered = StateJournal(tmp_path / "s1")
+    recovered.checkpoint({"a": b"4"}, "20250101_000003_000000")
+    assert StateJournal(tmp_path / "s1").replay() == (3, {"a": b"4"})
+
+
+def test_rollback_and_history_replay_journal(manager):
+    state = GraphState()
+    for step in range(4):
+        state.metadata["step"] = step
+        state.error = "失败" if step == 2 else None
+        manager.save_graph_state("s1", state)
+
+    assert [s.metadata["step"] for s in manager.get_graph_state_history("s1")] == [0, 1, 2, 3]
+    rolled = manager.rollback_graph_state("s1", steps=2)
+    assert rolled.metadata == {"step": 1} and rolled.error is None
+    assert manager.load_graph_state("s1") is rolled
+    assert manager.rollback_graph_state("s1", steps=4) is None
+    assert manager.load_graph_state("missing") is None
+
+
+def test_history_and_rollback_survive_compaction(manager):
+    manager.journal_compact_every = 3
+    state = GraphState()
+    lengths = []
+    for step in range(30):
+        state.metadata["step"] = step
+        manager.save_graph_state("s1", state)
+        lengths.append(len(manager.get_graph_state_history("s1")))
+
+        # 每次压缩后仍能回滚，而不是只能回到压缩之后的检查点
+        if step >= 1:
+            assert manager.rollback_graph_state("s1", steps=1).metadata == {"step": step - 1}
+
+    # 历史长度逐步增长到 max_history_size 后保持不变
+    assert lengths == [min(step + 1, manager.max_history_size) for step in range(30)]
+    _fresh(manager)
+    assert [s.metadata["step"] for s in manager.get_graph_state_history("s1")] == list(range(20, 30))
+    assert manager.rollback_graph_state("s1", steps=9).metadata == {"step": 20}
+    assert manager.rollback_graph_state("s1", steps=10) is None
+
+    # 只保留覆盖最近10个检查点所需的历史分段
+    history_dir = manager.graph_journals["s1"].history_dir
+    assert len(list(history_dir.glob("base.*.pickle"))) <= manager.max_history_size // 2 + 1
+
+
+def test_list_appends_write_only_new_items(manager):
+    state = GraphState()
+    for i in range(500):
+        state.task_state.tasks.append(Task(id=f"t{i}", type=TaskType.CONTENT_ANALYSIS, data={"text": LARGE_BLOB[:200]}))
+        state.analysis_state.results.append(AnalysisResult(task_id=f"t{i}", type=TaskType.CONTENT_ANALYSIS, score=7.0))
+    assert manager.save_graph_state("s1", state)
+    base_bytes = manager.performance_stats["bytes_written"]
+
+    # 少于 journal_compact_every 步，不触发压缩
+    steps = 40
+    for step in range(steps):
+        task_id = f"new{step}"
+        state.task_state.tasks.append(Task(id=task_id, type=TaskType.SPEECH_ANALYSIS))
+        state.task_state.tasks[step].status = TaskStatus.COMPLETED
+        state.analysis_state.results.append(AnalysisResult(task_id=task_id, type=TaskType.SPEECH_ANALYSIS, score=8.0))
+        assert manager.save_graph_state("s1", state)
+    per_step = (manager.performance_stats["bytes_written"] - base_bytes) / steps
+
+    # 每步只写入新追加的任务和结果、被修改的任务以及两个列表的长度，与已有的1000个元素无关
+    assert per_step < 2048 < base_bytes / 100
+
+    _fresh(manager)
+    loaded = manager.load_graph_state("s1")
+    assert [task.id for task in loaded.task_state.tasks] == [task.id for task in state.task_state.tasks]
+    assert [task.status for task in loaded.task_state.tasks] == [task.status for task in state.task_state.tasks]
+    assert [r.task_id for r in loaded.analysis_state.results] == [r.task_id for r in state.analysis_state.results]
+
+    # 列表缩短时多余的下标被删除
+    del state.task_state.tasks[10:]
+    manager.save_graph_state("s1", state)
+    _fresh(manager)
+    assert [task.id for task in manager.load_graph_state("s1").task_state.tasks] == [f"t{i}" for i in range(10)]
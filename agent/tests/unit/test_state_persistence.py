@@ -0,0 +1,104 @@
+# -*- coding: utf-8 -*-
+"""
+状态分片持久化单元测试：每个会话单独一个文件、只重写有变更的会话、防抖落盘与重启恢复
+"""
+import asyncio
+import json
+import os
+import time
+
+import pytest
+
+from agent.src.core.workflow.state_manager import StateManager
+
+SESSIONS = 500
+
+
+def _files(state_dir):
+    """状态目录下所有文件 -> 修改时间（纳秒）"""
+    result = {}
+    for root, _, names in os.walk(state_dir):
+        for name in names:
+            path = os.path.join(root, name)
+            result[os.path.relpath(path, state_dir)] = os.stat(path).st_mtime_ns
+    return result
+
+
+@pytest.mark.asyncio
+async def test_updating_one_session_rewrites_only_its_file(tmp_path):
+    manager = StateManager(state_dir=str(tmp_path), save_debounce=60)
+    for i in range(SESSIONS):
+        await manager.start_session(f"session/{i}", "technical", {"round": 0})
+    assert manager.flush() == SESSIONS + 1
+    assert len(os.listdir(tmp_path / "sessions")) == SESSIONS
+
+    # 把所有文件的修改时间调回过去，便于识别之后被重写的文件
+    past = time.time_ns() - 10 ** 10
+    for path in _files(tmp_path):
+        os.utime(tmp_path / path, ns=(past, past))
+
+    await manager.update_session_context("session/42", {"round": 1})
+    written = manager.flush()
+
+    changed = [path for path, mtime in _files(tmp_path).items() if mtime != past]
+    assert written == 1
+    assert changed == [os.path.join("sessions", "session%2F42.json")]
+
+    # 没有新变更时不写入任何文件
+    assert manager.flush() == 0
+    manager.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_changes_are_debounced_into_one_background_flush(tmp_path):
+    manager = StateManager(state_dir=str(tmp_path), save_debounce=0.05)
+    await manager.start_session("s1", "technical")
+    for i in range(20):
+        await manager.add_result_to_session("s1", {"overall_score": i, "processing_time": 0.1})
+        await manager.add_task_to_session("s1", f"task-{i}")
+    assert manager.performance_stats["flush_count"] == 0
+
+    await asyncio.sleep(0.15)
+
+    assert manager.performance_stats["flush_count"] == 1
+    saved = json.loads((tmp_path / "sessions" / "s1.json").read_text(encoding="utf-8"))
+    assert len(saved["analysis_results"]) == 20
+    assert len((tmp_path / StateManager.TASK_HISTORY_FILE).read_text().splitlines()) == 20
+    manager.cleanup()
+
+
+@pytest.mark.asyncio
+async def test_state_survives_restart(tmp_path):
+    manager = StateManager(state_dir=str(tmp_path), save_debounce=60)
+    for session_id in ("a", "b"):
+        await manager.start_session(session_id, "technical", {"candidate": session_id})
+    await manager.add_task_to_session("a", "t1")
+    await manager.end_session("b")
+    await manager.update_strategy_weights({"fast": 0.7})
+    manager.flush()
+
+    restored = StateManager(state_dir=str(tmp_path))
+
+    assert restored.get_active_sessions() == ["a"]
+    assert restored.get_session_context("a") == {"candidate": "a"}
+    assert not (tmp_path / "sessions" / "b.json").exists()
+    assert [entry["session_id"] for entry in restored.get_session_history()] == ["b"]
+    assert [entry["task_id"] for entry in restored.get_task_history("a")] == ["t1"]
+    assert restored.get_global_state().total_sessions == 2
+    assert restored.get_global_state().strategy_weights == {"fast": 0.7}
+    manager.cleanup()
+    restored.cleanup()
+
+
+def test_legacy_single_file_state_is_split_on_flush(tmp_path):
+    legacy = {"old": {"session_id": "old", "session_type": "technical", "context": {"k": "v"}}}
+    (tmp_path / "active_sessions.json").write_text(json.dumps(legacy), encoding="utf-8")
+    (tmp_path / "session_history.json").write_text(json.dumps([{"session_id": "done"}]), encoding="utf-8")
+
+    manager = StateManager(state_dir=str(tmp_path))
+    assert manager.get_session_context("old") == {"k": "v"}
+    manager.flush()
+
+    restored = StateManager(state_dir=str(tmp_path))
+    assert restored.get_session_context("old") == {"k": "v"}
+    assert restored.get_session_history() == [{"session_id": "done"}]
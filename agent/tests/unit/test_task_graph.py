@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""
+任务依赖图单元测试：各模态并发执行，依赖节点在其依赖完成后开始
+"""
+import asyncio
+import threading
+import time
+
+import pytest
+
+from agent.src.core.agent import agent as agent_module
+from agent.src.core.agent.agent import InterviewAgent
+from agent.src.core.workflow import workflow as workflow_module
+from agent.src.core.workflow.task_graph import TaskGraph
+from agent.src.core.workflow.workflow import InterviewAnalysisWorkflow
+
+STEP = 0.2
+
+
+def _overlap(timings, *names):
+    """各节点的执行区间存在公共部分"""
+    return max(timings[name][0] for name in names) < min(timings[name][1] for name in names)
+
+
+@pytest.fixture
+def recorded_graphs(monkeypatch):
+    """记录工作流和智能体创建的依赖图，便于检查节点执行区间"""
+    graphs = []
+
+    class RecordingGraph(TaskGraph):
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            graphs.append(self)
+
+    monkeypatch.setattr(workflow_module, "TaskGraph", RecordingGraph)
+    monkeypatch.setattr(agent_module, "TaskGraph", RecordingGraph)
+    return graphs
+
+
+def test_graph_runs_independent_nodes_concurrently():
+    threads = set()
+
+    def slow(value, seconds):
+        def run(**deps):
+            threads.add(threading.get_ident())
+            time.sleep(seconds)
+            return value, deps
+        return run
+
+    graph = TaskGraph("test")
+    graph.add("speech", slow("speech", STEP))
+    graph.add("visual", slow("visual", STEP * 1.5))
+    graph.add("transcript", slow("text", STEP / 2))
+    graph.add("content", slow("content", STEP / 2), deps=["transcript"])
+    graph.add("overall", lambda speech, visual, content: [speech[0], visual[0], content[0]],
+              deps=["speech", "visual", "content"])
+
+    results = graph.run_sync()
+
+    assert results["overall"] == ["speech", "visual", "content"]
+    assert results["content"][1] == {"transcript": ("text", {})}
+    assert len(threads) >= 3
+    assert _overlap(graph.timings, "speech", "visual", "transcript")
+    assert graph.timings["content"][0] >= graph.timings["transcript"][1] - 0.01
+    assert graph.timings["overall"][0] >= graph.timings["visual"][1] - 0.01
+
+
+@pytest.mark.asyncio
+async def test_failure_cancels_remaining_nodes():
+    cancelled = []
+
+    async def slow():
+        try:
+            await asyncio.sleep(1)
+        except asyncio.CancelledError:
+            cancelled.append("slow")
+            raise
+
+    async def broken():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("特征提取失败")
+
+    graph = TaskGraph("test").add("slow", slow).add("broken", broken)
+    graph.add("after", lambda slow, broken: None, deps=["slow", "broken"])
+
+    with pytest.raises(RuntimeError, match="特征提取失败"):
+        await graph.run()
+    assert cancelled == ["slow"]
+
+
+def test_add_validates_nodes():
+    graph = TaskGraph("test").add("a", lambda: 1)
+    with pytest.raises(ValueError):
+        graph.add("a", lambda: 2)
+    with pytest.raises(ValueError):
+        graph.add("b", lambda missing: 2, deps=["missing"])
+
+
+class SleepyAnalyzer:
+    """固定耗时的异步分析器桩"""
+
+    def __init__(self, result):
+        self.result = result
+
+    async def analyze(self, *args, **kwargs):
+        await asyncio.sleep(STEP)
+        return dict(self.result)
+
+    def extract_features(self, transcript):
+        return {"text": transcript}
+
+
+@pytest.mark.asyncio
+async def test_workflow_modalities_run_concurrently(recorded_graphs):
+    content = SleepyAnalyzer({})
+    content.analyze = lambda features, params=None: {"relevance": {"score": 90}, "text": features["text"]}
+    workflow = InterviewAnalysisWorkflow(
+        speech_analyzer=SleepyAnalyzer({"speech_rate": {"score": 80}, "transcript": "转写文本"}),
+        visual_analyzer=SleepyAnalyzer({"eye_contact": {"score": 70}}),
+        content_analyzer=content
+    )
+    interview_data = {"audio_file": "a.wav", "video_file": "v.mp4", "transcript": "已有文本"}
+
+    report = await workflow._analyze_interview_sync("c1", interview_data)
+
+    timings = recorded_graphs[0].timings
+    # 已有转写文本时内容分析不等待语音分析
+    assert _overlap(timings, "speech", "visual")
+    assert timings["content"][0] < timings["speech"][1]
+    assert report["overall_score"] == 80
+    assert report["content_analysis"]["text"] == "已有文本"
+
+    # 未提供转写文本时，内容分析等待语音分析产出的转写文本
+    report = await workflow._analyze_interview_sync("c1", {"audio_file": "a.wav", "video_file": "v.mp4"})
+    assert report["content_analysis"]["text"] == "转写文本"
+    timings = recorded_graphs[1].timings
+    assert timings["content"][0] >= timings["speech"][1] - 0.01
+
+
+class SleepyModality:
+    """同步阻塞的分析器桩，模拟特征提取耗时"""
+
+    def __init__(self, name, seconds):
+        self.name = name
+        self.seconds = seconds
+
+    def extract_features(self, file_path):
+        time.sleep(self.seconds)
+        return {"file": file_path}
+
+    def speech_to_text(self, file_path):
+        time.sleep(self.seconds)
+        return "转写文本"
+
+    def analyze(self, features, params=None):
+        if self.name == "overall":
+            return {"modalities": sorted(k for k, v in features.items() if v)}
+        if self.name == "content":
+            time.sleep(self.seconds)
+            return {"text": features}
+        return {"score": 80}
+
+
+def test_interview_agent_fallback_runs_modalities_concurrently(tmp_path, recorded_graphs):
+    video = tmp_path / "interview.mp4"
+    video.write_bytes(b"")
+    agent = InterviewAgent.__new__(InterviewAgent)
+    agent.scenarios = {}
+    agent.speech_analyzer = SleepyModality("speech", STEP)
+    agent.visual_analyzer = SleepyModality("visual", STEP)
+    agent.content_analyzer = SleepyModality("content", STEP / 2)
+    agent.overall_analyzer = SleepyModality("overall", 0)
+
+    result = agent.analyze(str(video), scenario="technical", use_langgraph=False)
+
+    timings = recorded_graphs[0].timings
+    assert _overlap(timings, "speech", "visual", "transcript")
+    assert timings["content"][0] >= timings["transcript"][1] - 0.01
+    assert result.raw_result["content"] == {"text": "转写文本"}
+    assert result.raw_result["overall"] == {"modalities": ["content", "speech", "visual"]}
@@ -0,0 +1,127 @@
+# -*- coding: utf-8 -*-
+"""
+列式视觉特征存储单元测试
+"""
+import pytest
+import numpy as np
+from unittest.mock import patch
+
+from agent.src.analyzers.visual.visual_analyzer import VisualAnalyzer
+from agent.src.analyzers.visual.visual_features import VisualFeatureColumns
+from agent.src.core.system.config import AgentConfig
+
+
+@pytest.fixture
+def visual_analyzer():
+    """创建不启用LLM的视觉分析器"""
+    config = AgentConfig()
+    config.set("visual", "use_xunfei_llm", False)
+    return VisualAnalyzer(config=config)
+
+
+def _build_columns(sample_count: int) -> VisualFeatureColumns:
+    """构造交替检测到/未检测到人脸的采样序列"""
+    columns = VisualFeatureColumns(capacity=2)
+    for i in range(sample_count):
+        if i % 2 == 0:
+            columns.append(
+                i * 0.2, face_bbox=(10, 20, 30, 40), eye_contact=8.0,
+                expression="自然" if i % 4 == 0 else "微笑", expression_score=6.0 + (i % 4),
+                posture="自然", posture_score=7.0
+            )
+        else:
+            columns.append(i * 0.2, posture="前倾", posture_score=5.0)
+    return columns
+
+
+def test_columns_grow_and_keep_values():
+    """容量倍增后已写入的数据保持不变"""
+    columns = _build_columns(100)
+
+    assert len(columns) == 100
+    assert columns.capacity >= 100
+    assert columns.timestamps[-1] == pytest.approx(99 * 0.2)
+    assert int(columns.face_detected.sum()) == 50
+    assert columns.face_bboxes.shape == (100, 4)
+    assert np.isnan(columns.eye_contact_scores[1])
+
+
+def test_records_round_trip():
+    """列式存储与字典列表之间可以无损互转"""
+    columns = _build_columns(9)
+    records = columns.to_records()
+
+    assert len(records["face_detections"]) == 5
+    assert records["face_detections"][0] == {"time": 0.0, "bbox": (10, 20, 30, 40)}
+    assert records["expressions"][1] == {"time": pytest.approx(0.4), "type": "微笑", "score": 8.0}
+    assert len(records["postures"]) == 9
+
+    rebuilt = VisualFeatureColumns.from_records(records)
+    assert rebuilt.to_records() == records
+
+
+def test_calculate_stats_vectorized(visual_analyzer):
+    """向量化统计结果与逐条统计一致"""
+    columns = _build_columns(20)
+    features = {"video_info": {"fps": 25, "frame_count": 100, "duration": 4.0}, "frames": columns}
+
+    stats = visual_analyzer._calculate_stats(features)
+
+    records = columns.to_records()
+    assert stats["face_detection_rate"] == pytest.approx(10 / 20)
+    assert stats["avg_eye_contact"] == pytest.approx(np.mean([r["score"] for r in records["eye_contacts"]]))
+    assert stats["avg_expression_score"] == pytest.approx(np.mean([r["score"] for r in records["expressions"]]))
+    assert stats["avg_posture_score"] == pytest.approx(6.0)
+    assert stats["expression_distribution"] == {"自然": 5, "微笑": 5}
+    assert stats["posture_distribution"] == {"自然": 10, "前倾": 10}
+
+
+def test_calculate_stats_accepts_legacy_records(visual_analyzer):
+    """旧的字典列表格式仍可计算统计"""
+    features = {"video_info": {"duration": 1.0}}
+    features.update(_build_columns(5).to_records())
+
+    stats = visual_analyzer._calculate_stats(features)
+
+    assert stats["expression_distribution"] == {"自然": 2, "微笑": 1}
+    assert stats["avg_eye_contact"] == pytest.approx(8.0)
+
+
+def test_calculate_stats_empty(visual_analyzer):
+    """没有采样帧时使用默认评分"""
+    features = {"video_info": {"duration": 0}, "frames": VisualFeatureColumns(capacity=1)}
+
+    stats = visual_analyzer._calculate_stats(features)
+
+    assert stats["avg_eye_contact"] == 5.0
+    assert stats["avg_expression_score"] == 5.0
+    assert stats["expression_distribution"] == {}
+
+
+def test_features_to_dict(visual_analyzer):
+    """API边界处把列式特征展开为字典列表"""
+    features = {"video_info": {"duration": 1.0}, "frames": _build_columns(3), "stats": {}}
+
+    result = visual_analyzer.features_to_dict(features)
+
+    assert "frames" not in result
+    assert len(result["face_detections"]) == 2
+    assert result["stats"] == {}
+
+
+def test_visual_trends(visual_analyzer):
+    """趋势基于最近三次实时分析的变化量"""
+    for score in (4.0, 6.0, 8.0):
+        visual_analyzer._record_trend_values({
+            "eye_contact": score,
+            "facial_expression": {"score": 10.0 - score},
+            "posture": {"score": 5.0},
+            "attention": score
+        })
+
+    trends = visual_analyzer._calculate_visual_trends()
+
+    assert trends == {"eye_contact": "上升", "expression": "下降", "posture": "稳定", "attention": "上升"}
+
+    visual_analyzer.clear_stream_data()
+    assert visual_analyzer._calculate_visual_trends() == {}
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+Web搜索缓存与并发单元测试：查询规范化、结果缓存、多引擎截止时间与批量并发搜索
+"""
+import asyncio
+
+import pytest
+
+from agent.src.core.system.config import AgentConfig
+from agent.src.services.adaptive_limiter import reset_provider_limiters
+from agent.src.services.single_flight import reset_single_flights
+from agent.src.services.websearch_service import (
+    WebSearchService,
+    canonical_url,
+    normalize_query,
+    reset_search_cache,
+)
+
+
+@pytest.fixture(autouse=True)
+def _reset_shared_state():
+    reset_search_cache()
+    reset_provider_limiters()
+    reset_single_flights()
+    yield
+    reset_search_cache()
+    reset_provider_limiters()
+    reset_single_flights()
+
+
+def _service(latencies=None, **settings) -> WebSearchService:
+    """创建各引擎按给定延迟返回结果的搜索服务，记录每个引擎的调用和最大并发数"""
+    config = AgentConfig()
+    config.config["services"]["websearch"].update({
+        "serper_api_key": "k1", "serpapi_api_key": "k2", "bing_api_key": "k3", **settings
+    })
+    service = WebSearchService(config)
+    service.calls = []
+    service.in_flight = service.max_in_flight = 0
+    latencies = latencies or {}
+
+    def fake(engine):
+        async def search(query, num_results, language, country):
+            service.calls.append((engine, query))
+            service.in_flight += 1
+            service.max_in_flight = max(service.max_in_flight, service.in_flight)
+            try:
+                await asyncio.sleep(latencies.get(engine, 0.02))
+            finally:
+                service.in_flight -= 1
+            return {"status": "success", "engine": engine, "results": [
+                {"title": f"{query} 教程", "link": f"https://www.example.com/{query}/?utm_source={engine}", "source": "organic"},
+                {"question": f"{engine}常见问题", "answer": "回答", "source": "related_question"}
+            ]}
+        return search
+
+    service._search_serper = fake("serper")
+    service._search_serpapi = fake("serpapi")
+    service._search_bing = fake("bing")
+    return service
+
+
+def test_normalize_query_and_canonical_url():
+    assert normalize_query(" Python　教程？") == normalize_query("python 教程")
+    assert normalize_query("Redis  缓存") == "redis 缓存"
+    assert canonical_url("https://www.Example.com/a/?utm_source=x#top") == canonical_url("http://example.com/a")
+    assert canonical_url("https://example.com/a?id=1") != canonical_url("https://example.com/a?id=2")
+
+
+@pytest.mark.asyncio
+async def test_search_results_cached_by_normalized_query():
+    service = _service()
+
+    first = await service.search("Python 教程", engine="serper")
+    second = await service.search("  python　教程？", engine="serper")
+
+    assert len(service.calls) == 1
+    assert second["cached"] is True and "cached" not in first
+    assert second["results"] == first["results"]
+    # 结果项规范化为统一字段
+    faq = first["results"][1]
+    assert faq["title"] == "serper常见问题" and faq["snippet"] == "回答" and faq["engine"] == "serper"
+
+    # 修改返回结果不影响缓存
+    second["results"].clear()
+    assert (await service.search("Python 教程", engine="serper"))["results"]
+
+    # 引擎或结果数量不同不共享缓存
+    await service.search("Python 教程", engine="bing")
+    await service.search("Python 教程", engine="serper", num_results=3)
+    assert len(service.calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_failed_searches_are_not_cached():
+    service = _service()
+
+    async def failing(query, num_results, language, country):
+        service.calls.append(("serper", query))
+        return {"status": "error", "error": "API返回错误: 500", "results": []}
+
+    service._search_serper = failing
+    for _ in range(2):
+        assert (await service.search("面试技巧", engine="serper"))["status"] == "error"
+    assert len(service.calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_multi_engine_search_returns_at_deadline():
+    service = _service(latencies={"serper": 0.02, "serpapi": 0.03, "bing": 1.0})
+
+    result = await service.multi_engine_search("分布式事务", num_results=5, deadline=0.2)
+
+    assert result["engines_used"] == ["serper", "serpapi"]
+    assert result["engines_timed_out"] == ["bing"]
+    # 各引擎返回的同一页面只有跟踪参数不同，按规范化URL去重
+    assert [item["title"] for item in result["results"]] == ["分布式事务 教程", "serper常见问题", "serpapi常见问题"]
+
+
+@pytest.mark.asyncio
+async def test_search_many_deduplicates_and_runs_concurrently():
+    service = _service(latencies={"serper": 0.1})
+    queries = [f"后端 主题{i} 学习资源" for i in range(6)] + ["后端 主题0 学习资源 "]
+
+    results = await service.search_many(queries, engine="serper")
+
+    assert len(service.calls) == 6
+    assert set(results) == set(queries)
+    assert service.max_in_flight == 6
+
@@ -0,0 +1,161 @@
+# -*- coding: utf-8 -*-
+"""
+工作流截止时间单元测试：节点超出时间预算后保留部分结果、请求截止时间跳过剩余节点、取消令牌传入工作线程
+"""
+import asyncio
+import threading
+import uuid
+
+import pytest
+
+from agent.src.core.workflow.deadline import (
+    current_cancel_token,
+    run_with_token,
+    set_deadline,
+    with_deadline,
+)
+from agent.src.core.workflow.state import AnalysisResult, GraphState, Task, TaskStatus, TaskType
+from agent.src.nodes.executors.analyzer_executor import AnalyzerExecutor, shutdown_analyzer_pool
+
+
+def _score_node(name: str, seconds: float, score: float):
+    """睡眠指定时间后写入得分的节点桩"""
+    async def node(state, config=None):
+        await asyncio.sleep(seconds)
+        state.analysis_state.results.append({"type": name, "score": score})
+        return state
+    return node
+
+
+def _thread_node(cancelled: threading.Event):
+    """在线程池中执行阻塞分析的节点桩，分析线程通过取消令牌得知节点已超时"""
+    def blocking_analysis():
+        if current_cancel_token().wait(5):
+            cancelled.set()
+            return None
+        return {"type": "visual", "score": 7.0}
+
+    async def node(state, config=None):
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(None, run_with_token, current_cancel_token(), blocking_analysis)
+        state.analysis_state.results.append(result)
+        return state
+    return node
+
+
+async def _run(state, nodes):
+    for node in nodes:
+        state = await node(state)
+    return state
+
+
+@pytest.mark.asyncio
+async def test_visual_timeout_keeps_speech_and_content_scores():
+    cancelled = threading.Event()
+    nodes = [
+        with_deadline("speech", _score_node("speech", 0.01, 8.0), timeout=0.2),
+        with_deadline("visual", _thread_node(cancelled), timeout=0.2),
+        with_deadline("content", _score_node("content", 0.01, 9.0), timeout=0.2),
+    ]
+
+    state = await _run(GraphState(), nodes)
+
+    assert state.analysis_state.results == [{"type": "speech", "score": 8.0}, {"type": "content", "score": 9.0}]
+    assert state.metadata == {"timed_out": ["visual"], "partial_result": True}
+    # 超时节点的分析线程收到取消信号后退出，而不是继续占用线程5秒
+    assert cancelled.wait(1)
+
+
+@pytest.mark.asyncio
+async def test_request_deadline_bounds_remaining_nodes():
+    skipped = []
+    nodes = [
+        with_deadline(name, _score_node(name, seconds, 8.0), timeout=1.0,
+                      on_timeout=lambda state, name=name: skipped.append(name), request_timeout=0.3)
+        for name, seconds in (("speech", 0.2), ("content", 1.0), ("visual", 0.01))
+    ]
+
+    state = await _run(GraphState(), nodes)
+
+    # 第二个节点只剩约0.1s即超时，第三个节点开始时截止时间已过，直接跳过
+    assert [r["type"] for r in state.analysis_state.results] == ["speech"]
+    assert state.metadata["timed_out"] == skipped == ["content", "visual"]
+
+    # 已有更早的截止时间时不会被延长
+    deadline = state.deadline
+    assert set_deadline(state, 10).deadline == deadline
+
+
+class _Adapter:
+    """分析器适配器桩，hang=True 时一直等待直到任务被取消"""
+
+    def __init__(self, task_type, hang=False):
+        self.task_type = task_type
+        self.hang = hang
+        self.cancelled = threading.Event()
+
+    def process(self, state, task_data):
+        if self.hang and current_cancel_token().wait(5):
+            self.cancelled.set()
+            return None
+        return AnalysisResult(task_id=task_data["id"], type=self.task_type, score=8.0)
+
+
+def _executor_state(deadline_seconds: float) -> GraphState:
+    state = GraphState()
+    state.task_state.parallel_execution = True
+    for task_type in (TaskType.SPEECH_ANALYSIS, TaskType.VISUAL_ANALYSIS, TaskType.CONTENT_ANALYSIS):
+        task_id = str(uuid.uuid4())
+        state.task_state.tasks.append(Task(id=task_id, type=task_type, data={"id": task_id}))
+    return set_deadline(state, deadline_seconds)
+
+
+@pytest.mark.parametrize("in_loop", [False, True])
+def test_analyzer_executor_cancels_tasks_at_request_deadline(in_loop):
+    shutdown_analyzer_pool()
+    executor = AnalyzerExecutor({"timeout": 30})
+    executor.analyzer_adapters = {
+        "speech": _Adapter(TaskType.SPEECH_ANALYSIS),
+        "visual": _Adapter(TaskType.VISUAL_ANALYSIS, hang=True),
+        "content": _Adapter(TaskType.CONTENT_ANALYSIS),
+    }
+    state = _executor_state(0.2)
+
+    async def in_running_loop():
+        return executor.execute(state)
+
+    state = asyncio.run(in_running_loop()) if in_loop else executor.execute(state)
+
+    assert {r.type for r in state.analysis_state.results} == {TaskType.SPEECH_ANALYSIS, TaskType.CONTENT_ANALYSIS}
+    assert [task.status for task in state.task_state.tasks] == [
+        TaskStatus.COMPLETED, TaskStatus.CANCELLED, TaskStatus.COMPLETED
+    ]
+    assert state.metadata == {"timed_out": ["visual"], "partial_result": True}
+    assert executor.analyzer_adapters["visual"].cancelled.wait(1)
+    shutdown_analyzer_pool()
+
+
+@pytest.mark.parametrize("in_loop", [False, True])
+def test_analyzer_timeout_is_handled_like_deadline(in_loop):
+    shutdown_analyzer_pool()
+    executor = AnalyzerExecutor({"timeout": 30, "visual_timeout": 0.2})
+    executor.analyzer_adapters = {
+        "speech": _Adapter(TaskType.SPEECH_ANALYSIS),
+        "visual": _Adapter(TaskType.VISUAL_ANALYSIS, hang=True),
+        "content": _Adapter(TaskType.CONTENT_ANALYSIS),
+    }
+    state = _executor_state(30)
+
+    async def in_running_loop():
+        return await executor.execute_async(state)
+
+    state = asyncio.run(in_running_loop()) if in_loop else executor.execute(state)
+
+    # 单个分析器超时同样取消其工作线程，返回已完成的结果并把该分析器记为缺失，而不是用模拟结果
+    assert {r.type for r in state.analysis_state.results} == {TaskType.SPEECH_ANALYSIS, TaskType.CONTENT_ANALYSIS}
+    assert [task.status for task in state.task_state.tasks] == [
+        TaskStatus.COMPLETED, TaskStatus.CANCELLED, TaskStatus.COMPLETED
+    ]
+    assert state.metadata == {"timed_out": ["visual"], "partial_result": True}
+    assert executor.analyzer_adapters["visual"].cancelled.wait(1)
+    shutdown_analyzer_pool()
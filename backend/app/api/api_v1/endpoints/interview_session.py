@@ -1,4 +1,4 @@
-from fastapi import APIRouter, Depends, HTTPException, status, WebSocket, WebSocketDisconnect, UploadFile, File
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, status, WebSocket, WebSocketDisconnect, UploadFile, File
 from sqlalchemy.orm import Session
 from typing import List, Dict, Any, Optional
 import json
@@ -6,6 +6,7 @@ import asyncio
 import base64
 from datetime import datetime
 
+from app.core.config import settings
 from app.db.database import get_db
 from app.models.interview_session import InterviewSession, InterviewQuestion, RealTimeFeedback, SessionStatus
 from app.models.user import User
@@ -185,6 +186,7 @@ def submit_question_answer(
 @router.post("/{session_id}/complete", response_model=SessionAnalysisResponse)
 def complete_interview_session(
     session_id: int,
+    background_tasks: BackgroundTasks,
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_active_user)
 ):
@@ -200,6 +202,9 @@ def complete_interview_session(
     
     try:
         analysis_result = interview_session_service.complete_session(db, session_id)
+        # 响应返回后再用LLM批量重新评估回答内容，不阻塞请求
+        if settings.BATCH_ANSWER_SCORING:
+            background_tasks.add_task(interview_session_service.rescore_answers_batch, session_id)
         return analysis_result
     except ValueError as e:
         raise HTTPException(status_code=400, detail=str(e))
@@ -7,6 +7,7 @@ Celery应用配置
 import os
 import logging
 from celery import Celery
+from celery.signals import worker_process_init, worker_process_shutdown
 from app.core.config import settings
 
 # 配置日志
@@ -41,6 +42,32 @@ celery_app.autodiscover_tasks(["app.services.tasks"])
 def setup_periodic_tasks(sender, **kwargs):
     logger.info("Celery应用已配置完成")
 
+# 工作进程启动时预热共享模型与服务客户端
+@worker_process_init.connect
+def init_worker_resources(**kwargs):
+    """prefork子进程启动后重新初始化资源注册表并预热分析器资源"""
+    try:
+        from agent.src.core.system.resource_registry import get_resource_registry, warm_up_analyzer_resources
+        from agent.src.services.http_session_manager import reset_http_sessions_after_fork
+        get_resource_registry().reset_after_fork()
+        reset_http_sessions_after_fork()
+        warmed = warm_up_analyzer_resources()
+        logger.info(f"工作进程资源预热完成: {len(warmed)} 个资源")
+    except Exception as e:
+        logger.warning(f"工作进程资源预热失败，将在首次使用时加载: {e}")
+
+# 工作进程退出时释放共享资源
+@worker_process_shutdown.connect
+def shutdown_worker_resources(**kwargs):
+    """关闭资源注册表中的线程池等资源，以及遗留的共享HTTP会话"""
+    try:
+        from agent.src.core.system.resource_registry import get_resource_registry
+        from agent.src.services.http_session_manager import get_http_session_manager
+        get_resource_registry().shutdown()
+        get_http_session_manager().close_all()
+    except Exception as e:
+        logger.warning(f"释放工作进程资源失败: {e}")
+
 # Celery任务基类
 class BaseTask(celery_app.Task):
     """
@@ -46,7 +46,13 @@ class Settings(BaseSettings):
     UPLOAD_FOLDER: str = "uploads"
     ALLOWED_EXTENSIONS: List[str] = ["mp4", "avi", "mov", "mp3", "wav"]
     MAX_CONTENT_LENGTH: int = 100 * 1024 * 1024  # 100MB
-    
+
+    # 媒体预处理配置（音频16kHz单声道 + 采样视频帧，按内容哈希缓存）
+    MEDIA_CACHE_DIR: str = os.getenv("MEDIA_CACHE_DIR", os.path.join("uploads", "media_cache"))
+    MEDIA_FRAME_FPS: float = float(os.getenv("MEDIA_FRAME_FPS", "2"))  # 视频帧采样帧率
+    MEDIA_MAX_FRAMES: int = int(os.getenv("MEDIA_MAX_FRAMES", "100"))  # 最多采样帧数
+    MEDIA_DECODE_TIMEOUT: int = int(os.getenv("MEDIA_DECODE_TIMEOUT", "600"))  # 解码超时时间，单位秒
+
     # 模型配置
     TEXT_MODEL: str = "bert-base-chinese"
     
@@ -70,6 +76,9 @@ class Settings(BaseSettings):
     # LLM服务提供商选择（modelscope或xunfei）
     LLM_PROVIDER: str = os.getenv("LLM_PROVIDER", "modelscope")
     
+    # 完成面试后在后台用LLM批量重新评估回答内容（多个问答合并为一次LLM调用）
+    BATCH_ANSWER_SCORING: bool = os.getenv("BATCH_ANSWER_SCORING", "true").lower() == "true"
+    
     model_config = dict(case_sensitive=True)
     
     def __init__(self, **data: Any):
@@ -62,12 +62,25 @@ async def startup_event():
     os.makedirs("data", exist_ok=True)
     os.makedirs("logs", exist_ok=True)
     
+    # 在应用事件循环中创建共享HTTP会话，外部API调用复用连接池
+    try:
+        from agent.src.services.http_session_manager import startup_http_sessions
+        await startup_http_sessions()
+    except Exception as e:
+        logger.warning(f"共享HTTP会话初始化失败，将在首次请求时创建: {e}")
+    
     logger.info("应用已启动")
 
 # 关闭事件
 @app.on_event("shutdown")
 async def shutdown_event():
     """应用关闭时执行的操作"""
+    try:
+        from agent.src.services.http_session_manager import shutdown_http_sessions
+        await shutdown_http_sessions()
+    except Exception as e:
+        logger.warning(f"关闭共享HTTP会话失败: {e}")
+    
     logger.info("应用已关闭")
 
 # 如果直接运行此文件
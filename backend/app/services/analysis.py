@@ -13,6 +13,8 @@ import requests
 
 from app.core.config import settings
 from app.services.xunfei_service import xunfei_service
+from app.services.media_pipeline import PreparedMedia, prepare_media
+from app.services.frame_sampler import FrameSampler
 
 # 配置日志记录器
 logger = logging.getLogger(__name__)
@@ -47,17 +49,24 @@ def analyze_interview(file_path: str, file_type: str) -> Dict[str, Any]:
         "overall": {}
     }
     
+    # 一次解复用得到音频和采样帧，后续各阶段共用
+    media = None
+    try:
+        media = prepare_media(file_path, file_type)
+    except Exception as e:
+        logger.warning(f"媒体预处理失败，各阶段将直接读取原文件: {e}")
+    
     try:
         # 提取音频特征
         logger.info(f"开始提取音频特征: {file_path}")
-        speech_features = extract_speech_features(file_path)
+        speech_features = extract_speech_features(file_path, media)
         result["speech"] = analyze_speech(speech_features)
         logger.info(f"音频特征分析完成: 清晰度={result['speech'].get('clarity')}, 语速={result['speech'].get('pace')}")
         
         # 如果是视频，提取视觉特征
         if file_type == "video":
             logger.info(f"开始提取视觉特征: {file_path}")
-            visual_features = extract_visual_features(file_path)
+            visual_features = extract_visual_features(file_path, media)
             result["visual"] = analyze_visual(visual_features)
             logger.info(f"视觉特征分析完成: 眼神接触={result['visual'].get('eye_contact')}")
         else:
@@ -70,7 +79,7 @@ def analyze_interview(file_path: str, file_type: str) -> Dict[str, Any]:
         
         # 提取文本内容（从语音转文本）
         logger.info(f"开始语音转文本: {file_path}")
-        text_content = speech_to_text(file_path)
+        text_content = speech_to_text(file_path, media)
         result["content"] = analyze_content(text_content)
         logger.info(f"内容分析完成: 相关性={result['content'].get('relevance')}, 结构性={result['content'].get('structure')}")
         
@@ -91,21 +100,21 @@ def analyze_interview(file_path: str, file_type: str) -> Dict[str, Any]:
         raise
 
 
-def extract_speech_features(file_path: str) -> Dict[str, Any]:
+def extract_speech_features(file_path: str, media: Optional[PreparedMedia] = None) -> Dict[str, Any]:
     """提取语音特征
     
     从音频文件中提取语音特征，使用讯飞API进行语音评测
     
     Args:
         file_path: 文件路径
+        media: 预处理后的媒体产物，提供时直接使用其中的16kHz单声道音频
         
     Returns:
         Dict[str, Any]: 语音特征
     """
     try:
-        # 读取音频文件
-        with open(file_path, 'rb') as f:
-            audio_data = f.read()
+        # 读取音频（预处理产物中只包含音轨）
+        audio_data = _read_audio_bytes(file_path, media)
         
         # 调用讯飞语音评测服务
         xunfei_assessment = xunfei_service.speech_assessment(audio_data)
@@ -114,7 +123,10 @@ def extract_speech_features(file_path: str) -> Dict[str, Any]:
         xunfei_emotion = xunfei_service.emotion_analysis(audio_data)
         
         # 同时保留一些基本的音频特征分析作为补充
-        y, sr = librosa.load(file_path, sr=None)
+        if media is not None and media.has_audio:
+            y, sr = media.load_waveform()
+        else:
+            y, sr = librosa.load(file_path, sr=None)
         
         # 合并讯飞API结果和基本特征
         features = {
@@ -226,22 +238,23 @@ def analyze_speech(speech_features: Dict[str, Any]) -> Dict[str, Any]:
     return result
 
 
-def extract_visual_features(video_path: str) -> Dict[str, Any]:
+def extract_visual_features(video_path: str, media: Optional[PreparedMedia] = None) -> Dict[str, Any]:
     """提取视觉特征
     
     从视频文件中提取视觉特征
     
     Args:
         video_path: 视频文件路径
+        media: 预处理后的媒体产物，提供时直接使用其中的采样帧
         
     Returns:
         Dict[str, Any]: 视觉特征
     """
+    if media is not None and media.frame_paths:
+        return _extract_visual_features_from_frames(media)
+    
     # 这里是示例实现，实际项目中应使用计算机视觉模型
     try:
-        # 打开视频文件
-        cap = cv2.VideoCapture(video_path)
-        
         # 初始化特征
         features = {
             "face_detections": [],
@@ -249,16 +262,9 @@ def extract_visual_features(video_path: str) -> Dict[str, Any]:
             "body_positions": []
         }
         
-        # 采样帧进行分析
-        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
-        sample_rate = max(1, frame_count // 100)  # 最多分析100帧
-        
-        for i in range(0, frame_count, sample_rate):
-            cap.set(cv2.CAP_PROP_POS_FRAMES, i)
-            ret, frame = cap.read()
-            if not ret:
-                break
-            
+        # 采样帧进行分析（最多分析100帧），按GOP和采样密度选择线性扫描或关键帧seek
+        sampler = FrameSampler(max_frames=100)
+        for i, frame in sampler.sample(video_path):
             # 在这里应该使用人脸检测和姿态估计模型
             # 这里使用随机值作为示例
             features["face_detections"].append({
@@ -278,7 +284,6 @@ def extract_visual_features(video_path: str) -> Dict[str, Any]:
                 "frame": i
             })
         
-        cap.release()
         return features
     
     except Exception as e:
@@ -286,6 +291,52 @@ def extract_visual_features(video_path: str) -> Dict[str, Any]:
         return {}
 
 
+def _extract_visual_features_from_frames(media: PreparedMedia) -> Dict[str, Any]:
+    """从预处理的采样帧中提取视觉特征
+    
+    Args:
+        media: 预处理后的媒体产物
+        
+    Returns:
+        Dict[str, Any]: 视觉特征
+    """
+    features = {
+        "face_detections": [],
+        "eye_positions": [],
+        "body_positions": []
+    }
+    
+    try:
+        for frame_index, (timestamp, frame) in enumerate(media.iter_frames()):
+            # 在这里应该使用人脸检测和姿态估计模型
+            # 这里使用随机值作为示例
+            features["face_detections"].append({
+                "confidence": np.random.uniform(0.7, 1.0),
+                "expression": np.random.choice(["neutral", "happy", "sad", "surprised"]),
+                "frame": frame_index,
+                "time": timestamp
+            })
+            
+            features["eye_positions"].append({
+                "looking_at_camera": np.random.choice([True, False], p=[0.7, 0.3]),
+                "frame": frame_index,
+                "time": timestamp
+            })
+            
+            features["body_positions"].append({
+                "posture": np.random.choice(["upright", "leaning", "slouched"]),
+                "movement": np.random.uniform(0, 1),
+                "frame": frame_index,
+                "time": timestamp
+            })
+        
+        return features
+    
+    except Exception as e:
+        logger.error(f"从采样帧提取视觉特征失败: {e}")
+        return {}
+
+
 def analyze_visual(visual_features: Dict[str, Any]) -> Dict[str, Any]:
     """分析视觉特征
     
@@ -340,21 +391,32 @@ def analyze_visual(visual_features: Dict[str, Any]) -> Dict[str, Any]:
     }
 
 
-def speech_to_text(file_path: str) -> str:
+def _read_audio_bytes(file_path: str, media: Optional[PreparedMedia] = None) -> bytes:
+    """读取要发送给语音API的音频数据
+    
+    有预处理产物时只返回其中的音轨，否则读取原文件
+    """
+    if media is not None and media.has_audio:
+        return media.read_audio_bytes()
+    with open(file_path, 'rb') as f:
+        return f.read()
+
+
+def speech_to_text(file_path: str, media: Optional[PreparedMedia] = None) -> str:
     """语音转文本
     
     使用讯飞语音识别API将语音文件转换为文本
     
     Args:
         file_path: 文件路径
+        media: 预处理后的媒体产物，提供时直接使用其中的16kHz单声道音频
         
     Returns:
         str: 转换后的文本
     """
     try:
-        # 读取音频文件
-        with open(file_path, 'rb') as f:
-            audio_data = f.read()
+        # 读取音频（预处理产物中只包含音轨）
+        audio_data = _read_audio_bytes(file_path, media)
         
         # 调用讯飞语音识别服务
         text = xunfei_service.speech_recognition(audio_data)
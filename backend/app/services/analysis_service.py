@@ -1,12 +1,16 @@
 from typing import Dict, Any, Optional, List
 import os
 import json
+import logging
 from .xunfei_service import XunfeiService
+from .media_pipeline import prepare_media
 from sqlalchemy.orm import Session
 from app.models.interview import Interview
 from app.models.analysis import Analysis
 from app.models.job_position import JobPosition
 
+logger = logging.getLogger(__name__)
+
 class AnalysisService:
     """面试分析服务"""
     
@@ -51,8 +55,8 @@ class AnalysisService:
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"面试文件不存在: {file_path}")
         
-        with open(file_path, "rb") as f:
-            audio_data = f.read()
+        # 解复用一次得到16kHz单声道音频，只把音轨发送给语音API
+        audio_data = self._prepare_audio(file_path)
         
         # 语音识别
         speech_text = self.xunfei_service.speech_recognition(audio_data)
@@ -152,6 +156,25 @@ class AnalysisService:
             "speech_logic": speech_logic
         }
     
+    def _prepare_audio(self, file_path: str) -> bytes:
+        """获取面试文件中的音频数据
+        
+        Args:
+            file_path: 音频/视频文件路径
+            
+        Returns:
+            音频数据，预处理失败时退回原文件内容
+        """
+        try:
+            media = prepare_media(file_path)
+            if media.has_audio:
+                return media.read_audio_bytes()
+        except Exception as e:
+            logger.warning(f"媒体预处理失败，直接读取原文件: {e}")
+        
+        with open(file_path, "rb") as f:
+            return f.read()
+    
     def _analyze_visual(self, file_path: str) -> Dict[str, Any]:
         """分析视觉表现
         
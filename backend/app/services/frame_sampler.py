@@ -0,0 +1,215 @@
+"""视频帧采样器
+
+从视频中均匀采样若干帧。对H.264/MPEG-4/VP8等帧间编码，每次
+``cap.set(CAP_PROP_POS_FRAMES, i)`` 都要回退到前一个关键帧重新解码：
+OpenCV的FFmpeg后端会先定位到第 i-16 帧之前的关键帧，再逐帧解码到第 i 帧，
+密集采样时逐帧seek的代价远高于一次线性扫描。
+
+采样器先线性扫描视频开头、观察关键帧间隔（GOP），再根据GOP大小和采样密度
+在以下策略中选择估算开销最小的一种：
+
+- linear: 顺序grab所有帧，只对采样帧retrieve（grab不做颜色转换）
+- keyframe: 把采样点对齐到“关键帧 + 回退帧数”，使seek正好从关键帧开始解码
+- seek: 直接seek到原采样点（GOP未知时使用）
+"""
+
+import logging
+from itertools import islice
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+STRATEGY_LINEAR = "linear"
+STRATEGY_KEYFRAME = "keyframe"
+STRATEGY_SEEK = "seek"
+
+# OpenCV FFmpeg后端seek到第N帧时先定位到第N-16帧之前的关键帧（cap_ffmpeg_impl.hpp）
+SEEK_BACKOFF_FRAMES = 16
+# 每次seek清空解码器、重新定位的固定开销，折算为解码帧数（实测约4帧）
+SEEK_OVERHEAD_FRAMES = 4.0
+
+
+@dataclass
+class SamplingPlan:
+    """采样计划及估算依据"""
+    strategy: str
+    frame_count: int
+    step: int
+    gop_size: Optional[int] = None
+    probed_frames: int = 0
+    estimated_costs: dict = field(default_factory=dict)
+
+
+def estimate_costs(remaining_frames: int, remaining_targets: int, gop_size: Optional[int],
+                   gop_known: bool, seek_backoff: int = SEEK_BACKOFF_FRAMES,
+                   seek_overhead: float = SEEK_OVERHEAD_FRAMES) -> dict:
+    """以“解码帧数”为单位估算各策略的剩余开销
+
+    Args:
+        remaining_frames: 当前位置之后的帧数
+        remaining_targets: 当前位置之后的采样点数
+        gop_size: 关键帧间隔（未知时为已扫描帧数，作为下限）
+        gop_known: 是否观察到了完整的关键帧间隔
+        seek_backoff: seek时后端回退的帧数
+        seek_overhead: 每次seek的固定开销（清空解码器等，折算为解码帧数）
+
+    Returns:
+        dict: 策略 -> 估算开销
+    """
+    gop = max(1, gop_size or 1)
+    costs = {
+        STRATEGY_LINEAR: float(remaining_frames),
+        # 任意采样点平均要从回退位置之前半个GOP处的关键帧开始解码
+        STRATEGY_SEEK: remaining_targets * (seek_overhead + seek_backoff + (gop - 1) / 2.0 + 1)
+    }
+    if gop_known:
+        keyframe_targets = min(remaining_targets, -(-remaining_frames // gop))
+        costs[STRATEGY_KEYFRAME] = keyframe_targets * (seek_overhead + seek_backoff + 1)
+    return costs
+
+
+class FrameSampler:
+    """自适应视频帧采样器"""
+
+    def __init__(self, max_frames: int = 100, probe_frames: int = 300,
+                 seek_backoff: int = SEEK_BACKOFF_FRAMES, seek_overhead: float = SEEK_OVERHEAD_FRAMES):
+        """初始化帧采样器
+
+        Args:
+            max_frames: 最多采样的帧数
+            probe_frames: 用于估算GOP的最大线性扫描帧数
+            seek_backoff: seek时后端回退的帧数
+            seek_overhead: 每次seek的固定开销，折算为解码帧数
+        """
+        self.max_frames = max(1, max_frames)
+        self.probe_frames = max(1, probe_frames)
+        self.seek_backoff = seek_backoff
+        self.seek_overhead = seek_overhead
+        self.last_plan: Optional[SamplingPlan] = None
+
+    def sample(self, video_path: str) -> Iterator[Tuple[int, np.ndarray]]:
+        """均匀采样视频帧
+
+        Args:
+            video_path: 视频文件路径
+
+        Yields:
+            Tuple[int, np.ndarray]: 帧序号和BGR图像
+        """
+        cap = cv2.VideoCapture(video_path)
+        try:
+            if not cap.isOpened():
+                raise IOError(f"无法打开视频文件: {video_path}")
+            yield from self._sample(cap)
+        finally:
+            cap.release()
+
+    def _sample(self, cap: "cv2.VideoCapture") -> Iterator[Tuple[int, np.ndarray]]:
+        frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        if frame_count <= 0:
+            # 帧数未知（部分webm/流式文件），只能线性扫描开头的若干帧
+            self.last_plan = SamplingPlan(STRATEGY_LINEAR, frame_count, 1)
+            yield from islice(self._scan_linear(cap, 0, None, 1), self.max_frames)
+            return
+
+        step = max(1, frame_count // self.max_frames)
+        targets = list(range(0, frame_count, step))
+
+        # 阶段一：线性扫描开头，顺带取出其中的采样帧并记录关键帧位置
+        keyframes: List[int] = []
+        position = 0
+        target_index = 0
+        probe_limit = min(frame_count, self.probe_frames)
+
+        while position < probe_limit:
+            if not cap.grab():
+                frame_count = position
+                break
+            if self._is_keyframe(cap):
+                keyframes.append(position)
+            if target_index < len(targets) and targets[target_index] == position:
+                ret, frame = cap.retrieve()
+                if ret:
+                    yield position, frame
+                target_index += 1
+            position += 1
+            # 观察到两个完整的GOP后即可停止探测
+            if len(keyframes) >= 3:
+                break
+
+        remaining_targets = [t for t in targets[target_index:] if t < frame_count]
+        if not remaining_targets:
+            self.last_plan = SamplingPlan(STRATEGY_LINEAR, frame_count, step, probed_frames=position)
+            return
+
+        gop_size, gop_known = self._estimate_gop(keyframes, position)
+        costs = estimate_costs(frame_count - position, len(remaining_targets), gop_size,
+                               gop_known, self.seek_backoff, self.seek_overhead)
+        strategy = min(costs, key=costs.get)
+        self.last_plan = SamplingPlan(strategy, frame_count, step, gop_size, position, costs)
+        logger.debug(f"帧采样策略: {strategy}, 帧数={frame_count}, 步长={step}, GOP={gop_size}")
+
+        # 阶段二：按选定策略采样剩余部分
+        if strategy == STRATEGY_LINEAR:
+            yield from self._scan_linear(cap, position, remaining_targets, step)
+        elif strategy == STRATEGY_KEYFRAME:
+            aligned = self._align_to_keyframes(remaining_targets, keyframes[0], gop_size)
+            yield from self._seek_targets(cap, [t for t in aligned if position <= t < frame_count])
+        else:
+            yield from self._seek_targets(cap, remaining_targets)
+
+    @staticmethod
+    def _is_keyframe(cap: "cv2.VideoCapture") -> bool:
+        """最近一次grab的帧是否为关键帧（后端不支持时返回False）"""
+        return cap.get(cv2.CAP_PROP_LRF_HAS_KEY_FRAME) > 0
+
+    @staticmethod
+    def _estimate_gop(keyframes: List[int], scanned: int) -> Tuple[int, bool]:
+        """根据探测到的关键帧位置估算GOP
+
+        Returns:
+            Tuple[int, bool]: GOP大小、是否为实测值（否则为已扫描帧数构成的下限）
+        """
+        if len(keyframes) >= 2:
+            intervals = np.diff(keyframes)
+            return max(1, int(np.median(intervals))), True
+        return max(1, scanned), False
+
+    def _align_to_keyframes(self, targets: List[int], anchor: int, gop_size: int) -> List[int]:
+        """把采样点移动到最近的“关键帧 + 回退帧数”位置
+
+        后端seek到该位置时正好从关键帧开始解码，只需解码 seek_backoff + 1 帧
+        """
+        aligned = set()
+        for target in targets:
+            keyframe = anchor + int(round((target - self.seek_backoff - anchor) / gop_size)) * gop_size
+            aligned.add(max(keyframe, anchor) + self.seek_backoff)
+        return sorted(aligned)
+
+    @staticmethod
+    def _scan_linear(cap: "cv2.VideoCapture", position: int, targets: Optional[List[int]],
+                     step: int) -> Iterator[Tuple[int, np.ndarray]]:
+        """从当前位置顺序grab，只解码输出采样帧"""
+        pending = iter(targets) if targets is not None else None
+        next_target = next(pending, None) if pending is not None else position
+        while next_target is not None and cap.grab():
+            if position == next_target:
+                ret, frame = cap.retrieve()
+                if ret:
+                    yield position, frame
+                next_target = next(pending, None) if pending is not None else position + step
+            position += 1
+
+    @staticmethod
+    def _seek_targets(cap: "cv2.VideoCapture", targets: List[int]) -> Iterator[Tuple[int, np.ndarray]]:
+        """逐个seek到目标帧读取"""
+        for target in targets:
+            cap.set(cv2.CAP_PROP_POS_FRAMES, target)
+            ret, frame = cap.read()
+            if not ret:
+                break
+            yield target, frame
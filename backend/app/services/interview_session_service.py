@@ -1,6 +1,7 @@
 from typing import Dict, Any, List, Optional
 import asyncio
 import json
+import logging
 from datetime import datetime, timedelta
 from sqlalchemy.orm import Session
 from sqlalchemy import and_
@@ -11,6 +12,9 @@ from app.models.interview_session import (
 )
 from app.models.job_position import JobPosition, TechField, PositionType
 from app.services.xunfei_service import xunfei_service
+from app.db.database import SessionLocal
+
+logger = logging.getLogger(__name__)
 
 # 创建一个模拟的InterviewAgent类，用于测试
 class InterviewAgent:
@@ -656,6 +660,68 @@ class InterviewSessionService:
             ] if hasattr(final_analysis, k)}
         }
     
+    async def rescore_answers_batch(self, session_id: int) -> None:
+        """完成面试后用LLM批量重新评估回答内容
+        
+        多个问答打包进同一个提示词，由内容分析器按token预算分批并发调用LLM，
+        更新内容与相关性评分后重新生成分析报告。在请求返回后作为后台任务运行，
+        失败时保留提交回答时的评分
+        
+        Args:
+            session_id: 会话ID
+        """
+        db = SessionLocal()
+        try:
+            session = db.query(InterviewSession).filter(InterviewSession.id == session_id).first()
+            if not session:
+                return
+            questions = db.query(InterviewQuestion).filter(
+                InterviewQuestion.session_id == session_id
+            ).order_by(InterviewQuestion.order_index).all()
+            answered = [q for q in questions if q.is_answered and q.answer_text]
+            if not answered:
+                return
+            
+            from agent.src.analyzers.content.content_analyzer import ContentAnalyzer
+            # 分析器持有绑定事件循环的异步客户端，每次运行单独创建
+            analyzer = ContentAnalyzer()
+            qa_pairs = [{"question": q.question_text, "answer": q.answer_text} for q in answered]
+            results = await analyzer.analyze_batch(qa_pairs, self._job_position_info(session))
+            
+            for question, result in zip(answered, results):
+                scores = result.get("scores") or result.get("detailed_scores") or {}
+                overall = scores.get("overall_score", result.get("overall_score", 0)) or 0
+                # 内容分析为百分制，会话评分为0-1；表达评分不由内容分析给出，保持不变
+                question.content_score = overall / 100.0
+                question.relevance_score = (scores.get("professional_relevance", overall) or 0) / 100.0
+            
+            if session.final_analysis is not None:
+                db.delete(session.final_analysis)
+                db.flush()
+            final_analysis = self._generate_final_analysis(db, session, questions)
+            session.overall_score = final_analysis.overall_score
+            db.commit()
+            logger.info(f"批量评分完成: session_id={session_id}, 回答数={len(answered)}")
+        except Exception as e:
+            db.rollback()
+            logger.exception(f"批量评分失败: session_id={session_id}, {e}")
+        finally:
+            db.close()
+    
+    @staticmethod
+    def _job_position_info(session: InterviewSession) -> Optional[Dict[str, Any]]:
+        """把会话的职位转换为内容分析器使用的职位信息"""
+        job_position = session.job_position
+        if not job_position:
+            return None
+        skills = [s.strip() for s in (job_position.required_skills or "").replace("，", ",").split(",") if s.strip()]
+        return {
+            "title": job_position.title,
+            "requirements": skills,
+            "skills": skills,
+            "description": job_position.job_description
+        }
+    
     def _generate_final_analysis(self, db: Session, session: InterviewSession, 
                               questions: List[InterviewQuestion]) -> Dict[str, Any]:
         """生成最终分析报告
@@ -0,0 +1,486 @@
+"""媒体预处理流水线
+
+面试上传的音视频文件只解复用/解码一次，生成：
+1. 16kHz单声道PCM音频（WAV），供讯飞语音评测、情感分析、语音识别和librosa特征提取共用
+2. 按固定帧率采样的视频帧（JPEG），供视觉特征提取使用
+
+产物按文件内容哈希缓存，同一文件重复分析时直接复用。
+解码优先使用单个ffmpeg子进程（一次读取、两路输出），其次使用PyAV，
+两者都不可用时退回librosa + OpenCV。
+"""
+
+import os
+import io
+import json
+import wave
+import shutil
+import hashlib
+import logging
+import subprocess
+import threading
+import uuid
+from dataclasses import dataclass, field, asdict
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+AUDIO_SAMPLE_RATE = 16000
+AUDIO_FILE_NAME = "audio.wav"
+FRAMES_DIR_NAME = "frames"
+MANIFEST_FILE_NAME = "manifest.json"
+HASH_CHUNK_SIZE = 1024 * 1024
+
+AUDIO_EXTENSIONS = {"wav", "mp3", "m4a", "aac", "flac", "ogg", "pcm"}
+
+
+class MediaPreparationError(Exception):
+    """媒体预处理失败"""
+    pass
+
+
+@dataclass
+class PreparedMedia:
+    """预处理后的媒体产物"""
+    content_hash: str
+    source_path: str
+    cache_dir: str
+    audio_path: Optional[str] = None
+    frame_paths: List[str] = field(default_factory=list)
+    frame_timestamps: List[float] = field(default_factory=list)
+    frame_fps: float = 0.0
+    duration: float = 0.0
+    has_video: bool = False
+    decoder: str = ""
+    from_cache: bool = False
+
+    def __post_init__(self):
+        self._audio_bytes: Optional[bytes] = None
+        self._waveform: Optional[np.ndarray] = None
+
+    @property
+    def has_audio(self) -> bool:
+        return bool(self.audio_path) and os.path.exists(self.audio_path)
+
+    def read_audio_bytes(self) -> bytes:
+        """读取16kHz单声道WAV音频的字节内容（只读一次）
+
+        Returns:
+            bytes: WAV文件内容，没有音轨时为空字节串
+        """
+        if self._audio_bytes is None:
+            if not self.has_audio:
+                self._audio_bytes = b""
+            else:
+                with open(self.audio_path, "rb") as f:
+                    self._audio_bytes = f.read()
+        return self._audio_bytes
+
+    def load_waveform(self) -> Tuple[np.ndarray, int]:
+        """加载归一化的单声道波形
+
+        Returns:
+            Tuple[np.ndarray, int]: float32波形（[-1, 1]）和采样率
+        """
+        if self._waveform is None:
+            audio_bytes = self.read_audio_bytes()
+            if not audio_bytes:
+                self._waveform = np.zeros(0, dtype=np.float32)
+            else:
+                with wave.open(io.BytesIO(audio_bytes), "rb") as wav:
+                    pcm = wav.readframes(wav.getnframes())
+                self._waveform = np.frombuffer(pcm, dtype=np.int16).astype(np.float32) / 32768.0
+        return self._waveform, AUDIO_SAMPLE_RATE
+
+    def iter_frames(self) -> Iterator[Tuple[float, np.ndarray]]:
+        """按时间顺序遍历采样帧
+
+        Yields:
+            Tuple[float, np.ndarray]: 时间戳（秒）和BGR图像
+        """
+        import cv2
+
+        for timestamp, path in zip(self.frame_timestamps, self.frame_paths):
+            frame = cv2.imread(path)
+            if frame is not None:
+                yield timestamp, frame
+
+    def to_manifest(self) -> Dict[str, Any]:
+        """转换为缓存清单（路径相对于缓存目录保存）"""
+        data = asdict(self)
+        for key in ("source_path", "cache_dir", "from_cache"):
+            data.pop(key)
+        if self.audio_path:
+            data["audio_path"] = os.path.relpath(self.audio_path, self.cache_dir)
+        data["frame_paths"] = [os.path.relpath(path, self.cache_dir) for path in self.frame_paths]
+        return data
+
+    @classmethod
+    def from_manifest(cls, manifest: Dict[str, Any], source_path: str, cache_dir: str) -> "PreparedMedia":
+        """从缓存清单恢复"""
+        audio_path = manifest.get("audio_path")
+        return cls(
+            content_hash=manifest["content_hash"],
+            source_path=source_path,
+            cache_dir=cache_dir,
+            audio_path=os.path.join(cache_dir, audio_path) if audio_path else None,
+            frame_paths=[os.path.join(cache_dir, path) for path in manifest.get("frame_paths", [])],
+            frame_timestamps=list(manifest.get("frame_timestamps", [])),
+            frame_fps=manifest.get("frame_fps", 0.0),
+            duration=manifest.get("duration", 0.0),
+            has_video=manifest.get("has_video", False),
+            decoder=manifest.get("decoder", ""),
+            from_cache=True
+        )
+
+
+def compute_content_hash(file_path: str) -> str:
+    """分块计算文件内容的SHA-256
+
+    Args:
+        file_path: 文件路径
+
+    Returns:
+        str: 十六进制哈希值
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        while True:
+            chunk = f.read(HASH_CHUNK_SIZE)
+            if not chunk:
+                break
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _write_wav(path: str, samples: np.ndarray, sample_rate: int = AUDIO_SAMPLE_RATE):
+    """把int16或float波形写入单声道WAV"""
+    if samples.dtype != np.int16:
+        samples = (np.clip(samples, -1.0, 1.0) * 32767).astype(np.int16)
+    with wave.open(path, "wb") as wav:
+        wav.setnchannels(1)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(samples.tobytes())
+
+
+class MediaPipeline:
+    """媒体预处理流水线"""
+
+    def __init__(self, cache_dir: Optional[str] = None, frame_fps: Optional[float] = None,
+                 max_frames: Optional[int] = None, ffmpeg_path: Optional[str] = None):
+        """初始化媒体预处理流水线
+
+        Args:
+            cache_dir: 产物缓存目录
+            frame_fps: 视频帧采样帧率
+            max_frames: 最多采样的帧数
+            ffmpeg_path: ffmpeg可执行文件路径，None表示从PATH中查找
+        """
+        self.cache_dir = cache_dir or settings.MEDIA_CACHE_DIR
+        self.frame_fps = frame_fps or settings.MEDIA_FRAME_FPS
+        self.max_frames = max_frames or settings.MEDIA_MAX_FRAMES
+        self.ffmpeg_path = ffmpeg_path or shutil.which("ffmpeg")
+        self.ffprobe_path = shutil.which("ffprobe")
+
+        # 同一内容的并发预处理只执行一次
+        self._locks: Dict[str, threading.Lock] = {}
+        self._locks_guard = threading.Lock()
+
+        self.stats = {
+            "prepared": 0,
+            "cache_hits": 0,
+            "failures": 0
+        }
+
+    def prepare(self, file_path: str, file_type: Optional[str] = None) -> PreparedMedia:
+        """预处理媒体文件
+
+        Args:
+            file_path: 上传的音视频文件路径
+            file_type: 文件类型（video或audio），None时根据扩展名判断
+
+        Returns:
+            PreparedMedia: 预处理产物
+
+        Raises:
+            MediaPreparationError: 所有解码方式均失败
+        """
+        if not os.path.exists(file_path):
+            raise FileNotFoundError(f"文件不存在: {file_path}")
+
+        content_hash = compute_content_hash(file_path)
+        target_dir = os.path.join(self.cache_dir, content_hash[:2], content_hash)
+
+        with self._get_lock(content_hash):
+            cached = self._load_cached(target_dir, file_path)
+            if cached is not None:
+                self.stats["cache_hits"] += 1
+                logger.info(f"复用媒体预处理缓存: {content_hash[:12]}")
+                return cached
+
+            want_video = self._want_video(file_path, file_type)
+            work_dir = f"{target_dir}.tmp-{uuid.uuid4().hex[:8]}"
+            os.makedirs(os.path.join(work_dir, FRAMES_DIR_NAME), exist_ok=True)
+
+            try:
+                media = self._demux(file_path, work_dir, content_hash, want_video)
+                with open(os.path.join(work_dir, MANIFEST_FILE_NAME), "w", encoding="utf-8") as f:
+                    json.dump(media.to_manifest(), f, ensure_ascii=False)
+
+                # 原子地发布产物目录，其他进程不会看到写了一半的缓存
+                if os.path.isdir(target_dir):
+                    shutil.rmtree(target_dir, ignore_errors=True)
+                os.makedirs(os.path.dirname(target_dir), exist_ok=True)
+                os.replace(work_dir, target_dir)
+            except Exception:
+                self.stats["failures"] += 1
+                shutil.rmtree(work_dir, ignore_errors=True)
+                raise
+
+        self.stats["prepared"] += 1
+        media = self._load_cached(target_dir, file_path)
+        media.from_cache = False
+        logger.info(
+            f"媒体预处理完成: {content_hash[:12]}, 解码器={media.decoder}, "
+            f"时长={media.duration:.1f}s, 采样帧={len(media.frame_paths)}"
+        )
+        return media
+
+    def _get_lock(self, content_hash: str) -> threading.Lock:
+        with self._locks_guard:
+            return self._locks.setdefault(content_hash, threading.Lock())
+
+    def _load_cached(self, target_dir: str, source_path: str) -> Optional[PreparedMedia]:
+        """读取缓存清单，缓存不存在或已损坏时返回None"""
+        manifest_path = os.path.join(target_dir, MANIFEST_FILE_NAME)
+        try:
+            with open(manifest_path, "r", encoding="utf-8") as f:
+                manifest = json.load(f)
+            return PreparedMedia.from_manifest(manifest, source_path, target_dir)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.warning(f"媒体缓存清单无效，重新预处理: {manifest_path}, 错误: {e}")
+            return None
+
+    @staticmethod
+    def _want_video(file_path: str, file_type: Optional[str]) -> bool:
+        if file_type:
+            return file_type == "video"
+        extension = os.path.splitext(file_path)[1].lstrip(".").lower()
+        return extension not in AUDIO_EXTENSIONS
+
+    def _demux(self, file_path: str, work_dir: str, content_hash: str, want_video: bool) -> PreparedMedia:
+        """依次尝试ffmpeg、PyAV和librosa/OpenCV"""
+        errors = []
+        for name, demuxer in (
+            ("ffmpeg", self._demux_with_ffmpeg),
+            ("pyav", self._demux_with_pyav),
+            ("fallback", self._demux_with_fallback)
+        ):
+            try:
+                media = demuxer(file_path, work_dir, want_video)
+            except Exception as e:
+                errors.append(f"{name}: {e}")
+                continue
+            if media is None:
+                continue
+            media.content_hash = content_hash
+            media.decoder = name
+            return media
+
+        raise MediaPreparationError(f"媒体预处理失败: {file_path}, " + "; ".join(errors))
+
+    def _new_media(self, file_path: str, work_dir: str) -> PreparedMedia:
+        return PreparedMedia(content_hash="", source_path=file_path, cache_dir=work_dir,
+                             frame_fps=self.frame_fps)
+
+    def _probe_streams(self, file_path: str) -> Tuple[bool, bool, float]:
+        """用ffprobe读取容器头部，获取是否有音轨/视频轨及时长"""
+        if not self.ffprobe_path:
+            return True, True, 0.0
+
+        completed = subprocess.run(
+            [self.ffprobe_path, "-v", "error", "-show_entries", "stream=codec_type:format=duration",
+             "-of", "json", file_path],
+            capture_output=True, timeout=30, check=True
+        )
+        info = json.loads(completed.stdout or b"{}")
+        codec_types = {stream.get("codec_type") for stream in info.get("streams", [])}
+        duration = float(info.get("format", {}).get("duration") or 0.0)
+        return "audio" in codec_types, "video" in codec_types, duration
+
+    def _demux_with_ffmpeg(self, file_path: str, work_dir: str, want_video: bool) -> Optional[PreparedMedia]:
+        """单个ffmpeg进程读取一次输入，同时输出音频和采样帧"""
+        if not self.ffmpeg_path:
+            return None
+
+        has_audio, has_video, duration = self._probe_streams(file_path)
+        has_video = has_video and want_video
+
+        audio_path = os.path.join(work_dir, AUDIO_FILE_NAME)
+        frame_pattern = os.path.join(work_dir, FRAMES_DIR_NAME, "%05d.jpg")
+
+        command = [self.ffmpeg_path, "-nostdin", "-hide_banner", "-loglevel", "error", "-y", "-i", file_path]
+        if has_audio:
+            command += ["-map", "0:a:0", "-vn", "-ac", "1", "-ar", str(AUDIO_SAMPLE_RATE),
+                        "-c:a", "pcm_s16le", audio_path]
+        if has_video:
+            command += ["-map", "0:v:0", "-an", "-vf", f"fps={self.frame_fps}",
+                        "-frames:v", str(self.max_frames), "-q:v", "3", frame_pattern]
+        if not has_audio and not has_video:
+            raise MediaPreparationError("文件中没有可用的音频或视频流")
+
+        completed = subprocess.run(command, capture_output=True, timeout=settings.MEDIA_DECODE_TIMEOUT)
+        if completed.returncode != 0:
+            raise MediaPreparationError(completed.stderr.decode("utf-8", errors="ignore").strip())
+
+        media = self._new_media(file_path, work_dir)
+        media.has_video = has_video
+        if has_audio:
+            media.audio_path = audio_path
+        if has_video:
+            frame_dir = os.path.join(work_dir, FRAMES_DIR_NAME)
+            frame_files = sorted(os.listdir(frame_dir))
+            media.frame_paths = [os.path.join(frame_dir, name) for name in frame_files]
+            media.frame_timestamps = [round(i / self.frame_fps, 3) for i in range(len(frame_files))]
+
+        if not duration and has_audio:
+            with wave.open(audio_path, "rb") as wav:
+                duration = wav.getnframes() / float(wav.getframerate())
+        media.duration = duration
+        return media
+
+    def _demux_with_pyav(self, file_path: str, work_dir: str, want_video: bool) -> Optional[PreparedMedia]:
+        """使用PyAV在一次解复用中同时解码音频和视频"""
+        try:
+            import av
+        except ImportError:
+            return None
+        import cv2
+
+        media = self._new_media(file_path, work_dir)
+        frame_dir = os.path.join(work_dir, FRAMES_DIR_NAME)
+
+        with av.open(file_path) as container:
+            audio_stream = container.streams.audio[0] if container.streams.audio else None
+            video_stream = container.streams.video[0] if (want_video and container.streams.video) else None
+            if audio_stream is None and video_stream is None:
+                raise MediaPreparationError("文件中没有可用的音频或视频流")
+
+            streams = [stream for stream in (audio_stream, video_stream) if stream is not None]
+            resampler = av.AudioResampler(format="s16", layout="mono", rate=AUDIO_SAMPLE_RATE) if audio_stream else None
+            pcm_chunks: List[np.ndarray] = []
+            next_frame_time = 0.0
+
+            for packet in container.demux(*streams):
+                if packet.stream is video_stream and len(media.frame_paths) >= self.max_frames:
+                    continue
+                for frame in packet.decode():
+                    if packet.stream is audio_stream:
+                        for resampled in resampler.resample(frame):
+                            pcm_chunks.append(resampled.to_ndarray().reshape(-1))
+                    elif frame.time is not None and frame.time >= next_frame_time:
+                        if len(media.frame_paths) >= self.max_frames:
+                            break
+                        path = os.path.join(frame_dir, f"{len(media.frame_paths) + 1:05d}.jpg")
+                        cv2.imwrite(path, frame.to_ndarray(format="bgr24"))
+                        media.frame_paths.append(path)
+                        media.frame_timestamps.append(round(float(frame.time), 3))
+                        next_frame_time = float(frame.time) + 1.0 / self.frame_fps
+
+            if resampler is not None:
+                for resampled in resampler.resample(None):
+                    pcm_chunks.append(resampled.to_ndarray().reshape(-1))
+
+            if container.duration:
+                media.duration = container.duration / av.time_base
+
+        if audio_stream is not None:
+            samples = np.concatenate(pcm_chunks) if pcm_chunks else np.zeros(0, dtype=np.int16)
+            media.audio_path = os.path.join(work_dir, AUDIO_FILE_NAME)
+            _write_wav(media.audio_path, samples.astype(np.int16))
+            media.duration = media.duration or len(samples) / AUDIO_SAMPLE_RATE
+        media.has_video = video_stream is not None
+        return media
+
+    def _demux_with_fallback(self, file_path: str, work_dir: str, want_video: bool) -> Optional[PreparedMedia]:
+        """没有ffmpeg和PyAV时的兜底：librosa解码音频、OpenCV顺序读取视频帧"""
+        import cv2
+
+        media = self._new_media(file_path, work_dir)
+        frame_dir = os.path.join(work_dir, FRAMES_DIR_NAME)
+
+        if want_video:
+            cap = cv2.VideoCapture(file_path)
+            try:
+                if cap.isOpened():
+                    fps = cap.get(cv2.CAP_PROP_FPS) or 25.0
+                    step = max(1, int(round(fps / self.frame_fps)))
+                    index = 0
+                    # 顺序grab，只对采样帧retrieve解码，避免逐帧seek
+                    while len(media.frame_paths) < self.max_frames and cap.grab():
+                        if index % step == 0:
+                            ret, frame = cap.retrieve()
+                            if ret:
+                                path = os.path.join(frame_dir, f"{len(media.frame_paths) + 1:05d}.jpg")
+                                cv2.imwrite(path, frame)
+                                media.frame_paths.append(path)
+                                media.frame_timestamps.append(round(index / fps, 3))
+                        index += 1
+                    frame_count = cap.get(cv2.CAP_PROP_FRAME_COUNT)
+                    media.duration = frame_count / fps if frame_count > 0 else index / fps
+            finally:
+                cap.release()
+            media.has_video = bool(media.frame_paths)
+
+        try:
+            import librosa
+            samples, _ = librosa.load(file_path, sr=AUDIO_SAMPLE_RATE, mono=True)
+        except Exception as e:
+            if not media.has_video:
+                raise MediaPreparationError(f"音频解码失败: {e}")
+            logger.warning(f"未能从视频中解码音轨: {file_path}, 错误: {e}")
+        else:
+            media.audio_path = os.path.join(work_dir, AUDIO_FILE_NAME)
+            _write_wav(media.audio_path, samples)
+            media.duration = media.duration or len(samples) / AUDIO_SAMPLE_RATE
+
+        return media
+
+    def get_stats(self) -> Dict[str, Any]:
+        """获取统计信息"""
+        return {
+            **self.stats,
+            "decoder": "ffmpeg" if self.ffmpeg_path else "pyav/fallback",
+            "cache_dir": self.cache_dir
+        }
+
+
+# 全局媒体预处理流水线实例
+_media_pipeline: Optional[MediaPipeline] = None
+
+
+def get_media_pipeline() -> MediaPipeline:
+    """获取全局媒体预处理流水线实例"""
+    global _media_pipeline
+    if _media_pipeline is None:
+        _media_pipeline = MediaPipeline()
+    return _media_pipeline
+
+
+def prepare_media(file_path: str, file_type: Optional[str] = None) -> PreparedMedia:
+    """预处理媒体文件（使用全局流水线）
+
+    Args:
+        file_path: 文件路径
+        file_type: 文件类型（video或audio）
+
+    Returns:
+        PreparedMedia: 预处理产物
+    """
+    return get_media_pipeline().prepare(file_path, file_type)
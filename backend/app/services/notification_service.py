@@ -4,14 +4,102 @@
 处理系统通知和实时反馈
 """
 
+import time
 import asyncio
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional
 from app.services.websocket_manager import ConnectionManager
 
 # 配置日志
 logger = logging.getLogger(__name__)
 
+
+class FeedbackStream:
+    """
+    LLM评估过程的流式反馈
+    
+    作为分析器的 on_token 回调使用：第一个片段立即推送，之后的片段按时间窗口
+    合并成一条 FEEDBACK_DELTA 消息，避免逐token发送WebSocket帧
+    """
+    
+    def __init__(self, service: "NotificationService", client_id: str, feedback_type: str,
+                 flush_interval: float = 0.05):
+        """
+        初始化流式反馈
+        
+        Args:
+            service: 通知服务
+            client_id: 客户端ID
+            feedback_type: 反馈类型 (如 'speech', 'content')
+            flush_interval: 合并片段的时间窗口（秒）
+        """
+        self.service = service
+        self.client_id = client_id
+        self.feedback_type = feedback_type
+        self.flush_interval = flush_interval
+        self.seq = 0
+        self.text = ""
+        self.first_token_at: Optional[float] = None
+        self._buffer: List[str] = []
+        self._last_flush = 0.0
+        self._flush_task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()
+        self._started_at = time.monotonic()
+        self._closed = False
+    
+    async def __call__(self, token: str):
+        """
+        接收一个文本片段
+        
+        Args:
+            token: LLM输出的文本片段
+        """
+        if self._closed or not token:
+            return
+        self.text += token
+        self._buffer.append(token)
+        if self.first_token_at is None:
+            self.first_token_at = time.monotonic() - self._started_at
+        
+        delay = self._last_flush + self.flush_interval - time.monotonic()
+        if delay <= 0:
+            await self._flush()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_later(delay))
+    
+    async def _flush_later(self, delay: float):
+        await asyncio.sleep(delay)
+        self._flush_task = None
+        await self._flush()
+    
+    async def _flush(self, done: bool = False):
+        async with self._lock:
+            if not self._buffer and (not done or self.seq == 0):
+                # 没有收到任何片段时（如未走LLM流式分析）不发送结束标记
+                return
+            delta = "".join(self._buffer)
+            self._buffer = []
+            self._last_flush = time.monotonic()
+            seq = self.seq
+            self.seq += 1
+            await self.service.send_feedback_delta(self.client_id, self.feedback_type, delta, seq, done)
+    
+    async def close(self):
+        """推送剩余片段并发送结束标记"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        await self._flush(done=True)
+    
+    async def __aenter__(self) -> "FeedbackStream":
+        return self
+    
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.close()
+
 class NotificationService:
     """
     通知服务
@@ -60,6 +148,41 @@ class NotificationService:
             "content": feedback_content
         })
         logger.info(f"已发送部分反馈: client_id={client_id}, type={feedback_type}")
+    
+    async def send_feedback_delta(self, client_id: str, feedback_type: str, delta: str, seq: int, done: bool = False):
+        """
+        发送LLM评估过程的增量文本
+        
+        Args:
+            client_id: 客户端ID
+            feedback_type: 反馈类型 (如 'speech', 'content')
+            delta: 新增的文本
+            seq: 增量序号，从0开始
+            done: 是否为该反馈的最后一条增量
+        """
+        await self.manager.send_message(client_id, "FEEDBACK_DELTA", {
+            "type": feedback_type,
+            "delta": delta,
+            "seq": seq,
+            "done": done
+        })
+        logger.debug(f"已发送反馈增量: client_id={client_id}, type={feedback_type}, seq={seq}, done={done}")
+    
+    def partial_feedback_stream(self, client_id: str, feedback_type: str, flush_interval: float = 0.05) -> FeedbackStream:
+        """
+        创建流式部分反馈，作为分析器的 on_token 回调使用
+        
+        流式增量之后仍需调用 send_partial_feedback 发送解析后的完整结果
+        
+        Args:
+            client_id: 客户端ID
+            feedback_type: 反馈类型 (如 'speech', 'content')
+            flush_interval: 合并片段的时间窗口（秒）
+            
+        Returns:
+            FeedbackStream: 流式反馈
+        """
+        return FeedbackStream(self, client_id, feedback_type, flush_interval)
         
     async def notify_interview_status(self, client_id: str, status: str, message: str):
         """
@@ -60,6 +60,20 @@ def send_partial_feedback(client_id: str, feedback_type: str, feedback_content:
     ))
     logger.info(f"已发送部分反馈: client_id={client_id}, type={feedback_type}")
 
+# 辅助函数：运行带流式反馈的分析
+def run_with_feedback_stream(client_id: str, feedback_type: str, analyze):
+    """运行分析并把LLM评估的文本片段实时推送给客户端
+    
+    Args:
+        client_id: 客户端ID
+        feedback_type: 反馈类型
+        analyze: 接收 on_token 回调、返回分析协程的函数
+    """
+    async def _run():
+        async with notification_service.partial_feedback_stream(client_id, feedback_type) as on_token:
+            return await analyze(on_token)
+    return run_async(_run())
+
 # 辅助函数：通知状态变化
 def notify_status(client_id: str, status: str, message: str):
     """通知状态变化"""
@@ -158,7 +172,10 @@ def detailed_analysis_speech(self, client_id: str, audio_file: str, quick_result
         send_progress_notification(client_id, 22, "正在进行详细语音分析...")
         
         # 执行完整的语音分析
-        full_result = run_async(speech_analyzer.analyze(audio_file))
+        full_result = run_with_feedback_stream(
+            client_id, "speech",
+            lambda on_token: speech_analyzer.analyze_async(audio_file, on_token=on_token)
+        )
         
         # 如果有快速分析结果，合并结果
         if quick_result:
@@ -318,7 +335,12 @@ def analyze_content(self, client_id: str, transcript: str, job_position: Dict[st
             send_progress_notification(client_id, i * 10, f"内容分析进度: {i * 10}%")
         
         # 执行实际的内容分析
-        content_result = run_async(content_analyzer.analyze(transcript, job_position))
+        content_result = run_with_feedback_stream(
+            client_id, "content",
+            lambda on_token: content_analyzer.analyze_async(
+                transcript, {"job_position": job_position}, on_token=on_token
+            )
+        )
         
         # 通知内容分析完成
         send_progress_notification(client_id, 90, "内容分析完成")
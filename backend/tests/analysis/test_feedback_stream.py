@@ -0,0 +1,72 @@
+import asyncio
+
+import pytest
+
+from app.services.notification_service import NotificationService
+
+
+class RecordingManager:
+    """记录发送消息的连接管理器桩"""
+
+    def __init__(self):
+        self.messages = []
+
+    async def send_message(self, client_id, event_type, data):
+        self.messages.append((event_type, data, asyncio.get_running_loop().time()))
+        return True
+
+
+def _deltas(manager):
+    return [data for event_type, data, _ in manager.messages if event_type == "FEEDBACK_DELTA"]
+
+
+def test_first_token_is_sent_immediately_and_rest_coalesced():
+    """首个片段立即推送，之后的片段按时间窗口合并"""
+    async def run():
+        manager = RecordingManager()
+        service = NotificationService(manager)
+        async with service.partial_feedback_stream("c1", "content", flush_interval=0.05) as stream:
+            start = asyncio.get_running_loop().time()
+            for i in range(50):
+                await stream(f"t{i} ")
+                await asyncio.sleep(0.002)
+        return manager, stream, start
+
+    manager, stream, start = asyncio.run(run())
+    deltas = _deltas(manager)
+
+    assert deltas[0]["delta"] == "t0 "
+    assert manager.messages[0][2] - start < 0.01
+    # 50个片段约0.1秒内到达，合并后只需少量消息
+    assert 2 <= len(deltas) <= 6
+    assert "".join(d["delta"] for d in deltas) == stream.text == "".join(f"t{i} " for i in range(50))
+    assert [d["seq"] for d in deltas] == list(range(len(deltas)))
+    assert deltas[-1]["done"] and not any(d["done"] for d in deltas[:-1])
+
+
+def test_buffered_tokens_flush_without_new_tokens():
+    """片段停止到达时，缓冲内容在时间窗口结束后自动推送"""
+    async def run():
+        manager = RecordingManager()
+        service = NotificationService(manager)
+        stream = service.partial_feedback_stream("c1", "speech", flush_interval=0.02)
+        await stream("a")
+        await stream("b")
+        await asyncio.sleep(0.05)
+        sent_before_close = list(_deltas(manager))
+        await stream.close()
+        return sent_before_close, _deltas(manager)
+
+    before_close, all_deltas = asyncio.run(run())
+    assert [d["delta"] for d in before_close] == ["a", "b"]
+    assert all_deltas[-1] == {"type": "speech", "delta": "", "seq": 2, "done": True}
+
+
+def test_stream_without_tokens_sends_nothing():
+    async def run():
+        manager = RecordingManager()
+        async with NotificationService(manager).partial_feedback_stream("c1", "content"):
+            pass
+        return manager.messages
+
+    assert asyncio.run(run()) == []
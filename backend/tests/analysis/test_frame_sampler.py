@@ -0,0 +1,209 @@
+import shutil
+import subprocess
+import time
+
+import cv2
+import numpy as np
+import pytest
+
+from app.services.frame_sampler import (
+    STRATEGY_KEYFRAME,
+    STRATEGY_LINEAR,
+    STRATEGY_SEEK,
+    FrameSampler,
+    estimate_costs,
+)
+
+
+def _write_video(path, fourcc, frame_count, size=(320, 240), fps=25):
+    """生成内容逐帧平移的测试视频，并在左上角编码帧序号"""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*fourcc), fps, size)
+    if not writer.isOpened():
+        pytest.skip(f"当前OpenCV不支持编码器: {fourcc}")
+    rng = np.random.default_rng(0)
+    base = rng.integers(0, 255, (size[1], size[0], 3), dtype=np.uint8)
+    for i in range(frame_count):
+        frame = np.roll(base, i * 3, axis=1)
+        frame[:8, :8] = i % 256
+        writer.write(frame)
+    writer.release()
+    return str(path)
+
+
+BIT_BLOCK = 20  # 帧序号每一位占用的方块边长（像素），有损编码后仍可按亮度阈值还原
+INDEX_BITS = 12
+
+
+def _indexed_frame(index, size):
+    """平滑渐变背景上以黑白方块二进制编码帧序号的帧"""
+    width, height = size
+    x = np.linspace(0, 255, width, dtype=np.float32)
+    frame = np.empty((height, width, 3), dtype=np.uint8)
+    frame[:] = ((x + index * 2) % 256).astype(np.uint8)[None, :, None]
+    for bit in range(INDEX_BITS):
+        block = frame[BIT_BLOCK:2 * BIT_BLOCK, bit * BIT_BLOCK:(bit + 1) * BIT_BLOCK]
+        block[:] = 255 if (index >> bit) & 1 else 0
+    return frame
+
+
+def _decode_index(frame):
+    """从帧中的方块还原帧序号"""
+    index = 0
+    for bit in range(INDEX_BITS):
+        block = frame[BIT_BLOCK + 4:2 * BIT_BLOCK - 4, bit * BIT_BLOCK + 4:(bit + 1) * BIT_BLOCK - 4]
+        if block.mean() > 128:
+            index |= 1 << bit
+    return index
+
+
+def _write_h264_video(path, frame_count, size=(320, 240), fps=25):
+    """生成长GOP的H.264测试视频，优先用OpenCV编码，不支持时使用ffmpeg（libx264默认GOP为250帧）"""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"avc1"), fps, size)
+    if writer.isOpened():
+        for i in range(frame_count):
+            writer.write(_indexed_frame(i, size))
+        writer.release()
+        return str(path)
+    writer.release()
+
+    ffmpeg = shutil.which("ffmpeg")
+    if ffmpeg is None:
+        pytest.skip("当前环境没有H.264编码器（OpenCV avc1 或 ffmpeg）")
+    command = [ffmpeg, "-y", "-loglevel", "error", "-f", "rawvideo", "-pix_fmt", "bgr24",
+               "-s", f"{size[0]}x{size[1]}", "-r", str(fps), "-i", "-",
+               "-c:v", "libx264", "-g", "250", "-pix_fmt", "yuv420p", str(path)]
+    process = subprocess.Popen(command, stdin=subprocess.PIPE)
+    for i in range(frame_count):
+        process.stdin.write(_indexed_frame(i, size).tobytes())
+    process.stdin.close()
+    if process.wait() != 0:
+        pytest.skip("ffmpeg 不支持 libx264 编码")
+    return str(path)
+
+
+def _sample_with_per_frame_seek(video_path, max_frames=100):
+    """原实现：每个采样点都seek一次"""
+    cap = cv2.VideoCapture(video_path)
+    frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    sample_rate = max(1, frame_count // max_frames)
+    indices = []
+    for i in range(0, frame_count, sample_rate):
+        cap.set(cv2.CAP_PROP_POS_FRAMES, i)
+        ret, _ = cap.read()
+        if not ret:
+            break
+        indices.append(i)
+    cap.release()
+    return indices
+
+
+def test_cost_model_prefers_linear_for_dense_sampling():
+    """采样密集（步长小于seek开销）时线性扫描最便宜"""
+    costs = estimate_costs(remaining_frames=500, remaining_targets=100, gop_size=12, gop_known=True)
+    assert min(costs, key=costs.get) == STRATEGY_LINEAR
+
+
+def test_cost_model_prefers_keyframe_for_sparse_sampling():
+    """长视频稀疏采样且GOP已知时对齐关键帧seek"""
+    costs = estimate_costs(remaining_frames=45000, remaining_targets=100, gop_size=250, gop_known=True)
+    assert min(costs, key=costs.get) == STRATEGY_KEYFRAME
+
+
+def test_cost_model_falls_back_to_seek_when_gop_unknown():
+    """探测范围内没有第二个关键帧时只能在线性扫描和直接seek之间选择"""
+    costs = estimate_costs(remaining_frames=45000, remaining_targets=100, gop_size=300, gop_known=False)
+    assert STRATEGY_KEYFRAME not in costs
+    assert min(costs, key=costs.get) == STRATEGY_SEEK
+
+
+def test_dense_sampling_matches_per_frame_seek(tmp_path):
+    """线性扫描得到的帧序号和帧内容与逐帧seek一致"""
+    video_path = _write_video(tmp_path / "short.mp4", "mp4v", 200)
+
+    sampler = FrameSampler(max_frames=50)
+    sampled = list(sampler.sample(video_path))
+
+    assert sampler.last_plan.strategy == STRATEGY_LINEAR
+    assert [index for index, _ in sampled] == _sample_with_per_frame_seek(video_path, max_frames=50)
+
+    cap = cv2.VideoCapture(video_path)
+    for index, frame in sampled[::10]:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, index)
+        _, expected = cap.read()
+        assert np.array_equal(frame, expected)
+    cap.release()
+
+
+def test_sparse_sampling_aligns_to_keyframes(tmp_path):
+    """稀疏采样时采样点对齐到关键帧之后的固定偏移处"""
+    video_path = _write_video(tmp_path / "long.mp4", "mp4v", 1500, size=(160, 120))
+
+    sampler = FrameSampler(max_frames=20, probe_frames=100)
+    indices = [index for index, _ in sampler.sample(video_path)]
+    plan = sampler.last_plan
+
+    assert plan.strategy == STRATEGY_KEYFRAME
+    assert plan.gop_size > 1
+    assert len(indices) == len(set(indices))
+    assert indices == sorted(indices)
+    # 探测阶段之后的采样点都满足 (index - 回退帧数) 是关键帧
+    for index in indices:
+        if index >= plan.probed_frames:
+            assert (index - sampler.seek_backoff) % plan.gop_size == 0
+    assert 15 <= len(indices) <= 21
+
+
+@pytest.mark.parametrize("max_frames, probe_frames", [
+    (50, 300),   # 密集采样：线性扫描
+    (20, 300),   # 稀疏采样：探测到两个关键帧后对齐关键帧seek
+    (20, 100),   # 探测范围内只有一个关键帧：直接seek
+])
+def test_h264_long_gop_sampled_timestamps_are_exact(tmp_path, max_frames, probe_frames):
+    """长GOP的H.264视频上，每个采样帧的内容都对应其帧序号，时间戳 = 帧序号 / fps 准确无偏移"""
+    fps = 25
+    video_path = _write_h264_video(tmp_path / "answer.mp4", 1500, fps=fps)
+
+    sampler = FrameSampler(max_frames=max_frames, probe_frames=probe_frames)
+    sampled = list(sampler.sample(video_path))
+    indices = [index for index, _ in sampled]
+
+    assert [_decode_index(frame) for _, frame in sampled] == indices
+    assert indices == sorted(set(indices)) and indices[0] == 0
+    assert abs(len(indices) - max_frames) <= 2
+    # 采样时间点覆盖整段回答，相邻采样点间隔均匀（不超过两倍平均步长）
+    timestamps = [index / fps for index in indices]
+    assert timestamps[-1] >= 60 * (1 - 2 / max_frames)
+    step = 1500 / max_frames
+    assert all(b - a <= 2 * step for a, b in zip(indices, indices[1:]))
+
+
+def test_unopenable_video_raises(tmp_path):
+    with pytest.raises(IOError):
+        list(FrameSampler().sample(str(tmp_path / "missing.mp4")))
+
+
+@pytest.mark.benchmark
+@pytest.mark.parametrize("fourcc, extension, frame_count, size", [
+    ("mp4v", "mp4", 500, (320, 240)),    # MPEG-4 Part 2，短回答
+    ("mp4v", "mp4", 3000, (320, 240)),   # MPEG-4 Part 2，2分钟长回答
+    ("VP80", "webm", 300, (160, 120)),   # 浏览器MediaRecorder录制的webm
+    ("MJPG", "avi", 500, (320, 240)),    # 摄像头直出的帧内编码
+])
+def test_benchmark_sampler_beats_per_frame_seek(tmp_path, fourcc, extension, frame_count, size):
+    """基准测试：自适应采样比逐帧seek更快，且采样数量相当"""
+    video_path = _write_video(tmp_path / f"interview.{extension}", fourcc, frame_count, size)
+
+    start = time.perf_counter()
+    seek_indices = _sample_with_per_frame_seek(video_path)
+    seek_time = time.perf_counter() - start
+
+    sampler = FrameSampler()
+    start = time.perf_counter()
+    sampled_indices = [index for index, _ in sampler.sample(video_path)]
+    sampler_time = time.perf_counter() - start
+
+    print(f"\n{fourcc}/{frame_count}帧: 逐帧seek {seek_time:.3f}s, "
+          f"{sampler.last_plan.strategy} {sampler_time:.3f}s, GOP={sampler.last_plan.gop_size}")
+
+    assert abs(len(sampled_indices) - len(seek_indices)) <= 2
+    assert sampler_time < seek_time
@@ -0,0 +1,124 @@
+import os
+import wave
+import shutil
+
+import cv2
+import numpy as np
+import pytest
+
+from app.services.media_pipeline import (
+    AUDIO_SAMPLE_RATE,
+    MediaPipeline,
+    MediaPreparationError,
+    compute_content_hash,
+)
+
+
+def _write_stereo_wav(path, seconds=1.0, sample_rate=44100):
+    """生成44.1kHz双声道正弦波测试音频"""
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    tone = (np.sin(2 * np.pi * 440 * t) * 0.5 * 32767).astype(np.int16)
+    stereo = np.stack([tone, tone], axis=1)
+    with wave.open(str(path), "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(sample_rate)
+        wav.writeframes(stereo.tobytes())
+
+
+def _write_video(path, frame_count=50, fps=25):
+    """生成MJPG编码的测试视频"""
+    writer = cv2.VideoWriter(str(path), cv2.VideoWriter_fourcc(*"MJPG"), fps, (64, 48))
+    for i in range(frame_count):
+        frame = np.full((48, 64, 3), i * 5 % 255, dtype=np.uint8)
+        writer.write(frame)
+    writer.release()
+
+
+@pytest.fixture
+def pipeline(tmp_path):
+    return MediaPipeline(cache_dir=str(tmp_path / "cache"), frame_fps=5, max_frames=20)
+
+
+def test_audio_is_resampled_to_16k_mono(pipeline, tmp_path):
+    """音频统一转换为16kHz单声道PCM"""
+    source = tmp_path / "answer.wav"
+    _write_stereo_wav(source)
+
+    media = pipeline.prepare(str(source), "audio")
+
+    assert media.has_audio
+    assert not media.has_video
+    assert media.content_hash == compute_content_hash(str(source))
+    with wave.open(media.audio_path, "rb") as wav:
+        assert wav.getnchannels() == 1
+        assert wav.getframerate() == AUDIO_SAMPLE_RATE
+        assert wav.getsampwidth() == 2
+
+    waveform, sample_rate = media.load_waveform()
+    assert sample_rate == AUDIO_SAMPLE_RATE
+    assert len(waveform) == pytest.approx(AUDIO_SAMPLE_RATE, rel=0.01)
+    assert media.duration == pytest.approx(1.0, rel=0.05)
+
+
+def test_artifacts_cached_by_content_hash(pipeline, tmp_path):
+    """内容相同的文件只预处理一次"""
+    source = tmp_path / "answer.wav"
+    _write_stereo_wav(source)
+    copy = tmp_path / "answer_copy.wav"
+    shutil.copy(source, copy)
+
+    first = pipeline.prepare(str(source), "audio")
+    second = pipeline.prepare(str(copy), "audio")
+
+    assert not first.from_cache
+    assert second.from_cache
+    assert second.source_path == str(copy)
+    assert second.audio_path == first.audio_path
+    assert second.read_audio_bytes() == first.read_audio_bytes()
+    assert pipeline.get_stats()["prepared"] == 1
+    assert pipeline.get_stats()["cache_hits"] == 1
+
+
+def test_video_frames_are_sampled(pipeline, tmp_path):
+    """视频按采样帧率抽帧，时间戳递增"""
+    source = tmp_path / "interview.avi"
+    _write_video(source)
+
+    media = pipeline.prepare(str(source), "video")
+
+    assert media.has_video
+    assert 0 < len(media.frame_paths) <= 20
+    assert len(media.frame_paths) == len(media.frame_timestamps)
+    assert media.frame_timestamps == sorted(media.frame_timestamps)
+
+    frames = list(media.iter_frames())
+    assert len(frames) == len(media.frame_paths)
+    assert frames[0][1].shape[:2] == (48, 64)
+
+
+def test_corrupted_manifest_is_rebuilt(pipeline, tmp_path):
+    """缓存清单损坏时重新预处理"""
+    source = tmp_path / "answer.wav"
+    _write_stereo_wav(source)
+    media = pipeline.prepare(str(source), "audio")
+
+    with open(os.path.join(media.cache_dir, "manifest.json"), "w") as f:
+        f.write("{broken")
+
+    rebuilt = pipeline.prepare(str(source), "audio")
+    assert not rebuilt.from_cache
+    assert rebuilt.has_audio
+
+
+def test_undecodable_file_raises(pipeline, tmp_path):
+    source = tmp_path / "broken.mp3"
+    source.write_bytes(b"not really audio")
+
+    with pytest.raises(MediaPreparationError):
+        pipeline.prepare(str(source), "audio")
+
+    # 失败时不留下临时目录
+    cache_root = tmp_path / "cache"
+    leftovers = [name for _, dirs, _ in os.walk(cache_root) for name in dirs if ".tmp-" in name]
+    assert leftovers == []
@@ -3,6 +3,25 @@ from sqlalchemy import text
 from app.db.database import engine, Base
 from sqlalchemy.orm import sessionmaker
 
+
+def pytest_addoption(parser):
+    parser.addoption("--run-benchmark", action="store_true", default=False,
+                     help="运行标记为 benchmark 的基准测试")
+
+
+def pytest_configure(config):
+    config.addinivalue_line("markers", "benchmark: 比较耗时、受机器负载影响的基准测试，默认跳过，使用 --run-benchmark 运行")
+
+
+def pytest_collection_modifyitems(config, items):
+    """默认跳过基准测试，单元测试只检查正确性"""
+    if config.getoption("--run-benchmark"):
+        return
+    skip_benchmark = pytest.mark.skip(reason="基准测试，使用 --run-benchmark 运行")
+    for item in items:
+        if "benchmark" in item.keywords:
+            item.add_marker(skip_benchmark)
+
 @pytest.fixture(scope="function")
 def test_db():
     with engine.connect() as conn: